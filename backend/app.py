@@ -1,19 +1,43 @@
-from flask import Flask, request, jsonify
+import io
+import itertools
+import json
+from flask import Flask, Request, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+from werkzeug.datastructures import FileStorage
 
 # Core feature handlers
-from chat import handle_chat
+from chat import handle_chat, handle_chat_stream, llm_lane
 from voice import handle_voice
-from report import generate_farming_report
+from report import generate_farming_report, generate_report_batch, report_lane
 
 # Services
 from services.db_service import (
-    get_chat_history, 
     get_chat_sessions, 
+    get_chat_sessions_page,
     get_chat_by_id,
+    get_user_chat_page,
+    chat_session_exists,
+    get_user_reports,
+    get_user_reports_page,
+    get_user_report,
+    iter_chat_history,
+    decode_cursor,
     delete_chat_session
 )
 from services.firebase_service import initialize_firebase
+from services.db_indexes import ensure_indexes
+from services.llm_errors import LLMError, LLMOverloadedError
+from services.llm_service import get_overload_retry_after, get_circuit_retry_after
+from services.transcription_client import TranscriptionError, TranscriptionOverloadedError
+from services.audio_decode import AudioRejectedError, check_upload_limits, UPLOAD_OVERHEAD_BYTES
+from utils.config import (
+    REPORT_BATCH_MAX_ITEMS,
+    VOICE_MAX_UPLOAD_BYTES,
+    DB_ENSURE_INDEXES_ON_STARTUP,
+    LIST_PAGE_SIZES,
+    LIST_PAGE_MAX,
+    LIST_API_COMPAT
+)
 
 # Auth
 from routes.auth_routes import auth_bp, token_required, verify_token
@@ -23,7 +47,25 @@ from routes.feedback_routes import feedback_bp
 # Initialize Firebase Admin SDK
 initialize_firebase()
 
+# Create missing MongoDB indexes (idempotent; `python manage_indexes.py` does the same)
+if DB_ENSURE_INDEXES_ON_STARTUP:
+    try:
+        ensure_indexes()
+    except Exception as e:
+        print(f"⚠️ Index bootstrap failed: {str(e)}")
+
+
+class InMemoryUploadRequest(Request):
+    """Keep voice-sized multipart file parts in memory instead of werkzeug's spooled temp file"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= VOICE_MAX_UPLOAD_BYTES + UPLOAD_OVERHEAD_BYTES:
+            return io.BytesIO()
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
 app = Flask(__name__)
+app.request_class = InMemoryUploadRequest
 CORS(app, origins="*")
 
 # Register authentication blueprint
@@ -31,6 +73,83 @@ app.register_blueprint(auth_bp)
 app.register_blueprint(otp_bp)
 app.register_blueprint(feedback_bp)
 
+OVERLOADED_MESSAGE = "AgriGPT is receiving too many requests right now. Please try again shortly."
+
+
+UNAVAILABLE_MESSAGE = "AgriGPT's AI service is temporarily unavailable. Please try again shortly."
+TRANSCRIPTION_BUSY_MESSAGE = "Voice transcription is busy right now. Please try again shortly."
+TRANSCRIPTION_UNAVAILABLE_MESSAGE = "Voice transcription is temporarily unavailable. Please try again shortly."
+
+
+def llm_error_body(error):
+    """(payload, status) for an LLM layer error: 429 when overloaded, 503 when the upstream is unavailable"""
+    if isinstance(error, LLMOverloadedError):
+        return {"error": OVERLOADED_MESSAGE, "retry_after": error.retry_after}, 429
+    return {"error": UNAVAILABLE_MESSAGE, "retry_after": error.retry_after}, 503
+
+
+def _retry_later_response(payload, status):
+    response = jsonify(payload)
+    response.headers["Retry-After"] = str(payload["retry_after"])
+    return response, status
+
+
+def _overloaded_response(retry_after):
+    """HTTP 429 with Retry-After when the LLM admission control refuses a call"""
+    return _retry_later_response({"error": OVERLOADED_MESSAGE, "retry_after": retry_after}, 429)
+
+
+def _llm_error_response(error):
+    """HTTP 429 / 503 with Retry-After for LLMOverloadedError / LLMUnavailableError"""
+    return _retry_later_response(*llm_error_body(error))
+
+
+def transcription_error_body(error):
+    """(payload, status) for a transcription server error: 429 when its queue is full, else 503"""
+    if isinstance(error, TranscriptionOverloadedError):
+        return {"error": TRANSCRIPTION_BUSY_MESSAGE, "retry_after": error.retry_after}, 429
+    return {"error": TRANSCRIPTION_UNAVAILABLE_MESSAGE, "retry_after": error.retry_after}, 503
+
+
+def compat_requested(get):
+    """Old unpaginated list shapes: LIST_API_COMPAT, or ?compat=1 (get: query string lookup)"""
+    return LIST_API_COMPAT or (get("compat") or "").lower() in ("1", "true")
+
+
+def page_args(get, kind, cursor_param="cursor"):
+    """(limit, cursor) from the query string; ValueError if limit is not a positive integer"""
+    raw_limit = get("limit")
+    limit = int(raw_limit) if raw_limit else LIST_PAGE_SIZES[kind]
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, LIST_PAGE_MAX), get(cursor_param) or None
+
+
+HISTORY_STREAM_BATCH = 200  # pairs serialized per chunk
+
+
+def history_json_chunks(user_id, limit=None, cursor=None, compat=False):
+    """
+    /api/history body, piece by piece, as the aggregation cursor delivers the
+    pairs. The first pair is fetched before anything is yielded, so query
+    errors surface before the response starts.
+    """
+    page = {}
+    pairs = iter_chat_history(user_id, limit, cursor, page)
+    first = next(pairs, None)
+    yield "[" if compat else '{"history": ['
+
+    batch, separator = [], ""
+    for pair in itertools.chain([first] if first else [], pairs):
+        batch.append(app.json.dumps(pair))
+        if len(batch) == HISTORY_STREAM_BATCH:
+            yield separator + ",".join(batch)
+            batch, separator = [], ","
+    if batch:
+        yield separator + ",".join(batch)
+    yield "]" if compat else f'], "next_cursor": {app.json.dumps(page.get("next_cursor"))}}}'
+
+
 # -------------------- HEALTH CHECK --------------------
 @app.route("/")
 def health():
@@ -59,20 +178,94 @@ def chat_api():
         result = handle_chat(user_id, message, chat_id)
         return jsonify(result)
 
+    except LLMError as e:
+        return _llm_error_response(e)
     except Exception as e:
         print(f"❌ Error in chat_api: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
 
+# -------------------- CHAT STREAM API --------------------
+def _sse(event, data):
+    """Format a single Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route("/api/chat/stream", methods=["POST"])
+def chat_stream_api():
+    """Same as /api/chat, but streams the reply as Server-Sent Events"""
+    try:
+        token = request.headers.get("Authorization")
+        user_id = "trial_user"  # default for unauthenticated users
+
+        if token and token.startswith("Bearer "):
+            token_str = token.split(" ")[1]
+            user_data = verify_token(token_str)
+            if user_data:
+                user_id = user_data["user_id"]
+
+        data = request.json
+        message = data.get("message")
+        chat_id = data.get("chat_id")  # Optional: for continuing existing chat
+
+        if not message or not message.strip():
+            return jsonify({"error": "Message is required"}), 400
+
+        # Refuse before the stream starts, while a proper 429 / 503 can still be sent
+        retry_after = get_overload_retry_after(llm_lane(user_id))
+        if retry_after:
+            return _overloaded_response(retry_after)
+        retry_after = get_circuit_retry_after()
+        if retry_after:
+            return _retry_later_response({"error": UNAVAILABLE_MESSAGE, "retry_after": retry_after}, 503)
+
+        def generate():
+            events = handle_chat_stream(user_id, message, chat_id)
+            try:
+                for event, payload in events:
+                    yield _sse(event, payload)
+            except LLMError as e:
+                yield _sse("error", llm_error_body(e)[0])
+            except Exception as e:
+                print(f"❌ Error in chat_stream_api: {str(e)}")
+                yield _sse("error", {"error": "Internal server error"})
+            finally:
+                # On client disconnect this lets handle_chat_stream finish and save the turn
+                events.close()
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"  # disable proxy buffering (nginx)
+            }
+        )
+
+    except Exception as e:
+        print(f"❌ Error in chat_stream_api: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
 # -------------------- CHAT SESSIONS API --------------------
 @app.route("/api/chats", methods=["GET"])
 @token_required
 def get_chats():
-    """Get all chat sessions for authenticated user"""
+    """
+    Chat sessions of the authenticated user, most recently updated first.
+    Query: limit?, cursor? -> {"sessions": [...], "next_cursor"} (summary fields only).
+    With ?compat=1 / LIST_API_COMPAT: the full array of session documents.
+    """
     try:
         user_id = request.current_user["user_id"]
-        sessions = get_chat_sessions(user_id)
-        return jsonify(sessions)
+        if compat_requested(request.args.get):
+            return jsonify(get_chat_sessions(user_id))
+
+        try:
+            limit, cursor = page_args(request.args.get, "sessions")
+            return jsonify(get_chat_sessions_page(user_id, limit, cursor))
+        except ValueError:
+            return jsonify({"error": "Invalid limit or cursor"}), 400
 
     except Exception as e:
         print(f"❌ Error in get_chats: {str(e)}")
@@ -82,18 +275,29 @@ def get_chats():
 @app.route("/api/chats/<chat_id>", methods=["GET"])
 @token_required
 def get_chat(chat_id):
-    """Get full chat history for a specific chat session"""
+    """
+    One chat session with its newest messages (oldest first).
+    Query: limit?, before? (next_cursor of the previous response, for older messages)
+    -> {"session", "messages", "next_cursor"}. With ?compat=1 / LIST_API_COMPAT: every message.
+    Ownership is part of the query: another user's chat is never loaded.
+    """
     try:
         user_id = request.current_user["user_id"]
-        chat_data = get_chat_by_id(chat_id)
+        if compat_requested(request.args.get):
+            chat_data = get_chat_by_id(chat_id, user_id)
+        else:
+            try:
+                limit, before = page_args(request.args.get, "messages", cursor_param="before")
+                chat_data = get_user_chat_page(chat_id, user_id, limit, before)
+            except ValueError:
+                return jsonify({"error": "Invalid limit or cursor"}), 400
         
         if not chat_data:
+            # Not this user's chat - tell a missing chat from someone else's (an _id lookup)
+            if chat_session_exists(chat_id):
+                return jsonify({"error": "Unauthorized"}), 403
             return jsonify({"error": "Chat not found"}), 404
         
-        # Verify user owns this chat
-        if chat_data["session"]["user_id"] != user_id:
-            return jsonify({"error": "Unauthorized"}), 403
-        
         return jsonify(chat_data)
 
     except Exception as e:
@@ -123,16 +327,34 @@ def delete_chat(chat_id):
 @app.route("/api/voice", methods=["POST"])
 @token_required
 def voice_api():
+    """
+    Multipart upload (field "audio", optional "duration" in seconds), or the raw
+    audio as the request body (Content-Type audio/*, optional X-Audio-Duration).
+    Too large / too long uploads are rejected with 413 before any decoding.
+    """
     try:
         user_id = request.current_user["user_id"]
-        audio = request.files.get("audio")
+        check_upload_limits(request.content_length, request.headers.get("X-Audio-Duration"))
 
-        if not audio:
-            return jsonify({"error": "Audio file is required"}), 400
+        if request.mimetype.startswith("audio/"):
+            # Raw body: decoded while it is still being received
+            audio = FileStorage(stream=request.stream, content_type=request.content_type)
+        else:
+            audio = request.files.get("audio")
+            if not audio:
+                return jsonify({"error": "Audio file is required"}), 400
+            check_upload_limits(duration=request.form.get("duration"))
 
         result = handle_voice(audio, user_id)
         return jsonify(result)
 
+    except AudioRejectedError as e:
+        return jsonify({"error": str(e)}), e.status
+    except LLMError as e:
+        return _llm_error_response(e)
+    except TranscriptionError as e:
+        print(f"⚠️ Transcription failed in voice_api: {str(e)}")
+        return _retry_later_response(*transcription_error_body(e))
     except Exception as e:
         print(f"❌ Error in voice_api: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
@@ -142,10 +364,29 @@ def voice_api():
 @app.route("/api/history", methods=["GET"])
 @token_required
 def history():
+    """
+    Question/answer history of the authenticated user, newest first - paired
+    inside MongoDB and streamed. Query: limit?, cursor?
+    -> {"history": [...], "next_cursor"}. With ?compat=1 / LIST_API_COMPAT: the full array.
+    """
     try:
         user_id = request.current_user["user_id"]
-        history = get_chat_history(user_id)
-        return jsonify(history)
+        compat = compat_requested(request.args.get)
+        limit, cursor = None, None
+        if not compat:
+            try:
+                limit, cursor = page_args(request.args.get, "history")
+                if cursor:
+                    decode_cursor(cursor)
+            except ValueError:
+                return jsonify({"error": "Invalid limit or cursor"}), 400
+
+        chunks = history_json_chunks(user_id, limit, cursor, compat)
+        first = next(chunks)
+        return Response(
+            stream_with_context(itertools.chain([first], chunks)),
+            mimetype="application/json"
+        )
 
     except Exception as e:
         print(f"❌ Error in history_api: {str(e)}")
@@ -186,26 +427,124 @@ def report_api():
 
         return jsonify(report)
 
+    except LLMError as e:
+        return _llm_error_response(e)
     except Exception as e:
         print(f"❌ Error in report_api: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
 
+# -------------------- BATCH REPORT API --------------------
+@app.route("/api/reports/batch", methods=["POST"])
+@token_required
+def report_batch_api():
+    """
+    Generate reports for many crops at once (e.g. every crop of one district).
+    Authenticated users only - a batch is up to REPORT_BATCH_MAX_ITEMS LLM calls,
+    trial users generate one report at a time through /api/report.
+    Body: {"items": [{"cropName", "region"?, "language"?}, ...], "region"?, "language"?}
+    Top-level region / language are defaults for the items.
+    Streams NDJSON: one {"type": "item", ...} line per report as it completes,
+    then a {"type": "done", ...} summary line.
+    """
+    try:
+        user_id = request.current_user["user_id"]
+        data = request.json or {}
+        items = data.get("items")
+
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "items must be a non-empty list"}), 400
+        if len(items) > REPORT_BATCH_MAX_ITEMS:
+            return jsonify({"error": f"At most {REPORT_BATCH_MAX_ITEMS} items per batch"}), 400
+
+        batch = []
+        for item in items:
+            if not isinstance(item, dict):
+                return jsonify({"error": "Each item must be an object"}), 400
+            crop_name = item.get("cropName")
+            region = item.get("region") or data.get("region")
+            if not crop_name or not region:
+                return jsonify({"error": "Crop name and region are required for every item"}), 400
+            batch.append({
+                "cropName": crop_name,
+                "region": region,
+                "language": item.get("language") or data.get("language")
+            })
+
+        # Refuse before the stream starts, while a proper 429 / 503 can still be sent
+        retry_after = get_overload_retry_after(report_lane(user_id))
+        if retry_after:
+            return _overloaded_response(retry_after)
+        retry_after = get_circuit_retry_after()
+        if retry_after:
+            return _retry_later_response({"error": UNAVAILABLE_MESSAGE, "retry_after": retry_after}, 503)
+
+        def generate():
+            events = generate_report_batch(user_id, batch)
+            try:
+                for event, payload in events:
+                    yield json.dumps({"type": event, **payload}, ensure_ascii=False) + "\n"
+            except Exception as e:
+                print(f"❌ Error in report_batch_api: {str(e)}")
+                yield json.dumps({"type": "error", "error": "Internal server error"}) + "\n"
+            finally:
+                # On client disconnect: cancel pending items, save the finished ones
+                events.close()
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype="application/x-ndjson",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"  # first reports reach the client early
+            }
+        )
+
+    except Exception as e:
+        print(f"❌ Error in report_batch_api: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
 # -------------------- REPORT HISTORY --------------------
 @app.route("/api/reports", methods=["GET"])
 @token_required
 def report_history():
+    """
+    Reports of the authenticated user, newest first, without report_data
+    (GET /api/reports/<report_id> has it). Query: limit?, cursor?
+    -> {"reports": [...], "next_cursor"}. With ?compat=1 / LIST_API_COMPAT: full reports array.
+    """
     try:
         user_id = request.current_user["user_id"]
-        from services.db_service import get_user_reports
-        reports = get_user_reports(user_id)
-        return jsonify(reports)
+        if compat_requested(request.args.get):
+            return jsonify(get_user_reports(user_id))
+
+        try:
+            limit, cursor = page_args(request.args.get, "reports")
+            return jsonify(get_user_reports_page(user_id, limit, cursor))
+        except ValueError:
+            return jsonify({"error": "Invalid limit or cursor"}), 400
 
     except Exception as e:
         print(f"❌ Error in report_history: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
 
+@app.route("/api/reports/<report_id>", methods=["GET"])
+@token_required
+def report_detail(report_id):
+    """One of the authenticated user's reports, with its full report_data"""
+    try:
+        report = get_user_report(request.current_user["user_id"], report_id)
+        if not report:
+            return jsonify({"error": "Report not found"}), 404
+        return jsonify(report)
+
+    except Exception as e:
+        print(f"❌ Error in report_detail: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
 # -------------------- RUN SERVER --------------------
 if __name__ == "__main__":
     # app.run(
@@ -0,0 +1,332 @@
+"""
+ASGI entry point (asyncio serving mode)
+
+The LLM-bound routes are served natively on asyncio: Gemini and MongoDB are
+awaited, so an in-flight request holds no thread while it waits on the
+network and one process can keep thousands of LLM calls in flight.
+
+    POST /api/chat      -> chat.handle_chat_async
+    POST /api/report    -> report.generate_farming_report_async
+    GET  /api/history   -> app.history_json_chunks (streamed, paired in MongoDB)
+    WS   /ws/voice      -> voice.VoiceStream (streaming voice, ASGI mode only)
+
+Every other route (auth_bp, otp_bp, feedback_bp, /api/chats, /api/voice, ...)
+is forwarded unchanged to the Flask app through asgiref's WSGI adapter, which
+runs it on a thread pool. /api/voice stays there: the request thread only
+decodes the upload and waits on the transcription server
+(transcription_server.py), where Whisper runs in its own processes.
+
+Usage:
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+    gunicorn asgi:application -k uvicorn.workers.UvicornWorker -w 2 -b 0.0.0.0:5000
+
+The WSGI entry point (gunicorn app:app) keeps working as before.
+"""
+
+import asyncio
+import itertools
+import json
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi
+
+from app import (
+    app as flask_app,
+    llm_error_body,
+    transcription_error_body,
+    compat_requested,
+    page_args,
+    history_json_chunks
+)
+from chat import handle_chat_async
+from report import generate_farming_report_async
+from voice import VoiceStream
+from services.db_service import chat_writer, decode_cursor
+from services.audio_decode import AudioRejectedError, SAMPLE_RATE
+from routes.auth_routes import verify_token
+from services.llm_errors import LLMError
+from services.transcription_client import TranscriptionError
+
+wsgi_application = WsgiToAsgi(flask_app)
+
+MAX_BODY_BYTES = 1024 * 1024  # JSON bodies only - uploads go through Flask
+
+
+# -------------------- ASGI HELPERS --------------------
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        if not message.get("more_body"):
+            return body
+
+
+async def _send_json(send, payload, status=200, headers=None):
+    """Send a JSON response serialized exactly like Flask's jsonify"""
+    body = flask_app.json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"access-control-allow-origin", b"*"),
+            *(headers or [])
+        ]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_json_stream(send, chunks):
+    """Stream a JSON body from a (blocking) iterator of text chunks, each pulled on a worker thread"""
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"access-control-allow-origin", b"*")
+        ]
+    })
+    while True:
+        chunk = await asyncio.to_thread(next, chunks, None)
+        if chunk is None:
+            break
+        await send({"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _bearer_token(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            token = value.decode("latin-1")
+            return token.split(" ")[1] if token.startswith("Bearer ") and " " in token else None
+    return None
+
+
+def _optional_user_id(scope):
+    """Same as the routes in app.py: unauthenticated users are trial users"""
+    token = _bearer_token(scope)
+    if token:
+        user_data = verify_token(token)
+        if user_data:
+            return user_data["user_id"]
+    return "trial_user"
+
+
+# -------------------- ASYNC ROUTES --------------------
+async def chat_endpoint(scope, receive):
+    try:
+        user_id = _optional_user_id(scope)
+        data = json.loads(await _read_body(receive))
+        message = data.get("message")
+        chat_id = data.get("chat_id")
+
+        if not message:
+            return {"error": "Message is required"}, 400
+
+        return await handle_chat_async(user_id, message, chat_id), 200
+
+    except LLMError:
+        raise
+    except Exception as e:
+        print(f"❌ Error in chat_api (async): {str(e)}")
+        return {"error": "Internal server error"}, 500
+
+
+async def report_endpoint(scope, receive):
+    try:
+        user_id = _optional_user_id(scope)
+        data = json.loads(await _read_body(receive))
+
+        crop_name = data.get("cropName")
+        region = data.get("region")
+        language = data.get("language")
+
+        if not crop_name or not region:
+            return {"error": "Crop name and region are required"}, 400
+
+        report = await generate_farming_report_async(
+            user_id=user_id,
+            crop_name=crop_name,
+            region=region,
+            language=language
+        )
+
+        if "error" in report:
+            return report, 500
+
+        return report, 200
+
+    except LLMError:
+        raise
+    except Exception as e:
+        print(f"❌ Error in report_api (async): {str(e)}")
+        return {"error": "Internal server error"}, 500
+
+
+async def history_endpoint(scope, receive):
+    token = _bearer_token(scope)
+    if not token:
+        return {"error": "Token missing"}, 401
+    user_data = verify_token(token)
+    if not user_data:
+        return {"error": "Invalid token"}, 401
+
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    get = lambda name: query.get(name, [None])[0]
+    compat = compat_requested(get)
+    limit, cursor = None, None
+    if not compat:
+        try:
+            limit, cursor = page_args(get, "history")
+            if cursor:
+                decode_cursor(cursor)
+        except ValueError:
+            return {"error": "Invalid limit or cursor"}, 400
+
+    try:
+        # The first chunk runs the aggregation, so its errors still get a 500
+        chunks = history_json_chunks(user_data["user_id"], limit, cursor, compat)
+        first = await asyncio.to_thread(next, chunks)
+        return itertools.chain([first], chunks), 200
+    except Exception as e:
+        print(f"❌ Error in history_api (async): {str(e)}")
+        return {"error": "Internal server error"}, 500
+
+
+# -------------------- STREAMING VOICE --------------------
+# WebSocket close codes
+WS_NORMAL = 1000
+WS_UNAUTHORIZED = 4401
+WS_TOO_BIG = 1009
+WS_INTERNAL_ERROR = 1011
+WS_TRY_AGAIN_LATER = 1013
+
+
+async def voice_ws_endpoint(scope, receive, send):
+    """
+    WS /ws/voice?token=<jwt>&sample_rate=16000
+
+    Client: binary frames of mono 16-bit little-endian PCM while the farmer
+    speaks, then {"type": "end"} - or nothing: VOICE_VAD_END_SILENCE_MS of
+    silence after speech also ends the utterance.
+    Server: {"type": "partial", ...} per speech segment, {"type": "final", ...},
+    then {"type": "reply", user_text, ai_reply, response_type, language} and
+    close. Errors arrive as {"type": "error", "error", "status", ...} before the close.
+    """
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    token = query.get("token", [None])[0] or _bearer_token(scope)
+    user_data = verify_token(token) if token else None
+    if not user_data:
+        await send({"type": "websocket.close", "code": WS_UNAUTHORIZED})
+        return
+    try:
+        sample_rate = int(query.get("sample_rate", [SAMPLE_RATE])[0])
+    except ValueError:
+        sample_rate = SAMPLE_RATE
+
+    await send({"type": "websocket.accept"})
+
+    async def send_event(payload):
+        await send({"type": "websocket.send", "text": flask_app.json.dumps(payload)})
+
+    stream = VoiceStream(user_data["user_id"], send_event, sample_rate)
+    code, error = WS_NORMAL, None
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                stream.cancel()
+                return
+            if message.get("bytes"):
+                if await stream.feed(message["bytes"]):
+                    break
+            elif message.get("text") and json.loads(message["text"]).get("type") == "end":
+                break
+
+        reply = await stream.finish()
+        await send_event({"type": "reply", **reply})
+
+    except AudioRejectedError as e:
+        code = WS_TOO_BIG if e.status == 413 else WS_NORMAL
+        error = {"error": str(e), "status": e.status}
+    except TranscriptionError as e:
+        payload, status = transcription_error_body(e)
+        code, error = WS_TRY_AGAIN_LATER, {**payload, "status": status}
+    except LLMError as e:
+        payload, status = llm_error_body(e)
+        code, error = WS_TRY_AGAIN_LATER, {**payload, "status": status}
+    except Exception as e:
+        print(f"❌ Error in voice_ws: {str(e)}")
+        code, error = WS_INTERNAL_ERROR, {"error": "Voice processing failed", "status": 500}
+    finally:
+        stream.cancel()
+
+    try:
+        if error:
+            await send_event({"type": "error", **error})
+        await send({"type": "websocket.close", "code": code})
+    except Exception:
+        # The client is already gone
+        pass
+
+
+ASYNC_ROUTES = {
+    ("POST", "/api/chat"): chat_endpoint,
+    ("POST", "/api/report"): report_endpoint,
+    ("GET", "/api/history"): history_endpoint,
+}
+
+
+# -------------------- APPLICATION --------------------
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            # Write buffered chat turns before the server exits
+            await asyncio.to_thread(chat_writer.close)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+
+    if scope["type"] == "http":
+        endpoint = ASYNC_ROUTES.get((scope["method"], scope["path"]))
+        if endpoint:
+            try:
+                payload, status = await endpoint(scope, receive)
+                if isinstance(payload, (dict, list)):
+                    await _send_json(send, payload, status)
+                else:
+                    await _send_json_stream(send, payload)
+            except LLMError as e:
+                payload, status = llm_error_body(e)
+                await _send_json(
+                    send,
+                    payload,
+                    status,
+                    headers=[(b"retry-after", str(e.retry_after).encode())]
+                )
+            return
+
+    if scope["type"] == "websocket":
+        if scope["path"] == "/ws/voice":
+            await voice_ws_endpoint(scope, receive, send)
+        else:
+            await send({"type": "websocket.close", "code": WS_NORMAL})
+        return
+
+    # Blueprints, remaining routes and CORS preflight (OPTIONS) are handled by Flask
+    await wsgi_application(scope, receive, send)
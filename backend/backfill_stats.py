@@ -0,0 +1,79 @@
+"""
+Admin Statistics Backfill Script
+
+The admin dashboard reads counters and hourly / daily rollups from the
+app_stats collection (services/stats_service.py), which the write paths keep
+up to date. This script recounts them from the collections: run it once when
+deploying the counters on an existing database, and whenever `check` reports
+drift (e.g. after stats writes failed or documents were removed by hand).
+
+Usage:
+    python backfill_stats.py run      - Recount totals and rollups from the collections (idempotent)
+    python backfill_stats.py check    - Compare the stored totals with a recount; exit 1 on drift
+    python backfill_stats.py show     - Print the stored totals and last-7-days counts
+
+Example (first deployment):
+    python backfill_stats.py run && python backfill_stats.py check
+"""
+
+import sys
+import time
+from services.db_service import db, stats
+from services.stats_service import COUNTERS
+
+
+def run():
+    started = time.perf_counter()
+    print("\n📊 Recounting statistics from the collections...")
+    summary = stats.backfill(db)
+    print("=" * 60)
+    for counter in COUNTERS:
+        print(f"  {counter:<15} {summary['totals'][counter]:>10}")
+    print("-" * 60)
+    print(f"✓ Backfill done in {time.perf_counter() - started:.1f}s: {summary['hourly']} hourly and "
+          f"{summary['daily']} daily rollups written, {summary['removed']} stale rollups removed")
+
+
+def check():
+    stored = stats.current_totals()
+    recounted, _ = stats.compute(db)
+    print("\n🔍 Stored counters vs recount:")
+    print("=" * 60)
+    drift = False
+    for counter in COUNTERS:
+        ok = stored[counter] == recounted[counter]
+        drift = drift or not ok
+        print(f"  {'✓' if ok else '✗'} {counter:<15} {stored[counter]:>10} {recounted[counter]:>10}")
+    print("-" * 60)
+    if drift:
+        print("❌ Counters have drifted - run `python backfill_stats.py run`")
+        return False
+    print("✅ Counters match the collections")
+    return True
+
+
+def show():
+    snapshot = stats.snapshot()
+    print(f"\n📋 Statistics (updated {snapshot['updated_at']}, backfilled {snapshot['backfilled_at']}):")
+    print("=" * 60)
+    print(f"  {'counter':<15} {'total':>10} {'last 7 days':>12}")
+    for counter in COUNTERS:
+        print(f"  {counter:<15} {snapshot['totals'][counter]:>10} {snapshot['last_7_days'][counter]:>12}")
+
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] not in ("run", "check", "show"):
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    if command == "run":
+        run()
+    elif command == "check":
+        sys.exit(0 if check() else 1)
+    else:
+        show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+GET /api/chats/<chat_id> benchmark: MongoDB round trips per request, before and after
+
+Seeds one chat session with --messages messages (as chat_turns documents) for
+a synthetic user, then fetches it the way the route does, counting the
+commands each request sends to MongoDB (a pymongo CommandListener, so getMore
+and every $lookup-less query show up):
+
+    before   get_chat_page, ownership checked afterwards (the previous route)
+    after    get_user_chat_page - one aggregation on chat_sessions, owner in
+             the $match, messages through $lookup - and, only when it finds
+             nothing, chat_session_exists to tell 403 from 404
+
+for the newest page, an older page (the `before` cursor) and another user's
+request for the same chat:
+
+    python benchmarks/chat_fetch_benchmark.py
+    python benchmarks/chat_fetch_benchmark.py --messages 5000 --limit 100 --runs 50 --keep
+
+Needs MongoDB at MONGO_URI. Buffered writes are not involved (the chat is
+seeded directly); with CHAT_LEGACY_READS=true both paths also read
+chat_history. The synthetic documents are deleted afterwards unless --keep
+is given.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo import monitoring
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts the commands sent to MongoDB (registered before the clients are created)"""
+
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        self.commands.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+counter = CommandCounter()
+monitoring.register(counter)
+
+
+def seed(user_id, messages):
+    from bson import ObjectId
+    from services.db_service import chat_sessions_collection, chat_turns_collection, build_chat_session_doc
+    from services.chat_turns import build_turn, bucket_doc
+    from utils.config import CHAT_TURNS_PER_DOCUMENT
+
+    session = build_chat_session_doc(user_id, "Chat fetch benchmark", "English")
+    chat_id = str(chat_sessions_collection.insert_one(session).inserted_id)
+    started = datetime.now(timezone.utc) - timedelta(days=30)
+    turns = []
+    for i in range(messages // 2):
+        turn = build_turn(user_id, f"question {i} " + "x" * 80, f"answer {i} " + "y" * 600,
+                          "ai", "English", chat_id=chat_id)
+        turn["_id"] = ObjectId()
+        turn["asked_at"] = started + timedelta(minutes=2 * i)
+        turn["answered_at"] = turn["asked_at"] + timedelta(seconds=5)
+        turns.append(turn)
+    documents = [bucket_doc(turns[i:i + CHAT_TURNS_PER_DOCUMENT]) for i in range(0, len(turns), CHAT_TURNS_PER_DOCUMENT)]
+    for i in range(0, len(documents), 1000):
+        chat_turns_collection.insert_many(documents[i:i + 1000], ordered=False)
+    return chat_id
+
+
+def measure(fn, runs):
+    """(result, commands of one call, median ms)"""
+    latencies, commands, result = [], [], None
+    for _ in range(runs):
+        counter.commands = []
+        started = time.perf_counter()
+        result = fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+        commands = counter.commands
+    return result, commands, statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/chats/<chat_id> round-trip benchmark")
+    parser.add_argument("--messages", type=int, default=2000, help="messages in the synthetic chat")
+    parser.add_argument("--limit", type=int, default=100, help="messages per page")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic documents")
+    args = parser.parse_args()
+
+    from bson import ObjectId
+    from services.db_service import (
+        get_chat_page, get_user_chat_page, chat_session_exists, delete_chat_messages, chat_sessions_collection
+    )
+    from services.db_indexes import ensure_indexes
+
+    ensure_indexes()
+    user_id, other_user = f"chat-fetch-bench-{ObjectId()}", f"chat-fetch-bench-{ObjectId()}"
+    chat_id = seed(user_id, args.messages)
+    print(f"\n📋 Seeded {args.messages} messages in chat {chat_id}")
+
+    def before(requester, cursor=None):
+        chat = get_chat_page(chat_id, args.limit, cursor)
+        if not chat:
+            return 404
+        return chat if chat["session"]["user_id"] == requester else 403
+
+    def after(requester, cursor=None):
+        chat = get_user_chat_page(chat_id, requester, args.limit, cursor)
+        if chat:
+            return chat
+        return 403 if chat_session_exists(chat_id) else 404
+
+    try:
+        first = get_chat_page(chat_id, args.limit)
+        cases = [
+            ("newest page", user_id, None),
+            ("older page", user_id, first["next_cursor"]),
+            ("other user", other_user, None),
+        ]
+        print("=" * 78)
+        print(f"{'request':>12} {'path':>7} {'status':>7} {'round trips':>12} {'p50':>9}   commands")
+        identical = True
+        for label, requester, cursor in cases:
+            old, old_commands, old_ms = measure(lambda: before(requester, cursor), args.runs)
+            new, new_commands, new_ms = measure(lambda: after(requester, cursor), args.runs)
+            for path, result, commands, ms in (("before", old, old_commands, old_ms), ("after", new, new_commands, new_ms)):
+                status = result if isinstance(result, int) else 200
+                print(f"{label:>12} {path:>7} {status:>7} {len(commands):>12} {ms:>7.1f}ms   {', '.join(commands)}")
+            identical = identical and old == new
+        print("-" * 78)
+        if identical:
+            print("  ✓ Both paths return the same sessions, messages, cursors and statuses")
+        else:
+            print("  ✗ The paths returned different results")
+    finally:
+        if not args.keep:
+            deleted = delete_chat_messages({"chat_id": chat_id})
+            chat_sessions_collection.delete_one({"_id": ObjectId(chat_id)})
+            print(f"  🗑️ Deleted the synthetic chat ({deleted} messages)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Concurrent-request capacity benchmark: WSGI (gunicorn app:app) vs ASGI (asgi:application)
+
+Fires bursts of N simultaneous POST /api/chat requests at a running server and
+reports, for each N, how many completed successfully within the timeout and the
+latency percentiles. Capacity is the largest burst that completes with >= 99%
+success. Run it once against each serving mode, with one worker each:
+
+    # WSGI - one sync worker with 32 threads (current deployment shape)
+    gunicorn app:app -w 1 --threads 32 -b 127.0.0.1:5001
+
+    # ASGI - one asyncio worker
+    uvicorn asgi:application --workers 1 --port 5002
+
+    python benchmarks/concurrency_benchmark.py --url http://127.0.0.1:5001 --label wsgi
+    python benchmarks/concurrency_benchmark.py --url http://127.0.0.1:5002 --label asgi
+
+Requests are sent as the trial user, so nothing is written to MongoDB. Every
+message gets a unique suffix so the response cache never answers for Gemini.
+Use a non-production API key with enough quota - or start the servers with
+LLM_PROVIDER=stub to benchmark offline - since the benchmark issues thousands
+of LLM calls.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from urllib.parse import urlparse
+
+
+async def _post_json(host, port, path, payload, timeout):
+    """Minimal HTTP/1.1 POST over asyncio streams (no third-party client needed)"""
+    body = json.dumps(payload).encode("utf-8")
+    request = (
+        f"POST {path} HTTP/1.1\r\n"
+        f"Host: {host}:{port}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode("latin-1") + body
+
+    async def _roundtrip():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()  # headers + body until the server closes
+            return int(status_line.split()[1])
+        finally:
+            writer.close()
+
+    return await asyncio.wait_for(_roundtrip(), timeout)
+
+
+async def run_burst(url, concurrency, timeout):
+    parsed = urlparse(url)
+    host, port = parsed.hostname, parsed.port or 80
+
+    async def one():
+        started = time.perf_counter()
+        try:
+            status = await _post_json(
+                host, port, "/api/chat",
+                {"message": f"Best fertilizer for paddy in kharif season? ({uuid.uuid4().hex[:8]})"},
+                timeout
+            )
+            return status == 200, time.perf_counter() - started
+        except Exception:
+            return False, time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(latency for ok, latency in results if ok)
+    succeeded = len(latencies)
+    return {
+        "concurrency": concurrency,
+        "succeeded": succeeded,
+        "success_rate": succeeded / concurrency,
+        "p50_s": statistics.median(latencies) if latencies else None,
+        "p95_s": latencies[int(len(latencies) * 0.95) - 1] if latencies else None,
+        "throughput_rps": succeeded / wall if wall else 0.0,
+    }
+
+
+async def main(args):
+    levels = [int(level) for level in args.levels.split(",")]
+    capacity = 0
+
+    print(f"\n📊 Concurrency benchmark [{args.label}] -> {args.url}")
+    print("=" * 78)
+    print(f"{'burst':>7} {'ok':>7} {'success':>9} {'p50 (s)':>9} {'p95 (s)':>9} {'req/s':>9}")
+    for level in levels:
+        result = await run_burst(args.url, level, args.timeout)
+        p50 = f"{result['p50_s']:.2f}" if result["p50_s"] is not None else "-"
+        p95 = f"{result['p95_s']:.2f}" if result["p95_s"] is not None else "-"
+        print(f"{level:>7} {result['succeeded']:>7} {result['success_rate']:>8.1%} "
+              f"{p50:>9} {p95:>9} {result['throughput_rps']:>9.1f}")
+
+        if result["success_rate"] >= 0.99:
+            capacity = level
+        elif args.stop_on_failure:
+            break
+        await asyncio.sleep(args.pause)
+
+    print("-" * 78)
+    print(f"✓ [{args.label}] capacity per worker: {capacity} concurrent requests (>= 99% success, "
+          f"timeout {args.timeout:.0f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-request capacity benchmark")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="base URL of the running server")
+    parser.add_argument("--label", default="server", help="label for the report (e.g. wsgi / asgi)")
+    parser.add_argument("--levels", default="10,50,100,250,500,1000,2000", help="comma separated burst sizes")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--pause", type=float, default=2.0, help="pause between bursts in seconds")
+    parser.add_argument("--stop-on-failure", action="store_true", help="stop at the first burst under 99%% success")
+    asyncio.run(main(parser.parse_args()))
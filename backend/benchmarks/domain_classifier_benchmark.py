@@ -0,0 +1,109 @@
+"""
+Accuracy and latency of the local agriculture-domain classifier
+
+Evaluates services/domain_classifier.py on the held-out queries in
+data/domain_classifier/heldout.jsonl (never used for training) and times
+single classifications:
+
+    python benchmarks/domain_classifier_benchmark.py
+    python benchmarks/domain_classifier_benchmark.py --min-confidence 0.8 --iterations 20000
+
+Reports per language: accuracy of every prediction, how many queries clear the
+confidence threshold (decided locally, no LLM call) and the accuracy of those.
+Below the threshold the voice path asks the LLM, so "local acc" is the number
+that matters for correctness and "local" the share of LLM calls saved.
+
+No network, MongoDB or API keys needed.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _rate(numerator, denominator):
+    return f"{numerator / denominator:.1%}" if denominator else "-"
+
+
+def evaluate(classifier, samples, min_confidence):
+    per_language = defaultdict(lambda: {"n": 0, "correct": 0, "local": 0, "local_correct": 0})
+    confusion = defaultdict(int)  # (expected, predicted) -> count, local decisions only
+    misses = []
+
+    for sample in samples:
+        label, confidence = classifier.predict(sample["text"])
+        row = per_language[sample["language"]]
+        row["n"] += 1
+        row["correct"] += label == sample["label"]
+        if confidence >= min_confidence:
+            row["local"] += 1
+            row["local_correct"] += label == sample["label"]
+            confusion[(sample["label"], label)] += 1
+            if label != sample["label"]:
+                misses.append((sample, label, confidence))
+    return per_language, confusion, misses
+
+
+def time_predictions(classifier, samples, iterations):
+    texts = [s["text"] for s in samples]
+    timings = []
+    for i in range(iterations):
+        text = texts[i % len(texts)]
+        started = time.perf_counter()
+        classifier.predict(text)
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local domain classifier accuracy / latency")
+    parser.add_argument("--min-confidence", type=float, help="threshold (default: DOMAIN_CLASSIFIER_MIN_CONFIDENCE)")
+    parser.add_argument("--iterations", type=int, default=10000, help="classifications to time")
+    args = parser.parse_args()
+
+    from services.domain_classifier import DomainClassifier, load_samples, load_lexicon
+    from utils.config import DOMAIN_CLASSIFIER_MIN_CONFIDENCE
+    min_confidence = args.min_confidence if args.min_confidence is not None else DOMAIN_CLASSIFIER_MIN_CONFIDENCE
+
+    train, heldout = load_samples("train"), load_samples("heldout")
+    started = time.perf_counter()
+    classifier = DomainClassifier().train(train, load_lexicon())
+    train_ms = (time.perf_counter() - started) * 1000
+
+    per_language, confusion, misses = evaluate(classifier, heldout, min_confidence)
+
+    print(f"\n📊 Domain classifier: {len(train)} training / {len(heldout)} held-out queries, "
+          f"threshold {min_confidence}")
+    print("=" * 66)
+    print(f"{'language':>10} {'n':>5} {'accuracy':>9} {'local':>8} {'local acc':>10}")
+    totals = defaultdict(int)
+    for language in sorted(per_language):
+        row = per_language[language]
+        for key, value in row.items():
+            totals[key] += value
+        print(f"{language:>10} {row['n']:>5} {_rate(row['correct'], row['n']):>9} "
+              f"{_rate(row['local'], row['n']):>8} {_rate(row['local_correct'], row['local']):>10}")
+    print("-" * 66)
+    print(f"{'all':>10} {totals['n']:>5} {_rate(totals['correct'], totals['n']):>9} "
+          f"{_rate(totals['local'], totals['n']):>8} {_rate(totals['local_correct'], totals['local']):>10}")
+
+    print("\nLocal decisions (expected → predicted):")
+    for expected in ("agri", "other"):
+        print(f"  {expected:>5}: " + ", ".join(
+            f"{predicted} {confusion[(expected, predicted)]}" for predicted in ("agri", "other")
+        ))
+    for sample, label, confidence in misses:
+        print(f"  ✗ [{sample['language']}] {sample['text']} → {label} ({confidence:.2f})")
+
+    p50_us, p99_us = time_predictions(classifier, heldout, args.iterations)
+    print(f"\nTraining: {train_ms:.0f} ms   classification: p50 {p50_us:.1f} µs, p99 {p99_us:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
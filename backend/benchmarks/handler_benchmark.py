@@ -0,0 +1,151 @@
+"""
+End-to-end handler benchmark against the offline LLM stub
+
+Calls handle_chat, generate_farming_report and handle_voice in-process from a
+thread pool - the same code paths the Flask routes run - with LLM_PROVIDER=stub,
+so it needs no network, no Gemini API key and no quota:
+
+    python benchmarks/handler_benchmark.py --requests 500 --concurrency 32
+    python benchmarks/handler_benchmark.py --latency "fixed:800" --error-rate 0.02
+    python benchmarks/handler_benchmark.py --handlers voice --audio samples/query_hi.wav
+
+The stub latency/error settings override the LLM_STUB_* values from .env. The
+response cache and the report store are disabled by default so every call
+reaches the (stub) provider; pass --warm to keep them on.
+
+MongoDB is still used: point MONGO_URI at a local mongod. Chat and report calls
+run as the trial user and are not persisted; voice turns are always saved.
+Voice transcription runs the real Whisper model on the given audio file, so
+start the transcription server (python transcription_server.py) first.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CROPS = ["Rice", "Wheat", "Cotton", "Sugarcane", "Maize", "Groundnut", "Mustard", "Soybean"]
+REGIONS = ["Odisha", "Punjab", "Maharashtra", "Tamil Nadu", "Bihar", "Gujarat"]
+MESSAGES = [
+    "Best fertilizer for paddy in kharif season?",
+    "गेहूं में पीला रतुआ रोग का इलाज क्या है?",
+    "ଧାନ ଚାଷ ପାଇଁ କେଉଁ ସାର ଭଲ?",
+    "How often should I irrigate cotton in black soil?",
+]
+
+
+class AudioUpload:
+    """Minimal stand-in for werkzeug's FileStorage (handle_voice only calls .save)"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = f.read()
+
+    def save(self, destination):
+        with open(destination, "wb") as f:
+            f.write(self.data)
+
+
+def _configure(args):
+    # Must happen before the services are imported - config is read at import time
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["LLM_STUB_LATENCY_MS"] = args.latency
+    os.environ["LLM_STUB_ERROR_RATE"] = str(args.error_rate)
+    os.environ["LLM_STUB_SEED"] = str(args.seed)
+    if not args.warm:
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+        os.environ["REPORT_STORE_ENABLED"] = "false"
+
+
+def _calls(handler, args):
+    """One zero-argument callable per request for the given handler"""
+    if handler == "chat":
+        from chat import handle_chat
+        return [
+            lambda i=i: handle_chat("trial_user", f"{MESSAGES[i % len(MESSAGES)]} ({uuid.uuid4().hex[:8]})")
+            for i in range(args.requests)
+        ]
+    if handler == "report":
+        from report import generate_farming_report
+        return [
+            lambda i=i: generate_farming_report(
+                "trial_user",
+                f"{CROPS[i % len(CROPS)]} {uuid.uuid4().hex[:6]}",
+                REGIONS[i % len(REGIONS)],
+                "English"
+            )
+            for i in range(args.requests)
+        ]
+    if handler == "voice":
+        from voice import handle_voice
+        upload = AudioUpload(args.audio)
+        return [lambda: handle_voice(upload, args.user_id) for _ in range(args.requests)]
+    raise ValueError(f"Unknown handler: {handler}")
+
+
+def run_handler(handler, args):
+    def timed(call):
+        started = time.perf_counter()
+        try:
+            result = call()
+            ok = "error" not in result
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - started
+
+    calls = _calls(handler, args)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(timed, calls))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(latency for ok, latency in results if ok)
+    return {
+        "handler": handler,
+        "ok": len(latencies),
+        "failed": len(results) - len(latencies),
+        "p50_s": statistics.median(latencies) if latencies else None,
+        "p95_s": latencies[int(len(latencies) * 0.95) - 1] if latencies else None,
+        "p99_s": latencies[int(len(latencies) * 0.99) - 1] if latencies else None,
+        "throughput_rps": len(results) / wall if wall else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end handler benchmark (offline LLM stub)")
+    parser.add_argument("--handlers", default="chat,report", help="comma separated: chat, report, voice")
+    parser.add_argument("--requests", type=int, default=200, help="requests per handler")
+    parser.add_argument("--concurrency", type=int, default=32, help="worker threads")
+    parser.add_argument("--latency", default="lognormal:1200,0.5", help="stub latency distribution (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub calls that fail")
+    parser.add_argument("--seed", type=int, default=42, help="stub random seed")
+    parser.add_argument("--audio", help="audio file for the voice handler")
+    parser.add_argument("--user-id", default="trial_user", help="user id for voice turns")
+    parser.add_argument("--warm", action="store_true", help="keep the response cache and report store enabled")
+    args = parser.parse_args()
+
+    handlers = [h.strip() for h in args.handlers.split(",") if h.strip()]
+    if "voice" in handlers and not args.audio:
+        parser.error("--audio is required for the voice handler")
+
+    _configure(args)
+
+    print(f"\n📊 Handler benchmark (stub: {args.latency}, errors {args.error_rate:.1%}, "
+          f"{args.concurrency} threads)")
+    print("=" * 78)
+    print(f"{'handler':>8} {'ok':>6} {'failed':>7} {'p50 (s)':>9} {'p95 (s)':>9} {'p99 (s)':>9} {'req/s':>8}")
+    for handler in handlers:
+        result = run_handler(handler, args)
+        cells = [f"{result[k]:.2f}" if result[k] is not None else "-" for k in ("p50_s", "p95_s", "p99_s")]
+        print(f"{handler:>8} {result['ok']:>6} {result['failed']:>7} "
+              f"{cells[0]:>9} {cells[1]:>9} {cells[2]:>9} {result['throughput_rps']:>8.1f}")
+    print("-" * 78)
+
+
+if __name__ == "__main__":
+    main()
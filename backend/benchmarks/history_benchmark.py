@@ -0,0 +1,142 @@
+"""
+/api/history benchmark: Python pairing vs. MongoDB aggregation
+
+Seeds one synthetic user with --messages chat_history documents (default
+100k: alternating question / answer turns, with an occasional unanswered
+question or dropped question so the pairing edge cases occur), then compares
+
+    legacy      find() every message, sorted newest first, paired in Python
+                (db_service.pair_history_messages - the old get_chat_history)
+    aggregate   the full history paired by history_pipeline, streamed
+    first page  one /api/history page (--page pairs) - what a client loads
+
+on latency and peak Python memory (tracemalloc), and checks that the
+aggregation returns exactly the legacy pairs:
+
+    python benchmarks/history_benchmark.py
+    python benchmarks/history_benchmark.py --messages 20000 --runs 5 --keep
+
+Needs MongoDB 5.0+ at MONGO_URI ($setWindowFields) and CHAT_LEGACY_READS=true
+(the default): the messages are seeded in chat_history, the pre-migration
+layout, so this measures the dual-read path. The synthetic user's
+documents are deleted afterwards unless --keep is given; the registered
+indexes are created first, as the app does at startup.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(collection, user_id, messages, seed_value):
+    rng = random.Random(seed_value)
+    started = datetime(2023, 1, 1)
+    docs, batch = 0, []
+    at = started
+    while docs < messages:
+        at += timedelta(seconds=rng.randint(20, 600))
+        roles = ["user", "assistant"]
+        roll = rng.random()
+        if roll < 0.01:
+            roles = ["user"]            # unanswered question (e.g. failed request)
+        elif roll < 0.02:
+            roles = ["assistant"]       # answer without its question
+        for role in roles:
+            at += timedelta(milliseconds=rng.randint(1, 5000))
+            batch.append({
+                "chat_id": None,
+                "user_id": user_id,
+                "role": role,
+                "content": f"{role} message {docs} " + "x" * rng.randint(40, 400),
+                "input_type": "text",
+                "response_type": "ai",
+                "language": "Hindi",
+                "timestamp": at
+            })
+            docs += 1
+        if len(batch) >= 5000:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+    return docs
+
+
+def measure(fn, runs):
+    latencies, peaks, result = [], [], None
+    for _ in range(runs):
+        tracemalloc.start()
+        started = time.perf_counter()
+        result = fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024 / 1024)
+        tracemalloc.stop()
+    return result, statistics.median(latencies), max(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/history pairing benchmark")
+    parser.add_argument("--messages", type=int, default=100_000, help="chat_history documents for the synthetic user")
+    parser.add_argument("--page", type=int, default=50, help="pairs per page")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic user's documents")
+    args = parser.parse_args()
+
+    from services.db_service import chat_collection, iter_chat_history, pair_history_messages
+    from services.db_indexes import ensure_indexes
+
+    ensure_indexes()
+    user_id = f"history-bench-{uuid.uuid4().hex[:8]}"
+    started = time.perf_counter()
+    seeded = seed(chat_collection, user_id, args.messages, args.seed)
+    print(f"\n📋 Seeded {seeded} messages for {user_id} in {time.perf_counter() - started:.1f}s")
+
+    def legacy():
+        messages = list(chat_collection.find({"user_id": user_id}, {"_id": 0}).sort("timestamp", -1))
+        return pair_history_messages(messages)
+
+    def aggregate_all():
+        return list(iter_chat_history(user_id))
+
+    def first_page():
+        page = {}
+        pairs = list(iter_chat_history(user_id, args.page, None, page))
+        return pairs, page["next_cursor"]
+
+    try:
+        legacy_pairs, legacy_ms, legacy_mb = measure(legacy, args.runs)
+        new_pairs, new_ms, new_mb = measure(aggregate_all, args.runs)
+        (page_pairs, next_cursor), page_ms, page_mb = measure(first_page, args.runs)
+
+        print("=" * 70)
+        print(f"{'path':>12} {'pairs':>8} {'p50':>10} {'peak memory':>13}")
+        print(f"{'legacy':>12} {len(legacy_pairs):>8} {legacy_ms:>8.0f}ms {legacy_mb:>10.1f} MB")
+        print(f"{'aggregate':>12} {len(new_pairs):>8} {new_ms:>8.0f}ms {new_mb:>10.1f} MB")
+        print(f"{'first page':>12} {len(page_pairs):>8} {page_ms:>8.1f}ms {page_mb:>10.2f} MB")
+        print("-" * 70)
+
+        if new_pairs == legacy_pairs and page_pairs == legacy_pairs[:args.page] and next_cursor:
+            print("  ✓ Aggregation returns exactly the legacy pairs (and the first page is their prefix)")
+        else:
+            mismatch = next((i for i, (a, b) in enumerate(zip(new_pairs, legacy_pairs)) if a != b),
+                            min(len(new_pairs), len(legacy_pairs)))
+            print(f"  ✗ Pairs differ from the legacy pairing (first difference at pair {mismatch})")
+        print(f"  ✓ Full history: {legacy_ms / new_ms:.1f}x faster, {legacy_mb / max(new_mb, 0.01):.1f}x less memory")
+        print(f"  ✓ First page vs legacy full load: {legacy_ms / page_ms:.0f}x faster")
+    finally:
+        if not args.keep:
+            deleted = chat_collection.delete_many({"user_id": user_id}).deleted_count
+            print(f"  🗑️ Deleted {deleted} synthetic messages")
+
+
+if __name__ == "__main__":
+    main()
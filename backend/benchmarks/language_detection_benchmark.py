@@ -0,0 +1,122 @@
+"""
+Language detection micro-benchmark: script table + n-gram vs. langdetect
+
+Compares services/language_service.detect_language with the previous
+implementation (Odia Unicode loop, then langdetect) on the labelled queries
+in data/domain_classifier/ (13 languages):
+
+    python benchmarks/language_detection_benchmark.py
+    python benchmarks/language_detection_benchmark.py --rounds 20
+
+Reports accuracy, first-call time (langdetect loads its profiles lazily),
+per-call latency and how many answers changed between two identical runs
+(langdetect is non-deterministic unless seeded). The langdetect baseline is
+skipped if the package is not installed (pip install langdetect).
+
+No network, MongoDB or API keys needed.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "domain_classifier")
+
+
+def load_queries():
+    queries = []
+    for split in ("train", "heldout"):
+        with open(os.path.join(DATA_DIR, f"{split}.jsonl"), encoding="utf-8") as f:
+            queries.extend(json.loads(line) for line in f if line.strip())
+    return queries
+
+
+def legacy_detector():
+    """The detect_language previously duplicated in chat.py and report.py, or None"""
+    try:
+        from langdetect import detect
+    except ImportError:
+        return None
+    from services.language_service import LANGUAGE_MAP
+
+    def detect_language(message):
+        for ch in message:
+            if '\u0B00' <= ch <= '\u0B7F':
+                return "Odia"
+        try:
+            return LANGUAGE_MAP.get(detect(message), "English")
+        except Exception:
+            return "English"
+
+    return detect_language
+
+
+def run(name, detect, queries, rounds):
+    started = time.perf_counter()
+    detect(queries[0]["text"])
+    first_call_ms = (time.perf_counter() - started) * 1000
+
+    timings = []
+    answers = []
+    for _ in range(rounds):
+        current = []
+        for query in queries:
+            started = time.perf_counter()
+            current.append(detect(query["text"]))
+            timings.append((time.perf_counter() - started) * 1e6)
+        answers.append(current)
+
+    timings.sort()
+    correct = sum(answer == query["language"] for answer, query in zip(answers[0], queries))
+    unstable = sum(a != b for a, b in zip(answers[0], answers[-1]))
+    return {
+        "name": name,
+        "accuracy": correct / len(queries),
+        "first_call_ms": first_call_ms,
+        "p50_us": statistics.median(timings),
+        "p99_us": timings[int(len(timings) * 0.99) - 1],
+        "unstable": unstable,
+        "answers": answers[0]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Language detection micro-benchmark")
+    parser.add_argument("--rounds", type=int, default=10, help="passes over the query set")
+    args = parser.parse_args()
+
+    from services.language_service import detect_language
+
+    queries = load_queries()
+    detectors = [("script table", detect_language)]
+    legacy = legacy_detector()
+    if legacy is None:
+        print("ℹ langdetect not installed - baseline skipped")
+    else:
+        detectors.append(("langdetect", legacy))
+
+    results = [run(name, detect, queries, max(2, args.rounds)) for name, detect in detectors]
+
+    print(f"\n📊 Language detection: {len(queries)} labelled queries, 13 languages, {max(2, args.rounds)} rounds")
+    print("=" * 72)
+    print(f"{'detector':>14} {'accuracy':>9} {'first call':>11} {'p50':>9} {'p99':>9} {'unstable':>9}")
+    for result in results:
+        print(f"{result['name']:>14} {result['accuracy']:>8.1%} {result['first_call_ms']:>9.1f}ms "
+              f"{result['p50_us']:>7.1f}µs {result['p99_us']:>7.1f}µs {result['unstable']:>9}")
+    print("-" * 72)
+
+    errors = {}
+    for query, answer in zip(queries, results[0]["answers"]):
+        if answer != query["language"]:
+            errors.setdefault(query["language"], []).append(answer)
+    for language, answers in sorted(errors.items()):
+        print(f"  ✗ {language}: detected as {', '.join(sorted(set(answers)))} ({len(answers)}x)")
+
+
+if __name__ == "__main__":
+    main()
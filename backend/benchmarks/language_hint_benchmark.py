@@ -0,0 +1,143 @@
+"""
+Language-hinted transcription benchmark: auto-detection vs. profile hint
+
+Transcribes every clip of a labelled corpus twice on the transcription
+server - once with Whisper's language identification, once with the clip's
+language forced as the per-user profile would (plus the low-confidence
+fallback to auto-detection) - and compares latency and accuracy:
+
+    python transcription_server.py &
+    python benchmarks/language_hint_benchmark.py --manifest corpus/voice/manifest.jsonl
+    python benchmarks/language_hint_benchmark.py --manifest corpus/voice/manifest.jsonl --wrong-hints 0.1
+
+The manifest is JSONL, one clip per line, paths relative to the manifest:
+
+    {"audio": "hi/0001.wav", "language": "hi", "text": "धान में कौन सी खाद डालें"}
+
+"text" is optional; with it the character error rate (CER) is reported.
+--wrong-hints gives that share of clips another language's hint, as when a
+farmer switches language, to exercise the fallback. Both passes pin the
+model and beam size (--model, --beam) so the load-adaptive tiers do not skew
+the comparison. MongoDB is not queried (the hint comes from the manifest).
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_manifest(path):
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding="utf-8") as f:
+        clips = [json.loads(line) for line in f if line.strip()]
+    for clip in clips:
+        clip["audio"] = os.path.join(base, clip["audio"])
+    return clips
+
+
+def char_errors(reference: str, hypothesis: str) -> int:
+    """Levenshtein distance over characters (spaces ignored)"""
+    reference, hypothesis = reference.replace(" ", ""), hypothesis.replace(" ", "")
+    previous = list(range(len(hypothesis) + 1))
+    for i, r in enumerate(reference, 1):
+        current = [i]
+        for j, h in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+def run(mode, clips, pcms, hints, options):
+    from services.transcription_client import transcribe
+    from services.language_profile import hinted_transcript_ok
+
+    latencies, decode, correct, errors, chars, fallbacks = [], [], 0, 0, 0, 0
+    for clip, pcm, hint in zip(clips, pcms, hints):
+        started = time.perf_counter()
+        if mode == "hinted" and hint:
+            transcript = transcribe(pcm, language=hint, **options)
+            language = hint
+            if not hinted_transcript_ok(transcript, hint):
+                fallbacks += 1
+                transcript = transcribe(pcm, **options)
+                language = transcript["language"]
+        else:
+            transcript = transcribe(pcm, **options)
+            language = transcript["language"]
+        latencies.append((time.perf_counter() - started) * 1000)
+        decode.append(transcript["decode_seconds"] * 1000)
+
+        correct += language == clip["language"]
+        if clip.get("text"):
+            errors += char_errors(clip["text"], transcript["text"])
+            chars += len(clip["text"].replace(" ", ""))
+
+    return {
+        "mode": mode,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": percentile(latencies, 0.95),
+        "decode_p50_ms": statistics.median(decode),
+        "language_accuracy": correct / len(clips),
+        "cer": errors / chars if chars else None,
+        "fallbacks": fallbacks
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Language-hinted transcription benchmark")
+    parser.add_argument("--manifest", required=True, help="JSONL corpus manifest")
+    parser.add_argument("--model", default="tiny", help="model size pinned for both passes")
+    parser.add_argument("--beam", type=int, default=1, help="beam size pinned for both passes")
+    parser.add_argument("--wrong-hints", type=float, default=0.0, help="share of clips given a wrong hint")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from services.audio_decode import decode_audio
+    from services.language_profile import WHISPER_LANGUAGES
+
+    clips = load_manifest(args.manifest)
+    pcms = []
+    for clip in clips:
+        with open(clip["audio"], "rb") as f:
+            pcms.append(decode_audio(f))
+
+    rng = random.Random(args.seed)
+    languages = sorted({clip["language"] for clip in clips} & WHISPER_LANGUAGES) or ["hi"]
+    hints = []
+    for clip in clips:
+        hint = clip["language"] if clip["language"] in WHISPER_LANGUAGES else None
+        if hint and rng.random() < args.wrong_hints:
+            hint = rng.choice([language for language in sorted(WHISPER_LANGUAGES) if language != hint])
+        hints.append(hint)
+
+    options = {"model_size": args.model, "beam_size": args.beam}
+    results = [run(mode, clips, pcms, hints, options) for mode in ("auto", "hinted")]
+
+    audio_seconds = sum(len(pcm) for pcm in pcms) / 16000
+    print(f"\n📊 Language hint: {len(clips)} clips ({audio_seconds:.0f}s), {len(languages)} languages, "
+          f"model {args.model}, beam {args.beam}, wrong hints {args.wrong_hints:.0%}")
+    print("=" * 76)
+    print(f"{'mode':>8} {'p50':>9} {'p95':>9} {'decode p50':>11} {'language':>9} {'CER':>7} {'fallbacks':>10}")
+    for r in results:
+        cer = f"{r['cer']:.1%}" if r["cer"] is not None else "-"
+        print(f"{r['mode']:>8} {r['p50_ms']:>7.0f}ms {r['p95_ms']:>7.0f}ms {r['decode_p50_ms']:>9.0f}ms "
+              f"{r['language_accuracy']:>8.1%} {cer:>7} {r['fallbacks']:>10}")
+    print("-" * 76)
+    auto, hinted = results
+    print(f"  ✓ Latency saved per clip (p50): {auto['p50_ms'] - hinted['p50_ms']:.0f} ms")
+    print(f"  ✓ Language accuracy delta: {hinted['language_accuracy'] - auto['language_accuracy']:+.1%}")
+
+
+if __name__ == "__main__":
+    main()
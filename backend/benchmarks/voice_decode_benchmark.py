@@ -0,0 +1,132 @@
+"""
+Voice upload decode benchmark: temp file + pydub vs. in-memory decode
+
+Times the audio preparation step of /api/voice, before transcription:
+
+    legacy     save upload to a temp file -> pydub load -> re-export WAV over it
+               -> Whisper re-reads and decodes the file (PyAV)
+    in-memory  services/audio_decode.decode_audio on the upload stream
+               (WAV parsed directly, other formats piped through ffmpeg)
+
+    python benchmarks/voice_decode_benchmark.py                     - synthetic 8 s 44.1 kHz stereo WAV
+    python benchmarks/voice_decode_benchmark.py --seconds 20 --rounds 50
+    python benchmarks/voice_decode_benchmark.py --audio samples/query_hi.webm --mimetype audio/webm
+
+The legacy path needs pydub (and ffmpeg); the Whisper re-read uses
+faster_whisper.decode_audio when installed, else a second pydub load.
+No network, MongoDB, transcription server or API keys needed.
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def synthetic_wav(seconds: float, rate=44100, channels=2) -> bytes:
+    """A tone plus noise, as a phone or browser recorder would upload it"""
+    import numpy as np
+
+    t = np.arange(int(seconds * rate)) / rate
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * np.random.default_rng(0).standard_normal(len(t))
+    frames = np.repeat((signal * 32767).astype("<i2")[:, None], channels, axis=1)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(frames.tobytes())
+    return buffer.getvalue()
+
+
+def legacy_decoder():
+    """The pre-audio_decode handle_voice preparation, or None without pydub"""
+    try:
+        from pydub import AudioSegment
+    except ImportError:
+        return None
+    try:
+        from faster_whisper import decode_audio as whisper_read
+    except ImportError:
+        def whisper_read(path):
+            import numpy as np
+            audio = AudioSegment.from_file(path).set_frame_rate(16000).set_channels(1).set_sample_width(2)
+            return np.frombuffer(audio.raw_data, dtype=np.int16).astype(np.float32) / 32768.0
+
+    def decode(data, mimetype):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp:
+            path = temp.name
+            temp.write(data)
+        try:
+            audio = AudioSegment.from_file(path)
+            audio.export(path, format="wav")
+            return whisper_read(path)
+        finally:
+            os.remove(path)
+
+    return decode
+
+
+def run(decode, data, mimetype, rounds):
+    decode(data, mimetype)  # warm-up (imports, ffmpeg page cache)
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        pcm = decode(data, mimetype)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": statistics.median(timings),
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "seconds": len(pcm) / 16000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice upload decode benchmark")
+    parser.add_argument("--audio", help="audio file to upload (default: synthetic WAV)")
+    parser.add_argument("--mimetype", default=None, help="declared Content-Type of --audio")
+    parser.add_argument("--seconds", type=float, default=8.0, help="length of the synthetic WAV")
+    parser.add_argument("--rounds", type=int, default=20, help="timed decodes per path")
+    args = parser.parse_args()
+
+    from services.audio_decode import decode_audio
+
+    if args.audio:
+        with open(args.audio, "rb") as f:
+            data = f.read()
+        label = os.path.basename(args.audio)
+    else:
+        data = synthetic_wav(args.seconds)
+        label = f"synthetic {args.seconds:g}s 44.1 kHz stereo WAV"
+
+    paths = [("in-memory", lambda d, m: decode_audio(io.BytesIO(d), m))]
+    legacy = legacy_decoder()
+    if legacy is None:
+        print("ℹ pydub not installed - legacy baseline skipped")
+    else:
+        paths.insert(0, ("legacy", legacy))
+
+    results = {name: run(decode, data, args.mimetype, args.rounds) for name, decode in paths}
+
+    print(f"\n📊 Voice decode: {label}, {len(data) / 1024:.0f} KB, {args.rounds} rounds")
+    print("=" * 60)
+    print(f"{'path':>10} {'p50':>10} {'p95':>10} {'audio':>8} {'disk I/O':>12}")
+    for name, result in results.items():
+        disk = f"{3 * len(data) / 1024:.0f} KB" if name == "legacy" else "0 KB"
+        print(f"{name:>10} {result['p50_ms']:>8.1f}ms {result['p95_ms']:>8.1f}ms "
+              f"{result['seconds']:>7.2f}s {disk:>12}")
+    print("-" * 60)
+    if "legacy" in results:
+        saved = results["legacy"]["p50_ms"] - results["in-memory"]["p50_ms"]
+        print(f"  ✓ Saved per request (p50): {saved:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
-from services.llm_service import get_ai_response
+from services.llm_service import get_ai_response, get_ai_response_async, stream_ai_response
 from services.db_service import (
     save_chat, 
     create_chat_session, 
     update_chat_session, 
     generate_chat_title, 
-    get_recent_chat_messages
+    get_chat_session_language
+)
+from services import async_db_service
+from services.context_service import get_chat_context, get_chat_context_async, schedule_summary_update
+from services.domain_classifier import classify_domain
+from utils.config import DOMAIN_CLASSIFIER_ENABLED, DOMAIN_FILTER_CHAT, DOMAIN_FILTER_CHAT_MIN_CONFIDENCE
+from services.language_service import (
+    resolve_language,
+    get_session_language,
+    remember_session_language
 )
-from langdetect import detect
 
 # Language-wise fallback messages (ALL Indian languages)
 FALLBACK_MESSAGES = {
@@ -25,49 +33,41 @@ FALLBACK_MESSAGES = {
     "Assamese": "🌾 মই AgriGPT 🌾 আৰু মই কেৱল কৃষি আৰু খেতি সম্পৰ্কীয় প্ৰশ্নত সহায় কৰোঁ।"
 }
 
-LANGUAGE_MAP = {
-    "en": "English",
-    "hi": "Hindi",
-    "bn": "Bengali",
-    "or": "Odia",
-    "ta": "Tamil",
-    "te": "Telugu",
-    "kn": "Kannada",
-    "ml": "Malayalam",
-    "mr": "Marathi",
-    "gu": "Gujarati",
-    "pa": "Punjabi",
-    "ur": "Urdu",
-    "as": "Assamese"
-}
-
-
-def detect_language(message: str) -> str:
+def get_chat_language(user_id: str, message: str, chat_id: str = None) -> str:
     """
-    Odia-safe language detection
+    Reply language for a message: the session's language while the message is
+    written in the same script (memoized per chat_id, chat_sessions.language on
+    first sight), otherwise detected from the message.
     """
+    session_language = None
+    if chat_id and user_id != "trial_user":
+        session_language = get_session_language(chat_id) or get_chat_session_language(chat_id)
+    language = resolve_language(message, session_language)
+    remember_session_language(chat_id, language)
+    return language
 
-    # Only Odia Unicode detection
-    for ch in message:
-        if '\u0B00' <= ch <= '\u0B7F':
-            return "Odia"
 
-    # Other languages handled by langdetect
-    try:
-        lang_code = detect(message)
-        return LANGUAGE_MAP.get(lang_code, "English")
-    except Exception:
-        return "English"
+async def get_chat_language_async(user_id: str, message: str, chat_id: str = None) -> str:
+    """Async variant of get_chat_language for the ASGI serving path"""
+    session_language = None
+    if chat_id and user_id != "trial_user":
+        session_language = get_session_language(chat_id) or await async_db_service.get_chat_session_language(chat_id)
+    language = resolve_language(message, session_language)
+    remember_session_language(chat_id, language)
+    return language
 
 
-def build_context_aware_prompt(current_message: str, language: str, chat_history: list) -> str:
+def build_context_aware_prompt(current_message: str, language: str, chat_history: list, summary: str = None) -> str:
     """
     Build a structured prompt with conversation context.
+    The recent messages themselves are NOT inlined - they go to the model once,
+    as chat history. Only the rolling summary of older turns is part of the prompt.
     
     Args:
         current_message: The user's current message
         language: Detected language for response
         chat_history: List of previous messages [{"role": "user"/"assistant", "message": "..."}]
+        summary: Rolling summary of turns older than chat_history (optional)
     
     Returns:
         Formatted prompt string with context
@@ -95,21 +95,19 @@ def build_context_aware_prompt(current_message: str, language: str, chat_history
         f"Every single word must be in {language}.\n"
     )
     
-    # 3. Conversation context (if exists)
-    if chat_history and len(chat_history) > 0:
-        prompt_parts.append("\n=== CONVERSATION HISTORY ===")
-        for msg in chat_history:
-            role_label = "User" if msg["role"] == "user" else "AgriGPT"
-            prompt_parts.append(f"{role_label}: {msg['message']}")
-        prompt_parts.append("=== END OF HISTORY ===\n")
+    # 3. Summary of earlier turns (recent messages are sent as chat history)
+    if summary:
+        prompt_parts.append("\n=== EARLIER CONVERSATION SUMMARY ===")
+        prompt_parts.append(summary)
+        prompt_parts.append("=== END OF SUMMARY ===\n")
     
     # 4. Current user message
     prompt_parts.append(f"\nCurrent User Question:\n{current_message}")
     
     # 5. Instruction for contextual understanding
-    if chat_history:
+    if chat_history or summary:
         prompt_parts.append(
-            "\nIMPORTANT: Use the conversation history above to understand context, "
+            "\nIMPORTANT: Use the previous messages of this conversation to understand context, "
             "references (like 'this', 'that', 'earlier'), and provide relevant answers. "
             f"Respond ONLY in {language} language."
         )
@@ -117,11 +115,95 @@ def build_context_aware_prompt(current_message: str, language: str, chat_history
     return "\n".join(prompt_parts)
 
 
+def llm_lane(user_id: str) -> str:
+    """Admission lane for chat traffic: trial users queue behind authenticated users"""
+    return "trial" if user_id == "trial_user" else "chat"
+
+
+def get_context_history(user_id: str, chat_id: str = None) -> tuple:
+    """
+    Retrieve conversation context: recent messages trimmed to the token budget,
+    plus the rolling summary of older turns. Returns (chat_history, summary).
+    """
+    chat_history, summary = [], None
+    if chat_id and user_id != "trial_user":
+        try:
+            chat_history, summary = get_chat_context(chat_id)
+            if chat_history:
+                print(f"✓ Retrieved {len(chat_history)} recent messages for context"
+                      f"{' + summary' if summary else ''}")
+            else:
+                print("ℹ No previous messages in this chat session")
+        except Exception as e:
+            print(f"✗ Error retrieving chat history: {str(e)}")
+            chat_history, summary = [], None
+    else:
+        if chat_id is None:
+            print(f"ℹ New chat session - no history available")
+        else:
+            print(f"ℹ Trial user - limited history")
+    return chat_history, summary
+
+
+def is_off_topic(message: str, chat_history: list, summary: str = None) -> bool:
+    """
+    Local pre-check (DOMAIN_FILTER_CHAT): True only for a confidently non-agricultural
+    message without conversation context - follow-ups like "and for wheat?" need the LLM.
+    """
+    if not (DOMAIN_FILTER_CHAT and DOMAIN_CLASSIFIER_ENABLED) or chat_history or summary:
+        return False
+    label, confidence = classify_domain(message)
+    return label == "other" and confidence >= DOMAIN_FILTER_CHAT_MIN_CONFIDENCE
+
+
+def classify_response(response: str, language: str) -> tuple:
+    """
+    If Gemini indicates non-agriculture → localized fallback.
+    Returns (response, response_type).
+    """
+    # Check if response matches any fallback message (in any language)
+    is_fallback = any(
+        fallback_msg.lower().replace(" ", "") in response.lower().replace(" ", "")
+        for fallback_msg in FALLBACK_MESSAGES.values()
+    )
+
+    if is_fallback:
+        return FALLBACK_MESSAGES.get(language, FALLBACK_MESSAGES["English"]), "fallback"
+    return response, "ai"
+
+
+def persist_chat_turn(user_id: str, message: str, response: str, response_type: str,
+                      language: str, chat_id: str = None) -> str:
+    """
+    Save a chat turn for authenticated users (not trial users).
+    Creates a new chat session if chat_id is None. Returns the chat_id.
+    """
+    if user_id == "trial_user":
+        return chat_id
+
+    # Create new chat session if chat_id is None
+    if chat_id is None:
+        title = generate_chat_title(message, language)
+        chat_id = create_chat_session(user_id, title, language)
+        remember_session_language(chat_id, language)
+    else:
+        # Update existing session's updated_at
+        update_chat_session(chat_id)
+
+    # Save the messages
+    save_chat(user_id, message, response, response_type, language, chat_id=chat_id)
+
+    # Fold turns that left the context window into the session summary
+    schedule_summary_update(chat_id, language)
+    return chat_id
+
+
 def handle_chat(user_id: str, message: str, chat_id: str = None) -> dict:
     """
     Process chat with session support:
-    - detect input language (Odia-safe)
-    - send ALL queries to Gemini API (including greetings, capability queries)
+    - detect input language (script table, session language reused)
+    - send ALL queries to Gemini API (including greetings, capability queries),
+      except clearly off-topic first messages when DOMAIN_FILTER_CHAT is on
     - force same-language response from Gemini
     - use localized fallback only for non-agricultural queries
     - save chat history with chat_id
@@ -134,58 +216,63 @@ def handle_chat(user_id: str, message: str, chat_id: str = None) -> dict:
         response = FALLBACK_MESSAGES.get(language, FALLBACK_MESSAGES["English"])
         response_type = "fallback"
     else:
-        language = detect_language(message)
-        
-        # Retrieve recent conversation history for context (last 10 messages = ~5 pairs)
-        chat_history = []
-        if chat_id and user_id != "trial_user":
-            try:
-                chat_history = get_recent_chat_messages(chat_id, limit=10)
-                if chat_history:
-                    print(f"✓ Retrieved {len(chat_history)} recent messages for context")
-                else:
-                    print("ℹ No previous messages in this chat session")
-            except Exception as e:
-                print(f"✗ Error retrieving chat history: {str(e)}")
-                chat_history = []
+        language = get_chat_language(user_id, message, chat_id)
+        chat_history, summary = get_context_history(user_id, chat_id)
+
+        if is_off_topic(message, chat_history, summary):
+            print("ℹ Off-topic message answered locally")
+            response = FALLBACK_MESSAGES.get(language, FALLBACK_MESSAGES["English"])
         else:
-            if chat_id is None:
-                print(f"ℹ New chat session - no history available")
-            else:
-                print(f"ℹ Trial user - limited history")
-
-        # Build context-aware prompt with AgriGPT personality
-        prompt = build_context_aware_prompt(message, language, chat_history)
-        
-        print(f"📤 Sending to Gemini API (with {len(chat_history)} context messages)")
-        response = get_ai_response(prompt, chat_history=chat_history)
-
-        # If Gemini indicates non-agriculture → localized fallback
-        # Check if response matches any fallback message (in any language)
-        is_fallback = any(
-            fallback_msg.lower().replace(" ", "") in response.lower().replace(" ", "")
-            for fallback_msg in FALLBACK_MESSAGES.values()
-        )
-        
-        if is_fallback:
+            # Build context-aware prompt with AgriGPT personality
+            prompt = build_context_aware_prompt(message, language, chat_history, summary)
+
+            print(f"📤 Sending to Gemini API (with {len(chat_history)} context messages)")
+            response = get_ai_response(prompt, chat_history=chat_history, lane=llm_lane(user_id))
+        response, response_type = classify_response(response, language)
+
+    chat_id = persist_chat_turn(user_id, message, response, response_type, language, chat_id)
+    
+    return {
+        "reply": response,
+        "chat_id": chat_id,
+        "language": language
+    }
+
+
+async def handle_chat_async(user_id: str, message: str, chat_id: str = None) -> dict:
+    """
+    Async variant of handle_chat for the ASGI serving path.
+    Same behaviour, but Gemini and MongoDB are awaited instead of blocking a worker.
+    """
+    if not message or not message.strip():
+        language = "English"
+        response = FALLBACK_MESSAGES.get(language, FALLBACK_MESSAGES["English"])
+        response_type = "fallback"
+    else:
+        language = await get_chat_language_async(user_id, message, chat_id)
+
+        chat_history, summary = [], None
+        if chat_id and user_id != "trial_user":
+            chat_history, summary = await get_chat_context_async(chat_id)
+
+        if is_off_topic(message, chat_history, summary):
             response = FALLBACK_MESSAGES.get(language, FALLBACK_MESSAGES["English"])
-            response_type = "fallback"
         else:
-            response_type = "ai"
+            prompt = build_context_aware_prompt(message, language, chat_history, summary)
+            response = await get_ai_response_async(prompt, chat_history=chat_history, lane=llm_lane(user_id))
+        response, response_type = classify_response(response, language)
 
-    # Only save chat history for authenticated users (not trial users)
     if user_id != "trial_user":
-        # Create new chat session if chat_id is None
         if chat_id is None:
             title = generate_chat_title(message, language)
-            chat_id = create_chat_session(user_id, title, language)
+            chat_id = await async_db_service.create_chat_session(user_id, title, language)
+            remember_session_language(chat_id, language)
         else:
-            # Update existing session's updated_at
-            update_chat_session(chat_id)
-        
-        # Save the messages
-        save_chat(user_id, message, response, response_type, language, chat_id=chat_id)
-    
+            await async_db_service.update_chat_session(chat_id)
+
+        await async_db_service.save_chat(user_id, message, response, response_type, language, chat_id=chat_id)
+        schedule_summary_update(chat_id, language)
+
     return {
         "reply": response,
         "chat_id": chat_id,
@@ -193,6 +280,57 @@ def handle_chat(user_id: str, message: str, chat_id: str = None) -> dict:
     }
 
 
+def handle_chat_stream(user_id: str, message: str, chat_id: str = None):
+    """
+    Streaming variant of handle_chat.
+    Yields (event, data) tuples:
+    - ("meta", {...})  as soon as the language is known
+    - ("chunk", {...}) for every piece of text Gemini generates
+    - ("done", {...})  with the final reply, response_type and chat_id
+
+    The turn is persisted once the stream completes. If the client disconnects
+    mid-stream, the rest of the answer is still collected and saved.
+    """
+    language = get_chat_language(user_id, message, chat_id)
+    yield "meta", {"language": language, "chat_id": chat_id}
+
+    chat_history, summary = get_context_history(user_id, chat_id)
+    if is_off_topic(message, chat_history, summary):
+        print("ℹ Off-topic message answered locally")
+        stream = iter([FALLBACK_MESSAGES.get(language, FALLBACK_MESSAGES["English"])])
+    else:
+        prompt = build_context_aware_prompt(message, language, chat_history, summary)
+
+        print(f"📤 Streaming from Gemini API (with {len(chat_history)} context messages)")
+        stream = stream_ai_response(prompt, chat_history=chat_history, lane=llm_lane(user_id))
+    parts = []
+    client_gone = False
+    try:
+        for chunk in stream:
+            parts.append(chunk)
+            yield "chunk", {"text": chunk}
+    except GeneratorExit:
+        # Client disconnected - finish the answer so the saved turn is complete
+        client_gone = True
+        print(f"ℹ Client disconnected mid-stream, completing answer for chat: {chat_id}")
+        parts.extend(stream)
+
+    response, response_type = classify_response("".join(parts).strip(), language)
+
+    try:
+        chat_id = persist_chat_turn(user_id, message, response, response_type, language, chat_id)
+    except Exception as e:
+        print(f"✗ Error saving streamed chat: {str(e)}")
+
+    if not client_gone:
+        yield "done", {
+            "reply": response,
+            "response_type": response_type,
+            "chat_id": chat_id,
+            "language": language
+        }
+
+
 """For testing purposes only"""
 
 # if __name__ == "__main__":
@@ -0,0 +1,54 @@
+"""
+pytest setup: the services run against mongomock and the stub LLM provider.
+
+utils/config.py reads its settings at import, so the environment is set
+before any test module imports a service; pymongo.MongoClient is replaced by
+mongomock's for the module-level clients (db_service, ...). Install the test
+dependencies with `pip install -r requirements-dev.txt`.
+
+    python -m pytest -q
+"""
+
+import os
+
+os.environ.setdefault("LLM_PROVIDER", "stub")
+os.environ.setdefault("LLM_STUB_LATENCY_MS", "fixed:5")
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "agrigpt_test")
+os.environ.setdefault("EMAIL_ID", "test@example.com")
+os.environ.setdefault("EMAIL_APP_PASSWORD", "test")
+
+import mongomock
+import pymongo
+import pytest
+from mongomock.collection import BulkOperationBuilder
+
+pymongo.MongoClient = mongomock.MongoClient
+
+
+def _without_sort(add):
+    # PyMongo >= 4.11 passes sort= to update and replace operations; mongomock does not know it
+    def wrapper(self, *args, sort=None, **kwargs):
+        return add(self, *args, **kwargs)
+    return wrapper
+
+
+BulkOperationBuilder.add_update = _without_sort(BulkOperationBuilder.add_update)
+BulkOperationBuilder.add_replace = _without_sort(BulkOperationBuilder.add_replace)
+
+
+@pytest.fixture
+def mongo_db():
+    """A fresh mongomock database"""
+    return mongomock.MongoClient().get_database("agrigpt_test")
+
+
+@pytest.fixture
+def db_service():
+    """services.db_service on a mongomock database, emptied (and its write-behind buffer drained) after the test"""
+    from services import db_service
+
+    yield db_service
+    db_service.chat_writer.flush()
+    for name in db_service.db.list_collection_names():
+        db_service.db.drop_collection(name)
@@ -14,7 +14,7 @@ Example:
 """
 
 import sys
-from services.db_service import user_collection, developers_collection
+from services.db_service import user_collection, developers_collection, stats
 from datetime import datetime, timezone
 
 
@@ -38,15 +38,17 @@ def add_developer(email):
             return True
         
         # Add to developers collection
-        result = developers_collection.insert_one({
+        developer = {
             "user_id": user_id,
             "email": email,
             "name": user.get("name", ""),
             "added_at": datetime.now(timezone.utc),
             "role": "developer"
-        })
+        }
+        result = developers_collection.insert_one(developer)
         
         if result.inserted_id:
+            stats.record(created=[("developers", developer["added_at"])])
             print(f"✅ Success! User '{email}' added to developers collection")
             print(f"   Name: {user.get('name', 'N/A')}")
             print(f"   User ID: {user_id}")
@@ -77,6 +79,7 @@ def remove_developer(email):
         result = developers_collection.delete_one({"user_id": user_id})
         
         if result.deleted_count > 0:
+            stats.record(removed={"developers": result.deleted_count})
             print(f"✅ Developer access removed from '{email}'")
             return True
         else:
@@ -0,0 +1,67 @@
+"""
+MongoDB Index Management Script
+
+Creates and checks the indexes registered in services/db_indexes.py. The app
+also creates missing indexes at startup (DB_ENSURE_INDEXES_ON_STARTUP), so
+`ensure` is mainly for deployments that turn that off, and `verify` is the
+check to run after adding a query or changing an index.
+
+Usage:
+    python manage_indexes.py ensure    - Create missing registered indexes (idempotent)
+    python manage_indexes.py verify    - explain() every query shape; exit 1 if any is a COLLSCAN
+    python manage_indexes.py list      - List registered indexes and whether they exist
+
+Example (deploy step):
+    python manage_indexes.py ensure && python manage_indexes.py verify
+"""
+
+import sys
+from services.db_indexes import INDEXES, ensure_indexes, verify_indexes, query_shapes
+from services.db_service import db
+
+
+def list_indexes():
+    """Print every registered index and whether it exists in the database"""
+    existing = {}
+    print(f"\n📋 Registered indexes ({len(INDEXES)}):")
+    print("=" * 70)
+    for spec in INDEXES:
+        if spec["collection"] not in existing:
+            existing[spec["collection"]] = {idx["name"] for idx in db[spec["collection"]].list_indexes()}
+        present = spec["name"] in existing[spec["collection"]]
+        keys = ", ".join(f"{field}:{direction}" for field, direction in spec["keys"])
+        options = f" {spec['options']}" if spec.get("options") else ""
+        print(f"  {'✓' if present else '✗'} {spec['collection']}.{spec['name']:<22} {{{keys}}}{options}")
+
+
+def verify():
+    shapes = len(query_shapes())
+    print(f"\n🔍 Explaining {shapes} query shapes:")
+    print("=" * 70)
+    failures = verify_indexes()
+    print("-" * 70)
+    if failures:
+        print(f"❌ {len(failures)} of {shapes} query shapes use a collection scan")
+        print("   Run `python manage_indexes.py ensure`, or register an index for them in services/db_indexes.py")
+        return False
+    print(f"✅ All {shapes} query shapes use an index")
+    return True
+
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] not in ("ensure", "verify", "list"):
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    if command == "ensure":
+        summary = ensure_indexes()
+        sys.exit(1 if summary["conflicts"] else 0)
+    elif command == "verify":
+        sys.exit(0 if verify() else 1)
+    else:
+        list_indexes()
+
+
+if __name__ == "__main__":
+    main()
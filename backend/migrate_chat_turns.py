@@ -0,0 +1,81 @@
+"""
+Chat Turns Migration Script
+
+Moves the messages of chat_history (one document per message) into
+chat_turns (one document per question/answer turn, or per bucket of
+CHAT_TURNS_PER_DOCUMENT turns) while the app keeps serving - see
+services/chat_migration.py. Safe to stop and re-run at any time.
+
+Usage:
+    python migrate_chat_turns.py run [batch] [max_sessions]  - Migrate (default: everything)
+    python migrate_chat_turns.py status                      - Progress, remaining messages, collection sizes
+
+Example (deployment):
+    python migrate_chat_turns.py run && python migrate_chat_turns.py status
+    # then set CHAT_LEGACY_READS=false and restart the app
+"""
+
+import sys
+import time
+from services.chat_migration import run as run_migration, status as migration_status
+from utils.config import CHAT_MIGRATION_BATCH, CHAT_MIGRATION_PAUSE_MS, CHAT_TURNS_PER_DOCUMENT
+
+
+def run(batch, max_sessions):
+    started = time.perf_counter()
+    print(f"\n📋 Migrating chat_history to chat_turns ({CHAT_TURNS_PER_DOCUMENT} turns per document, "
+          f"batches of {batch} messages, {CHAT_MIGRATION_PAUSE_MS}ms pause)...")
+    summary = run_migration(batch=batch, max_sessions=max_sessions)
+    print("=" * 60)
+    print(f"✓ {summary['sessions']} sessions, {summary['messages']} messages moved as {summary['turns']} turns "
+          f"in {time.perf_counter() - started:.1f}s")
+    if summary["finished"]:
+        print("✅ chat_history is empty - CHAT_LEGACY_READS can be set to false")
+    else:
+        print("ℹ Stopped before the end - run again to continue")
+
+
+def _mb(size):
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+def status():
+    current = migration_status()
+    progress = current["progress"]
+    print("\n📊 Chat turns migration:")
+    print("=" * 60)
+    if progress:
+        print(f"  started   {progress.get('started_at')}")
+        print(f"  updated   {progress.get('updated_at')}")
+        print(f"  finished  {progress.get('finished_at') or '-'}")
+        print(f"  moved     {progress.get('sessions', 0)} sessions, {progress.get('messages', 0)} messages "
+              f"-> {progress.get('turns', 0)} turns")
+    else:
+        print("  not started")
+    print(f"  remaining {current['remaining_messages']} chat_history messages (estimate)")
+    print("-" * 60)
+    print(f"  {'collection':<14} {'documents':>10} {'data':>12} {'indexes':>12}")
+    for name, stats in current["collections"].items():
+        print(f"  {name:<14} {stats['count']:>10} {_mb(stats['size']):>12} {_mb(stats['total_index_size']):>12}")
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("run", "status"):
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    if command == "run":
+        try:
+            batch = int(sys.argv[2]) if len(sys.argv) > 2 else CHAT_MIGRATION_BATCH
+            max_sessions = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        except ValueError:
+            print(__doc__)
+            sys.exit(1)
+        run(batch, max_sessions)
+    else:
+        status()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Report Store Pre-warming Script
+
+Regenerates the most requested farming reports into the report store, so that
+/api/report can serve them without waiting on Gemini. Popularity is ranked by
+how often each (crop, region, language) combination appears in farming_reports.
+
+Run it off-peak (e.g. nightly from cron) and at the start of each season.
+
+Usage:
+    python prewarm_reports.py                  - Refresh stale entries among the top N keys
+    python prewarm_reports.py --top 100        - Consider the top 100 keys
+    python prewarm_reports.py --days 60        - Rank by the last 60 days of requests
+    python prewarm_reports.py --force          - Regenerate even if the entry is still fresh
+    python prewarm_reports.py --dry-run        - Only list the keys that would be refreshed
+
+Example (cron, every night at 02:30):
+    30 2 * * * cd /path/to/backend && python prewarm_reports.py --top 100
+"""
+
+import argparse
+import time
+from report import generate_report_data
+from services.report_store import get_popular_report_keys, get_stored_report
+from utils.config import REPORT_PREWARM_TOP_N, REPORT_PREWARM_LOOKBACK_DAYS, REPORT_STORE_FRESHNESS_HOURS
+
+
+def prewarm_reports(top_n, lookback_days, force=False, dry_run=False):
+    """Regenerate the top-N most requested reports that are missing or stale"""
+    keys = get_popular_report_keys(top_n, lookback_days)
+    if not keys:
+        print("📋 No reports requested in the lookback window - nothing to pre-warm")
+        return 0
+
+    # Refresh entries a bit before they expire so peak traffic never hits a stale key
+    refresh_age_hours = REPORT_STORE_FRESHNESS_HOURS * 0.8
+
+    refreshed = 0
+    print(f"\n📋 Top {len(keys)} report keys (last {lookback_days} days):")
+    print("=" * 70)
+    for key in keys:
+        label = f"{key['crop_name']} / {key['region']} / {key['language']} ({key['requests']} requests)"
+
+        if not force and get_stored_report(key["crop_name"], key["region"], key["language"],
+                                           max_age_hours=refresh_age_hours):
+            print(f"  ✓ fresh     {label}")
+            continue
+
+        if dry_run:
+            print(f"  • stale     {label}")
+            continue
+
+        started = time.perf_counter()
+        try:
+            generate_report_data(key["crop_name"], key["region"], key["language"])
+            refreshed += 1
+            print(f"  ✅ refreshed {label} in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            print(f"  ❌ failed    {label}: {str(e)}")
+
+    print("-" * 70)
+    print(f"✓ Pre-warm complete: {refreshed} report(s) regenerated")
+    return refreshed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-warm the farming report store")
+    parser.add_argument("--top", type=int, default=REPORT_PREWARM_TOP_N, help="number of popular keys to consider")
+    parser.add_argument("--days", type=int, default=REPORT_PREWARM_LOOKBACK_DAYS, help="popularity lookback window in days")
+    parser.add_argument("--force", action="store_true", help="regenerate even if the stored report is fresh")
+    parser.add_argument("--dry-run", action="store_true", help="only list keys that would be regenerated")
+    args = parser.parse_args()
+
+    prewarm_reports(args.top, args.days, force=args.force, dry_run=args.dry_run)
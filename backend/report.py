@@ -1,35 +1,28 @@
-from services.llm_service import get_ai_response
-from services.db_service import save_report
-from langdetect import detect
-
-# Language mapping
-LANGUAGE_MAP = {
-    "en": "English",
-    "hi": "Hindi",
-    "bn": "Bengali",
-    "or": "Odia",
-    "ta": "Tamil",
-    "te": "Telugu",
-    "kn": "Kannada",
-    "ml": "Malayalam",
-    "mr": "Marathi",
-    "gu": "Gujarati",
-    "pa": "Punjabi",
-    "ur": "Urdu",
-    "as": "Assamese"
-}
-
-def detect_language(text: str) -> str:
-    """Detect language from text"""
-    # Odia Unicode block
-    for ch in text:
-        if '\u0B00' <= ch <= '\u0B7F':
-            return "Odia"
-
-    try:
-        return LANGUAGE_MAP.get(detect(text), "English")
-    except Exception:
-        return "English"
+import asyncio
+import json
+import re
+import threading
+import time
+from services.llm_service import get_ai_response, get_ai_response_async
+from services.llm_errors import LLMError
+from services.llm_resilience import LatencyTracker
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from services.db_service import save_report, save_reports, build_report_doc
+from services import async_db_service
+from services.report_store import (
+    get_stored_report,
+    put_stored_report,
+    get_stored_report_async,
+    put_stored_report_async,
+    REPORT_SECTIONS
+)
+from utils.config import REPORT_STORE_ENABLED, REPORT_BATCH_CONCURRENCY, REPORT_REPAIR_MAX_SECTIONS
+from services.language_service import detect_language
+
+
+def report_lane(user_id: str) -> str:
+    """Admission lane for report traffic: trial users queue behind everyone else"""
+    return "trial" if user_id == "trial_user" else "report"
 
 
 def generate_farming_report(user_id: str, crop_name: str, region: str, language: str = None) -> dict:
@@ -50,89 +43,10 @@ def generate_farming_report(user_id: str, crop_name: str, region: str, language:
     print(f"   User: {user_id}")
     print(f"{'='*60}")
 
-    # Language-specific instruction
-    lang_instruction = f"Write EVERY single word in {language} language ONLY. Do NOT mix any other language."
-    if language == "English":
-        lang_instruction = "Write EVERY word in English only. Do NOT use Hindi, Odia, or any other language."
-    elif language == "Hindi":
-        lang_instruction = "हर शब्द केवल हिंदी में लिखें। अंग्रेजी या अन्य भाषा का उपयोग न करें।"
-
-    prompt = f"""You are an expert agricultural advisor for Indian farmers.
-
-**CRITICAL REQUIREMENT:**
-{lang_instruction}
-
-Generate a detailed farming report for:
-- Crop: {crop_name}
-- Region: {region}
-
-Provide exactly 4 points for each of these 4 categories (write in {language} only):
-
-**Category 1 - Sowing Advice:**
-- Best sowing time and season
-- Seed depth and spacing
-- Row spacing
-- Watering after sowing
-Start each point with these emojis in order: 🌱 📏 🌾 💧
-
-**Category 2 - Fertilizer Plan:**
-- Nitrogen quantity (kg/hectare)
-- Phosphorus quantity
-- Potash quantity
-- Organic manure recommendations
-Start each point with these emojis in order: 🧪 🟡 🔴 🌿
-
-**Category 3 - Weather Protection:**
-- Sun/heat protection
-- Rain/drainage management
-- Cold weather protection
-- Wind protection
-Start each point with these emojis in order: ☀️ 🌧️ ❄️ 🌪️
-
-**Category 4 - Farming Calendar:**
-- Week 1-2 activities
-- Week 3-4 activities
-- Week 5-8 activities
-- Week 12-16 harvest
-Start each point with these emojis in order: 📅 🌱 💧 🌾
-
-**IMPORTANT:** Format your response EXACTLY like this:
-
-SOWING_ADVICE:
-🌱 [advice in {language}]
-📏 [advice in {language}]
-🌾 [advice in {language}]
-💧 [advice in {language}]
-
-FERTILIZER_PLAN:
-🧪 [plan in {language}]
-🟡 [plan in {language}]
-🔴 [plan in {language}]
-🌿 [plan in {language}]
-
-WEATHER_TIPS:
-☀️ [tip in {language}]
-🌧️ [tip in {language}]
-❄️ [tip in {language}]
-🌪️ [tip in {language}]
-
-FARMING_CALENDAR:
-📅 [schedule in {language}]
-🌱 [schedule in {language}]
-💧 [schedule in {language}]
-🌾 [schedule in {language}]
-"""
-
     try:
-        # Get AI response
-        response = get_ai_response(prompt)
-        
-        # Debug output
-        print(f"\n✓ AI Response received ({len(response)} chars)")
-        print(f"First 200 chars: {response[:200]}...")
-        
-        # Parse the response
-        report_data = parse_report_response(response, crop_name, region, language)
+        report_data, source = resolve_report(crop_name, region, language, lane=report_lane(user_id))
+        if source == "store":
+            print(f"✓ Report served from report store")
         
         # Save to database (only for authenticated users)
         if user_id != "trial_user":
@@ -147,6 +61,9 @@ FARMING_CALENDAR:
         
         return report_data
 
+    except LLMError:
+        # Let the route answer 429 / 503 instead of a degraded report
+        raise
     except Exception as e:
         print(f"❌ Error generating report: {str(e)}")
         import traceback
@@ -154,98 +71,362 @@ FARMING_CALENDAR:
         return {"error": f"Failed to generate report: {str(e)}"}
 
 
-def parse_report_response(response: str, crop_name: str, region: str, language: str) -> dict:
-    """Parse AI response into structured report data"""
-    
-    report = {
+async def generate_farming_report_async(user_id: str, crop_name: str, region: str, language: str = None) -> dict:
+    """
+    Async variant of generate_farming_report for the ASGI serving path.
+    Gemini and MongoDB are awaited instead of blocking a worker.
+    """
+    if not crop_name or not region:
+        return {"error": "Crop name and region are required"}
+
+    if not language:
+        language = detect_language(f"{crop_name} {region}")
+
+    print(f"📊 Generating Report (async): {crop_name} / {region} / {language} for {user_id}")
+
+    try:
+        stored = await get_stored_report_async(crop_name, region, language) if REPORT_STORE_ENABLED else None
+        if stored:
+            report_data = {"crop": crop_name, "region": region, "language": language, **stored}
+        else:
+            report_data = await generate_report_data_async(crop_name, region, language, lane=report_lane(user_id))
+
+        if user_id != "trial_user":
+            try:
+                await async_db_service.save_report(user_id, crop_name, region, report_data, language)
+            except Exception as e:
+                print(f"⚠️ Failed to save report: {e}")
+
+        return report_data
+
+    except LLMError:
+        raise
+    except Exception as e:
+        print(f"❌ Error generating report: {str(e)}")
+        return {"error": f"Failed to generate report: {str(e)}"}
+
+
+def resolve_report(crop_name: str, region: str, language: str, lane: str = "report") -> tuple:
+    """
+    Report data from the precomputed report store when a fresh entry exists,
+    otherwise generated with Gemini. Returns (report_data, source) with
+    source "store" or "generated".
+    """
+    stored = get_stored_report(crop_name, region, language) if REPORT_STORE_ENABLED else None
+    if stored:
+        return {"crop": crop_name, "region": region, "language": language, **stored}, "store"
+    return generate_report_data(crop_name, region, language, lane=lane), "generated"
+
+
+def _batch_item(index: int, crop_name: str, region: str, language: str, lane: str) -> dict:
+    """Resolve one batch item; failures become a per-item error instead of failing the batch"""
+    result = {"index": index, "cropName": crop_name, "region": region, "language": language}
+    try:
+        report_data, source = resolve_report(crop_name, region, language, lane=lane)
+        return {**result, "status": "ok", "source": source, "report": report_data}
+    except LLMError as e:
+        return {**result, "status": "error", "error": str(e), "retry_after": e.retry_after}
+    except Exception as e:
+        print(f"❌ Error generating batch report ({crop_name}, {region}): {str(e)}")
+        return {**result, "status": "error", "error": "Failed to generate report"}
+
+
+def generate_report_batch(user_id: str, items: list):
+    """
+    Generate reports for many (crop, region, language) items with bounded parallelism.
+
+    Args:
+        user_id: Requesting user ("trial_user" for unauthenticated)
+        items: List of {"cropName", "region", "language"} dicts (language optional)
+
+    Yields (event, data) tuples:
+    - ("item", {...}) per item as soon as it completes (completion order, with
+      its "index" in the request), status "ok" with the report or "error"
+    - ("done", {...}) summary, after reports of authenticated users were saved
+      with a single bulk write
+    """
+    lane = report_lane(user_id)
+    pool = ThreadPoolExecutor(max_workers=max(1, min(REPORT_BATCH_CONCURRENCY, len(items))))
+    succeeded, failed, docs = 0, 0, []
+    try:
+        futures = []
+        for index, item in enumerate(items):
+            crop_name, region = item["cropName"], item["region"]
+            language = item.get("language") or detect_language(f"{crop_name} {region}")
+            futures.append(pool.submit(_batch_item, index, crop_name, region, language, lane))
+
+        for future in as_completed(futures):
+            result = future.result()
+            if result["status"] == "ok":
+                succeeded += 1
+                if user_id != "trial_user":
+                    docs.append(build_report_doc(
+                        user_id, result["cropName"], result["region"], result["report"], result["language"]
+                    ))
+            else:
+                failed += 1
+            yield "item", result
+    finally:
+        # Client went away: drop items that have not started, keep what is done
+        pool.shutdown(wait=False, cancel_futures=True)
+
+        saved = 0
+        if docs:
+            try:
+                saved = len(save_reports(docs))
+            except Exception as e:
+                print(f"⚠️ Failed to save batch reports: {e}")
+
+    print(f"📊 Batch reports for {user_id}: {succeeded} ok, {failed} failed, {saved} saved")
+    yield "done", {"total": len(items), "succeeded": succeeded, "failed": failed, "saved": saved}
+
+
+# Report sections: title, the 4 points asked for, and the emoji each point starts with
+REPORT_SECTION_SPECS = {
+    "sowingAdvice": (
+        "Sowing Advice",
+        ["Best sowing time and season", "Seed depth and spacing", "Row spacing", "Watering after sowing"],
+        ["🌱", "📏", "🌾", "💧"]
+    ),
+    "fertilizerPlan": (
+        "Fertilizer Plan",
+        ["Nitrogen quantity (kg/hectare)", "Phosphorus quantity", "Potash quantity", "Organic manure recommendations"],
+        ["🧪", "🟡", "🔴", "🌿"]
+    ),
+    "weatherTips": (
+        "Weather Protection",
+        ["Sun/heat protection", "Rain/drainage management", "Cold weather protection", "Wind protection"],
+        ["☀️", "🌧️", "❄️", "🌪️"]
+    ),
+    "calendar": (
+        "Farming Calendar",
+        ["Week 1-2 activities", "Week 3-4 activities", "Week 5-8 activities", "Week 12-16 harvest"],
+        ["📅", "🌱", "💧", "🌾"]
+    )
+}
+POINTS_PER_SECTION = 4
+
+# Parse success and generation latency (GET /api/admin/llm/metrics)
+_parse_stats = {"reports": 0, "parsed": 0, "repaired": 0, "fallback": 0, "reasked_sections": 0, "fallback_sections": 0}
+_parse_stats_lock = threading.Lock()
+_report_latency = LatencyTracker(window=500, min_samples=1)
+
+
+def build_report_schema(sections: tuple = REPORT_SECTIONS) -> dict:
+    """JSON schema for JSON-mode generation: one array of points per section"""
+    return {
+        "type": "object",
+        "properties": {section: {"type": "array", "items": {"type": "string"}} for section in sections},
+        "required": list(sections)
+    }
+
+
+def build_report_prompt(crop_name: str, region: str, language: str, sections: tuple = REPORT_SECTIONS) -> str:
+    """
+    Build the Gemini prompt for a farming report (JSON mode).
+    With a subset of sections it is the targeted re-ask for sections that were missing.
+    """
+
+    # Language-specific instruction
+    lang_instruction = f"Write EVERY single word in {language} language ONLY. Do NOT mix any other language."
+    if language == "English":
+        lang_instruction = "Write EVERY word in English only. Do NOT use Hindi, Odia, or any other language."
+    elif language == "Hindi":
+        lang_instruction = "हर शब्द केवल हिंदी में लिखें। अंग्रेजी या अन्य भाषा का उपयोग न करें।"
+
+    categories = []
+    for section in sections:
+        title, topics, emojis = REPORT_SECTION_SPECS[section]
+        categories.append(
+            f"**{section} - {title}:**\n"
+            + "\n".join(f"- {topic}" for topic in topics)
+            + f"\nStart each point with these emojis in order: {' '.join(emojis)}"
+        )
+
+    keys = ", ".join(f'"{section}"' for section in sections)
+    return f"""You are an expert agricultural advisor for Indian farmers.
+
+**CRITICAL REQUIREMENT:**
+{lang_instruction}
+
+Generate a detailed farming report for:
+- Crop: {crop_name}
+- Region: {region}
+
+Provide exactly {POINTS_PER_SECTION} points for each of these categories (write in {language} only):
+
+{chr(10).join(categories)}
+
+**IMPORTANT:** Return ONLY a JSON object with the keys {keys}.
+Each key holds an array of exactly {POINTS_PER_SECTION} strings - one per point, in the order above.
+"""
+
+
+def _load_json_object(response: str):
+    """The response as a JSON object, or None if it is not one (tolerates ``` fences)"""
+    text = (response or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`").strip()
+        if text.lower().startswith("json"):
+            text = text[4:]
+    try:
+        document = json.loads(text)
+    except ValueError:
+        return None
+    return document if isinstance(document, dict) else None
+
+
+def _salvage_section(response: str, section: str):
+    """The section's array from malformed JSON (e.g. output cut off in a later section)"""
+    match = re.search(rf'"{section}"\s*:\s*\[', response or "")
+    if not match:
+        return None
+    try:
+        # Decoded from the "[" on: a "]" inside a point does not end the array
+        return json.JSONDecoder().raw_decode(response, match.end() - 1)[0]
+    except ValueError:
+        return None
+
+
+def _valid_points(value, section: str):
+    """The section's points if they pass validation, else None. Adds missing emoji prefixes."""
+    if not isinstance(value, list):
+        return None
+    points = [point.strip() for point in value if isinstance(point, str) and point.strip()]
+    if len(points) < POINTS_PER_SECTION:
+        return None
+
+    emojis = REPORT_SECTION_SPECS[section][2]
+    return [
+        point if point.startswith(emoji) else f"{emoji} {point}"
+        for emoji, point in zip(emojis, points[:POINTS_PER_SECTION])
+    ]
+
+
+def parse_report_json(response: str, sections: tuple = REPORT_SECTIONS) -> dict:
+    """
+    Validate a JSON-mode report response in a single pass.
+    Returns {section: points} for the valid sections; missing or malformed ones are left out.
+    """
+    document = _load_json_object(response)
+    valid = {}
+    for section in sections:
+        value = document.get(section) if document is not None else _salvage_section(response, section)
+        points = _valid_points(value, section)
+        if points is not None:
+            valid[section] = points
+    return valid
+
+
+def _sections_to_repair(sections: dict) -> list:
+    """Missing sections worth a targeted re-ask (none if the response was mostly unusable)"""
+    missing = [section for section in REPORT_SECTIONS if section not in sections]
+    return missing if len(missing) <= REPORT_REPAIR_MAX_SECTIONS else []
+
+
+def _section_request(crop_name: str, region: str, language: str, section: str) -> tuple:
+    """(prompt, schema) of the targeted re-ask for one section"""
+    return build_report_prompt(crop_name, region, language, (section,)), build_report_schema((section,))
+
+
+def _assemble_report(crop_name: str, region: str, language: str, sections: dict, reasked: int,
+                     started: float) -> dict:
+    """Fill sections that are still missing with fallback data and record parse stats"""
+    fallback = get_fallback_data(crop_name, language)
+    missing = [section for section in REPORT_SECTIONS if section not in sections]
+
+    with _parse_stats_lock:
+        _parse_stats["reports"] += 1
+        _parse_stats["reasked_sections"] += reasked
+        _parse_stats["fallback_sections"] += len(missing)
+        if missing:
+            _parse_stats["fallback"] += 1
+        elif reasked:
+            _parse_stats["repaired"] += 1
+        else:
+            _parse_stats["parsed"] += 1
+    _report_latency.record("generation", time.monotonic() - started)
+
+    if missing:
+        print(f"⚠️ Report sections missing after {reasked} re-ask(s), using fallback data: {', '.join(missing)}")
+    elif reasked:
+        print(f"✓ Report repaired ({reasked} section(s) re-asked)")
+
+    return {
         "crop": crop_name,
         "region": region,
         "language": language,
-        "sowingAdvice": [],
-        "fertilizerPlan": [],
-        "weatherTips": [],
-        "calendar": []
+        **{section: sections.get(section, fallback[section]) for section in REPORT_SECTIONS}
     }
 
-    try:
-        print(f"\n🔍 Parsing response...")
-        
-        # Section header patterns
-        section_map = {
-            "sowingAdvice": ["SOWING_ADVICE", "SOWING ADVICE", "Sowing Advice"],
-            "fertilizerPlan": ["FERTILIZER_PLAN", "FERTILIZER PLAN", "Fertilizer Plan"],
-            "weatherTips": ["WEATHER_TIPS", "WEATHER TIPS", "Weather Tips"],
-            "calendar": ["FARMING_CALENDAR", "FARMING CALENDAR", "Farming Calendar", "CALENDAR"]
-        }
 
-        current_section = None
-        lines = response.split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            # Check if this line is a section header
-            section_found = False
-            for section_key, patterns in section_map.items():
-                if any(pattern in line for pattern in patterns):
-                    current_section = section_key
-                    section_found = True
-                    print(f"  ✓ Found section: {section_key}")
-                    break
-            
-            if section_found:
-                continue
-
-            # Add content to current section
-            if current_section:
-                # Clean line (remove bullets, numbers, extra spaces)
-                cleaned = line.lstrip('•-*0123456789.').strip()
-                
-                # Skip very short lines or lines with section keywords
-                if len(cleaned) < 10:
-                    continue
-                if any(kw in cleaned.upper() for kw in ['SOWING', 'FERTILIZER', 'WEATHER', 'FARMING', 'CALENDAR']):
-                    continue
-                
-                report[current_section].append(cleaned)
-                print(f"    → {section_key}: {cleaned[:60]}...")
-
-        # Show parsing results
-        print(f"\n📊 Parse Results:")
-        print(f"  Sowing: {len(report['sowingAdvice'])} items")
-        print(f"  Fertilizer: {len(report['fertilizerPlan'])} items")
-        print(f"  Weather: {len(report['weatherTips'])} items")
-        print(f"  Calendar: {len(report['calendar'])} items")
-
-        # Use fallback if any section is empty
-        if not all([report['sowingAdvice'], report['fertilizerPlan'], 
-                   report['weatherTips'], report['calendar']]):
-            print(f"⚠️ Some sections empty, using fallback data")
-            fallback = get_fallback_data(crop_name, language)
-            
-            if not report['sowingAdvice']:
-                report['sowingAdvice'] = fallback['sowingAdvice']
-            if not report['fertilizerPlan']:
-                report['fertilizerPlan'] = fallback['fertilizerPlan']
-            if not report['weatherTips']:
-                report['weatherTips'] = fallback['weatherTips']
-            if not report['calendar']:
-                report['calendar'] = fallback['calendar']
-
-        return report
+def generate_report_data(crop_name: str, region: str, language: str, lane: str = "report") -> dict:
+    """
+    Generate report sections with Gemini in JSON mode and validate them.
+    Missing or malformed sections are re-asked individually; complete reports
+    are written through to the report store.
+    """
+    started = time.monotonic()
+    response = get_ai_response(
+        build_report_prompt(crop_name, region, language), lane=lane, response_schema=build_report_schema()
+    )
+    sections = parse_report_json(response)
+
+    repair = _sections_to_repair(sections)
+    for section in repair:
+        prompt, schema = _section_request(crop_name, region, language, section)
+        sections.update(parse_report_json(get_ai_response(prompt, lane=lane, response_schema=schema), (section,)))
+
+    report_data = _assemble_report(crop_name, region, language, sections, len(repair), started)
+
+    if REPORT_STORE_ENABLED and is_complete_report(report_data, crop_name, language):
+        put_stored_report(crop_name, region, language, report_data)
+
+    return report_data
+
+
+async def generate_report_data_async(crop_name: str, region: str, language: str, lane: str = "report") -> dict:
+    """Async variant of generate_report_data; section re-asks run concurrently"""
+    started = time.monotonic()
+    response = await get_ai_response_async(
+        build_report_prompt(crop_name, region, language), lane=lane, response_schema=build_report_schema()
+    )
+    sections = parse_report_json(response)
+
+    repair = _sections_to_repair(sections)
+    if repair:
+        requests = [_section_request(crop_name, region, language, section) for section in repair]
+        replies = await asyncio.gather(*(
+            get_ai_response_async(prompt, lane=lane, response_schema=schema) for prompt, schema in requests
+        ))
+        for section, reply in zip(repair, replies):
+            sections.update(parse_report_json(reply, (section,)))
+
+    report_data = _assemble_report(crop_name, region, language, sections, len(repair), started)
+
+    if REPORT_STORE_ENABLED and is_complete_report(report_data, crop_name, language):
+        await put_stored_report_async(crop_name, region, language, report_data)
+
+    return report_data
+
+
+def get_report_parse_stats() -> dict:
+    """JSON-mode parse success rate, section repairs and generation latency"""
+    with _parse_stats_lock:
+        stats = dict(_parse_stats)
+    reports = stats["reports"]
+    return {
+        **stats,
+        "parse_success_rate": round(stats["parsed"] / reports, 3) if reports else None,
+        "complete_rate": round((stats["parsed"] + stats["repaired"]) / reports, 3) if reports else None,
+        "latency": _report_latency.stats().get("generation")
+    }
 
-    except Exception as e:
-        print(f"❌ Parse error: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return {
-            "crop": crop_name,
-            "region": region,
-            "language": language,
-            **get_fallback_data(crop_name, language)
-        }
+
+def is_complete_report(report_data: dict, crop_name: str, language: str) -> bool:
+    """True if the LLM produced every section (no fallback data was filled in)"""
+    fallback = get_fallback_data(crop_name, language)
+    return all(report_data[section] != fallback[section] for section in REPORT_SECTIONS)
 
 
 def get_fallback_data(crop_name: str, language: str) -> dict:
@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 from routes.auth_routes import verify_token, admin_required, token_required
-from services.db_service import save_feedback, get_all_feedbacks, developers_collection, user_collection, chat_sessions_collection, report_collection
+from services.db_service import save_feedback, get_all_feedbacks, developers_collection, stats
 
 feedback_bp = Blueprint("feedback", __name__)
 
@@ -58,6 +58,7 @@ def get_feedbacks():
         })
         
         if delete_result.deleted_count > 0:
+            stats.record(removed={"feedbacks": delete_result.deleted_count})
             print(f"🗑️ Auto-deleted {delete_result.deleted_count} old resolved feedbacks")
         
         feedbacks = get_all_feedbacks()
@@ -107,59 +108,35 @@ def check_developer():
 @feedback_bp.route("/api/admin/statistics", methods=["GET"])
 @admin_required
 def get_admin_statistics():
-    """Get comprehensive statistics for admin dashboard"""
+    """Get comprehensive statistics for admin dashboard (one read of the app_stats counters)"""
     try:
-        # Total users
-        total_users = user_collection.count_documents({})
-        
-        # Total developers
-        total_developers = developers_collection.count_documents({})
-        
-        # Total chat sessions
-        total_chats = chat_sessions_collection.count_documents({})
-        
-        # Total reports generated
-        total_reports = report_collection.count_documents({})
+        snapshot = stats.snapshot()
+        totals, recent = snapshot["totals"], snapshot["last_7_days"]
         
         # Feature usage (count of each feature)
         feature_usage = {
-            "chat": total_chats,
-            "report": total_reports,
-            "feedback": get_all_feedbacks().__len__()
+            "chat": totals["chat_sessions"],
+            "report": totals["reports"],
+            "feedback": totals["feedbacks"]
         }
         
         # Most used feature
         most_used = max(feature_usage.items(), key=lambda x: x[1]) if feature_usage else ("None", 0)
         
-        # Recent activity (last 7 days)
-        from datetime import datetime, timedelta
-        seven_days_ago = datetime.now() - timedelta(days=7)
-        
-        recent_users = user_collection.count_documents({
-            "created_at": {"$gte": seven_days_ago}
-        })
-        
-        recent_chats = chat_sessions_collection.count_documents({
-            "created_at": {"$gte": seven_days_ago}
-        })
-        
-        recent_reports = report_collection.count_documents({
-            "timestamp": {"$gte": seven_days_ago}
-        })
-        
         return jsonify({
             "success": True,
             "statistics": {
                 "users": {
-                    "total": total_users,
-                    "developers": total_developers,
-                    "regular_users": total_users - total_developers,
-                    "recent_signups": recent_users
+                    "total": totals["users"],
+                    "developers": totals["developers"],
+                    "regular_users": totals["users"] - totals["developers"],
+                    "recent_signups": recent["users"]
                 },
                 "feature_usage": {
-                    "chat_sessions": total_chats,
-                    "reports_generated": total_reports,
-                    "feedbacks_received": feature_usage["feedback"],
+                    "chat_sessions": totals["chat_sessions"],
+                    "chat_messages": totals["chat_messages"],
+                    "reports_generated": totals["reports"],
+                    "feedbacks_received": totals["feedbacks"],
                     "most_used_feature": {
                         "name": most_used[0],
                         "count": most_used[1]
@@ -167,11 +144,18 @@ def get_admin_statistics():
                 },
                 "recent_activity": {
                     "last_7_days": {
-                        "new_users": recent_users,
-                        "chat_sessions": recent_chats,
-                        "reports": recent_reports
-                    }
-                }
+                        "new_users": recent["users"],
+                        "chat_sessions": recent["chat_sessions"],
+                        "chat_messages": recent["chat_messages"],
+                        "reports": recent["reports"],
+                        "feedbacks": recent["feedbacks"]
+                    },
+                    # Created per hour (UTC, last 24 hours) and per day (last STATS_SERIES_DAYS days)
+                    "hourly": snapshot["hourly"],
+                    "daily": snapshot["daily"]
+                },
+                "counters_updated_at": snapshot["updated_at"],
+                "backfilled_at": snapshot["backfilled_at"]
             }
         }), 200
 
@@ -180,6 +164,44 @@ def get_admin_statistics():
         return jsonify({"error": str(e)}), 500
 
 
+@feedback_bp.route("/api/admin/llm/metrics", methods=["GET"])
+@admin_required
+def get_llm_metrics():
+    """Get LLM layer metrics (response cache, request coalescing, admission control, resilience, domain classifier, report parsing, transcription, language hints, chat write buffer, statistics counters) - admin only"""
+    try:
+        from services.llm_service import (
+            get_cache_stats,
+            get_coalescing_stats,
+            get_scheduler_stats,
+            get_resilience_stats
+        )
+        from services.domain_classifier import get_domain_classifier_stats
+        from report import get_report_parse_stats
+        from services.transcription_client import get_transcription_stats
+        from services.language_profile import get_language_hint_stats
+        from services.db_service import chat_writer
+
+        return jsonify({
+            "success": True,
+            "metrics": {
+                "cache": get_cache_stats(),
+                "coalescing": get_coalescing_stats(),
+                "scheduler": get_scheduler_stats(),
+                "resilience": get_resilience_stats(),
+                "domain_classifier": get_domain_classifier_stats(),
+                "report_parsing": get_report_parse_stats(),
+                "transcription": get_transcription_stats(),
+                "language_hint": get_language_hint_stats(),
+                "chat_writes": chat_writer.stats(),
+                "statistics_counters": stats.stats()
+            }
+        }), 200
+
+    except Exception as e:
+        print(f"❌ Error in get_llm_metrics: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
 @feedback_bp.route("/api/admin/feedback/<feedback_id>", methods=["DELETE"])
 @admin_required
 def delete_feedback(feedback_id):
@@ -192,6 +214,7 @@ def delete_feedback(feedback_id):
         
         if result.deleted_count == 0:
             return jsonify({"error": "Feedback not found"}), 404
+        stats.record(removed={"feedbacks": 1})
         
         print(f"✅ Feedback deleted: {feedback_id}")
         return jsonify({
@@ -0,0 +1,143 @@
+"""
+Async MongoDB access for the ASGI serving path (asgi.py).
+
+Mirrors the chat and report functions of db_service using PyMongo's
+native asyncio client, so awaiting the database never blocks the event loop.
+Document shapes are shared with db_service through its build_* helpers, and
+chat turns go through the same write-behind buffer (db_service.chat_writer);
+statistics counter updates are built by db_service.stats.
+"""
+
+import asyncio
+import itertools
+from pymongo import AsyncMongoClient
+from datetime import datetime, timezone
+from bson import ObjectId
+from utils.config import MONGO_URI, MONGO_DB, CHAT_LEGACY_READS
+from services.db_service import (
+    build_chat_session_doc,
+    build_report_doc,
+    format_context_messages,
+    pending_chat_messages,
+    chat_writer,
+    stats,
+    TURN_ORDER
+)
+from services.chat_turns import build_turn, bucket_messages, NewestFirst, merge_newest
+
+async_client = AsyncMongoClient(MONGO_URI)
+async_db = async_client[MONGO_DB]
+
+chat_turns_collection = async_db.chat_turns
+chat_collection = async_db.chat_history
+chat_sessions_collection = async_db.chat_sessions
+report_collection = async_db.farming_reports
+stats_collection = async_db.app_stats
+
+
+async def record_stats(created=(), removed=None):
+    """db_service.stats.record on the async client (never raises)"""
+    operations = stats.operations(created, removed)
+    if not operations:
+        return
+    try:
+        await stats_collection.bulk_write(operations, ordered=False)
+    except Exception as e:
+        stats.record_failure(e)
+
+
+async def save_chat(user_id, question, answer, response_type, language, input_type="text", chat_id=None):
+    """Save one chat turn (question and answer) with chat_id reference (queued on the write-behind buffer)"""
+    try:
+        turn = build_turn(user_id, question, answer, response_type, language, input_type, chat_id)
+        if chat_writer.add_turns([turn]):
+            await asyncio.to_thread(chat_writer.flush, True)
+        print(f"✓ Chat saved for user: {user_id}, chat_id: {chat_id}, ID: {turn['_id']}")
+        return turn["_id"]
+    except Exception as e:
+        print(f"✗ Error saving chat: {str(e)}")
+        raise
+
+
+async def save_report(user_id, crop_name, region, report_data, language):
+    """Save farming report to database"""
+    try:
+        report_doc = build_report_doc(user_id, crop_name, region, report_data, language)
+        result = await report_collection.insert_one(report_doc)
+        await record_stats(created=[("reports", report_doc["timestamp"])])
+        print(f"✓ Report saved for user: {user_id}, Crop: {crop_name}, Region: {region}, ID: {result.inserted_id}")
+        return result.inserted_id
+    except Exception as e:
+        print(f"✗ Error saving report: {str(e)}")
+        raise
+
+
+async def create_chat_session(user_id, title, language):
+    """Create a new chat session (id allocated here, document written behind)"""
+    try:
+        chat_id, write_through = chat_writer.add_session(build_chat_session_doc(user_id, title, language))
+        if write_through:
+            await asyncio.to_thread(chat_writer.flush, True)
+        print(f"✓ Chat session created for user: {user_id}, ID: {chat_id}")
+        return chat_id
+    except Exception as e:
+        print(f"✗ Error creating chat session: {str(e)}")
+        raise
+
+
+async def update_chat_session(chat_id):
+    """Update the updated_at timestamp of a chat session (written behind)"""
+    try:
+        if chat_writer.touch_session(chat_id, datetime.now(timezone.utc)):
+            await asyncio.to_thread(chat_writer.flush, True)
+    except Exception as e:
+        print(f"✗ Error updating chat session: {str(e)}")
+        raise
+
+
+async def get_recent_chat_messages(chat_id, limit=10):
+    """Recent N messages of a chat session for context, oldest first"""
+    try:
+        # Same sources and read order as db_service.chat_messages
+        pending = pending_chat_messages(chat_id)
+        legacy = []
+        if CHAT_LEGACY_READS:
+            legacy = await chat_collection.find({"chat_id": chat_id}).sort(
+                [("timestamp", -1), ("_id", -1)]
+            ).limit(limit).to_list()
+        # Each document holds a message at its last_at, so the newest `limit`
+        # documents hold the newest `limit` messages
+        documents = await chat_turns_collection.find({"chat_id": chat_id}).sort(TURN_ORDER).limit(limit).to_list()
+        messages = list(itertools.islice(
+            merge_newest(pending, legacy, NewestFirst(documents, bucket_messages)), limit
+        ))
+        messages.reverse()
+        return format_context_messages(messages)
+    except Exception as e:
+        print(f"✗ Error getting recent chat messages: {str(e)}")
+        return []
+
+
+async def get_chat_summary(chat_id):
+    """Rolling summary of a chat session's older turns, or None"""
+    try:
+        session = await chat_sessions_collection.find_one(
+            {"_id": ObjectId(chat_id)},
+            {"summary": 1, "summary_through": 1}
+        )
+        if not session or not session.get("summary"):
+            return None
+        return {"summary": session["summary"], "summary_through": session["summary_through"]}
+    except Exception as e:
+        print(f"✗ Error getting chat summary: {str(e)}")
+        return None
+
+
+async def get_chat_session_language(chat_id):
+    """Language stored on a chat session, or None"""
+    try:
+        session = await chat_sessions_collection.find_one({"_id": ObjectId(chat_id)}, {"language": 1})
+        return session.get("language") if session else None
+    except Exception as e:
+        print(f"✗ Error getting chat session language: {str(e)}")
+        return None
@@ -0,0 +1,274 @@
+"""
+In-memory audio decoding for /api/voice.
+
+Uploads are decoded straight from the request stream into the 16 kHz mono
+float32 NumPy buffer Whisper expects - no temporary file, no intermediate
+WAV export:
+
+    WAV (PCM 8/16/24/32-bit, float 32/64)   -> parsed directly, downmixed, resampled
+    audio/L16 raw PCM (rate=, channels=)    -> parsed directly
+    anything else (webm, ogg, mp3, m4a ...) -> piped through ffmpeg, stdin -> f32le stdout
+
+Limits are checked before any decode work - the declared size
+(Content-Length) and the declared duration (WAV header, or the client's
+duration field / X-Audio-Duration header) - and enforced again while
+decoding, so a missing or wrong declaration costs at most the limit.
+"""
+
+import struct
+import subprocess
+import threading
+from math import gcd
+from utils.config import VOICE_MAX_UPLOAD_BYTES, VOICE_MAX_SECONDS, VOICE_FFMPEG_PATH
+
+SAMPLE_RATE = 16000
+CHUNK_BYTES = 64 * 1024
+
+# Multipart boundaries and part headers on top of the audio bytes
+UPLOAD_OVERHEAD_BYTES = 16 * 1024
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class AudioRejectedError(Exception):
+    """The upload is too large / too long (413) or not decodable audio (400)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def check_upload_limits(content_length=None, duration=None):
+    """
+    Reject an upload from its declared size and duration, before reading it.
+
+    Raises:
+        AudioRejectedError: 413 when either declaration exceeds the limits
+    """
+    if content_length and content_length > VOICE_MAX_UPLOAD_BYTES + UPLOAD_OVERHEAD_BYTES:
+        raise AudioRejectedError(f"Audio upload exceeds {VOICE_MAX_UPLOAD_BYTES // 1024} KB", 413)
+    try:
+        seconds = float(duration) if duration else 0.0
+    except ValueError:
+        return
+    if seconds > VOICE_MAX_SECONDS:
+        raise AudioRejectedError(f"Audio is longer than {VOICE_MAX_SECONDS:g} seconds", 413)
+
+
+def decode_audio(stream, mimetype=None, mimetype_params=None):
+    """
+    Decode an audio upload (file-like, read sequentially) to 16 kHz mono float32 PCM.
+
+    Raises:
+        AudioRejectedError: empty, undecodable, too large or too long
+    """
+    head = stream.read(CHUNK_BYTES)
+    if not head:
+        raise AudioRejectedError("Empty audio upload")
+
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        data = head + _read_limited(stream, len(head))
+        try:
+            pcm = _decode_wav(data)
+        except struct.error:
+            raise AudioRejectedError("Malformed WAV header")
+        if pcm is not None:
+            return pcm
+        # Compressed WAV payload (ADPCM, mu-law, ...)
+        return _decode_ffmpeg(data, None)
+
+    if (mimetype or "").lower() == "audio/l16":
+        params = mimetype_params or {}
+        try:
+            channels = int(params.get("channels", 1))
+            rate = int(params.get("rate", SAMPLE_RATE))
+        except ValueError:
+            raise AudioRejectedError("Invalid audio/L16 rate or channels")
+        if channels < 1 or rate < 1:
+            raise AudioRejectedError("Invalid audio/L16 rate or channels")
+        data = head + _read_limited(stream, len(head))
+        _check_duration(len(data) // (2 * channels), rate)
+        # RFC 2586: big-endian signed 16-bit
+        samples = _to_float(data[:len(data) - len(data) % 2], ">i2")
+        return _to_mono_16k(samples, channels, rate)
+
+    return _decode_ffmpeg(head, stream)
+
+
+def decode_pcm16(data: bytes, rate=SAMPLE_RATE, channels=1):
+    """
+    Little-endian 16-bit PCM frames (WebSocket streaming) to 16 kHz mono float32.
+    Clients should capture at 16 kHz: other rates are resampled frame by frame.
+    """
+    samples = _to_float(data[:len(data) - len(data) % (2 * channels)], "<i2")
+    return _to_mono_16k(samples, channels, rate)
+
+
+# ==================== DIRECT PARSING ====================
+
+def _read_limited(stream, already: int) -> bytes:
+    """Rest of the stream, refusing to buffer more than VOICE_MAX_UPLOAD_BYTES in total"""
+    chunks = []
+    total = already
+    while True:
+        chunk = stream.read(CHUNK_BYTES)
+        if not chunk:
+            return b"".join(chunks)
+        total += len(chunk)
+        if total > VOICE_MAX_UPLOAD_BYTES:
+            raise AudioRejectedError(f"Audio upload exceeds {VOICE_MAX_UPLOAD_BYTES // 1024} KB", 413)
+        chunks.append(chunk)
+
+
+def _check_duration(samples: int, rate: int):
+    if rate and samples / rate > VOICE_MAX_SECONDS:
+        raise AudioRejectedError(f"Audio is longer than {VOICE_MAX_SECONDS:g} seconds", 413)
+
+
+def _decode_wav(data: bytes):
+    """PCM / float WAV to 16 kHz mono float32, or None for formats left to ffmpeg"""
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id, size = struct.unpack_from("<4sI", data, offset)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            tag, channels, rate, _, block_align, bits = struct.unpack_from("<HHIIHH", data, body)
+            if tag == WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                # The real format tag is the start of the SubFormat GUID
+                tag = struct.unpack_from("<H", data, body + 24)[0]
+            fmt = (tag, channels, rate, block_align, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise AudioRejectedError("Malformed WAV: data before fmt chunk")
+            tag, channels, rate, block_align, bits = fmt
+            if not channels or not block_align or not rate:
+                raise AudioRejectedError("Malformed WAV header")
+            # Streaming writers leave the size at 0 / 0xFFFFFFFF: use what arrived
+            if 0 < size < 0xFFFFFFFF:
+                _check_duration(size // block_align, rate)
+            payload = data[body:body + size] if 0 < size < 0xFFFFFFFF else data[body:]
+            payload = payload[:len(payload) - len(payload) % block_align]
+            _check_duration(len(payload) // block_align, rate)
+            samples = _wav_samples(payload, tag, bits)
+            if samples is None:
+                return None
+            return _to_mono_16k(samples, channels, rate)
+        offset = body + size + (size & 1)
+    raise AudioRejectedError("Malformed WAV: no data chunk")
+
+
+def _wav_samples(payload: bytes, tag: int, bits: int):
+    import numpy as np
+
+    if tag == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        return np.frombuffer(payload, dtype=f"<f{bits // 8}").astype(np.float32)
+    if tag != WAVE_FORMAT_PCM:
+        return None
+    if bits == 8:
+        # 8-bit WAV is unsigned
+        return (np.frombuffer(payload, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if bits == 16:
+        return _to_float(payload, "<i2")
+    if bits == 24:
+        triples = np.frombuffer(payload, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = triples[:, 0] | (triples[:, 1] << 8) | (triples[:, 2] << 16)
+        values = np.where(values & 0x800000, values - 0x1000000, values)
+        return values.astype(np.float32) / float(1 << 23)
+    if bits == 32:
+        return _to_float(payload, "<i4")
+    return None
+
+
+def _to_float(payload: bytes, dtype: str):
+    import numpy as np
+
+    samples = np.frombuffer(payload, dtype=dtype)
+    return samples.astype(np.float32) / float(1 << (samples.itemsize * 8 - 1))
+
+
+def _to_mono_16k(samples, channels: int, rate: int):
+    import numpy as np
+
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        from scipy.signal import resample_poly
+
+        divisor = gcd(SAMPLE_RATE, rate)
+        samples = resample_poly(samples, SAMPLE_RATE // divisor, rate // divisor)
+    return np.ascontiguousarray(samples, dtype=np.float32)
+
+
+# ==================== FFMPEG PIPE ====================
+
+def _decode_ffmpeg(head: bytes, stream):
+    """
+    Decode with ffmpeg reading the upload from stdin while it arrives.
+    The container must be streamable (webm, ogg, mp3, fragmented mp4); an mp4
+    with its index at the end cannot be decoded from a pipe.
+    """
+    import numpy as np
+
+    process = subprocess.Popen(
+        [VOICE_FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+         "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    rejected = []
+
+    def feed():
+        total = len(head)
+        try:
+            process.stdin.write(head)
+            while stream is not None:
+                chunk = stream.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > VOICE_MAX_UPLOAD_BYTES:
+                    rejected.append(AudioRejectedError(f"Audio upload exceeds {VOICE_MAX_UPLOAD_BYTES // 1024} KB", 413))
+                    process.kill()
+                    break
+                process.stdin.write(chunk)
+        except OSError:
+            # ffmpeg exited early (bad input, or killed for length)
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+
+    max_bytes = int(VOICE_MAX_SECONDS * SAMPLE_RATE) * 4
+    output = bytearray()
+    try:
+        while True:
+            chunk = process.stdout.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            output += chunk
+            if len(output) > max_bytes:
+                process.kill()
+                raise AudioRejectedError(f"Audio is longer than {VOICE_MAX_SECONDS:g} seconds", 413)
+        error = process.stderr.read().decode("utf-8", "replace").strip()
+        returncode = process.wait()
+    finally:
+        if process.returncode is None:
+            # Killed for length, or reading failed: reap ffmpeg so no zombie is left
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        process.stderr.close()
+        writer.join()
+
+    if rejected:
+        raise rejected[0]
+    if returncode != 0 or not output:
+        raise AudioRejectedError(f"Unsupported or corrupt audio: {error or 'no audio stream'}")
+    return np.frombuffer(output, dtype="<f4", count=len(output) // 4)
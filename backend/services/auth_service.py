@@ -2,7 +2,7 @@ import jwt, bcrypt
 import random
 from datetime import datetime, timedelta, timezone
 from utils.config import JWT_SECRET_KEY, JWT_EXPIRY_HOURS
-from services.db_service import user_collection, chat_collection, report_collection, db
+from services.db_service import user_collection, report_collection, db, chat_writer, stats, delete_chat_messages
 from bson import ObjectId
 
 # Import the proper OTP service functions
@@ -26,6 +26,7 @@ def signup_user(email, password, name):
     }
 
     result = user_collection.insert_one(user)
+    stats.record(created=[("users", user["created_at"])])
     token = generate_token(str(result.inserted_id))
 
     return {
@@ -158,9 +159,12 @@ def delete_user_account(user_id):
         if not user:
             raise Exception("User not found")
 
+        # Buffered chat turns must not land after the delete
+        chat_writer.flush(raise_errors=True)
+
         # Delete all chat history for this user
-        chat_delete_result = chat_collection.delete_many({"user_id": user_id})
-        print(f"✓ Deleted {chat_delete_result.deleted_count} chat records for user: {user_id}")
+        deleted_messages = delete_chat_messages({"user_id": user_id})
+        print(f"✓ Deleted {deleted_messages} chat messages for user: {user_id}")
 
         # Delete all farming reports for this user
         report_delete_result = report_collection.delete_many({"user_id": user_id})
@@ -170,6 +174,11 @@ def delete_user_account(user_id):
         user_delete_result = user_collection.delete_one({"_id": ObjectId(user_id)})
         if user_delete_result.deleted_count == 0:
             raise Exception("Failed to delete user account")
+        stats.record(removed={
+            "users": 1,
+            "chat_messages": deleted_messages,
+            "reports": report_delete_result.deleted_count
+        })
 
         print(f"✓ User account deleted successfully: {user_id}")
 
@@ -177,7 +186,7 @@ def delete_user_account(user_id):
             "success": True,
             "message": "Account and all associated data deleted successfully",
             "deleted": {
-                "chats": chat_delete_result.deleted_count,
+                "chats": deleted_messages,
                 "reports": report_delete_result.deleted_count
             }
         }
@@ -291,6 +300,7 @@ def sync_firebase_user_with_mongodb(firebase_user_info):
         }
         
         result = user_collection.insert_one(user_data)
+        stats.record(created=[("users", user_data["created_at"])])
         user_id = str(result.inserted_id)
         
         print(f"✅ User created successfully with ID: {user_id}")
@@ -0,0 +1,114 @@
+"""
+Online migration of chat_history (a document per message) to chat_turns.
+
+chat_history is its own work queue: each round reads the oldest
+CHAT_MIGRATION_BATCH message stubs by _id, and every session they belong to
+is moved whole - its messages paired into turns (chat_turns.legacy_turns),
+inserted into chat_turns in documents of CHAT_TURNS_PER_DOCUMENT turns, then
+deleted from chat_history. The app keeps serving meanwhile: readers look at
+both collections while CHAT_LEGACY_READS is set (chat_history first), and new
+turns are written to chat_turns only.
+
+Stopping at any point is safe. A session interrupted between insert and
+delete is moved again on the next run: turns already in chat_turns are
+looked up by _id and skipped. Progress is kept in the migrations collection.
+"""
+
+import time
+from datetime import datetime, timezone
+from pymongo.errors import BulkWriteError, OperationFailure
+from services.db_service import db, chat_collection, chat_turns_collection
+from services.chat_turns import legacy_turns, bucket_doc, stored_turn_ids
+from services.chat_writer import DUPLICATE_KEY
+from utils.config import CHAT_TURNS_PER_DOCUMENT, CHAT_MIGRATION_BATCH, CHAT_MIGRATION_PAUSE_MS
+
+MIGRATION_ID = "chat_turns"
+migrations_collection = db.migrations
+
+
+def migrate_session(user_id, chat_id, per_document=CHAT_TURNS_PER_DOCUMENT) -> dict:
+    """Move one session's chat_history messages to chat_turns; returns {"turns", "messages"} moved"""
+    messages = list(
+        chat_collection.find({"chat_id": chat_id, "user_id": user_id}).sort([("timestamp", 1), ("_id", 1)])
+    )
+    if not messages:
+        return {"turns": 0, "messages": 0}
+
+    turns = legacy_turns(messages)
+    stored = stored_turn_ids(chat_turns_collection, turns)
+    turns = [turn for turn in turns if turn["_id"] not in stored]
+    documents = [bucket_doc(turns[i:i + per_document]) for i in range(0, len(turns), per_document)]
+    if documents:
+        try:
+            chat_turns_collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Another run moved the same session concurrently
+            if any(error.get("code") != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                raise
+
+    chat_collection.delete_many({"_id": {"$in": [msg["_id"] for msg in messages]}})
+    return {"turns": len(turns), "messages": len(messages)}
+
+
+def record_progress(sessions, turns, messages, finished=False):
+    now = datetime.now(timezone.utc)
+    update = {
+        "$inc": {"sessions": sessions, "turns": turns, "messages": messages},
+        "$set": {"updated_at": now, "finished_at": now if finished else None},
+        "$setOnInsert": {"started_at": now}
+    }
+    migrations_collection.update_one({"_id": MIGRATION_ID}, update, upsert=True)
+
+
+def run(batch=CHAT_MIGRATION_BATCH, max_sessions=None, pause_ms=CHAT_MIGRATION_PAUSE_MS,
+        per_document=CHAT_TURNS_PER_DOCUMENT) -> dict:
+    """
+    Migrate until chat_history is empty (or `max_sessions` sessions were moved).
+    Returns {"sessions", "turns", "messages", "finished"} for this run.
+    """
+    summary = {"sessions": 0, "turns": 0, "messages": 0, "finished": False}
+    while max_sessions is None or summary["sessions"] < max_sessions:
+        stubs = list(chat_collection.find({}, {"user_id": 1, "chat_id": 1}).sort("_id", 1).limit(batch))
+        if not stubs:
+            summary["finished"] = True
+            record_progress(0, 0, 0, finished=True)
+            break
+
+        round_totals = {"sessions": 0, "turns": 0, "messages": 0}
+        for user_id, chat_id in dict.fromkeys((stub.get("user_id"), stub.get("chat_id")) for stub in stubs):
+            if max_sessions is not None and summary["sessions"] + round_totals["sessions"] >= max_sessions:
+                break
+            moved = migrate_session(user_id, chat_id, per_document)
+            round_totals["sessions"] += 1
+            round_totals["turns"] += moved["turns"]
+            round_totals["messages"] += moved["messages"]
+
+        record_progress(round_totals["sessions"], round_totals["turns"], round_totals["messages"])
+        for key, value in round_totals.items():
+            summary[key] += value
+        print(f"  ✓ {summary['sessions']} sessions, {summary['messages']} messages -> {summary['turns']} turns")
+        if pause_ms:
+            # Leave room for the serving traffic between rounds
+            time.sleep(pause_ms / 1000)
+    return summary
+
+
+def collection_stats(name) -> dict:
+    """Document count, data size and index size of a collection (zeros if it does not exist)"""
+    try:
+        stats = db.command("collStats", name)
+    except OperationFailure:
+        return {"count": 0, "size": 0, "total_index_size": 0}
+    return {"count": stats.get("count", 0), "size": stats.get("size", 0),
+            "total_index_size": stats.get("totalIndexSize", 0)}
+
+
+def status() -> dict:
+    """Migration progress, and the size of both collections"""
+    progress = migrations_collection.find_one({"_id": MIGRATION_ID}) or {}
+    progress.pop("_id", None)
+    return {
+        "progress": progress,
+        "remaining_messages": chat_collection.estimated_document_count(),
+        "collections": {name: collection_stats(name) for name in ("chat_history", "chat_turns")}
+    }
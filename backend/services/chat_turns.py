@@ -0,0 +1,264 @@
+"""
+Turn-oriented chat storage (chat_turns collection).
+
+chat_history stores two documents per turn - the question (role=user) and the
+answer (role=assistant) - both repeating chat_id, user_id, input_type,
+response_type, language and a timestamp, and every reader re-pairs them. A
+chat_turns document holds the turns of one session:
+
+    {"_id", "chat_id", "user_id",
+     "turns": [{"_id", "question", "answer", "asked_at", "answered_at",
+                "input_type", "response_type", "language"}, ...],
+     "count": <turns>, "messages": <questions + answers>,
+     "first_at": <oldest turn time>, "last_at": <newest turn time>}
+
+With CHAT_TURNS_PER_DOCUMENT=1 (default) each turn is its own document, with
+the turn's _id. Above 1, a flush appends a session's turns to its open bucket
+(count < N) with one upsert: fewer documents and index entries, but readers
+merge turns across buckets and may read a few more bytes per page. A flush
+appends all of a session's queued turns at once, so a bucket can exceed N by
+that many.
+
+Readers work on messages again: the question at key (asked_at, turn _id), the
+answer at (answered_at, turn _id - or answer_id, the old assistant message's
+_id, for migrated turns). Those are the (timestamp, _id) keys chat_history
+messages have, so keyset cursors stay valid across the migration, and a turn
+read from both collections while its session is being migrated is
+recognised by key (merge_newest keeps one). Migrated turns that lost their
+question or answer keep only the part that existed (a message is there when
+its asked_at / answered_at is).
+
+NewestFirst merges the items of buckets read in (last_at, _id) descending
+order into exact newest-first order, reading a bucket only once it can hold
+the next item.
+"""
+
+import heapq
+from datetime import datetime, timezone, timedelta
+from pymongo import InsertOne, UpdateOne
+
+TURN_FIELDS = ("question", "answer", "asked_at", "answered_at", "answer_id",
+               "input_type", "response_type", "language")
+
+
+def build_turn(user_id, question, answer, response_type, language, input_type="text", chat_id=None):
+    """A chat turn as queued on the write-behind buffer (the buffer assigns _id)"""
+    asked_at = datetime.now(timezone.utc)
+    # MongoDB stores milliseconds - keep the answer strictly after the question
+    answered_at = max(datetime.now(timezone.utc), asked_at + timedelta(milliseconds=1))
+    return {
+        "chat_id": chat_id,
+        "user_id": user_id,
+        "question": question,
+        "answer": answer,
+        "asked_at": asked_at,
+        "answered_at": answered_at,
+        "input_type": input_type,
+        "response_type": response_type,
+        "language": language
+    }
+
+
+def legacy_turns(messages):
+    """
+    chat_history messages of one session, oldest first, as turns: a question
+    directly followed by an answer is one turn, any other message a turn of
+    its own. _ids and timestamps are kept, so the messages keep their keys.
+    """
+    turns, i = [], 0
+    while i < len(messages):
+        msg = messages[i]
+        turn = {
+            "_id": msg["_id"],
+            "chat_id": msg.get("chat_id"),
+            "user_id": msg.get("user_id"),
+            "input_type": msg.get("input_type"),
+            "response_type": msg.get("response_type"),
+            "language": msg.get("language")
+        }
+        if msg.get("role") == "user":
+            turn.update(question=msg.get("content"), asked_at=msg["timestamp"])
+            answer = messages[i + 1] if i + 1 < len(messages) else None
+            if answer and answer.get("role") == "assistant":
+                turn.update(answer=answer.get("content"), answered_at=answer["timestamp"], answer_id=answer["_id"],
+                            response_type=answer.get("response_type"), language=answer.get("language"))
+                i += 1
+        else:
+            turn.update(answer=msg.get("content"), answered_at=msg["timestamp"])
+        turns.append(turn)
+        i += 1
+    return turns
+
+
+# ==================== WRITES ====================
+
+def _entry(turn):
+    """The element stored in a document's turns array"""
+    entry = {"_id": turn["_id"]}
+    entry.update((field, turn[field]) for field in TURN_FIELDS if turn.get(field) is not None)
+    return entry
+
+
+def _times(turns):
+    return [at for turn in turns for at in (turn.get("asked_at"), turn.get("answered_at")) if at is not None]
+
+
+def _message_count(turns):
+    return sum((turn.get("asked_at") is not None) + (turn.get("answered_at") is not None) for turn in turns)
+
+
+def bucket_doc(turns):
+    """A chat_turns document holding `turns` (one session, oldest first); its _id is the first turn's"""
+    times = _times(turns)
+    return {
+        "_id": turns[0]["_id"],
+        "chat_id": turns[0]["chat_id"],
+        "user_id": turns[0]["user_id"],
+        "turns": [_entry(turn) for turn in turns],
+        "count": len(turns),
+        "messages": _message_count(turns),
+        "first_at": min(times),
+        "last_at": max(times)
+    }
+
+
+def turn_operations(turns, per_document):
+    """bulk_write operations storing queued turns: one insert per turn, or one bucket upsert per session"""
+    if per_document <= 1:
+        return [InsertOne(bucket_doc([turn])) for turn in turns]
+
+    sessions = {}
+    for turn in turns:
+        sessions.setdefault((turn["user_id"], turn["chat_id"]), []).append(turn)
+    operations = []
+    for (user_id, chat_id), session_turns in sessions.items():
+        times = _times(session_turns)
+        operations.append(UpdateOne(
+            {"chat_id": chat_id, "user_id": user_id, "count": {"$lt": per_document}},
+            {"$push": {"turns": {"$each": [_entry(turn) for turn in session_turns]}},
+             "$inc": {"count": len(session_turns), "messages": _message_count(session_turns)},
+             "$min": {"first_at": min(times)},
+             "$max": {"last_at": max(times)}},
+            upsert=True
+        ))
+    return operations
+
+
+def stored_turn_ids(collection, turns) -> set:
+    """Ids of `turns` already stored (a bucket upsert is not idempotent, so retries check first)"""
+    ids = [turn["_id"] for turn in turns]
+    chat_ids = list({turn["chat_id"] for turn in turns})
+    stored = set()
+    for doc in collection.find({"chat_id": {"$in": chat_ids}, "turns._id": {"$in": ids}}, {"turns._id": 1}):
+        stored.update(entry["_id"] for entry in doc["turns"])
+    return stored & set(ids)
+
+
+# ==================== READS ====================
+
+def item_key(item):
+    """Keyset key of a message or history pair: (timestamp, _id)"""
+    return item["timestamp"], item["_id"]
+
+
+def turn_messages(turn):
+    """A stored (or queued) turn as chat_history-style messages, oldest first"""
+    base = {
+        "input_type": turn.get("input_type"),
+        "response_type": turn.get("response_type"),
+        "language": turn.get("language")
+    }
+    messages = []
+    if turn.get("asked_at") is not None:
+        messages.append({"_id": turn["_id"], "role": "user", "content": turn.get("question"),
+                         "timestamp": turn["asked_at"], **base})
+    if turn.get("answered_at") is not None:
+        messages.append({"_id": turn.get("answer_id", turn["_id"]), "role": "assistant", "content": turn.get("answer"),
+                         "timestamp": turn["answered_at"], **base})
+    return messages
+
+
+def bucket_messages(bucket):
+    return [msg for turn in bucket["turns"] for msg in turn_messages(turn)]
+
+
+def bucket_pairs(bucket):
+    """/api/history pairs of a document's answered turns, keyed like the answer message"""
+    return [
+        {
+            "_id": turn.get("answer_id", turn["_id"]),
+            "question": turn.get("question"),
+            "answer": turn.get("answer"),
+            "response_type": turn.get("response_type"),
+            "language": turn.get("language"),
+            "timestamp": turn["answered_at"]
+        }
+        for turn in bucket["turns"]
+        if turn.get("asked_at") is not None and turn.get("answered_at") is not None
+    ]
+
+
+class _Newest:
+    __slots__ = ("key", "item")
+
+    def __init__(self, key, item):
+        self.key, self.item = key, item
+
+    def __lt__(self, other):
+        return self.key > other.key  # heapq pops the newest first
+
+
+class NewestFirst:
+    """
+    Items (messages or pairs) of chat_turns documents, newest first.
+
+    `buckets` yields documents sorted by (last_at, _id) descending, and
+    items_of(bucket) returns its items, none newer than its last_at: an item
+    is returned once it is newer than the next document's last_at, so only
+    the documents a page needs (plus one) are read. Items at or after the
+    `before` key are skipped, and iteration stops at the first item not newer
+    than `floor` (documents read for last_at > floor may hold older turns).
+    """
+
+    def __init__(self, buckets, items_of, before=None, floor=None):
+        self._buckets = iter(buckets)
+        self.items_of = items_of
+        self.before = before
+        self.floor = floor
+        self._heap = []
+        self._next = None       # document read, items not expanded yet
+        self._done = False
+
+    def __iter__(self):
+        return self
+
+    def _top(self):
+        while True:
+            if self._next is None and not self._done:
+                self._next = next(self._buckets, None)
+                self._done = self._next is None
+            if self._next is not None and (not self._heap or self._heap[0].key[0] <= self._next["last_at"]):
+                for item in self.items_of(self._next):
+                    key = item_key(item)
+                    if self.before is None or key < self.before:
+                        heapq.heappush(self._heap, _Newest(key, item))
+                self._next = None
+                continue
+            if not self._heap or (self.floor is not None and self._heap[0].key[0] <= self.floor):
+                return None
+            return self._heap[0]
+
+    def __next__(self):
+        if self._top() is None:
+            raise StopIteration
+        return heapq.heappop(self._heap).item
+
+
+def merge_newest(*sources):
+    """Newest-first union of newest-first item iterables; an item found in two of them is returned once"""
+    last = None
+    for item in heapq.merge(*sources, key=item_key, reverse=True):
+        key = item_key(item)
+        if key != last:
+            last = key
+            yield item
@@ -0,0 +1,335 @@
+"""
+Write-behind buffer for chat turns.
+
+After the LLM answered, a chat request used to make up to four sequential
+MongoDB round trips (session insert or update, then one insert per message).
+Turns are now queued in memory and written by a background thread every
+CHAT_WRITE_FLUSH_INTERVAL_MS, batched across requests:
+
+    chat_sessions  one bulk_write - new sessions (InsertOne) and
+                   updated_at touches (UpdateOne $max)
+    chat_turns     one bulk_write of the queued turns (CHAT_WRITE_BATCH_MAX at
+                   most) - chat_turns.turn_operations: a document per turn, or
+                   one bucket upsert per session
+
+Session ids stay synchronous: create_chat_session generates the ObjectId
+client-side, so the response carries chat_id before the write lands. Every
+queued document has a client-generated _id, which makes a retry after a
+failed or partial write idempotent (duplicate key errors are ignored); bucket
+upserts are not, so turns of a failed batch are looked up before they are
+appended again.
+
+Read-your-writes: the chat readers of db_service / async_db_service merge this
+process's not-yet-acknowledged documents into their results, so the next
+turn's context already contains the previous one. With several worker
+processes, a turn served by another worker sees it once it is flushed.
+
+Durability: the buffer is drained on graceful shutdown (atexit, and the ASGI
+lifespan shutdown), for at most CHAT_WRITE_SHUTDOWN_TIMEOUT_SECONDS. Past
+CHAT_WRITE_MAX_PENDING queued turns (MongoDB unreachable) callers write
+through synchronously and get the error, as before. With
+CHAT_WRITE_BEHIND_ENABLED=false every turn is written synchronously (still one
+call per collection).
+
+on_flush(turns, sessions) is called after each written batch (db_service
+counts the new messages and sessions for the admin statistics there).
+"""
+
+import atexit
+import threading
+import time
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from services.chat_turns import turn_operations, stored_turn_ids
+from utils.config import (
+    CHAT_TURNS_PER_DOCUMENT,
+    CHAT_WRITE_BEHIND_ENABLED,
+    CHAT_WRITE_FLUSH_INTERVAL_MS,
+    CHAT_WRITE_BATCH_MAX,
+    CHAT_WRITE_MAX_PENDING,
+    CHAT_WRITE_SHUTDOWN_TIMEOUT_SECONDS
+)
+
+DUPLICATE_KEY = 11000
+MAX_RETRY_DELAY_SECONDS = 5.0
+
+
+def _as_stored(value):
+    """A datetime as PyMongo reads it back: naive UTC, millisecond precision"""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+
+def stored_copy(doc: dict) -> dict:
+    return {key: _as_stored(value) for key, value in doc.items()}
+
+
+def _ignore_duplicates(write) -> set:
+    """
+    Run a bulk write; documents already written by an earlier attempt are fine.
+    Returns the indexes of the operations skipped as duplicates.
+    """
+    try:
+        write()
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if e.details.get("writeConcernErrors") or any(err.get("code") != DUPLICATE_KEY for err in errors):
+            raise
+        return {err["index"] for err in errors}
+    return set()
+
+
+class ChatWriteBuffer:
+    def __init__(self, turns_collection, sessions_collection, enabled=CHAT_WRITE_BEHIND_ENABLED,
+                 flush_interval_ms=CHAT_WRITE_FLUSH_INTERVAL_MS, batch_max=CHAT_WRITE_BATCH_MAX,
+                 max_pending=CHAT_WRITE_MAX_PENDING, turns_per_document=CHAT_TURNS_PER_DOCUMENT, on_flush=None):
+        self.turns_collection = turns_collection
+        self.sessions_collection = sessions_collection
+        self.turns_per_document = turns_per_document
+        self.enabled = enabled
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_max = batch_max
+        self.max_pending = max_pending
+        self.on_flush = on_flush
+
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()   # one flush at a time, in queue order
+        self._turns = []                      # queued turns (chat_turns.build_turn)
+        self._sessions = {}                   # chat_id -> new chat_sessions document
+        self._touches = {}                    # chat_id -> latest updated_at of an existing session
+        self._inflight = ([], {}, {})         # the same three, being written right now
+        self._retried = set()                 # ids of turns whose write failed once
+        self._thread = None
+        self._closed = False
+
+        self.counters = {
+            "flushes": 0,
+            "turns_written": 0,
+            "sessions_written": 0,
+            "touches_written": 0,
+            "write_through": 0,
+            "failures": 0
+        }
+        self.last_error = None
+        atexit.register(self.close)
+
+    # -------------------- ENQUEUE --------------------
+    def add_turns(self, turns: list) -> bool:
+        """
+        Queue chat turns (an _id is assigned to each).
+        Returns True if the caller must write through now (flush(raise_errors=True)).
+        """
+        for turn in turns:
+            turn.setdefault("_id", ObjectId())
+        with self._cond:
+            self._turns.extend(turns)
+            self._cond.notify()
+        return self._write_through_needed()
+
+    def add_session(self, doc: dict) -> tuple:
+        """Queue a new chat_sessions document; returns (chat_id, write_through_needed)"""
+        doc.setdefault("_id", ObjectId())
+        chat_id = str(doc["_id"])
+        with self._cond:
+            self._sessions[chat_id] = doc
+            self._cond.notify()
+        return chat_id, self._write_through_needed()
+
+    def touch_session(self, chat_id: str, updated_at: datetime) -> bool:
+        """Queue an updated_at bump; returns True if the caller must write through now"""
+        ObjectId(chat_id)  # invalid ids fail here, in the request, as before
+        with self._cond:
+            if chat_id in self._sessions:
+                self._sessions[chat_id]["updated_at"] = updated_at
+            else:
+                self._touches[chat_id] = max(self._touches.get(chat_id, updated_at), updated_at)
+            self._cond.notify()
+        return self._write_through_needed()
+
+    def _write_through_needed(self) -> bool:
+        with self._cond:
+            over_limit = len(self._turns) > self.max_pending
+            if self.enabled and not self._closed and not over_limit:
+                self._start_thread()
+                return False
+            if self.enabled:
+                self.counters["write_through"] += 1
+            return True
+
+    def _start_thread(self):
+        # Started lazily, so each forked worker process gets its own flusher
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="chat-writer", daemon=True)
+            self._thread.start()
+
+    # -------------------- FLUSH --------------------
+    def _has_pending(self) -> bool:
+        return bool(self._turns or self._sessions or self._touches)
+
+    def _run(self):
+        delay = self.flush_interval
+        while True:
+            with self._cond:
+                # Every enqueue notifies; the timeout only bounds a missed wake-up
+                while not self._closed and not self._has_pending():
+                    self._cond.wait(timeout=self.flush_interval)
+                if self._closed:
+                    return  # close() drains the rest
+                # Let turns of concurrent requests join the batch
+                self._cond.wait_for(
+                    lambda: self._closed or len(self._turns) >= self.batch_max,
+                    timeout=self.flush_interval
+                )
+            try:
+                self.flush_once()
+                delay = self.flush_interval
+            except Exception as e:
+                delay = min(max(delay * 2, 0.1), MAX_RETRY_DELAY_SECONDS)
+                print(f"⚠️ Chat write flush failed, retrying in {delay:.1f}s: {str(e)}")
+                time.sleep(delay)
+
+    def flush_once(self) -> int:
+        """Write one batch; re-queues it and raises if the write fails. Returns turns written."""
+        with self._write_lock:
+            with self._cond:
+                turns = self._turns[:self.batch_max]
+                del self._turns[:self.batch_max]
+                sessions, self._sessions = self._sessions, {}
+                touches, self._touches = self._touches, {}
+                self._inflight = (turns, sessions, touches)
+                retried = [turn for turn in turns if turn["_id"] in self._retried]
+            if not (turns or sessions or touches):
+                return 0
+
+            try:
+                # on_flush only hears of documents this flush inserted, not those of an earlier attempt
+                inserted = list(sessions.values())
+                if sessions or touches:
+                    operations = [InsertOne(doc) for doc in inserted] + [
+                        UpdateOne({"_id": ObjectId(chat_id)}, {"$max": {"updated_at": updated_at}})
+                        for chat_id, updated_at in touches.items()
+                    ]
+                    skipped = _ignore_duplicates(lambda: self.sessions_collection.bulk_write(operations, ordered=False))
+                    inserted = [doc for i, doc in enumerate(inserted) if i not in skipped]
+                written = turns
+                if retried and self.turns_per_document > 1:
+                    stored = stored_turn_ids(self.turns_collection, retried)
+                    written = [turn for turn in turns if turn["_id"] not in stored]
+                if written:
+                    operations = turn_operations(written, self.turns_per_document)
+                    skipped = _ignore_duplicates(lambda: self.turns_collection.bulk_write(operations, ordered=False))
+                    if self.turns_per_document <= 1:
+                        # One insert per turn
+                        written = [turn for i, turn in enumerate(written) if i not in skipped]
+            except Exception as e:
+                self._requeue(turns, sessions, touches, e)
+                raise
+
+            with self._cond:
+                self._inflight = ([], {}, {})
+                self._retried.difference_update(turn["_id"] for turn in retried)
+                self.counters["flushes"] += 1
+                self.counters["turns_written"] += len(turns)
+                self.counters["sessions_written"] += len(sessions)
+                self.counters["touches_written"] += len(touches)
+            if self.on_flush and (written or inserted):
+                self.on_flush(written, inserted)
+            return len(turns)
+
+    def _requeue(self, turns, sessions, touches, error):
+        with self._cond:
+            self._turns[:0] = turns
+            self._retried.update(turn["_id"] for turn in turns)
+            for chat_id, doc in sessions.items():
+                # A touch queued meanwhile must not race the session's own insert
+                touched = self._touches.pop(chat_id, None)
+                if touched is not None:
+                    doc["updated_at"] = max(doc["updated_at"], touched)
+                self._sessions.setdefault(chat_id, doc)
+            for chat_id, updated_at in touches.items():
+                self._touches[chat_id] = max(self._touches.get(chat_id, updated_at), updated_at)
+            self._inflight = ([], {}, {})
+            self.counters["failures"] += 1
+            self.last_error = str(error)
+
+    def flush(self, raise_errors: bool = False) -> int:
+        """Write everything queued so far (before deletes, at shutdown, write-through)"""
+        written = 0
+        with self._cond:
+            rounds = len(self._turns) // self.batch_max + 1
+        for _ in range(rounds):
+            try:
+                written += self.flush_once()
+            except Exception as e:
+                if raise_errors:
+                    raise
+                print(f"✗ Error flushing chat writes: {str(e)}")
+                break
+        return written
+
+    def close(self, timeout: float = CHAT_WRITE_SHUTDOWN_TIMEOUT_SECONDS):
+        """Drain the buffer on shutdown; later writes go straight to MongoDB"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+
+        deadline = time.monotonic() + timeout
+        written = 0
+        while time.monotonic() < deadline:
+            with self._cond:
+                if not self._has_pending():
+                    break
+            try:
+                written += self.flush_once()
+            except Exception:
+                time.sleep(min(0.5, max(0.0, deadline - time.monotonic())))
+
+        with self._cond:
+            lost_turns, lost_sessions = len(self._turns), len(self._sessions)
+        if lost_turns or lost_sessions:
+            print(f"❌ Chat write buffer: {lost_turns} turns and {lost_sessions} sessions not written at shutdown")
+        elif written:
+            print(f"✓ Chat write buffer drained: {written} turns written at shutdown")
+
+    # -------------------- READ-YOUR-WRITES --------------------
+    def pending_turns(self, chat_id: str) -> list:
+        """Queued or in-flight turns of a chat session, with datetimes as MongoDB would return them"""
+        with self._cond:
+            turns = [turn for turn in self._inflight[0] + self._turns if turn["chat_id"] == chat_id]
+        return [stored_copy(turn) for turn in turns]
+
+    def pending_session(self, chat_id: str):
+        """A new chat session not written yet, or None"""
+        with self._cond:
+            doc = self._sessions.get(chat_id) or self._inflight[1].get(chat_id)
+        return stored_copy(doc) if doc else None
+
+    def pending_sessions(self, user_id: str) -> tuple:
+        """(new sessions of the user not written yet, {chat_id: pending updated_at})"""
+        with self._cond:
+            sessions = [doc for doc in list(self._inflight[1].values()) + list(self._sessions.values())
+                        if doc["user_id"] == user_id]
+            touches = {**self._inflight[2], **self._touches}
+        return [stored_copy(doc) for doc in sessions], {
+            chat_id: _as_stored(updated_at) for chat_id, updated_at in touches.items()
+        }
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "enabled": self.enabled,
+                "pending_turns": len(self._turns) + len(self._inflight[0]),
+                "pending_sessions": len(self._sessions) + len(self._inflight[1]),
+                "pending_touches": len(self._touches) + len(self._inflight[2]),
+                **self.counters,
+                "avg_batch_turns": round(self.counters["turns_written"] / self.counters["flushes"], 1)
+                if self.counters["flushes"] else 0.0,
+                "last_error": self.last_error
+            }
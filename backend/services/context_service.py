@@ -0,0 +1,229 @@
+"""
+Conversation context for contextual chat turns.
+
+The recent messages of a session are sent to the LLM exactly once - as chat
+history - trimmed to a token budget (LLM_CONTEXT_TOKEN_BUDGET), newest turns
+first, with over-long messages cut to LLM_CONTEXT_MESSAGE_MAX_TOKENS.
+
+Every message a turn does not send - older than the recent window, or cut by
+the budget - is folded into a compact rolling summary kept on the
+chat_sessions document (summary / summary_through), so each message reaches
+the LLM either verbatim or summarized. The history only holds messages newer
+than summary_through. The summary is updated incrementally in the background
+after each turn: only messages newer than summary_through are sent, together
+with the previous summary. Each update folds in at least
+LLM_SUMMARY_BATCH_MESSAGES messages (whole turns, the oldest sent ones too, but
+never the latest turn), so a session is not summarized after every turn.
+
+Token counts are estimates (no tokenizer round-trip): about 4 characters per
+token for Latin text and 2 per token for Indic scripts.
+"""
+
+import math
+import threading
+from utils.config import (
+    LLM_CONTEXT_TOKEN_BUDGET,
+    LLM_CONTEXT_MAX_MESSAGES,
+    LLM_CONTEXT_MESSAGE_MAX_TOKENS,
+    LLM_SUMMARY_ENABLED,
+    LLM_SUMMARY_BATCH_MESSAGES,
+    LLM_SUMMARY_MAX_WORDS
+)
+from services.db_service import (
+    get_recent_chat_messages,
+    get_chat_summary,
+    get_chat_messages_after,
+    set_chat_summary
+)
+from services import async_db_service
+
+# Chat sessions with a summary update running in this process
+_summarizing = set()
+_summarizing_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: ~4 chars/token for ASCII, ~2 chars/token otherwise"""
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 2)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens (including the ellipsis), keeping the beginning"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) + 1 <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low].rstrip() + " …"
+
+
+def fit_history(chat_history: list, budget: int = LLM_CONTEXT_TOKEN_BUDGET,
+                message_max_tokens: int = LLM_CONTEXT_MESSAGE_MAX_TOKENS) -> list:
+    """
+    Keep the newest messages that fit the token budget.
+    The result always starts with a user message, so turns stay paired.
+    """
+    kept = []
+    used = 0
+    for msg in reversed(chat_history):
+        text = truncate_to_tokens(msg["message"], message_max_tokens)
+        tokens = estimate_tokens(text)
+        if used + tokens > budget:
+            break
+        kept.append({"role": msg["role"], "message": text})
+        used += tokens
+
+    kept.reverse()
+    while kept and kept[0]["role"] != "user":
+        kept.pop(0)
+    return kept
+
+
+def _fit_context(chat_history: list, summary_doc: dict) -> tuple:
+    """
+    (history, summary, oldest): the messages newer than summary_through that
+    fit the budget left by the summary, and the timestamp of the oldest one sent
+    (None if none is) - everything before it must be in the summary.
+    """
+    summary = summary_doc["summary"] if summary_doc else None
+    if summary_doc:
+        chat_history = [msg for msg in chat_history if msg["timestamp"] > summary_doc["summary_through"]]
+    budget = LLM_CONTEXT_TOKEN_BUDGET - estimate_tokens(summary)
+    history = fit_history(chat_history, max(0, budget))
+    # fit_history keeps a suffix of the messages
+    oldest = chat_history[-len(history)]["timestamp"] if history else None
+    return history, summary, oldest
+
+
+def _build_context(chat_history: list, summary_doc: dict) -> tuple:
+    history, summary, _ = _fit_context(chat_history, summary_doc)
+    return history, summary
+
+
+def get_chat_context(chat_id: str) -> tuple:
+    """
+    Context for the next turn of a chat session.
+    Returns (history, summary): budgeted recent messages and the rolling summary (or None).
+    """
+    chat_history = get_recent_chat_messages(chat_id, limit=LLM_CONTEXT_MAX_MESSAGES)
+    summary_doc = get_chat_summary(chat_id) if LLM_SUMMARY_ENABLED and chat_history else None
+    return _build_context(chat_history, summary_doc)
+
+
+async def get_chat_context_async(chat_id: str) -> tuple:
+    """Async variant of get_chat_context for the ASGI serving path"""
+    chat_history = await async_db_service.get_recent_chat_messages(chat_id, limit=LLM_CONTEXT_MAX_MESSAGES)
+    summary_doc = None
+    if LLM_SUMMARY_ENABLED and chat_history:
+        summary_doc = await async_db_service.get_chat_summary(chat_id)
+    return _build_context(chat_history, summary_doc)
+
+
+# ==================== ROLLING SUMMARY ====================
+
+def build_summary_prompt(previous_summary: str, messages: list, language: str) -> str:
+    lines = []
+    for msg in messages:
+        role_label = "User" if msg["role"] == "user" else "AgriGPT"
+        lines.append(f"{role_label}: {truncate_to_tokens(msg['content'], LLM_CONTEXT_MESSAGE_MAX_TOKENS)}")
+
+    return f"""
+Update the running summary of a farming conversation between a farmer and AgriGPT.
+
+Keep the facts needed to answer follow-up questions: crops, region, soil,
+season, problems reported and advice already given. Drop greetings and
+repetition. Write in {language}, at most {LLM_SUMMARY_MAX_WORDS} words, plain text only.
+
+Previous summary:
+{previous_summary or "(none)"}
+
+New conversation turns:
+{chr(10).join(lines)}
+
+Updated summary:
+"""
+
+
+def messages_to_summarize(pending: list, oldest_sent) -> list:
+    """
+    The oldest of the unsummarized `pending` messages (oldest first) to fold
+    into the summary: every one older than the oldest message the next turn
+    sends (`oldest_sent`, None if it sends none), extended by whole turns to
+    LLM_SUMMARY_BATCH_MESSAGES without reaching the latest turn. [] while all
+    of them are sent.
+    """
+    end = sum(1 for msg in pending if oldest_sent is None or msg["timestamp"] < oldest_sent)
+    if not end:
+        return []
+    # The latest turn (question and answer) always stays verbatim
+    target = min(LLM_SUMMARY_BATCH_MESSAGES, len(pending) - 2)
+    while end < target:
+        end += 1
+        while end < len(pending) and pending[end]["role"] != "user":
+            end += 1
+    return pending[:end]
+
+
+def _fold_summary(chat_id: str, language: str) -> bool:
+    """Fold the messages the next turn would not send into the summary; True if it changed"""
+    # Imported here: llm_service pulls in the provider and scheduler
+    from services.llm_service import get_ai_response, FALLBACK_RESPONSE
+
+    summary_doc = get_chat_summary(chat_id)
+    previous_summary = summary_doc["summary"] if summary_doc else None
+    previous_through = summary_doc["summary_through"] if summary_doc else None
+
+    recent = get_recent_chat_messages(chat_id, limit=LLM_CONTEXT_MAX_MESSAGES)
+    _, _, oldest_sent = _fit_context(recent, summary_doc)
+    overflow = messages_to_summarize(get_chat_messages_after(chat_id, previous_through), oldest_sent)
+    if not overflow:
+        return False
+
+    summary = get_ai_response(build_summary_prompt(previous_summary, overflow, language), lane="summary")
+    if not summary or summary == FALLBACK_RESPONSE:
+        print(f"⚠️ Chat summary not updated for chat: {chat_id}")
+        return False
+
+    if set_chat_summary(chat_id, summary, overflow[-1]["timestamp"], previous_through):
+        print(f"✓ Chat summary updated for chat: {chat_id} (+{len(overflow)} messages)")
+        return True
+    return False
+
+
+def update_chat_summary(chat_id: str, language: str):
+    """
+    Fold every message the next turn would not send into the session summary.
+    A longer summary leaves less budget for the history, so the messages it
+    pushes out are folded in by a second pass.
+    """
+    if _fold_summary(chat_id, language):
+        _fold_summary(chat_id, language)
+
+
+def schedule_summary_update(chat_id: str, language: str):
+    """Update the rolling summary in a background thread, at most one per session"""
+    if not LLM_SUMMARY_ENABLED or not chat_id:
+        return
+
+    with _summarizing_lock:
+        if chat_id in _summarizing:
+            return
+        _summarizing.add(chat_id)
+
+    def run():
+        try:
+            update_chat_summary(chat_id, language)
+        except Exception as e:
+            print(f"✗ Error updating chat summary: {str(e)}")
+        finally:
+            with _summarizing_lock:
+                _summarizing.discard(chat_id)
+
+    threading.Thread(target=run, daemon=True).start()
@@ -0,0 +1,277 @@
+"""
+Declarative MongoDB index registry, bootstrap and explain() verification.
+
+INDEXES lists every secondary index the backend relies on; query_shapes() lists
+every filtered query it issues (find, find_one, count, delete and the $match /
+$sort prefix of aggregations), each with sample values.
+
+    ensure_indexes()   creates the missing registered indexes and drops the
+                       RETIRED_INDEXES they replace (idempotent - existing ones
+                       are left alone, conflicts are reported)
+    verify_indexes()   runs explain() on every query shape and returns the
+                       ones whose winning plan still contains a COLLSCAN
+
+Both are run by `python manage_indexes.py`; ensure_indexes() also runs at
+startup when DB_ENSURE_INDEXES_ON_STARTUP is set. otp_ttl_index is registered
+with the same spec otp_service.setup_otp_collection uses, so either may create
+it. Lookups by _id (always indexed) and the whole-collection recounts of
+backfill_stats.py are not listed.
+"""
+
+from datetime import datetime, timezone, timedelta
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+from services.db_service import db
+
+INDEXES = [
+    # chat_turns: a session's turn documents newest first (context, /api/chats/<id> pages, summaries,
+    # delete, the open bucket of CHAT_TURNS_PER_DOCUMENT > 1); first_at lets older pages filter in the index
+    {"collection": "chat_turns", "name": "chat_id_last_at_id_first_at",
+     "keys": [("chat_id", ASCENDING), ("last_at", DESCENDING), ("_id", DESCENDING), ("first_at", DESCENDING)]},
+    # chat_turns: a user's turn documents newest first (/api/history pages, language profile, account cleanup)
+    {"collection": "chat_turns", "name": "user_id_last_at_id_first_at",
+     "keys": [("user_id", ASCENDING), ("last_at", DESCENDING), ("_id", DESCENDING), ("first_at", DESCENDING)]},
+
+    # chat_history (read until migrate_chat_turns.py has emptied it): a session's messages in order
+    {"collection": "chat_history", "name": "chat_id_timestamp_id",
+     "keys": [("chat_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]},
+    # chat_history: a user's messages newest first (/api/history pages, language profile, account cleanup)
+    {"collection": "chat_history", "name": "user_id_timestamp_id",
+     "keys": [("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]},
+
+    # Keyset pages of /api/chats sort on (updated_at, _id)
+    {"collection": "chat_sessions", "name": "user_id_updated_at_id",
+     "keys": [("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)]},
+
+    {"collection": "farming_reports", "name": "user_id_timestamp_id",
+     "keys": [("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]},
+    # Recent reports (report store popularity ranking)
+    {"collection": "farming_reports", "name": "timestamp",
+     "keys": [("timestamp", DESCENDING)]},
+
+    {"collection": "user_feedback", "name": "status_resolved_at",
+     "keys": [("status", ASCENDING), ("resolved_at", ASCENDING)]},
+    {"collection": "user_feedback", "name": "timestamp",
+     "keys": [("timestamp", DESCENDING)]},
+
+    {"collection": "developers", "name": "user_id",
+     "keys": [("user_id", ASCENDING)]},
+
+    {"collection": "users", "name": "email",
+     "keys": [("email", ASCENDING)]},
+    {"collection": "users", "name": "firebase_uid",
+     "keys": [("firebase_uid", ASCENDING)], "options": {"sparse": True}},
+
+    {"collection": "otp_verifications", "name": "email_otp_verified",
+     "keys": [("email", ASCENDING), ("otp", ASCENDING), ("verified", ASCENDING)]},
+    {"collection": "otp_verifications", "name": "verified",
+     "keys": [("verified", ASCENDING)]},
+    # Same spec as otp_service.setup_otp_collection
+    {"collection": "otp_verifications", "name": "otp_ttl_index",
+     "keys": [("expires_at", ASCENDING)], "options": {"expireAfterSeconds": 86400}},
+
+    # Hourly statistics rollups expire (services/stats_service.py; totals and daily rollups have no expire_at)
+    {"collection": "app_stats", "name": "expire_at_ttl",
+     "keys": [("expire_at", ASCENDING)], "options": {"expireAfterSeconds": 0}},
+]
+
+# Superseded by a registered index (same prefix plus the _id tie-breaker of keyset pagination), or unused
+RETIRED_INDEXES = [
+    {"collection": "chat_history", "name": "chat_id_timestamp"},
+    {"collection": "chat_history", "name": "user_id_timestamp"},
+    {"collection": "chat_sessions", "name": "user_id_updated_at"},
+    {"collection": "farming_reports", "name": "user_id_timestamp"},
+    # Only served the admin statistics counts, now read from app_stats
+    {"collection": "chat_sessions", "name": "created_at"},
+    {"collection": "users", "name": "created_at"},
+]
+
+
+def _sample_values():
+    now = datetime.now(timezone.utc)
+    return {
+        "user_id": str(ObjectId()),
+        "chat_id": str(ObjectId()),
+        "object_id": ObjectId(),
+        "email": "index-probe@example.com",
+        "now": now,
+        "week_ago": now - timedelta(days=7),
+        "cursor_time": (now - timedelta(days=1)).replace(tzinfo=None)
+    }
+
+
+def _keyset(sort_field, v):
+    """The $or a keyset page adds after its first page"""
+    return {"$or": [
+        {sort_field: {"$lt": v["cursor_time"]}},
+        {sort_field: v["cursor_time"], "_id": {"$lt": v["object_id"]}}
+    ]}
+
+
+def query_shapes():
+    """Every filtered query the backend issues, with sample values filled in"""
+    v = _sample_values()
+    turn_order = [("last_at", -1), ("_id", -1)]
+    return [
+        # services/db_service.py, services/async_db_service.py - chat_turns
+        {"collection": "chat_turns", "used_by": "chat_messages (context, get_chat_by_id, first page)",
+         "filter": {"chat_id": v["chat_id"]}, "sort": turn_order},
+        {"collection": "chat_turns", "used_by": "get_chat_page (older messages)",
+         "filter": {"chat_id": v["chat_id"], "first_at": {"$lte": v["cursor_time"]}}, "sort": turn_order},
+        {"collection": "chat_turns", "used_by": "get_chat_messages_after",
+         "filter": {"chat_id": v["chat_id"], "last_at": {"$gt": v["week_ago"]}}, "sort": turn_order},
+        {"collection": "chat_turns", "used_by": "delete_chat_session, chat_page_pipeline ($lookup)",
+         "filter": {"chat_id": v["chat_id"], "user_id": v["user_id"]}, "sort": turn_order},
+        {"collection": "chat_turns", "used_by": "chat_page_pipeline ($lookup, older messages)",
+         "filter": {"chat_id": v["chat_id"], "user_id": v["user_id"], "first_at": {"$lte": v["cursor_time"]}},
+         "sort": turn_order},
+        {"collection": "chat_turns", "used_by": "iter_chat_history, get_user_language_counts",
+         "filter": {"user_id": v["user_id"]}, "sort": turn_order},
+        {"collection": "chat_turns", "used_by": "iter_chat_history (next pages)",
+         "filter": {"user_id": v["user_id"], "first_at": {"$lte": v["cursor_time"]}}, "sort": turn_order},
+        # services/chat_turns.py (write-behind buffer, migration)
+        {"collection": "chat_turns", "used_by": "turn_operations (open bucket upsert)",
+         "filter": {"chat_id": v["chat_id"], "user_id": v["user_id"], "count": {"$lt": 10}}},
+        {"collection": "chat_turns", "used_by": "stored_turn_ids",
+         "filter": {"chat_id": {"$in": [v["chat_id"]]}, "turns._id": {"$in": [v["object_id"]]}}},
+
+        # chat_history, while CHAT_LEGACY_READS is set
+        {"collection": "chat_history", "used_by": "chat_messages (context, get_chat_by_id, pages)",
+         "filter": {"chat_id": v["chat_id"]}, "sort": [("timestamp", -1), ("_id", -1)]},
+        {"collection": "chat_history", "used_by": "chat_messages (older messages)",
+         "filter": {"chat_id": v["chat_id"], **_keyset("timestamp", v)}, "sort": [("timestamp", -1), ("_id", -1)]},
+        {"collection": "chat_history", "used_by": "get_chat_messages_after",
+         "filter": {"chat_id": v["chat_id"], "timestamp": {"$gt": v["week_ago"]}},
+         "sort": [("timestamp", -1), ("_id", -1)]},
+        {"collection": "chat_history", "used_by": "delete_chat_session, migrate_session, chat_page_pipeline",
+         "filter": {"chat_id": v["chat_id"], "user_id": v["user_id"]}, "sort": [("timestamp", -1), ("_id", -1)]},
+        {"collection": "chat_history", "used_by": "chat_page_pipeline ($lookup, older messages)",
+         "filter": {"chat_id": v["chat_id"], "user_id": v["user_id"], **_keyset("timestamp", v)},
+         "sort": [("timestamp", -1), ("_id", -1)]},
+        {"collection": "chat_history", "used_by": "history_pipeline ($match + $sort)",
+         "filter": {"user_id": v["user_id"]}, "sort": [("timestamp", -1), ("_id", -1)]},
+        {"collection": "chat_history", "used_by": "history_pipeline (next pages)",
+         "filter": {"user_id": v["user_id"], **_keyset("timestamp", v)}, "sort": [("timestamp", -1), ("_id", -1)]},
+        {"collection": "chat_history", "used_by": "get_user_language_counts",
+         "filter": {"user_id": v["user_id"], "role": "user"}, "sort": [("timestamp", -1), ("_id", -1)]},
+        {"collection": "chat_sessions", "used_by": "get_chat_sessions, get_user_language_counts",
+         "filter": {"user_id": v["user_id"]}, "sort": [("updated_at", -1)]},
+        {"collection": "chat_sessions", "used_by": "get_chat_sessions_page (next pages)",
+         "filter": {"user_id": v["user_id"], **_keyset("updated_at", v)}, "sort": [("updated_at", -1), ("_id", -1)]},
+        {"collection": "farming_reports", "used_by": "get_user_reports",
+         "filter": {"user_id": v["user_id"]}, "sort": [("timestamp", -1)]},
+        {"collection": "farming_reports", "used_by": "get_user_reports_page (next pages)",
+         "filter": {"user_id": v["user_id"], **_keyset("timestamp", v)}, "sort": [("timestamp", -1), ("_id", -1)]},
+        {"collection": "user_feedback", "used_by": "get_all_feedbacks",
+         "filter": {}, "sort": [("timestamp", -1)]},
+
+        # services/report_store.py
+        {"collection": "farming_reports", "used_by": "get_popular_report_keys",
+         "filter": {"timestamp": {"$gte": v["week_ago"]}}},
+
+        # routes/feedback_routes.py
+        {"collection": "user_feedback", "used_by": "feedback auto-delete",
+         "filter": {"status": "resolved", "resolved_at": {"$lt": v["week_ago"]}}},
+        {"collection": "developers", "used_by": "check_developer, admin_required, make_admin.py",
+         "filter": {"user_id": v["user_id"]}},
+
+        # services/auth_service.py, routes/auth_routes.py
+        {"collection": "users", "used_by": "signup, login, password reset",
+         "filter": {"email": v["email"]}},
+        {"collection": "users", "used_by": "update_user_profile",
+         "filter": {"email": v["email"], "_id": {"$ne": v["object_id"]}}},
+        {"collection": "users", "used_by": "Firebase sign-in",
+         "filter": {"firebase_uid": "index-probe"}},
+        {"collection": "users", "used_by": "link Google account",
+         "filter": {"firebase_uid": "index-probe", "_id": {"$ne": v["object_id"]}}},
+
+        # OTP verification (services/auth_service.py, routes/otp_routes.py, routes/auth_routes.py)
+        {"collection": "otp_verifications", "used_by": "verify_otp_code",
+         "filter": {"email": v["email"], "otp": "000000", "verified": False}},
+        {"collection": "otp_verifications", "used_by": "signup OTP check",
+         "filter": {"email": v["email"], "otp": "000000", "purpose": "signup", "verified": False}},
+        {"collection": "otp_verifications", "used_by": "verify-otp debug count",
+         "filter": {"email": v["email"]}},
+        {"collection": "otp_verifications", "used_by": "otp status (verified)",
+         "filter": {"verified": True}},
+        {"collection": "otp_verifications", "used_by": "otp status (expired)",
+         "filter": {"expires_at": {"$lt": v["now"]}}},
+    ]
+
+
+def ensure_indexes(database=None) -> dict:
+    """Create every missing registered index; returns {"created", "existing", "dropped", "conflicts"}"""
+    database = db if database is None else database
+    summary = {"created": [], "existing": [], "dropped": [], "conflicts": []}
+    existing_by_collection = {}
+
+    for spec in INDEXES:
+        collection = database[spec["collection"]]
+        label = f"{spec['collection']}.{spec['name']}"
+        if spec["collection"] not in existing_by_collection:
+            existing_by_collection[spec["collection"]] = {idx["name"] for idx in collection.list_indexes()}
+        if spec["name"] in existing_by_collection[spec["collection"]]:
+            summary["existing"].append(label)
+            continue
+        try:
+            collection.create_index(spec["keys"], name=spec["name"], **spec.get("options", {}))
+            summary["created"].append(label)
+        except OperationFailure as e:
+            # Same keys under another name, or same name with other options
+            summary["conflicts"].append(f"{label} ({e.details.get('errmsg', str(e)) if e.details else str(e)})")
+
+    # Retired indexes go only after every registered index is in place
+    if not summary["conflicts"]:
+        for spec in RETIRED_INDEXES:
+            collection = database[spec["collection"]]
+            if spec["name"] in {idx["name"] for idx in collection.list_indexes()}:
+                collection.drop_index(spec["name"])
+                summary["dropped"].append(f"{spec['collection']}.{spec['name']}")
+
+    for label in summary["created"]:
+        print(f"✓ Index created: {label}")
+    for label in summary["dropped"]:
+        print(f"🗑️ Retired index dropped: {label}")
+    for conflict in summary["conflicts"]:
+        print(f"⚠️ Index not created: {conflict}")
+    print(f"✓ MongoDB indexes: {len(summary['created'])} created, {len(summary['existing'])} already present, "
+          f"{len(summary['dropped'])} retired, {len(summary['conflicts'])} conflicts")
+    return summary
+
+
+def plan_stages(plan) -> list:
+    """All stage names in an explain() plan tree (classic and slot-based engine, sharded)"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for key, value in plan.items():
+            if key != "rejectedPlans":
+                stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+def explain_shape(shape, database=None) -> list:
+    """Stage names of the winning plan for one query shape"""
+    database = db if database is None else database
+    cursor = database[shape["collection"]].find(shape["filter"])
+    if shape.get("sort"):
+        cursor = cursor.sort(shape["sort"])
+    explained = cursor.explain()
+    return plan_stages(explained.get("queryPlanner", {}).get("winningPlan", {}))
+
+
+def verify_indexes(database=None) -> list:
+    """Query shapes whose winning plan still has a COLLSCAN (empty list = all indexed)"""
+    failures = []
+    for shape in query_shapes():
+        stages = explain_shape(shape, database)
+        ok = "COLLSCAN" not in stages
+        print(f"  {'✓' if ok else '✗'} {shape['collection']:<18} {shape['used_by']:<45} {' > '.join(reversed(stages))}")
+        if not ok:
+            failures.append({**shape, "stages": stages})
+    return failures
@@ -1,11 +1,26 @@
+import itertools
 from pymongo import MongoClient
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from bson import ObjectId
-from utils.config import MONGO_URI, MONGO_DB
+from utils.config import MONGO_URI, MONGO_DB, CHAT_LEGACY_READS, CHAT_TURNS_PER_DOCUMENT
+from services.chat_writer import ChatWriteBuffer
+from services.chat_turns import (
+    build_turn,
+    turn_messages,
+    bucket_messages,
+    bucket_pairs,
+    item_key,
+    NewestFirst,
+    merge_newest
+)
+from services.stats_service import StatsCounters
 
 client = MongoClient(MONGO_URI)
 db = client[MONGO_DB]
 
+# Chat turns (services/chat_turns.py); chat_history holds the messages not
+# migrated yet (migrate_chat_turns.py) and is read while CHAT_LEGACY_READS is set
+chat_turns_collection = db.chat_turns
 chat_collection = db.chat_history
 chat_sessions_collection = db.chat_sessions
 user_collection = db.users
@@ -13,83 +28,262 @@ report_collection = db.farming_reports
 feedback_collection = db.user_feedback
 developers_collection = db.developers
 
+# Admin statistics counters and hourly / daily rollups (app_stats collection)
+stats = StatsCounters(db.app_stats)
+
+
+def count_chat_writes(turns, sessions):
+    """Statistics for a batch of chat turns the write-behind buffer has written"""
+    stats.record(created=[("chat_messages", msg["timestamp"]) for turn in turns for msg in turn_messages(turn)]
+                 + [("chat_sessions", doc["created_at"]) for doc in sessions])
+
+
+# Chat turns (turns, new sessions, updated_at bumps) are written behind the request
+chat_writer = ChatWriteBuffer(chat_turns_collection, chat_sessions_collection, on_flush=count_chat_writes)
+
+# Fields of the paginated list / detail views
+SESSION_SUMMARY_FIELDS = {"title": 1, "language": 1, "created_at": 1, "updated_at": 1}
+MESSAGE_FIELDS = {"role": 1, "content": 1, "timestamp": 1, "input_type": 1, "response_type": 1, "language": 1}
+REPORT_SUMMARY_FIELDS = {"crop_name": 1, "region": 1, "language": 1, "timestamp": 1}
+HISTORY_FIELDS = ("question", "answer", "response_type", "language", "timestamp")
+# chat_turns documents are read newest first in this order (NewestFirst)
+TURN_ORDER = [("last_at", -1), ("_id", -1)]
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+# ==================== KEYSET PAGINATION ====================
+
+def encode_cursor(value, doc_id):
+    """Opaque page cursor for a (datetime, ObjectId) sort key: "<epoch ms>_<id>" """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return f"{(value - _EPOCH) // timedelta(milliseconds=1)}_{doc_id}"
+
+
+def decode_cursor(cursor):
+    """(datetime, ObjectId) from encode_cursor; ValueError if malformed"""
+    try:
+        millis, doc_id = cursor.split("_", 1)
+        return _EPOCH + timedelta(milliseconds=int(millis)), ObjectId(doc_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_filter(query, sort_field, cursor=None):
+    """`query` narrowed to the documents after `cursor` (a cursor string or decoded key) in (sort_field, _id) order"""
+    if not cursor:
+        return query
+    value, last_id = decode_cursor(cursor) if isinstance(cursor, str) else cursor
+    return {**query, "$or": [
+        {sort_field: {"$lt": value}},
+        {sort_field: value, "_id": {"$lt": last_id}}
+    ]}
+
+
+def keyset_query(collection, query, sort_field, cursor=None, projection=None):
+    """Cursor over documents after `cursor` (a cursor string or decoded key), newest first in (sort_field, _id) order"""
+    query = keyset_filter(query, sort_field, cursor)
+    if projection is not None:
+        projection = {**projection, sort_field: 1}
+    return collection.find(query, projection).sort([(sort_field, -1), ("_id", -1)])
+
+
+def page_with_cursor(docs, sort_field, limit):
+    """First `limit` of newest-first documents, and the cursor to the rest (or None)"""
+    page = docs[:limit]
+    if len(docs) > limit and page:
+        return page, encode_cursor(page[-1][sort_field], page[-1]["_id"])
+    return page, None
+
+
+def turn_documents(query, before=None):
+    """
+    (filter, sort) of the chat_turns documents matching `query` that can hold
+    items older than the `before` key, in the order NewestFirst reads them.
+    A document's last_at moves on while its bucket fills, so pages filter on
+    first_at (part of the index, checked without fetching) rather than
+    resuming at a document.
+    """
+    if before:
+        query = {**query, "first_at": {"$lte": before[0]}}
+    return query, TURN_ORDER
+
+
+def pending_chat_messages(chat_id, after=None, before=None):
+    """
+    Messages of a chat's turns still in the write-behind buffer, newest first:
+    newer than the `after` time, older than the `before` key
+    """
+    messages = [
+        msg for turn in chat_writer.pending_turns(chat_id) for msg in turn_messages(turn)
+        if (after is None or msg["timestamp"] > after) and (before is None or item_key(msg) < before)
+    ]
+    return sorted(messages, key=item_key, reverse=True)
+
+
+def chat_messages(chat_id, before=None, limit=None):
+    """
+    Messages of a chat session older than the `before` key, newest first, from
+    chat_turns, the write-behind buffer and (CHAT_LEGACY_READS) chat_history.
+
+    Sources are read newest-written last: the buffer before the queries (a
+    flush cannot slip a turn between them), chat_history before chat_turns (a
+    session migrated meanwhile is found in chat_turns). A migrated message
+    found in both keeps its key, and merge_newest returns it once. `limit`
+    caps the chat_history read (to the messages a page can show).
+    """
+    pending = pending_chat_messages(chat_id, before=before)
+    legacy = []
+    if CHAT_LEGACY_READS:
+        legacy = keyset_query(chat_collection, {"chat_id": chat_id}, "timestamp", before)
+        legacy = list(legacy.limit(limit) if limit else legacy)
+    query, sort = turn_documents({"chat_id": chat_id}, before)
+    documents = chat_turns_collection.find(query).sort(sort)
+    if limit:
+        # Every document holds a message; NewestFirst looks one document ahead
+        documents = documents.batch_size(limit + 1)
+    return merge_newest(pending, legacy, NewestFirst(documents, bucket_messages, before))
+
 
 def save_chat(user_id, question, answer, response_type, language, input_type="text", chat_id=None):
-    """Save individual chat message with chat_id reference"""
+    """Save one chat turn (question and answer) with chat_id reference (queued on the write-behind buffer)"""
     try:
-        result = chat_collection.insert_one({
-            "chat_id": chat_id,
-            "user_id": user_id,
-            "role": "user",
-            "content": question,
-            "input_type": input_type,
-            "response_type": response_type,
-            "language": language,
-            "timestamp": datetime.now(timezone.utc)
-        })
-        
-        # Save assistant response
-        chat_collection.insert_one({
-            "chat_id": chat_id,
-            "user_id": user_id,
-            "role": "assistant",
-            "content": answer,
-            "input_type": input_type,
-            "response_type": response_type,
-            "language": language,
-            "timestamp": datetime.now(timezone.utc)
-        })
+        turn = build_turn(user_id, question, answer, response_type, language, input_type, chat_id)
+        if chat_writer.add_turns([turn]):
+            chat_writer.flush(raise_errors=True)
         
-        print(f"✓ Chat saved for user: {user_id}, chat_id: {chat_id}, ID: {result.inserted_id}")
-        return result.inserted_id
+        print(f"✓ Chat saved for user: {user_id}, chat_id: {chat_id}, ID: {turn['_id']}")
+        return turn["_id"]
     except Exception as e:
         print(f"✗ Error saving chat: {str(e)}")
         raise
 
 
+def pair_history_messages(messages):
+    """
+    Convert chat_history messages sorted newest-first to the legacy question/answer format.
+    Reference implementation of history_pipeline (kept for benchmarks/history_benchmark.py).
+    """
+    result = []
+    i = 0
+    while i < len(messages):
+        if i + 1 < len(messages) and messages[i]["role"] == "assistant" and messages[i+1]["role"] == "user":
+            result.append({
+                "question": messages[i+1]["content"],
+                "answer": messages[i]["content"],
+                "response_type": messages[i]["response_type"],
+                "language": messages[i]["language"],
+                "timestamp": messages[i]["timestamp"]
+            })
+            i += 2
+        else:
+            i += 1
+    return result
+
+
+def history_pipeline(user_id, before=None, limit=None):
+    """
+    Aggregation doing the legacy question/answer pairing of chat_history inside
+    MongoDB: newest first, an assistant message is paired with the message just
+    before it in the user's timeline when that one is a user message - exactly
+    what pair_history_messages does in Python. $shift needs MongoDB 5.0+.
+    Output documents keep _id (of the answer) for the next page's cursor.
+    """
+    match = {"user_id": user_id}
+    if before:
+        # Pairs never straddle the cursor: the question is older than its answer
+        value, last_id = before
+        match["$or"] = [{"timestamp": {"$lt": value}}, {"timestamp": value, "_id": {"$lt": last_id}}]
+    pipeline = [
+        {"$match": match},
+        # Sorted on the (user_id, timestamp, _id) index, so the window streams and $limit stops early
+        {"$setWindowFields": {
+            "sortBy": {"timestamp": -1, "_id": -1},
+            "output": {"previous": {"$shift": {"output": {"role": "$role", "content": "$content"}, "by": 1}}}
+        }},
+        {"$match": {"role": "assistant", "previous.role": "user"}},
+        {"$project": {
+            "question": "$previous.content",
+            "answer": "$content",
+            "response_type": 1,
+            "language": 1,
+            "timestamp": 1
+        }}
+    ]
+    if limit:
+        pipeline.append({"$limit": limit})
+    return pipeline
+
+
+def iter_chat_history(user_id, limit=None, cursor=None, page=None):
+    """
+    Stream the question/answer history, newest first (pairs without _id): the
+    answered turns of chat_turns, merged with the chat_history pairs of
+    history_pipeline while CHAT_LEGACY_READS is set (chat_history first, see
+    chat_messages). A page's chat_history pairs are read before chat_turns; the
+    unpaginated history streams both.
+    With `page` (a dict), page["next_cursor"] is set once the iteration is over:
+    the cursor of the following page, or None when there is none.
+    """
+    before = decode_cursor(cursor) if cursor else None
+    batch = min(limit or 1000, 1000) + 1
+    legacy = None
+    if CHAT_LEGACY_READS:
+        legacy = chat_collection.aggregate(
+            history_pipeline(user_id, before, limit + 1 if limit else None), batchSize=batch
+        )
+    query, sort = turn_documents({"user_id": user_id}, before)
+    documents = chat_turns_collection.find(query).sort(sort).batch_size(batch)
+    turns = NewestFirst(documents, bucket_pairs, before)
+
+    next_cursor = None
+    last = None
+    count = 0
+    try:
+        legacy_pairs = (list(legacy) if limit else legacy) if legacy is not None else []
+        for pair in merge_newest(legacy_pairs, turns):
+            if limit and count == limit:
+                next_cursor = encode_cursor(last["timestamp"], last["_id"])
+                break
+            last = pair
+            count += 1
+            yield {field: pair.get(field) for field in HISTORY_FIELDS}
+    finally:
+        if legacy is not None:
+            legacy.close()
+        documents.close()
+    if page is not None:
+        page["next_cursor"] = next_cursor
+
+
 def get_chat_history(user_id):
     """Legacy function for backward compatibility - returns all messages without chat_id grouping"""
     try:
-        messages = list(
-            chat_collection.find(
-                {"user_id": user_id},
-                {"_id": 0}
-            ).sort("timestamp", -1)
-        )
-        
-        # Convert to old format for backward compatibility
-        result = []
-        i = 0
-        while i < len(messages):
-            if i + 1 < len(messages) and messages[i]["role"] == "assistant" and messages[i+1]["role"] == "user":
-                result.append({
-                    "question": messages[i+1]["content"],
-                    "answer": messages[i]["content"],
-                    "response_type": messages[i]["response_type"],
-                    "language": messages[i]["language"],
-                    "timestamp": messages[i]["timestamp"]
-                })
-                i += 2
-            else:
-                i += 1
-        
-        return result
+        return list(iter_chat_history(user_id))
     except Exception as e:
         print(f"✗ Error getting chat history: {str(e)}")
         return []
 
 
+def build_report_doc(user_id, crop_name, region, report_data, language):
+    """Build a farming_reports document"""
+    return {
+        "user_id": user_id,
+        "crop_name": crop_name,
+        "region": region,
+        "report_data": report_data,
+        "language": language,
+        "timestamp": datetime.now(timezone.utc)
+    }
+
+
 def save_report(user_id, crop_name, region, report_data, language):
     """Save farming report to database"""
     try:
-        result = report_collection.insert_one({
-            "user_id": user_id,
-            "crop_name": crop_name,
-            "region": region,
-            "report_data": report_data,
-            "language": language,
-            "timestamp": datetime.now(timezone.utc)
-        })
+        report_doc = build_report_doc(user_id, crop_name, region, report_data, language)
+        result = report_collection.insert_one(report_doc)
+        stats.record(created=[("reports", report_doc["timestamp"])])
         print(f"✓ Report saved for user: {user_id}, Crop: {crop_name}, Region: {region}, ID: {result.inserted_id}")
         return result.inserted_id
     except Exception as e:
@@ -97,8 +291,22 @@ def save_report(user_id, crop_name, region, report_data, language):
         raise
 
 
+def save_reports(report_docs):
+    """Save many farming reports (build_report_doc documents) with a single bulk write"""
+    if not report_docs:
+        return []
+    try:
+        result = report_collection.insert_many(report_docs, ordered=False)
+        stats.record(created=[("reports", doc["timestamp"]) for doc in report_docs])
+        print(f"✓ {len(result.inserted_ids)} reports saved in one bulk write")
+        return result.inserted_ids
+    except Exception as e:
+        print(f"✗ Error saving reports: {str(e)}")
+        raise
+
+
 def get_user_reports(user_id):
-    """Get all reports for a user"""
+    """Get all reports for a user (unpaginated, with report_data - LIST_API_COMPAT shape)"""
     return list(
         report_collection.find(
             {"user_id": user_id},
@@ -107,33 +315,72 @@ def get_user_reports(user_id):
     )
 
 
+def get_user_reports_page(user_id, limit, cursor=None):
+    """One page of a user's reports without report_data, newest first"""
+    reports, next_cursor = page_with_cursor(list(keyset_query(
+        report_collection, {"user_id": user_id}, "timestamp", cursor, REPORT_SUMMARY_FIELDS
+    ).limit(limit + 1)), "timestamp", limit)
+    for report in reports:
+        report["_id"] = str(report["_id"])
+    return {"reports": reports, "next_cursor": next_cursor}
+
+
+def get_user_report(user_id, report_id):
+    """One of the user's reports with its full report_data, or None"""
+    if not ObjectId.is_valid(report_id):
+        return None
+    report = report_collection.find_one({"_id": ObjectId(report_id), "user_id": user_id})
+    if report:
+        report["_id"] = str(report["_id"])
+    return report
+
+
 # ==================== CHAT SESSION MANAGEMENT ====================
 
+def build_chat_session_doc(user_id, title, language):
+    """Build a chat_sessions document"""
+    now = datetime.now(timezone.utc)
+    return {
+        "user_id": user_id,
+        "title": title,
+        "language": language,
+        "created_at": now,
+        "updated_at": now
+    }
+
+
 def create_chat_session(user_id, title, language):
-    """Create a new chat session"""
+    """Create a new chat session (id allocated here, document written behind)"""
     try:
-        result = chat_sessions_collection.insert_one({
-            "user_id": user_id,
-            "title": title,
-            "language": language,
-            "created_at": datetime.now(timezone.utc),
-            "updated_at": datetime.now(timezone.utc)
-        })
-        print(f"✓ Chat session created for user: {user_id}, ID: {result.inserted_id}")
-        return str(result.inserted_id)
+        chat_id, write_through = chat_writer.add_session(build_chat_session_doc(user_id, title, language))
+        if write_through:
+            chat_writer.flush(raise_errors=True)
+        print(f"✓ Chat session created for user: {user_id}, ID: {chat_id}")
+        return chat_id
     except Exception as e:
         print(f"✗ Error creating chat session: {str(e)}")
         raise
 
 
 def get_chat_sessions(user_id):
-    """Get all chat sessions for a user (sorted by updated_at DESC)"""
+    """Get all chat sessions for a user (sorted by updated_at DESC; unpaginated LIST_API_COMPAT shape)"""
     try:
+        new_sessions, touches = chat_writer.pending_sessions(user_id)
         sessions = list(
             chat_sessions_collection.find(
                 {"user_id": user_id}
             ).sort("updated_at", -1)
         )
+
+        # Sessions and updated_at bumps still in the write-behind buffer
+        if new_sessions or touches:
+            stored_ids = {session["_id"] for session in sessions}
+            sessions += [session for session in new_sessions if session["_id"] not in stored_ids]
+            for session in sessions:
+                touched = touches.get(str(session["_id"]))
+                if touched and touched > session["updated_at"]:
+                    session["updated_at"] = touched
+            sessions.sort(key=lambda session: session["updated_at"], reverse=True)
         
         # Convert ObjectId to string for JSON serialization
         for session in sessions:
@@ -145,24 +392,55 @@ def get_chat_sessions(user_id):
         return []
 
 
-def get_chat_by_id(chat_id):
-    """Get full chat history for a specific chat session"""
+def get_chat_sessions_page(user_id, limit, cursor=None):
+    """One page of a user's chat sessions (summary fields), most recently updated first"""
+    new_sessions, touches = chat_writer.pending_sessions(user_id) if not cursor else ([], {})
+    sessions = list(keyset_query(
+        chat_sessions_collection, {"user_id": user_id}, "updated_at", cursor, SESSION_SUMMARY_FIELDS
+    ).limit(limit + 1))
+
+    # The first page also shows sessions / updated_at bumps still in the write-behind buffer
+    if new_sessions or touches:
+        stored_ids = {session["_id"] for session in sessions}
+        sessions += [
+            {"_id": session["_id"], **{field: session.get(field) for field in SESSION_SUMMARY_FIELDS}}
+            for session in new_sessions if session["_id"] not in stored_ids
+        ]
+        for session in sessions:
+            touched = touches.get(str(session["_id"]))
+            if touched and touched > session["updated_at"]:
+                session["updated_at"] = touched
+        sessions.sort(key=lambda session: (session["updated_at"], session["_id"]), reverse=True)
+
+    sessions, next_cursor = page_with_cursor(sessions, "updated_at", limit)
+    for session in sessions:
+        session["_id"] = str(session["_id"])
+    return {"sessions": sessions, "next_cursor": next_cursor}
+
+
+def get_chat_by_id(chat_id, user_id=None):
+    """
+    Get full chat history for a specific chat session (unpaginated LIST_API_COMPAT shape).
+    With `user_id`, only a session of that user is returned (messages are not read otherwise).
+    """
     try:
-        # Get session metadata
-        session = chat_sessions_collection.find_one({"_id": ObjectId(chat_id)})
+        # Get session metadata (a new session may still be in the write-behind buffer)
+        owner = {"user_id": user_id} if user_id else {}
+        pending_session = chat_writer.pending_session(chat_id)
+        if pending_session and user_id and pending_session["user_id"] != user_id:
+            pending_session = None
+        session = chat_sessions_collection.find_one({"_id": ObjectId(chat_id), **owner}) or pending_session
         if not session:
             return None
         
-        # Get all messages for this chat
-        messages = list(
-            chat_collection.find(
-                {"chat_id": chat_id}
-            ).sort("timestamp", 1)
-        )
-        
-        # Remove MongoDB _id from messages
-        for msg in messages:
-            msg.pop("_id", None)
+        # Get all messages for this chat, oldest first (chat_history documents
+        # carry chat_id / user_id, messages of turns get them here)
+        messages = [
+            {"chat_id": chat_id, "user_id": session["user_id"],
+             **{key: value for key, value in msg.items() if key != "_id"}}
+            for msg in chat_messages(chat_id)
+        ]
+        messages.reverse()
         
         # Convert ObjectId to string
         session["_id"] = str(session["_id"])
@@ -176,6 +454,160 @@ def get_chat_by_id(chat_id):
         return None
 
 
+def get_chat_page(chat_id, limit, before=None):
+    """
+    Detail view of a chat session: its summary fields and the newest `limit`
+    messages, or the `limit` messages older than the `before` cursor - oldest first.
+    Returns {"session", "messages", "next_cursor"} (next_cursor pages to older
+    messages, None at the start of the chat), or None if there is no such session.
+    """
+    if not ObjectId.is_valid(chat_id):
+        return None
+    before = decode_cursor(before) if before else None
+
+    # Read the write-behind buffer first, so no new session can slip between buffer and query
+    session = chat_writer.pending_session(chat_id)
+    session = chat_sessions_collection.find_one(
+        {"_id": ObjectId(chat_id)}, {"user_id": 1, **SESSION_SUMMARY_FIELDS}
+    ) or session
+    if not session:
+        return None
+
+    messages = list(itertools.islice(chat_messages(chat_id, before, limit + 1), limit + 1))
+    messages, next_cursor = page_with_cursor(messages, "timestamp", limit)
+    messages = [{field: msg.get(field) for field in MESSAGE_FIELDS} for msg in reversed(messages)]
+
+    return {
+        "session": {
+            "_id": str(session["_id"]),
+            "user_id": session["user_id"],
+            **{field: session.get(field) for field in SESSION_SUMMARY_FIELDS}
+        },
+        "messages": messages,
+        "next_cursor": next_cursor
+    }
+
+
+def chat_page_pipeline(chat_id, user_id, limit, before=None):
+    """
+    Aggregation on chat_sessions: the user's session (summary fields) with, in
+    `legacy` (CHAT_LEGACY_READS), the newest limit + 1 chat_history messages
+    before the cursor and, in `turns`, the newest chat_turns documents that
+    can hold them - chat_page_documents(limit) of them. Both $lookup
+    sub-pipelines are uncorrelated (the chat_id is a literal), so they use the
+    indexes, and they only run when the session matched: for another user's
+    chat nothing beyond the session's _id lookup is read. chat_history is
+    looked up before chat_turns (see chat_messages).
+    """
+    owner = {"chat_id": chat_id, "user_id": user_id}
+    turn_query, turn_order = turn_documents(owner, before)
+    pipeline = [
+        {"$match": {"_id": ObjectId(chat_id), "user_id": user_id}},
+        {"$project": {"user_id": 1, **SESSION_SUMMARY_FIELDS}}
+    ]
+    if CHAT_LEGACY_READS:
+        pipeline.append({"$lookup": {
+            "from": chat_collection.name,
+            "pipeline": [
+                {"$match": keyset_filter(owner, "timestamp", before)},
+                {"$sort": {"timestamp": -1, "_id": -1}},
+                {"$limit": limit + 1},
+                {"$project": MESSAGE_FIELDS}
+            ],
+            "as": "legacy"
+        }})
+    pipeline.append({"$lookup": {
+        "from": chat_turns_collection.name,
+        "pipeline": [
+            {"$match": turn_query},
+            {"$sort": dict(turn_order)},
+            {"$limit": chat_page_documents(limit)}
+        ],
+        "as": "turns"
+    }})
+    return pipeline
+
+
+def chat_page_documents(limit):
+    """
+    chat_turns documents a page reads in chat_page_pipeline: enough for
+    limit + 1 messages at CHAT_TURNS_PER_DOCUMENT (a bucket of N turns holds
+    up to 2N), plus the document straddling the cursor and one to look ahead.
+    No more, as $lookup returns them inside one (16 MB at most) document.
+    """
+    return -(-(limit + 1) // CHAT_TURNS_PER_DOCUMENT) + 2
+
+
+def get_user_chat_page(chat_id, user_id, limit, before=None):
+    """
+    get_chat_page for the session's owner in one round trip (chat_page_pipeline):
+    None if `user_id` has no such session - its messages are never read.
+    """
+    if not ObjectId.is_valid(chat_id):
+        return None
+    before_key = decode_cursor(before) if before else None
+
+    # Read the write-behind buffer first, so no turn can slip between buffer and query
+    pending_session = chat_writer.pending_session(chat_id)
+    pending = pending_chat_messages(chat_id, before=before_key)
+    session = next(chat_sessions_collection.aggregate(chat_page_pipeline(chat_id, user_id, limit, before_key)), None)
+    if not session:
+        if pending_session and pending_session["user_id"] == user_id:
+            # Created within the last flush interval
+            return get_chat_page(chat_id, limit, before)
+        return None
+
+    documents = session.pop("turns")
+    legacy = session.pop("legacy", [])
+    messages = merge_newest(pending, legacy, NewestFirst(documents, bucket_messages, before_key))
+    truncated = len(documents) == chat_page_documents(limit)
+    if truncated:
+        # Documents not read hold nothing newer than the last one's last_at
+        floor = documents[-1]["last_at"]
+        messages = itertools.takewhile(lambda msg: msg["timestamp"] > floor, messages)
+    messages = list(itertools.islice(messages, limit + 1))
+
+    if truncated and len(messages) <= limit:
+        if not messages:
+            # Documents in the window that hold no message before the cursor
+            return get_chat_page(chat_id, limit, before)
+        # A short page: the rest follows from its last message
+        next_cursor = encode_cursor(messages[-1]["timestamp"], messages[-1]["_id"])
+    else:
+        messages, next_cursor = page_with_cursor(messages, "timestamp", limit)
+
+    return {
+        "session": {
+            "_id": str(session["_id"]),
+            "user_id": session["user_id"],
+            **{field: session.get(field) for field in SESSION_SUMMARY_FIELDS}
+        },
+        "messages": [{field: msg.get(field) for field in MESSAGE_FIELDS} for msg in reversed(messages)],
+        "next_cursor": next_cursor
+    }
+
+
+def chat_session_exists(chat_id):
+    """Whether a chat session exists at all (_id lookup, or still in the write-behind buffer)"""
+    if not ObjectId.is_valid(chat_id):
+        return False
+    if chat_writer.pending_session(chat_id):
+        return True
+    return chat_sessions_collection.find_one({"_id": ObjectId(chat_id)}, {"_id": 1}) is not None
+
+
+def format_context_messages(messages):
+    """Convert chat_history documents to the simple {role, message} format for the LLM (timestamp kept for the summary boundary)"""
+    return [
+        {
+            "role": msg["role"],
+            "message": msg["content"],  # Database uses 'content' field
+            "timestamp": msg["timestamp"]
+        }
+        for msg in messages
+    ]
+
+
 def get_recent_chat_messages(chat_id, limit=10):
     """
     Get recent N messages from a chat session for context.
@@ -186,26 +618,16 @@ def get_recent_chat_messages(chat_id, limit=10):
                Should be even number for balanced user/assistant pairs
     
     Returns:
-        List of message dicts with role and message fields, ordered chronologically
+        List of message dicts with role, message and timestamp fields, ordered chronologically
     """
     try:
-        # Fetch recent messages in reverse chronological order, then reverse
-        messages = list(
-            chat_collection.find(
-                {"chat_id": chat_id}
-            ).sort("timestamp", -1).limit(limit)
-        )
+        # Fetch recent messages in reverse chronological order (buffered turns included)
+        messages = list(itertools.islice(chat_messages(chat_id, limit=limit), limit))
         
         # Reverse to get chronological order (oldest to newest)
         messages.reverse()
         
-        # Convert to simple format for LLM
-        formatted_messages = []
-        for msg in messages:
-            formatted_messages.append({
-                "role": msg["role"],
-                "message": msg["content"]  # Database uses 'content' field
-            })
+        formatted_messages = format_context_messages(messages)
         
         return formatted_messages
     except Exception as e:
@@ -213,24 +635,144 @@ def get_recent_chat_messages(chat_id, limit=10):
         return []
 
 
-def update_chat_session(chat_id):
-    """Update the updated_at timestamp of a chat session"""
+def get_chat_summary(chat_id):
+    """
+    Rolling summary of a chat session's older turns.
+    Returns {"summary": str, "summary_through": datetime} or None if there is none yet.
+    """
     try:
-        chat_sessions_collection.update_one(
+        session = chat_sessions_collection.find_one(
             {"_id": ObjectId(chat_id)},
-            {"$set": {"updated_at": datetime.now(timezone.utc)}}
+            {"summary": 1, "summary_through": 1}
         )
+        if not session or not session.get("summary"):
+            return None
+        return {"summary": session["summary"], "summary_through": session["summary_through"]}
+    except Exception as e:
+        print(f"✗ Error getting chat summary: {str(e)}")
+        return None
+
+
+def get_chat_session_language(chat_id):
+    """Language stored on a chat session, or None"""
+    try:
+        session = chat_sessions_collection.find_one({"_id": ObjectId(chat_id)}, {"language": 1})
+        return session.get("language") if session else None
+    except Exception as e:
+        print(f"✗ Error getting chat session language: {str(e)}")
+        return None
+
+
+def get_user_language_counts(user_id, limit=50):
+    """
+    How often each language appears in a user's latest messages and chat sessions.
+    Values are stored as names ("Hindi", text chat and sessions) or codes ("hi", voice).
+    """
+    counts = {}
+    try:
+        # Latest questions: of the latest chat_turns documents, merged with chat_history's
+        questions = []
+        if CHAT_LEGACY_READS:
+            questions.append(list(chat_collection.find(
+                {"user_id": user_id, "role": "user"}, {"language": 1, "timestamp": 1}
+            ).sort([("timestamp", -1), ("_id", -1)]).limit(limit)))
+        questions.append(list(chat_turns_collection.aggregate([
+            {"$match": {"user_id": user_id}},
+            {"$sort": {"last_at": -1, "_id": -1}},
+            {"$limit": limit},
+            {"$unwind": "$turns"},
+            {"$match": {"turns.asked_at": {"$exists": True}}},
+            {"$project": {"_id": "$turns._id", "language": "$turns.language", "timestamp": "$turns.asked_at"}},
+            {"$sort": {"timestamp": -1, "_id": -1}},
+            {"$limit": limit}
+        ])))
+        for question in itertools.islice(merge_newest(*questions), limit):
+            if question.get("language"):
+                counts[question["language"]] = counts.get(question["language"], 0) + 1
+
+        for row in chat_sessions_collection.aggregate([
+            {"$match": {"user_id": user_id}},
+            {"$sort": {"updated_at": -1}},
+            {"$limit": limit},
+            {"$group": {"_id": "$language", "count": {"$sum": 1}}}
+        ]):
+            if row["_id"]:
+                counts[row["_id"]] = counts.get(row["_id"], 0) + row["count"]
+    except Exception as e:
+        print(f"✗ Error getting user language counts: {str(e)}")
+    return counts
+
+
+def get_chat_messages_after(chat_id, after=None):
+    """Messages of a chat session newer than `after` (all if None), oldest first"""
+    pending = pending_chat_messages(chat_id, after)
+    legacy = []
+    if CHAT_LEGACY_READS:
+        query = {"chat_id": chat_id}
+        if after is not None:
+            query["timestamp"] = {"$gt": after}
+        legacy = list(chat_collection.find(query, {"role": 1, "content": 1, "timestamp": 1})
+                      .sort([("timestamp", -1), ("_id", -1)]))
+    query = {"chat_id": chat_id}
+    if after is not None:
+        query["last_at"] = {"$gt": after}
+    # Documents newer than `after` may also hold older turns: `floor` drops them
+    turns = NewestFirst(chat_turns_collection.find(query).sort(TURN_ORDER), bucket_messages, floor=after)
+    messages = [
+        {"role": msg["role"], "content": msg["content"], "timestamp": msg["timestamp"]}
+        for msg in merge_newest(pending, legacy, turns)
+    ]
+    messages.reverse()
+    return messages
+
+
+def set_chat_summary(chat_id, summary, summary_through, previous_through=None):
+    """
+    Store a new rolling summary, only if nobody else advanced it meanwhile.
+    Returns True if the summary was written.
+    """
+    result = chat_sessions_collection.update_one(
+        {"_id": ObjectId(chat_id), "summary_through": previous_through},
+        {"$set": {
+            "summary": summary,
+            "summary_through": summary_through,
+            "summary_updated_at": datetime.now(timezone.utc)
+        }}
+    )
+    return result.modified_count == 1
+
+
+def update_chat_session(chat_id):
+    """Update the updated_at timestamp of a chat session (written behind)"""
+    try:
+        if chat_writer.touch_session(chat_id, datetime.now(timezone.utc)):
+            chat_writer.flush(raise_errors=True)
         print(f"✓ Chat session updated: {chat_id}")
     except Exception as e:
         print(f"✗ Error updating chat session: {str(e)}")
         raise
 
 
+def delete_chat_messages(query):
+    """Delete the chat_turns and chat_history documents matching `query`; returns the number of messages deleted"""
+    stored = next(chat_turns_collection.aggregate([
+        {"$match": query},
+        {"$group": {"_id": None, "messages": {"$sum": "$messages"}}}
+    ]), None)
+    turns_result = chat_turns_collection.delete_many(query)
+    legacy_result = chat_collection.delete_many(query)
+    turn_messages_deleted = stored["messages"] if stored and turns_result.deleted_count else 0
+    return turn_messages_deleted + legacy_result.deleted_count
+
+
 def delete_chat_session(chat_id, user_id):
     """Delete a chat session and all its messages"""
     try:
+        # Buffered turns of this chat must not land after the delete
+        chat_writer.flush(raise_errors=True)
+
         # Delete all messages in this chat
-        chat_collection.delete_many({
+        deleted_messages = delete_chat_messages({
             "chat_id": chat_id,
             "user_id": user_id
         })
@@ -240,6 +782,8 @@ def delete_chat_session(chat_id, user_id):
             "_id": ObjectId(chat_id),
             "user_id": user_id
         })
+        stats.record(removed={"chat_messages": deleted_messages,
+                              "chat_sessions": result.deleted_count})
         
         print(f"✓ Chat session deleted: {chat_id}")
         return result.deleted_count > 0
@@ -265,14 +809,16 @@ def generate_chat_title(message, language):
 def save_feedback(name, email, message, user_id=None):
     """Save user feedback to database"""
     try:
-        result = feedback_collection.insert_one({
+        feedback = {
             "name": name,
             "email": email,
             "message": message,
             "user_id": user_id,
             "status": "new",  # new, in-progress, resolved
             "timestamp": datetime.now(timezone.utc)
-        })
+        }
+        result = feedback_collection.insert_one(feedback)
+        stats.record(created=[("feedbacks", feedback["timestamp"])])
         print(f"✓ Feedback saved from: {name}, ID: {result.inserted_id}")
         return result.inserted_id
     except Exception as e:
@@ -0,0 +1,166 @@
+"""
+On-box agriculture-domain classifier.
+
+Decides whether a query is in scope for AgriGPT without an LLM round trip:
+a multinomial naive Bayes model over character n-grams (2-4, per word) and
+whole words, trained at first use from the bundled data in
+data/domain_classifier/:
+
+    lexicon.json   agriculture / off-topic terms for all 13 languages
+    train.jsonl    labelled sample queries ({"text", "label", "language"})
+    heldout.jsonl  held-out queries for the accuracy report (never trained on)
+
+Labels: "agri" (farming questions, greetings and questions about AgriGPT)
+and "other" (everything AgriGPT declines). Character n-grams work across
+scripts without tokenizers, so one model covers every language in
+LANGUAGE_MAP. Prediction is a handful of dict lookups - microseconds.
+
+Features never seen in training are ignored; when too few of a query's
+features are known (unfamiliar wording, romanized text, other language),
+the confidence shrinks towards 0.5 and callers fall back to the LLM.
+"""
+
+import json
+import math
+import os
+import threading
+import unicodedata
+from utils.config import DOMAIN_CLASSIFIER_MIN_CONFIDENCE
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "domain_classifier")
+
+LABELS = ("agri", "other")
+NGRAM_RANGE = (2, 4)
+LEXICON_WEIGHT = 2     # a lexicon term counts as much as two sample queries
+SMOOTHING = 0.5        # additive smoothing of n-gram counts
+CALIBRATION = 4.0      # scales the mean log-likelihood ratio into a probability
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and symbols (keep combining vowel signs), collapse spaces"""
+    chars = []
+    for ch in unicodedata.normalize("NFC", text.lower()):
+        category = unicodedata.category(ch)
+        chars.append(" " if category[0] in ("P", "S", "Z", "C") else ch)
+    return " ".join("".join(chars).split())
+
+
+def extract_features(text: str) -> list:
+    """Character n-grams of every space-padded word, plus the words themselves"""
+    features = []
+    for word in normalize_text(text).split():
+        features.append("w:" + word)
+        padded = f" {word} "
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+            for i in range(len(padded) - n + 1):
+                features.append(padded[i:i + n])
+    return features
+
+
+def load_samples(split: str) -> list:
+    """Labelled samples of a split ("train" / "heldout")"""
+    with open(os.path.join(DATA_DIR, f"{split}.jsonl"), encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_lexicon() -> dict:
+    with open(os.path.join(DATA_DIR, "lexicon.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class DomainClassifier:
+    def __init__(self):
+        self._llr = {}          # feature -> log P(f|agri) - log P(f|other)
+        self._prior_llr = 0.0
+
+    def train(self, samples: list, lexicon: dict = None):
+        counts = {label: {} for label in LABELS}
+        docs = {label: 0 for label in LABELS}
+
+        def add(text, label, weight):
+            docs[label] += weight
+            for feature in extract_features(text):
+                counts[label][feature] = counts[label].get(feature, 0) + weight
+
+        for sample in samples:
+            add(sample["text"], sample["label"], 1)
+        for terms in (lexicon or {}).values():
+            for label in LABELS:
+                for term in terms.get(label, []):
+                    add(term, label, LEXICON_WEIGHT)
+
+        vocabulary = set(counts["agri"]) | set(counts["other"])
+        totals = {label: sum(counts[label].values()) + SMOOTHING * len(vocabulary) for label in LABELS}
+        self._llr = {
+            feature: math.log((counts["agri"].get(feature, 0) + SMOOTHING) / totals["agri"])
+                     - math.log((counts["other"].get(feature, 0) + SMOOTHING) / totals["other"])
+            for feature in vocabulary
+        }
+        self._prior_llr = math.log(docs["agri"] / docs["other"])
+        return self
+
+    def predict(self, text: str) -> tuple:
+        """
+        Returns (label, confidence) with confidence in [0.5, 1.0].
+        Low coverage (few known features) pulls confidence towards 0.5.
+        """
+        features = extract_features(text)
+        known = [self._llr[f] for f in features if f in self._llr]
+        if not known:
+            return "other", 0.5
+
+        score = self._prior_llr / len(known) + sum(known) / len(known)
+        p_agri = 1 / (1 + math.exp(-max(-30.0, min(30.0, score * CALIBRATION))))
+        coverage = len(known) / len(features)
+
+        label = "agri" if p_agri >= 0.5 else "other"
+        confidence = max(p_agri, 1 - p_agri)
+        return label, 0.5 + (confidence - 0.5) * coverage
+
+
+# ==================== SHARED INSTANCE ====================
+
+_classifier = None
+_classifier_lock = threading.Lock()
+_stats = {"local_agri": 0, "local_other": 0, "llm_fallback": 0}
+
+
+def get_classifier() -> DomainClassifier:
+    """The bundled model, trained on first use (a few milliseconds)"""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = DomainClassifier().train(load_samples("train"), load_lexicon())
+                print("✓ Domain classifier trained")
+    return _classifier
+
+
+def classify_domain(text: str) -> tuple:
+    """(label, confidence) for a query - see DomainClassifier.predict"""
+    return get_classifier().predict(text)
+
+
+def is_agriculture_query(text: str, llm_check=None, min_confidence: float = DOMAIN_CLASSIFIER_MIN_CONFIDENCE) -> bool:
+    """
+    True if the query is in scope for AgriGPT.
+    Decided locally when the classifier is confident, otherwise by llm_check(text)
+    (if given) - the LLM is only consulted for the uncertain cases.
+    """
+    label, confidence = classify_domain(text)
+    if confidence >= min_confidence or llm_check is None:
+        _stats["local_" + label] += 1
+        return label == "agri"
+
+    _stats["llm_fallback"] += 1
+    return llm_check(text)
+
+
+def get_domain_classifier_stats() -> dict:
+    """How many queries were decided locally vs. by the LLM"""
+    decided = sum(_stats.values())
+    return {
+        **_stats,
+        "min_confidence": DOMAIN_CLASSIFIER_MIN_CONFIDENCE,
+        "local_rate": round((decided - _stats["llm_fallback"]) / decided, 3) if decided else None
+    }
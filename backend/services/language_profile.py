@@ -0,0 +1,127 @@
+"""
+Per-user language profile: the Whisper language hint for voice input.
+
+Almost every farmer speaks one language consistently. The profile counts
+the languages of a user's latest LANGUAGE_PROFILE_HISTORY messages
+(chat_history, voice and text) and chat sessions; when one language holds
+LANGUAGE_PROFILE_MIN_SHARE of at least LANGUAGE_PROFILE_MIN_SAMPLES entries,
+it is passed to Whisper as `language`, which skips the language
+identification pass and avoids mis-detections on short clips.
+
+A hinted transcript is checked before it is used; it is redone with
+auto-detection when
+  - it is empty although there was speech,
+  - its script does not match the hinted language (the farmer switched
+    language), or
+  - its average log-probability is below LANGUAGE_HINT_MIN_LOGPROB (forced
+    decoding of the wrong language scores poorly).
+The user's cached profile is then dropped so it is rebuilt from the new turn.
+
+Profiles are cached per process for LANGUAGE_PROFILE_TTL_SECONDS.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from services.db_service import get_user_language_counts
+from services.language_service import LANGUAGE_MAP, LANGUAGE_CODES, detect_script, script_of
+from utils.config import (
+    LANGUAGE_PROFILE_ENABLED,
+    LANGUAGE_PROFILE_TTL_SECONDS,
+    LANGUAGE_PROFILE_HISTORY,
+    LANGUAGE_PROFILE_MIN_SAMPLES,
+    LANGUAGE_PROFILE_MIN_SHARE,
+    LANGUAGE_HINT_MIN_LOGPROB,
+    LANGUAGE_SESSION_CACHE_SIZE
+)
+
+# Languages of LANGUAGE_MAP that Whisper can be told to decode (it has no Odia)
+WHISPER_LANGUAGES = {"en", "hi", "bn", "ta", "te", "kn", "ml", "mr", "gu", "pa", "ur", "as"}
+
+_profiles = OrderedDict()   # user_id -> (expires_at, profile)
+_lock = threading.Lock()
+_counters = {"hinted": 0, "confirmed": 0, "fallback": 0, "no_profile": 0}
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def language_code(value):
+    """"hi" or "Hindi" -> "hi"; None for anything else"""
+    if value in LANGUAGE_MAP:
+        return value
+    return LANGUAGE_CODES.get(value)
+
+
+def build_language_profile(counts: dict) -> dict:
+    """{"language", "share", "samples"} from {stored language value: count}"""
+    totals = {}
+    for value, count in counts.items():
+        code = language_code(value)
+        if code:
+            totals[code] = totals.get(code, 0) + count
+    samples = sum(totals.values())
+    if not samples:
+        return {"language": None, "share": 0.0, "samples": 0}
+    language = max(totals, key=totals.get)
+    return {"language": language, "share": round(totals[language] / samples, 3), "samples": samples}
+
+
+def get_user_language_profile(user_id: str) -> dict:
+    now = time.monotonic()
+    with _lock:
+        cached = _profiles.get(user_id)
+        if cached and cached[0] > now:
+            _profiles.move_to_end(user_id)
+            return cached[1]
+
+    profile = build_language_profile(get_user_language_counts(user_id, LANGUAGE_PROFILE_HISTORY))
+    with _lock:
+        _profiles[user_id] = (now + LANGUAGE_PROFILE_TTL_SECONDS, profile)
+        _profiles.move_to_end(user_id)
+        while len(_profiles) > LANGUAGE_SESSION_CACHE_SIZE:
+            _profiles.popitem(last=False)
+    return profile
+
+
+def forget_user_language_profile(user_id: str):
+    with _lock:
+        _profiles.pop(user_id, None)
+
+
+def transcription_language_hint(user_id: str):
+    """Whisper language code to force for this user, or None to auto-detect"""
+    if not LANGUAGE_PROFILE_ENABLED or not user_id:
+        return None
+    profile = get_user_language_profile(user_id)
+    if (profile["language"] in WHISPER_LANGUAGES
+            and profile["samples"] >= LANGUAGE_PROFILE_MIN_SAMPLES
+            and profile["share"] >= LANGUAGE_PROFILE_MIN_SHARE):
+        _count("hinted")
+        return profile["language"]
+    _count("no_profile")
+    return None
+
+
+def hinted_transcript_ok(transcript: dict, hint: str) -> bool:
+    """Low-confidence check for a transcript decoded with a forced language"""
+    text = transcript["text"]
+    if not text:
+        # Nothing decoded because there was no speech: auto-detection would not do better
+        ok = not transcript["audio_seconds"]
+    else:
+        script = detect_script(text)
+        expected = script_of(LANGUAGE_MAP[hint])
+        logprob = transcript.get("avg_logprob")
+        ok = (script is None or expected is None or script == expected) and (
+            logprob is None or logprob >= LANGUAGE_HINT_MIN_LOGPROB
+        )
+    _count("confirmed" if ok else "fallback")
+    return ok
+
+
+def get_language_hint_stats() -> dict:
+    with _lock:
+        return {**_counters, "cached_profiles": len(_profiles)}
@@ -0,0 +1,224 @@
+"""
+Language detection shared by chat, report and voice.
+
+1. Script table: every letter is mapped to its Unicode script with one dict
+   lookup on its 128-code-point block. Scripts used by a single language in
+   LANGUAGE_MAP (Odia, Tamil, Telugu, Kannada, Malayalam, Gujarati, Gurmukhi,
+   Arabic) decide the language directly. Indic letters win over Latin ones, so
+   "NPK खाद कितना?" is Hindi.
+2. Same-script ambiguity - Hindi vs Marathi (Devanagari), Bengali vs Assamese
+   (Bengali script), English vs romanized Hindi (Latin) - is settled by a
+   compact character n-gram model trained at first use from
+   data/language_detector/ngram_corpus.json. The first language of a script
+   is the default; another one must win by NGRAM_MARGIN.
+3. Sessions: resolve_language() keeps the language already known for a chat
+   session (chat_sessions.language, memoized per chat_id) as long as the
+   script of the new message matches it, so short or mixed follow-ups do not
+   flip the reply language.
+
+Deterministic, no profiles to load, no third-party dependency.
+"""
+
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from utils.config import LANGUAGE_SESSION_CACHE_SIZE
+
+LANGUAGE_MAP = {
+    "en": "English",
+    "hi": "Hindi",
+    "bn": "Bengali",
+    "or": "Odia",
+    "ta": "Tamil",
+    "te": "Telugu",
+    "kn": "Kannada",
+    "ml": "Malayalam",
+    "mr": "Marathi",
+    "gu": "Gujarati",
+    "pa": "Punjabi",
+    "ur": "Urdu",
+    "as": "Assamese"
+}
+LANGUAGE_CODES = {name: code for code, name in LANGUAGE_MAP.items()}
+
+DEFAULT_LANGUAGE = "English"
+
+# Unicode block (code point >> 7) -> script
+_BLOCK_SCRIPTS = {
+    0x0600 >> 7: "Arabic",
+    0x0680 >> 7: "Arabic",
+    0x0900 >> 7: "Devanagari",
+    0x0980 >> 7: "Bengali",
+    0x0A00 >> 7: "Gurmukhi",
+    0x0A80 >> 7: "Gujarati",
+    0x0B00 >> 7: "Odia",
+    0x0B80 >> 7: "Tamil",
+    0x0C00 >> 7: "Telugu",
+    0x0C80 >> 7: "Kannada",
+    0x0D00 >> 7: "Malayalam",
+}
+
+# Languages written in each script; the first one is the default
+SCRIPT_LANGUAGES = {
+    "Latin": ("English", "Hindi"),
+    "Devanagari": ("Hindi", "Marathi"),
+    "Bengali": ("Bengali", "Assamese"),
+    "Gurmukhi": ("Punjabi",),
+    "Gujarati": ("Gujarati",),
+    "Odia": ("Odia",),
+    "Tamil": ("Tamil",),
+    "Telugu": ("Telugu",),
+    "Kannada": ("Kannada",),
+    "Malayalam": ("Malayalam",),
+    "Arabic": ("Urdu",),
+}
+
+CORPUS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "language_detector", "ngram_corpus.json"
+)
+NGRAM_MAX = 3
+NGRAM_MARGIN = 1.5   # log-likelihood lead (nats) a non-default language needs
+
+
+def detect_script(text: str):
+    """Dominant script of the letters in text (Indic before Latin), or None if there are none"""
+    counts = {}
+    latin = 0
+    for ch in text:
+        if ch < "\x80":
+            if ch.isalpha():
+                latin += 1
+            continue
+        script = _BLOCK_SCRIPTS.get(ord(ch) >> 7)
+        if script is not None:
+            counts[script] = counts.get(script, 0) + 1
+    if counts:
+        return max(counts, key=counts.get)
+    return "Latin" if latin else None
+
+
+def _ngrams(text: str) -> list:
+    features = []
+    for word in text.lower().split():
+        features.append("w:" + word)
+        padded = f" {word} "
+        for n in range(1, NGRAM_MAX + 1):
+            for i in range(len(padded) - n + 1):
+                features.append(padded[i:i + n])
+    return features
+
+
+class NgramModel:
+    """Per-script naive Bayes over character 1-3-grams and words"""
+
+    def __init__(self, samples: dict):
+        self.languages = tuple(samples)
+        counts = {language: {} for language in self.languages}
+        for language, texts in samples.items():
+            for text in texts:
+                for feature in _ngrams(text):
+                    counts[language][feature] = counts[language].get(feature, 0) + 1
+
+        vocabulary = set()
+        for language_counts in counts.values():
+            vocabulary.update(language_counts)
+        log_totals = [math.log(sum(counts[l].values()) + 0.5 * len(vocabulary)) for l in self.languages]
+        # feature -> log P(feature | language) per language, in self.languages order
+        self._table = {
+            feature: tuple(
+                math.log(counts[language].get(feature, 0) + 0.5) - log_total
+                for language, log_total in zip(self.languages, log_totals)
+            )
+            for feature in vocabulary
+        }
+
+    def scores(self, text: str) -> dict:
+        totals = [0.0] * len(self.languages)
+        for feature in _ngrams(text):
+            row = self._table.get(feature)
+            if row is not None:
+                for i, log_prob in enumerate(row):
+                    totals[i] += log_prob
+        return dict(zip(self.languages, totals))
+
+    def predict(self, text: str) -> str:
+        scores = self.scores(text)
+        default = self.languages[0]
+        best = max(scores, key=scores.get)
+        return best if scores[best] - scores[default] >= NGRAM_MARGIN else default
+
+
+_models = None
+_models_lock = threading.Lock()
+
+
+def _get_models() -> dict:
+    """Script -> NgramModel for the ambiguous scripts, built on first use"""
+    global _models
+    if _models is None:
+        with _models_lock:
+            if _models is None:
+                with open(CORPUS_PATH, encoding="utf-8") as f:
+                    corpus = json.load(f)
+                _models = {script: NgramModel(samples) for script, samples in corpus.items()}
+    return _models
+
+
+def detect_language(text: str, default: str = DEFAULT_LANGUAGE) -> str:
+    """Language name (a LANGUAGE_MAP value) of text; default if it has no letters"""
+    script = detect_script(text or "")
+    if script is None:
+        return default
+
+    candidates = SCRIPT_LANGUAGES[script]
+    if len(candidates) == 1:
+        return candidates[0]
+    return _get_models()[script].predict(text)
+
+
+def script_of(language: str):
+    """Script a language is written in (romanized Hindi counts as a script change)"""
+    for script, languages in SCRIPT_LANGUAGES.items():
+        if script != "Latin" and language in languages:
+            return script
+    return "Latin" if language == "English" else None
+
+
+def resolve_language(text: str, known_language: str = None) -> str:
+    """
+    Language of a message in a conversation: the already known language
+    (session or speech-recognition hint) while the script matches, otherwise
+    detected from the text.
+    """
+    if known_language in LANGUAGE_CODES:
+        script = detect_script(text or "")
+        if script is None or script == script_of(known_language):
+            return known_language
+    return detect_language(text, default=known_language if known_language in LANGUAGE_CODES else DEFAULT_LANGUAGE)
+
+
+# ==================== PER-SESSION MEMO ====================
+
+_session_languages = OrderedDict()  # chat_id -> language of its latest message
+_session_lock = threading.Lock()
+
+
+def get_session_language(chat_id: str):
+    """Memoized language of a chat session, or None if this process has not seen it"""
+    with _session_lock:
+        language = _session_languages.get(chat_id)
+        if language is not None:
+            _session_languages.move_to_end(chat_id)
+        return language
+
+
+def remember_session_language(chat_id: str, language: str):
+    if not chat_id:
+        return
+    with _session_lock:
+        _session_languages[chat_id] = language
+        _session_languages.move_to_end(chat_id)
+        while len(_session_languages) > LANGUAGE_SESSION_CACHE_SIZE:
+            _session_languages.popitem(last=False)
@@ -0,0 +1,41 @@
+"""Error types raised by the LLM layer (services/llm_service.py)"""
+
+import math
+
+
+class LLMError(Exception):
+    """Base class for LLM layer errors the routes translate into HTTP responses"""
+
+
+class LLMOverloadedError(LLMError):
+    """
+    The LLM scheduler refused or dropped the call (queue full or wait deadline
+    exceeded). Routes answer HTTP 429 with a Retry-After header.
+    """
+
+    def __init__(self, lane, reason, retry_after):
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+        super().__init__(f"LLM overloaded ({lane}): {reason}, retry after {self.retry_after}s")
+
+
+class LLMUnavailableError(LLMError):
+    """
+    The upstream LLM failed: retries exhausted or the endpoint deadline passed.
+    Routes answer HTTP 503 with a Retry-After header instead of a fallback reply.
+    """
+
+    def __init__(self, lane, reason, retry_after=5):
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+        super().__init__(f"LLM unavailable ({lane}): {reason}")
+
+
+class LLMTimeoutError(LLMUnavailableError):
+    """The call did not complete within its lane deadline"""
+
+
+class LLMCircuitOpenError(LLMUnavailableError):
+    """The circuit breaker is open - the call failed fast without reaching the upstream"""
@@ -0,0 +1,324 @@
+"""
+LLM providers behind llm_service.get_ai_response.
+
+    gemini - Google Gemini through google.generativeai (production)
+    stub   - deterministic local stub for offline load testing: configurable
+             latency distribution, streaming, error injection and canned
+             multilingual answers. No network, no API key, no quota.
+
+Select one with LLM_PROVIDER in .env. Every provider implements generate(),
+stream() and generate_async() with the same arguments; history is the simple
+[{"role": "user"/"assistant", "message": "..."}] format used across the app,
+and timeout (seconds) bounds a single request. generate() and
+generate_async() accept a response_schema (JSON schema dict) to request
+schema-constrained JSON output instead of free text. is_retryable() tells the retry
+policy in llm_service which errors are transient upstream failures.
+"""
+
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from utils.config import (
+    GEMINI_API_KEY,
+    LLM_STUB_LATENCY_MS,
+    LLM_STUB_ERROR_RATE,
+    LLM_STUB_STREAM_CHUNK_MS,
+    LLM_STUB_SEED
+)
+
+
+class LLMProviderError(Exception):
+    """Upstream provider failure (raised by the stub when injecting errors)"""
+
+
+class LLMProvider:
+    name = "base"
+    model_name = "base"
+
+    def generate(self, prompt: str, history: list = None, timeout: float = None,
+                 response_schema: dict = None) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, history: list = None, timeout: float = None):
+        raise NotImplementedError
+
+    async def generate_async(self, prompt: str, history: list = None, timeout: float = None,
+                             response_schema: dict = None) -> str:
+        raise NotImplementedError
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Transient failure (timeout, connection, 5xx, 429) worth retrying"""
+        return isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError, LLMProviderError))
+
+
+# ==================== GEMINI ====================
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str, system_instruction: str):
+        import warnings
+        import google.generativeai as genai
+
+        # Suppress deprecation warning for now (TODO: migrate to google.genai in future)
+        warnings.filterwarnings(
+            'ignore',
+            category=FutureWarning,
+            module='google.generativeai'
+        )
+
+        from google.api_core import exceptions as api_exceptions
+
+        genai.configure(api_key=api_key)
+        self._retryable_errors = (
+            api_exceptions.ServiceUnavailable,
+            api_exceptions.InternalServerError,
+            api_exceptions.DeadlineExceeded,
+            api_exceptions.TooManyRequests,
+            api_exceptions.ResourceExhausted
+        )
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(
+            model_name=model_name,
+            system_instruction=system_instruction
+        )
+
+    @staticmethod
+    def _to_gemini_history(history: list) -> list:
+        """
+        Format history for Gemini API.
+        Gemini expects: [{"role": "user", "parts": ["text"]}, {"role": "model", "parts": ["text"]}, ...]
+        """
+        gemini_history = []
+        for msg in history:
+            if msg["role"] == "user":
+                gemini_history.append({"role": "user", "parts": [msg["message"]]})
+            elif msg["role"] == "assistant":
+                gemini_history.append({"role": "model", "parts": [msg["message"]]})
+        return gemini_history
+
+    @staticmethod
+    def _request_options(timeout):
+        return {"timeout": timeout} if timeout else None
+
+    @staticmethod
+    def _generation_config(response_schema):
+        """JSON mode: the model must return a document matching the schema"""
+        if not response_schema:
+            return None
+        return {"response_mime_type": "application/json", "response_schema": response_schema}
+
+    def is_retryable(self, error):
+        return isinstance(error, self._retryable_errors) or super().is_retryable(error)
+
+    def generate(self, prompt, history=None, timeout=None, response_schema=None):
+        options = self._request_options(timeout)
+        config = self._generation_config(response_schema)
+        if history:
+            # Start chat with history, send current message with context
+            chat = self.model.start_chat(history=self._to_gemini_history(history))
+            response = chat.send_message(prompt, generation_config=config, request_options=options)
+        else:
+            # No history, single message
+            response = self.model.generate_content(prompt, generation_config=config, request_options=options)
+        return response.text.strip()
+
+    def stream(self, prompt, history=None, timeout=None):
+        options = self._request_options(timeout)
+        if history:
+            chat = self.model.start_chat(history=self._to_gemini_history(history))
+            response = chat.send_message(prompt, stream=True, request_options=options)
+        else:
+            response = self.model.generate_content(prompt, stream=True, request_options=options)
+
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+    async def generate_async(self, prompt, history=None, timeout=None, response_schema=None):
+        options = self._request_options(timeout)
+        config = self._generation_config(response_schema)
+        if history:
+            chat = self.model.start_chat(history=self._to_gemini_history(history))
+            response = await chat.send_message_async(prompt, generation_config=config, request_options=options)
+        else:
+            response = await self.model.generate_content_async(
+                prompt, generation_config=config, request_options=options
+            )
+        return response.text.strip()
+
+
+# ==================== LOCAL STUB ====================
+
+# Canned agricultural answer per language
+STUB_ANSWERS = {
+    "English": "🌾 For a healthy crop, test your soil first, apply balanced NPK fertilizer in split doses, and irrigate at critical growth stages.",
+    "Hindi": "🌾 अच्छी फसल के लिए पहले मिट्टी की जांच करें, संतुलित एनपीके खाद किस्तों में डालें और महत्वपूर्ण अवस्थाओं में सिंचाई करें।",
+    "Odia": "🌾 ଭଲ ଫସଲ ପାଇଁ ପ୍ରଥମେ ମାଟି ପରୀକ୍ଷା କରନ୍ତୁ, ସନ୍ତୁଳିତ NPK ସାର କିସ୍ତିରେ ଦିଅନ୍ତୁ ଏବଂ ଗୁରୁତ୍ୱପୂର୍ଣ୍ଣ ସମୟରେ ଜଳସେଚନ କରନ୍ତୁ।",
+    "Bengali": "🌾 ভালো ফসলের জন্য প্রথমে মাটি পরীক্ষা করুন, সুষম এনপিকে সার কিস্তিতে দিন এবং গুরুত্বপূর্ণ পর্যায়ে সেচ দিন।",
+    "Tamil": "🌾 நல்ல விளைச்சலுக்கு முதலில் மண் பரிசோதனை செய்து, சமச்சீர் NPK உரத்தை பிரித்து இட்டு, முக்கிய பருவங்களில் நீர் பாய்ச்சுங்கள்.",
+    "Telugu": "🌾 మంచి పంట కోసం ముందుగా మట్టి పరీక్ష చేయించి, సమతుల్య NPK ఎరువును విడతలుగా వేసి, కీలక దశల్లో నీరు పెట్టండి.",
+    "Kannada": "🌾 ಉತ್ತಮ ಬೆಳೆಗಾಗಿ ಮೊದಲು ಮಣ್ಣು ಪರೀಕ್ಷೆ ಮಾಡಿ, ಸಮತೋಲಿತ NPK ಗೊಬ್ಬರವನ್ನು ಹಂತಗಳಲ್ಲಿ ಹಾಕಿ ಮತ್ತು ಮುಖ್ಯ ಹಂತಗಳಲ್ಲಿ ನೀರು ಹಾಯಿಸಿ.",
+    "Malayalam": "🌾 നല്ല വിളവിന് ആദ്യം മണ്ണ് പരിശോധിക്കുക, സന്തുലിതമായ NPK വളം ഘട്ടങ്ങളായി നൽകുക, പ്രധാന ഘട്ടങ്ങളിൽ ജലസേചനം നടത്തുക.",
+    "Marathi": "🌾 चांगल्या पिकासाठी आधी माती परीक्षण करा, संतुलित एनपीके खत हप्त्यांमध्ये द्या आणि महत्त्वाच्या अवस्थेत पाणी द्या.",
+    "Gujarati": "🌾 સારા પાક માટે પહેલા જમીનની ચકાસણી કરો, સંતુલિત NPK ખાતર હપ્તામાં આપો અને મહત્વના તબક્કે પિયત આપો.",
+    "Punjabi": "🌾 ਚੰਗੀ ਫ਼ਸਲ ਲਈ ਪਹਿਲਾਂ ਮਿੱਟੀ ਦੀ ਜਾਂਚ ਕਰੋ, ਸੰਤੁਲਿਤ NPK ਖਾਦ ਕਿਸ਼ਤਾਂ ਵਿੱਚ ਪਾਓ ਅਤੇ ਜ਼ਰੂਰੀ ਪੜਾਵਾਂ ਤੇ ਸਿੰਚਾਈ ਕਰੋ।",
+    "Urdu": "🌾 اچھی فصل کے لیے پہلے مٹی کا ٹیسٹ کریں، متوازن این پی کے کھاد قسطوں میں ڈالیں اور اہم مراحل پر آبپاشی کریں۔",
+    "Assamese": "🌾 ভাল শস্যৰ বাবে প্ৰথমে মাটি পৰীক্ষা কৰক, সুষম NPK সাৰ কিস্তিত দিয়ক আৰু গুৰুত্বপূৰ্ণ সময়ত জলসিঞ্চন কৰক।"
+}
+
+# Unicode block -> language, for prompts that do not name a language (voice)
+_SCRIPT_LANGUAGES = (
+    ("଀", "୿", "Odia"),
+    ("ঀ", "৿", "Bengali"),
+    ("஀", "௿", "Tamil"),
+    ("ఀ", "౿", "Telugu"),
+    ("ಀ", "೿", "Kannada"),
+    ("ഀ", "ൿ", "Malayalam"),
+    ("઀", "૿", "Gujarati"),
+    ("਀", "੿", "Punjabi"),
+    ("؀", "ۿ", "Urdu"),
+    ("ऀ", "ॿ", "Hindi"),
+)
+
+_LANGUAGE_PATTERNS = (
+    re.compile(r"ENTIRELY in (\w+) language"),
+    re.compile(r"write in (\w+) only"),
+    re.compile(r"Respond ONLY in (\w+)"),
+)
+
+
+def parse_latency_spec(spec: str):
+    """
+    Parse a latency distribution (milliseconds) into a sampler(rng) -> seconds.
+
+        fixed:800            always 800 ms
+        uniform:300,2000     uniform between 300 and 2000 ms
+        normal:1200,300      mean 1200 ms, std-dev 300 ms (clipped at 0)
+        lognormal:1200,0.5   median 1200 ms, sigma 0.5 (long tail, like real LLMs)
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    kind = kind.strip().lower()
+
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1])) / 1000
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class StubProvider(LLMProvider):
+    """
+    Deterministic offline provider for load testing.
+
+    Answers are canned per language (detected from the language instruction in
+    the prompt, or the script of the text), JSON-mode calls get a document
+    matching the requested schema and YES/NO classification prompts get "YES". Latency is sampled from
+    a configurable distribution; a fraction of calls can fail on purpose.
+    """
+    name = "stub"
+
+    def __init__(self, latency="lognormal:1200,0.5", error_rate=0.0, stream_chunk_ms=40, seed=None):
+        self.model_name = "agrigpt-stub"
+        self._sample_latency = parse_latency_spec(latency)
+        self.error_rate = error_rate
+        self.stream_chunk_delay = stream_chunk_ms / 1000
+        self._rng = random.Random(seed)
+
+    @staticmethod
+    def detect_prompt_language(prompt: str) -> str:
+        for pattern in _LANGUAGE_PATTERNS:
+            match = pattern.search(prompt)
+            if match and match.group(1) in STUB_ANSWERS:
+                return match.group(1)
+        for ch in prompt:
+            for low, high, language in _SCRIPT_LANGUAGES:
+                if low <= ch <= high:
+                    return language
+        return "English"
+
+    @classmethod
+    def _schema_instance(cls, schema: dict, answer: str):
+        """A value matching a (Gemini subset) JSON schema, filled with the canned answer"""
+        kind = schema.get("type", "string").lower()
+        if kind == "object":
+            return {key: cls._schema_instance(sub, answer) for key, sub in schema.get("properties", {}).items()}
+        if kind == "array":
+            count = schema.get("minItems") or 4
+            return [f"{cls._schema_instance(schema.get('items', {}), answer)} ({i + 1})" for i in range(count)]
+        return answer[2:]
+
+    def respond(self, prompt: str, response_schema: dict = None) -> str:
+        """The canned answer for a prompt (no latency, no errors)"""
+        if "Answer ONLY YES or NO" in prompt:
+            return "YES"
+
+        language = self.detect_prompt_language(prompt)
+        answer = STUB_ANSWERS[language]
+
+        if response_schema:
+            return json.dumps(self._schema_instance(response_schema, answer), ensure_ascii=False)
+        return answer
+
+    def _maybe_fail(self):
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise LLMProviderError("Injected stub provider error")
+
+    @staticmethod
+    def _bounded(latency, timeout):
+        """Latency to wait, and whether the request times out first"""
+        if timeout is not None and latency > timeout:
+            return timeout, True
+        return latency, False
+
+    def generate(self, prompt, history=None, timeout=None, response_schema=None):
+        latency, timed_out = self._bounded(self._sample_latency(self._rng), timeout)
+        time.sleep(latency)
+        if timed_out:
+            raise TimeoutError("Stub provider request timed out")
+        self._maybe_fail()
+        return self.respond(prompt, response_schema)
+
+    def stream(self, prompt, history=None, timeout=None):
+        # Time to first token is a fraction of the full latency, then word by word
+        latency, timed_out = self._bounded(self._sample_latency(self._rng) * 0.3, timeout)
+        time.sleep(latency)
+        if timed_out:
+            raise TimeoutError("Stub provider request timed out")
+        self._maybe_fail()
+        words = self.respond(prompt).split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.stream_chunk_delay)
+            yield word if i == 0 else " " + word
+
+    async def generate_async(self, prompt, history=None, timeout=None, response_schema=None):
+        latency, timed_out = self._bounded(self._sample_latency(self._rng), timeout)
+        await asyncio.sleep(latency)
+        if timed_out:
+            raise TimeoutError("Stub provider request timed out")
+        self._maybe_fail()
+        return self.respond(prompt, response_schema)
+
+
+def create_provider(name: str, model_name: str, system_instruction: str) -> LLMProvider:
+    """Build the provider selected by LLM_PROVIDER"""
+    if name == "gemini":
+        return GeminiProvider(GEMINI_API_KEY, model_name, system_instruction)
+    if name == "stub":
+        return StubProvider(
+            latency=LLM_STUB_LATENCY_MS,
+            error_rate=LLM_STUB_ERROR_RATE,
+            stream_chunk_ms=LLM_STUB_STREAM_CHUNK_MS,
+            seed=LLM_STUB_SEED
+        )
+    raise ValueError(f"Unknown LLM_PROVIDER: {name}")
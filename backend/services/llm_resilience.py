@@ -0,0 +1,184 @@
+"""
+Failure isolation for upstream LLM calls (used by services/llm_service.py).
+
+- CircuitBreaker:  opens when the failure rate over the last calls crosses a
+                   threshold; while open, calls fail fast with
+                   LLMCircuitOpenError. After a cool-down a few probe calls are
+                   let through (half-open) to decide whether to close again.
+- LatencyTracker:  rolling per-lane latency window, source of the p95 that
+                   triggers hedged requests.
+- HedgeStats:      how often a hedge was fired and which request won.
+- backoff_delay:   exponential backoff with full jitter for retries.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from services.llm_errors import LLMCircuitOpenError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, failure_rate=0.5, min_calls=10, window=20, open_seconds=30, half_open_probes=1, enabled=True):
+        self.enabled = enabled
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)  # True = failure
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self.times_opened = 0
+        self.short_circuited = 0
+
+    def _retry_after(self, now):
+        return max(1.0, self._opened_at + self.open_seconds - now)
+
+    def allow(self, lane="chat"):
+        """Raise LLMCircuitOpenError if the call must fail fast"""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+                self._state = HALF_OPEN
+                self._probes = 0
+
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return
+
+            self.short_circuited += 1
+            raise LLMCircuitOpenError(lane, f"circuit {self._state}", self._retry_after(now))
+
+    def open_retry_after(self):
+        """Seconds until the next probe if the circuit is open right now, else None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            if self._state != OPEN or now - self._opened_at >= self.open_seconds:
+                return None
+            return LLMCircuitOpenError("", "", self._retry_after(now)).retry_after
+
+    def cancel(self):
+        """The allowed call never reached the upstream (e.g. refused by admission control)"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                # Probe succeeded - upstream is healthy again
+                self._state = CLOSED
+                self._outcomes.clear()
+            self._outcomes.append(False)
+
+    def record_failure(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self._state == HALF_OPEN:
+                self._trip(now)
+                return
+            self._outcomes.append(True)
+            if self._state == CLOSED and len(self._outcomes) >= self.min_calls:
+                if sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                    self._trip(now)
+
+    def _trip(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self.times_opened += 1
+        print(f"⚠️ LLM circuit breaker opened for {self.open_seconds}s")
+
+    def stats(self) -> dict:
+        with self._lock:
+            state = self._state
+            if state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                state = HALF_OPEN
+            return {
+                "enabled": self.enabled,
+                "state": state,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": sum(self._outcomes),
+                "failure_rate_threshold": self.failure_rate,
+                "open_seconds": self.open_seconds,
+                "times_opened": self.times_opened,
+                "short_circuited": self.short_circuited
+            }
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per lane"""
+
+    def __init__(self, window=200, min_samples=20):
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def record(self, lane, seconds):
+        with self._lock:
+            self._samples.setdefault(lane, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, lane, q):
+        """q-th percentile latency in seconds, or None until min_samples were recorded"""
+        with self._lock:
+            samples = self._samples.get(lane)
+            if not samples or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lanes = {lane: sorted(samples) for lane, samples in self._samples.items()}
+        return {
+            lane: {
+                "samples": len(ordered),
+                "p50_s": round(ordered[len(ordered) // 2], 3),
+                "p95_s": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3)
+            }
+            for lane, ordered in lanes.items() if ordered
+        }
+
+
+class HedgeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fired = 0
+        self.skipped = 0  # hedge was due but no admission slot was free
+        self.hedge_wins = 0
+        self.primary_wins = 0
+
+    def record(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            decided = self.hedge_wins + self.primary_wins
+            return {
+                "fired": self.fired,
+                "skipped": self.skipped,
+                "hedge_wins": self.hedge_wins,
+                "primary_wins": self.primary_wins,
+                "hedge_win_rate": round(self.hedge_wins / decided, 3) if decided else None
+            }
+
+
+def backoff_delay(attempt, base_seconds, max_seconds):
+    """Full-jitter exponential backoff: uniform(0, min(max, base * 2^attempt))"""
+    return random.uniform(0, min(max_seconds, base_seconds * (2 ** attempt)))
@@ -0,0 +1,254 @@
+"""
+Admission control for upstream LLM calls.
+
+A bounded number of Gemini calls run at once. Callers beyond that wait in a
+priority queue with one lane per traffic class:
+
+    chat    - authenticated chat and voice (highest priority)
+    report  - report generation
+    trial   - trial_user traffic
+    summary - background chat session summaries (lowest priority)
+
+Each lane has a queue-depth limit and a maximum queue wait. A call is refused
+up front when its lane is full or when the estimated wait already exceeds the
+lane's deadline, and dropped if the deadline passes while it is queued. In
+both cases LLMOverloadedError carries a Retry-After estimate for HTTP 429.
+
+Freed slots are handed directly to the highest-priority waiter, so thread
+waiters (WSGI) and coroutine waiters (ASGI) share one queue.
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from services.llm_errors import LLMOverloadedError
+
+LANE_PRIORITY = {"chat": 0, "report": 1, "trial": 2, "summary": 3}
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "lane", "deadline", "granted", "event", "loop", "future")
+
+    def __init__(self, priority, seq, lane, deadline):
+        self.priority = priority
+        self.seq = seq
+        self.lane = lane
+        self.deadline = deadline
+        self.granted = False
+        self.event = None
+        self.loop = None
+        self.future = None
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def wake(self):
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class Slot:
+    """An admitted slot, released once - by the slot() block, or by whoever hand_off() gave it to"""
+
+    def __init__(self, scheduler):
+        self._scheduler = scheduler
+        self._started = time.monotonic()
+        self.handed_off = False
+
+    def hand_off(self):
+        """Keep the slot past the slot() block: the returned callable releases it (e.g. when a future finishes)"""
+        self.handed_off = True
+        return self.release
+
+    def release(self, *args):
+        self._scheduler.release(time.monotonic() - self._started)
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency, queue_limits, max_wait_seconds, initial_latency=5.0):
+        self.max_concurrency = max_concurrency
+        self.queue_limits = queue_limits
+        self.max_wait_seconds = max_wait_seconds
+        self._lock = threading.Lock()
+        self._heap = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._queued = {lane: 0 for lane in LANE_PRIORITY}
+        # Exponentially weighted average of upstream call latency
+        self._avg_latency = initial_latency
+        self.admitted = {lane: 0 for lane in LANE_PRIORITY}
+        self.rejected = {lane: 0 for lane in LANE_PRIORITY}
+        self.dropped = {lane: 0 for lane in LANE_PRIORITY}
+
+    # -------------------- internals (hold self._lock) --------------------
+    def _estimated_wait(self, priority):
+        ahead = sum(1 for w in self._heap if w.priority <= priority)
+        return (ahead + 1) * self._avg_latency / self.max_concurrency
+
+    def _try_admit(self, lane):
+        """Admit immediately, or register a waiter, or raise LLMOverloadedError"""
+        if lane not in LANE_PRIORITY:
+            raise ValueError(f"Unknown LLM lane: {lane}")
+
+        if self._in_flight < self.max_concurrency and not self._heap:
+            self._in_flight += 1
+            self.admitted[lane] += 1
+            return None
+
+        priority = LANE_PRIORITY[lane]
+        estimate = self._estimated_wait(priority)
+        if self._queued[lane] >= self.queue_limits[lane]:
+            self.rejected[lane] += 1
+            raise LLMOverloadedError(lane, "queue full", estimate)
+        if estimate > self.max_wait_seconds[lane]:
+            self.rejected[lane] += 1
+            raise LLMOverloadedError(lane, "estimated wait exceeds deadline", estimate)
+
+        waiter = _Waiter(priority, next(self._seq), lane, time.monotonic() + self.max_wait_seconds[lane])
+        heapq.heappush(self._heap, waiter)
+        self._queued[lane] += 1
+        return waiter
+
+    def _abandon(self, waiter):
+        """Waiter gave up (timeout / cancellation). Returns True if it got the slot after all."""
+        if waiter.granted:
+            return True
+        if waiter in self._heap:
+            self._heap.remove(waiter)
+            heapq.heapify(self._heap)
+            self._queued[waiter.lane] -= 1
+        self.dropped[waiter.lane] += 1
+        return False
+
+    # -------------------- public API --------------------
+    def acquire(self, lane):
+        """Block until a slot is available for this lane (threads)"""
+        with self._lock:
+            waiter = self._try_admit(lane)
+            if waiter is None:
+                return
+            waiter.event = threading.Event()
+
+        waiter.event.wait(timeout=max(0.0, waiter.deadline - time.monotonic()))
+
+        with self._lock:
+            if self._abandon(waiter):
+                self.admitted[lane] += 1
+                return
+            retry_after = self._estimated_wait(waiter.priority)
+        raise LLMOverloadedError(lane, "queue wait deadline exceeded", retry_after)
+
+    async def acquire_async(self, lane):
+        """Wait for a slot for this lane without blocking the event loop"""
+        with self._lock:
+            waiter = self._try_admit(lane)
+            if waiter is None:
+                return
+            waiter.loop = asyncio.get_running_loop()
+            waiter.future = waiter.loop.create_future()
+
+        try:
+            await asyncio.wait_for(waiter.future, timeout=max(0.0, waiter.deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            with self._lock:
+                granted = self._abandon(waiter)
+                retry_after = self._estimated_wait(waiter.priority)
+            if not granted:
+                raise LLMOverloadedError(lane, "queue wait deadline exceeded", retry_after)
+        except asyncio.CancelledError:
+            # Client went away - give back a slot that was handed over meanwhile
+            with self._lock:
+                granted = self._abandon(waiter)
+            if granted:
+                self.release()
+            raise
+
+        with self._lock:
+            self.admitted[lane] += 1
+
+    def try_acquire(self, lane):
+        """Take a slot only if one is free right now (hedged requests never queue)"""
+        with self._lock:
+            if self._in_flight < self.max_concurrency and not self._heap:
+                self._in_flight += 1
+                self.admitted[lane] += 1
+                return True
+            return False
+
+    def release(self, latency=None):
+        """Free a slot, handing it to the highest-priority live waiter"""
+        with self._lock:
+            if latency is not None:
+                self._avg_latency = 0.8 * self._avg_latency + 0.2 * latency
+
+            now = time.monotonic()
+            while self._heap:
+                waiter = heapq.heappop(self._heap)
+                self._queued[waiter.lane] -= 1
+                if waiter.deadline <= now:
+                    # Deadline already passed - wake it so it reports overload
+                    waiter.wake()
+                    continue
+                waiter.granted = True
+                waiter.wake()
+                return
+            self._in_flight -= 1
+
+    @contextmanager
+    def slot(self, lane):
+        """Hold a slot for the block; unless the block takes it over (Slot.hand_off), it is released on exit"""
+        self.acquire(lane)
+        held = Slot(self)
+        try:
+            yield held
+        finally:
+            if not held.handed_off:
+                held.release()
+
+    @asynccontextmanager
+    async def slot_async(self, lane):
+        await self.acquire_async(lane)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def overload_retry_after(self, lane):
+        """Retry-After seconds if a call on this lane would be refused right now, else None"""
+        with self._lock:
+            if self._in_flight < self.max_concurrency and not self._heap:
+                return None
+            estimate = self._estimated_wait(LANE_PRIORITY[lane])
+            if self._queued[lane] >= self.queue_limits[lane] or estimate > self.max_wait_seconds[lane]:
+                return LLMOverloadedError(lane, "", estimate).retry_after
+            return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "avg_latency_s": round(self._avg_latency, 3),
+                "lanes": {
+                    lane: {
+                        "queued": self._queued[lane],
+                        "queue_limit": self.queue_limits[lane],
+                        "max_wait_s": self.max_wait_seconds[lane],
+                        "admitted": self.admitted[lane],
+                        "rejected": self.rejected[lane],
+                        "dropped": self.dropped[lane]
+                    }
+                    for lane in LANE_PRIORITY
+                }
+            }
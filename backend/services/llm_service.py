@@ -1,15 +1,45 @@
-import warnings
-import google.generativeai as genai
-from utils.config import GEMINI_API_KEY
-
-# Suppress deprecation warning for now (TODO: migrate to google.genai in future)
-warnings.filterwarnings(
-	'ignore', 
-	category=FutureWarning, 
-	module='google.generativeai'
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeoutError
+from utils.config import (
+    LLM_PROVIDER,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_COALESCE_ENABLED,
+    LLM_COALESCE_MODE,
+    LLM_COALESCE_LEASE_SECONDS,
+    LLM_COALESCE_POLL_MS,
+    LLM_COALESCE_RESULT_TTL_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    LLM_LANE_QUEUE_LIMITS,
+    LLM_LANE_MAX_WAIT_SECONDS,
+    LLM_LANE_DEADLINE_SECONDS,
+    LLM_RETRY_MAX_ATTEMPTS,
+    LLM_RETRY_BASE_DELAY_MS,
+    LLM_RETRY_MAX_DELAY_MS,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_MIN_DELAY_MS,
+    LLM_BREAKER_ENABLED,
+    LLM_BREAKER_FAILURE_RATE,
+    LLM_BREAKER_MIN_CALLS,
+    LLM_BREAKER_WINDOW,
+    LLM_BREAKER_OPEN_SECONDS
 )
-
-genai.configure(api_key=GEMINI_API_KEY)
+from services.response_cache import ResponseCache
+from services.llm_errors import (
+    LLMError,
+    LLMOverloadedError,
+    LLMUnavailableError,
+    LLMTimeoutError,
+    LLMCircuitOpenError
+)
+from services.llm_resilience import CircuitBreaker, LatencyTracker, HedgeStats, backoff_delay
+from services.llm_scheduler import LLMScheduler
+from services.singleflight import SingleFlight, AsyncSingleFlight, MongoSingleFlight
+from services.llm_providers import create_provider
 
 SYSTEM_PROMPT = """
 You are AgriGPT 🌾, an agricultural expert chatbot designed to assist Indian farmers.
@@ -46,43 +76,485 @@ politely decline in the SAME LANGUAGE as the user by saying:
 "I am AgriGPT 🌾 and I only assist with agricultural and farming-related queries."
 """
 
-model = genai.GenerativeModel(
-    model_name="gemini-2.5-flash",
-    system_instruction=SYSTEM_PROMPT
+FALLBACK_RESPONSE = "🌾 I am AgriGPT 🌾 and I only assist with agricultural and farming-related queries."
+
+# Gemini in production, the local stub for offline load testing (LLM_PROVIDER)
+provider = create_provider(LLM_PROVIDER, "gemini-2.5-flash", SYSTEM_PROMPT)
+
+# Part of every cache key, so stub answers never leak into a Gemini cache
+MODEL_NAME = provider.model_name
+
+# Shared cache for history-free prompts (chat without context, reports, voice)
+response_cache = ResponseCache(
+    max_entries=LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=LLM_CACHE_TTL_SECONDS
 )
 
-def get_ai_response(prompt: str, chat_history: list = None) -> str:
+# Bounded concurrency with priority lanes for upstream Gemini calls
+scheduler = LLMScheduler(
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    queue_limits=LLM_LANE_QUEUE_LIMITS,
+    max_wait_seconds=LLM_LANE_MAX_WAIT_SECONDS
+)
+
+# Upstream failure isolation: the breaker fails fast while the provider is unhealthy
+breaker = CircuitBreaker(
+    failure_rate=LLM_BREAKER_FAILURE_RATE,
+    min_calls=LLM_BREAKER_MIN_CALLS,
+    window=LLM_BREAKER_WINDOW,
+    open_seconds=LLM_BREAKER_OPEN_SECONDS,
+    enabled=LLM_BREAKER_ENABLED
+)
+latency_tracker = LatencyTracker(min_samples=LLM_HEDGE_MIN_SAMPLES)
+hedge_stats = HedgeStats()
+retry_counters = {"retries": 0, "deadline_exceeded": 0, "exhausted": 0}
+
+# Hedged sync calls run primary and hedge here while the caller waits on both
+hedge_pool = ThreadPoolExecutor(
+    max_workers=LLM_MAX_CONCURRENCY * 2,
+    thread_name_prefix="llm-hedge"
+) if LLM_HEDGE_ENABLED else None
+
+# Identical concurrent history-free prompts share one upstream call
+local_flight = SingleFlight()
+async_flight = AsyncSingleFlight()
+shared_flight = None
+if LLM_COALESCE_ENABLED and LLM_COALESCE_MODE == "shared":
+    from services.db_service import db
+    from pymongo import ASCENDING
+
+    # Expired lease / result documents are removed by MongoDB
+    db.llm_inflight.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0, name="llm_inflight_ttl")
+    shared_flight = MongoSingleFlight(
+        db.llm_inflight,
+        lease_seconds=LLM_COALESCE_LEASE_SECONDS,
+        poll_interval=LLM_COALESCE_POLL_MS / 1000,
+        result_ttl=LLM_COALESCE_RESULT_TTL_SECONDS,
+        # Followers answer 429 / 503 like the leader, not the fallback reply
+        errors=(LLMOverloadedError, LLMUnavailableError, LLMTimeoutError, LLMCircuitOpenError)
+    )
+
+def _request_key(prompt: str, chat_history: list, language: str, response_schema: dict = None):
+    """Key identifying a history-free call, or None for contextual calls"""
+    if chat_history:
+        # Contextual answers depend on the conversation - never share them
+        return None
+    # JSON-mode answers must never be served to a free-text call (and vice versa)
+    model_name = f"{MODEL_NAME}+json" if response_schema else MODEL_NAME
+    return ResponseCache.make_key(prompt, language, model_name)
+
+
+def _cache_key(prompt: str, chat_history: list, language: str, response_schema: dict = None):
+    """Cache key for a call, or None if the call must not be cached"""
+    if not LLM_CACHE_ENABLED:
+        return None
+    return _request_key(prompt, chat_history, language, response_schema)
+
+
+def get_cache_stats() -> dict:
+    """Response cache counters for monitoring"""
+    return {"enabled": LLM_CACHE_ENABLED, **response_cache.stats()}
+
+
+def get_scheduler_stats() -> dict:
+    """Admission control counters for monitoring"""
+    return scheduler.stats()
+
+
+def get_overload_retry_after(lane: str = "chat"):
+    """Retry-After seconds if a new call on this lane would be refused right now, else None"""
+    return scheduler.overload_retry_after(lane)
+
+
+def get_circuit_retry_after():
+    """Retry-After seconds while the circuit breaker is open, else None"""
+    return breaker.open_retry_after()
+
+
+def get_resilience_stats() -> dict:
+    """Circuit breaker state, retry counters, latency percentiles and hedge win rates"""
+    return {
+        "breaker": breaker.stats(),
+        "retries": {"max_attempts": LLM_RETRY_MAX_ATTEMPTS, **retry_counters},
+        "deadlines_s": LLM_LANE_DEADLINE_SECONDS,
+        "latency": latency_tracker.stats(),
+        "hedging": {"enabled": LLM_HEDGE_ENABLED, "percentile": LLM_HEDGE_PERCENTILE, **hedge_stats.stats()}
+    }
+
+
+def get_coalescing_stats() -> dict:
+    """Single-flight counters for monitoring"""
+    stats = {
+        "enabled": LLM_COALESCE_ENABLED,
+        "mode": LLM_COALESCE_MODE,
+        "local": local_flight.stats(),
+        "async": async_flight.stats()
+    }
+    if shared_flight is not None:
+        stats["shared"] = shared_flight.stats()
+    return stats
+
+
+def _remaining(deadline: float, lane: str) -> float:
+    """Seconds left before the lane deadline; raises LLMTimeoutError once it has passed"""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        retry_counters["deadline_exceeded"] += 1
+        raise LLMTimeoutError(lane, "deadline exceeded")
+    return remaining
+
+
+def _backoff(attempt: int, deadline: float, lane: str) -> float:
+    """Jittered delay before retry number `attempt`; raises LLMTimeoutError if it would cross the deadline"""
+    delay = backoff_delay(attempt - 1, LLM_RETRY_BASE_DELAY_MS / 1000, LLM_RETRY_MAX_DELAY_MS / 1000)
+    if time.monotonic() + delay >= deadline:
+        retry_counters["deadline_exceeded"] += 1
+        raise LLMTimeoutError(lane, "deadline exceeded before retry")
+    retry_counters["retries"] += 1
+    return delay
+
+
+def _hedge_delay(lane: str, timeout: float):
+    """Seconds after which a hedge request is fired, or None if this call is not hedged"""
+    if not LLM_HEDGE_ENABLED:
+        return None
+    p95 = latency_tracker.percentile(lane, LLM_HEDGE_PERCENTILE)
+    if p95 is None:
+        return None
+    delay = max(p95, LLM_HEDGE_MIN_DELAY_MS / 1000)
+    return delay if delay < timeout else None
+
+
+def _generate(prompt: str, chat_history: list = None, lane: str = "chat", response_schema: dict = None) -> str:
+    """
+    Call the LLM provider within an admission slot, bounded by the lane deadline.
+    Transient upstream failures are retried with jittered backoff; the circuit
+    breaker fails fast while the upstream is unhealthy.
+
+    Raises:
+        LLMOverloadedError: refused by admission control
+        LLMUnavailableError: deadline passed, retries exhausted or circuit open
+        Exception: non-transient provider errors (e.g. blocked response), unchanged
+    """
+    deadline = time.monotonic() + LLM_LANE_DEADLINE_SECONDS[lane]
+    last_error = None
+    for attempt in range(LLM_RETRY_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(_backoff(attempt, deadline, lane))
+        breaker.allow(lane)
+        try:
+            with scheduler.slot(lane) as held:
+                text = _call_model(prompt, chat_history, lane, _remaining(deadline, lane), response_schema, held)
+        except LLMError:
+            breaker.cancel()
+            raise
+        except Exception as e:
+            if not provider.is_retryable(e):
+                # The upstream answered - the request itself was rejected
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            last_error = e
+            print(f"⚠️ LLM call failed ({lane}, attempt {attempt + 1}/{LLM_RETRY_MAX_ATTEMPTS}): {str(e)}")
+            continue
+        breaker.record_success()
+        return text
+
+    retry_counters["exhausted"] += 1
+    raise LLMUnavailableError(lane, f"{LLM_RETRY_MAX_ATTEMPTS} attempts failed: {last_error}")
+
+
+def _call_model(prompt: str, chat_history: list, lane: str, timeout: float, response_schema: dict, held) -> str:
+    hedge_after = _hedge_delay(lane, timeout)
+    if hedge_after is not None:
+        return _call_model_hedged(prompt, chat_history, lane, timeout, hedge_after, response_schema, held)
+
+    started = time.monotonic()
+    text = provider.generate(prompt, chat_history, timeout=timeout, response_schema=response_schema)
+    latency_tracker.record(lane, time.monotonic() - started)
+    return text
+
+
+def _call_model_hedged(prompt: str, chat_history: list, lane: str, timeout: float, hedge_after: float,
+                       response_schema: dict, held) -> str:
+    """
+    Fire a second identical request if the first is slower than the lane's p95.
+    The hedge only runs if an admission slot is free right now; the first
+    successful answer wins and the other request is left to finish.
+
+    Each request holds its slot until it actually finishes: the primary takes
+    over the caller's slot (held), so a request left running after a win or
+    the deadline still counts against LLM_MAX_CONCURRENCY.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+
+    def record_primary(future):
+        if future.exception() is None:
+            latency_tracker.record(lane, time.monotonic() - started)
+
+    primary = hedge_pool.submit(provider.generate, prompt, chat_history, timeout, response_schema)
+    primary.add_done_callback(record_primary)
+    primary.add_done_callback(held.hand_off())
+    try:
+        try:
+            return primary.result(timeout=hedge_after)
+        except FuturesTimeoutError:
+            pass
+
+        if not scheduler.try_acquire(lane):
+            hedge_stats.record("skipped")
+            return primary.result(timeout=max(0.0, deadline - time.monotonic()))
+
+        hedge_stats.record("fired")
+        hedge = hedge_pool.submit(
+            provider.generate, prompt, chat_history, max(0.001, deadline - time.monotonic()), response_schema
+        )
+        hedge.add_done_callback(lambda future: scheduler.release())
+
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    hedge_stats.record("hedge_wins" if future is hedge else "primary_wins")
+                    return future.result()
+            if not pending:
+                # Both requests failed
+                raise done.pop().exception()
+    except FuturesTimeoutError:
+        pass
+    raise TimeoutError("LLM request timed out")
+
+
+async def _generate_async(prompt: str, chat_history: list = None, lane: str = "chat",
+                          response_schema: dict = None) -> str:
+    """Async variant of _generate: same deadline, retry and circuit breaker policy"""
+    deadline = time.monotonic() + LLM_LANE_DEADLINE_SECONDS[lane]
+    last_error = None
+    for attempt in range(LLM_RETRY_MAX_ATTEMPTS):
+        if attempt:
+            await asyncio.sleep(_backoff(attempt, deadline, lane))
+        breaker.allow(lane)
+        try:
+            async with scheduler.slot_async(lane):
+                text = await _call_model_async(
+                    prompt, chat_history, lane, _remaining(deadline, lane), response_schema
+                )
+        except LLMError:
+            breaker.cancel()
+            raise
+        except Exception as e:
+            if not provider.is_retryable(e):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            last_error = e
+            print(f"⚠️ LLM call failed ({lane}, attempt {attempt + 1}/{LLM_RETRY_MAX_ATTEMPTS}): {str(e)}")
+            continue
+        breaker.record_success()
+        return text
+
+    retry_counters["exhausted"] += 1
+    raise LLMUnavailableError(lane, f"{LLM_RETRY_MAX_ATTEMPTS} attempts failed: {last_error}")
+
+
+async def _call_model_async(prompt: str, chat_history: list, lane: str, timeout: float,
+                            response_schema: dict = None) -> str:
+    started = time.monotonic()
+    primary = asyncio.ensure_future(asyncio.wait_for(
+        provider.generate_async(prompt, chat_history, timeout=timeout, response_schema=response_schema), timeout
+    ))
+    hedge = None
+    try:
+        hedge_after = _hedge_delay(lane, timeout)
+        if hedge_after is not None:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+            if not done and scheduler.try_acquire(lane):
+                hedge_stats.record("fired")
+                remaining = max(0.001, started + timeout - time.monotonic())
+                hedge = asyncio.ensure_future(asyncio.wait_for(
+                    provider.generate_async(
+                        prompt, chat_history, timeout=remaining, response_schema=response_schema
+                    ),
+                    remaining
+                ))
+            elif not done:
+                hedge_stats.record("skipped")
+
+        if hedge is None:
+            text = await primary
+            latency_tracker.record(lane, time.monotonic() - started)
+            return text
+
+        pending, error = {primary, hedge}, None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is primary:
+                        latency_tracker.record(lane, time.monotonic() - started)
+                    hedge_stats.record("hedge_wins" if task is hedge else "primary_wins")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # The loser is cancelled - async requests can be abandoned cleanly
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
+        if hedge is not None:
+            scheduler.release()
+
+
+def _store(cache_key, text: str) -> str:
+    if cache_key is not None and text:
+        response_cache.set(cache_key, text)
+    return text
+
+
+def get_ai_response(prompt: str, chat_history: list = None, language: str = None, lane: str = "chat",
+                    response_schema: dict = None) -> str:
     """
     Get AI response with optional conversation history.
+    History-free calls are served from the response cache when possible, and
+    identical concurrent ones share a single upstream call.
     
     Args:
         prompt: The current user message
         chat_history: List of previous messages in format [{"role": "user"/"assistant", "message": "..."}]
+        language: Optional response language, part of the cache key
+        lane: Admission lane - "chat", "report", "trial" or "summary"
+        response_schema: JSON schema - request schema-constrained JSON output (JSON mode)
+
+    Raises:
+        LLMOverloadedError: the call was refused or dropped by admission control
+        LLMUnavailableError: the upstream failed (deadline, retries exhausted, circuit open)
     """
+    cache_key = _cache_key(prompt, chat_history, language, response_schema)
+    if cache_key is not None:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    request_key = _request_key(prompt, chat_history, language, response_schema)
     try:
-        if chat_history and len(chat_history) > 0:
-            # Format history for Gemini API
-            # Gemini expects: [{"role": "user", "parts": ["text"]}, {"role": "model", "parts": ["text"]}, ...]
-            gemini_history = []
-            for msg in chat_history:
-                if msg["role"] == "user":
-                    gemini_history.append({"role": "user", "parts": [msg["message"]]})
-                elif msg["role"] == "assistant":
-                    gemini_history.append({"role": "model", "parts": [msg["message"]]})
-            
-            # Start chat with history
-            chat = model.start_chat(history=gemini_history)
-            
-            # Send current message with context
-            response = chat.send_message(prompt)
-        else:
-            # No history, single message
-            response = model.generate_content(prompt)
-        
-        return response.text.strip()
+        if LLM_COALESCE_ENABLED and request_key is not None:
+            # Leader fills the cache before followers are released
+            call = lambda: _store(cache_key, _generate(prompt, lane=lane, response_schema=response_schema))
+            if shared_flight is not None:
+                return local_flight.do(request_key, lambda: shared_flight.do(request_key, call))
+            return local_flight.do(request_key, call)
+
+        return _store(cache_key, _generate(prompt, chat_history, lane=lane, response_schema=response_schema))
+    except LLMError:
+        raise
     except Exception as e:
         print(f"Error in get_ai_response: {str(e)}")
-        return "🌾 I am AgriGPT 🌾 and I only assist with agricultural and farming-related queries."
+        return FALLBACK_RESPONSE
+
+
+async def get_ai_response_async(prompt: str, chat_history: list = None, language: str = None,
+                                lane: str = "chat", response_schema: dict = None) -> str:
+    """
+    Async variant of get_ai_response for the ASGI serving path.
+    Awaits the provider without holding a thread, shares the same response cache.
+    Identical concurrent prompts are coalesced within the event loop.
+    """
+    cache_key = _cache_key(prompt, chat_history, language, response_schema)
+    if cache_key is not None:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    request_key = _request_key(prompt, chat_history, language, response_schema)
+    try:
+        if LLM_COALESCE_ENABLED and request_key is not None:
+            async def call():
+                return _store(cache_key, await _generate_async(prompt, lane=lane, response_schema=response_schema))
+            return await async_flight.do(request_key, call)
+
+        return _store(
+            cache_key, await _generate_async(prompt, chat_history, lane=lane, response_schema=response_schema)
+        )
+    except LLMError:
+        raise
+    except Exception as e:
+        print(f"Error in get_ai_response_async: {str(e)}")
+        return FALLBACK_RESPONSE
+
+
+def stream_ai_response(prompt: str, chat_history: list = None, language: str = None, lane: str = "chat"):
+    """
+    Streaming variant of get_ai_response.
+    Yields text chunks as the provider generates them.
+
+    Args:
+        prompt: The current user message
+        chat_history: List of previous messages in format [{"role": "user"/"assistant", "message": "..."}]
+        language: Optional response language, part of the cache key
+        lane: Admission lane - "chat", "report", "trial" or "summary"
+
+    Transient failures before the first chunk are retried; hedging does not
+    apply to streams.
+
+    Raises:
+        LLMOverloadedError: before the first chunk, if admission control refused the call
+        LLMUnavailableError: before the first chunk, if the upstream failed
+    """
+    cache_key = _cache_key(prompt, chat_history, language)
+    if cache_key is not None:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    deadline = time.monotonic() + LLM_LANE_DEADLINE_SECONDS[lane]
+    parts = []
+    last_error = None
+    for attempt in range(LLM_RETRY_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(_backoff(attempt, deadline, lane))
+        breaker.allow(lane)
+        try:
+            # The admission slot is held for the whole stream
+            with scheduler.slot(lane):
+                started = time.monotonic()
+                try:
+                    for text in provider.stream(prompt, chat_history, timeout=_remaining(deadline, lane)):
+                        parts.append(text)
+                        yield text
+                except Exception as e:
+                    if not parts:
+                        raise
+                    # Text already reached the client - end the stream with what was generated
+                    print(f"Error in stream_ai_response: {str(e)}")
+                    breaker.record_failure()
+                    return
+        except LLMError:
+            breaker.cancel()
+            raise
+        except Exception as e:
+            if not provider.is_retryable(e):
+                breaker.record_success()
+                print(f"Error in stream_ai_response: {str(e)}")
+                # Same behaviour as get_ai_response for non-transient errors
+                yield FALLBACK_RESPONSE
+                return
+            breaker.record_failure()
+            last_error = e
+            print(f"⚠️ LLM stream failed ({lane}, attempt {attempt + 1}/{LLM_RETRY_MAX_ATTEMPTS}): {str(e)}")
+            continue
+
+        breaker.record_success()
+        latency_tracker.record(lane, time.monotonic() - started)
+        _store(cache_key, "".join(parts).strip())
+        return
+
+    retry_counters["exhausted"] += 1
+    raise LLMUnavailableError(lane, f"{LLM_RETRY_MAX_ATTEMPTS} attempts failed: {last_error}")
 
 """For testing purpose"""
 
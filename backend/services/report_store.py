@@ -0,0 +1,135 @@
+from datetime import datetime, timezone, timedelta
+from services.db_service import db, report_collection
+from utils.config import REPORT_STORE_FRESHNESS_HOURS
+
+# Precomputed reports, one document per canonical (crop, region, language)
+report_store_collection = db.report_store
+
+REPORT_SECTIONS = ("sowingAdvice", "fertilizerPlan", "weatherTips", "calendar")
+
+
+def _canonical(value: str) -> str:
+    """Lowercase and collapse whitespace: '  Paddy  Rice ' -> 'paddy rice'"""
+    return " ".join((value or "").split()).casefold()
+
+
+def canonical_report_key(crop_name, region, language):
+    """Canonical store key for a (crop, region, language) combination"""
+    return f"{_canonical(crop_name)}|{_canonical(region)}|{_canonical(language)}"
+
+
+def _stored_report_query(crop_name, region, language, max_age_hours):
+    """Filter and projection for a fresh report store entry"""
+    max_age_hours = REPORT_STORE_FRESHNESS_HOURS if max_age_hours is None else max_age_hours
+    fresh_after = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+    query = {
+        "_id": canonical_report_key(crop_name, region, language),
+        "generated_at": {"$gte": fresh_after}
+    }
+    return query, {section: 1 for section in REPORT_SECTIONS}
+
+
+def _stored_report_update(crop_name, region, language, report_data):
+    """Upsert filter and update for a report store entry"""
+    return (
+        {"_id": canonical_report_key(crop_name, region, language)},
+        {"$set": {
+            "crop": _canonical(crop_name),
+            "region": _canonical(region),
+            "language": language,
+            **{section: report_data[section] for section in REPORT_SECTIONS},
+            "generated_at": datetime.now(timezone.utc)
+        }}
+    )
+
+
+def get_stored_report(crop_name, region, language, max_age_hours=None):
+    """
+    Return the stored report sections for this combination, or None if there is
+    no entry or it is older than the freshness window.
+    """
+    try:
+        entry = report_store_collection.find_one(
+            *_stored_report_query(crop_name, region, language, max_age_hours)
+        )
+    except Exception as e:
+        print(f"✗ Error reading report store: {str(e)}")
+        return None
+
+    if not entry:
+        return None
+    return {section: entry[section] for section in REPORT_SECTIONS}
+
+
+def put_stored_report(crop_name, region, language, report_data):
+    """Insert or refresh the stored report for this combination"""
+    try:
+        report_store_collection.update_one(
+            *_stored_report_update(crop_name, region, language, report_data),
+            upsert=True
+        )
+    except Exception as e:
+        print(f"✗ Error writing report store: {str(e)}")
+
+
+async def get_stored_report_async(crop_name, region, language, max_age_hours=None):
+    """Async variant of get_stored_report for the ASGI serving path"""
+    from services.async_db_service import async_db
+
+    try:
+        entry = await async_db.report_store.find_one(
+            *_stored_report_query(crop_name, region, language, max_age_hours)
+        )
+    except Exception as e:
+        print(f"✗ Error reading report store: {str(e)}")
+        return None
+
+    if not entry:
+        return None
+    return {section: entry[section] for section in REPORT_SECTIONS}
+
+
+async def put_stored_report_async(crop_name, region, language, report_data):
+    """Async variant of put_stored_report for the ASGI serving path"""
+    from services.async_db_service import async_db
+
+    try:
+        await async_db.report_store.update_one(
+            *_stored_report_update(crop_name, region, language, report_data),
+            upsert=True
+        )
+    except Exception as e:
+        print(f"✗ Error writing report store: {str(e)}")
+
+
+def get_popular_report_keys(top_n, lookback_days):
+    """
+    Most requested canonical (crop, region, language) combinations in
+    farming_reports over the last `lookback_days` days, most popular first.
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=lookback_days)
+    pipeline = [
+        {"$match": {"timestamp": {"$gte": since}}},
+        {"$group": {
+            "_id": {
+                "crop": {"$toLower": {"$trim": {"input": "$crop_name"}}},
+                "region": {"$toLower": {"$trim": {"input": "$region"}}},
+                "language": "$language"
+            },
+            "requests": {"$sum": 1},
+            # Keep one original spelling for prompting the LLM
+            "crop_name": {"$first": "$crop_name"},
+            "region_name": {"$first": "$region"}
+        }},
+        {"$sort": {"requests": -1}},
+        {"$limit": top_n}
+    ]
+    return [
+        {
+            "crop_name": row["crop_name"],
+            "region": row["region_name"],
+            "language": row["_id"]["language"],
+            "requests": row["requests"]
+        }
+        for row in report_collection.aggregate(pipeline)
+    ]
@@ -0,0 +1,92 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT = " \t\n?.!।॥؟"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a prompt so trivially different spellings share a cache entry:
+    - Unicode NFKC normalization
+    - case folding
+    - collapsed whitespace
+    - trailing punctuation removed ("?", ".", "!", danda, Urdu question mark)
+    """
+    text = unicodedata.normalize("NFKC", prompt or "")
+    text = _WHITESPACE_RE.sub(" ", text.casefold()).strip()
+    return text.rstrip(_TRAILING_PUNCT)
+
+
+class ResponseCache:
+    """
+    Thread-safe in-memory LLM response cache with LRU eviction and per-entry TTL.
+
+    Keys are built with make_key() from the normalized prompt, the language and
+    the model name. Counters (hits, misses, evictions, expirations) are exposed
+    through stats() for monitoring.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(prompt: str, language: str, model_name: str) -> tuple:
+        return (model_name, (language or "").casefold(), normalize_prompt(prompt))
+
+    def get(self, key):
+        """Return the cached value or None (counts a hit or a miss)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl_seconds: float = None):
+        """Store a value, evicting the least recently used entries when full"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
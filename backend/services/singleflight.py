@@ -0,0 +1,228 @@
+"""
+Single-flight request coalescing.
+
+Concurrent calls with the same key share one execution of the underlying
+function: the first caller (the leader) runs it, everyone else waits and gets
+the same result - or the same exception.
+
+- SingleFlight:      threads within one worker process
+- AsyncSingleFlight: coroutines within one event loop (ASGI serving mode)
+- MongoSingleFlight: across worker processes / hosts, using a MongoDB
+                     collection as the shared lock and result store
+"""
+
+import asyncio
+import hashlib
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+from pymongo.errors import DuplicateKeyError
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls across threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": in_flight}
+
+
+class AsyncSingleFlight:
+    """Coalesce concurrent identical coroutine calls within one event loop"""
+
+    def __init__(self):
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key, coro_fn):
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: a cancelled waiter must not cancel the shared call
+            return await asyncio.shield(future)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.leaders += 1
+        try:
+            result = await coro_fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an un-awaited future does not log a warning
+            future.exception()
+            raise
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class SharedFlightError(Exception):
+    """Raised in followers when the leader in another process failed with an error not in `errors`"""
+
+
+class MongoSingleFlight:
+    """
+    Coalesce identical calls across processes through a MongoDB collection.
+
+    The leader inserts {_id: key} (unique) with a lease, runs the function and
+    writes the result back. Followers poll the document until it is done. If
+    the leader dies, its lease expires and the next caller takes over. Results
+    are kept for `result_ttl` seconds so late arrivals still share them.
+
+    A leader error of one of the `errors` classes is stored with its class
+    name, lane, reason and retry_after, and raised again as that class in the
+    followers (retry_after counted from the leader's failure); any other error
+    reaches them as SharedFlightError.
+    """
+
+    def __init__(self, collection, lease_seconds=60, poll_interval=0.1, result_ttl=10, errors=()):
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.result_ttl = result_ttl
+        self.errors = {cls.__name__: cls for cls in errors}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.leaders = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def _doc_id(key) -> str:
+        return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+    def _try_lead(self, doc_id, now) -> bool:
+        lease = {
+            "status": "running",
+            "owner": self.owner,
+            "expires_at": now + timedelta(seconds=self.lease_seconds)
+        }
+        try:
+            self.collection.insert_one({"_id": doc_id, **lease})
+            return True
+        except DuplicateKeyError:
+            # Take over an expired lease or an expired result
+            result = self.collection.update_one(
+                {"_id": doc_id, "expires_at": {"$lt": now}},
+                {"$set": lease, "$unset": {"result": "", "error": "", "error_type": "", "error_detail": "",
+                                           "finished_at": ""}}
+            )
+            return result.modified_count == 1
+
+    def do(self, key, fn):
+        doc_id = self._doc_id(key)
+
+        while True:
+            now = datetime.now(timezone.utc)
+            if self._try_lead(doc_id, now):
+                break
+
+            doc = self.collection.find_one({"_id": doc_id})
+            if doc and doc["status"] == "done" and doc["expires_at"].replace(tzinfo=timezone.utc) >= now:
+                self.coalesced += 1
+                if doc.get("error"):
+                    raise self._shared_error(doc, now)
+                return doc["result"]
+            if doc and doc["status"] == "running":
+                time.sleep(self.poll_interval)
+            # Missing / expired document: loop and try to become the leader
+
+        self.leaders += 1
+        try:
+            result = fn()
+        except Exception as e:
+            self._finish(doc_id, self._error_outcome(e))
+            raise
+        self._finish(doc_id, {"result": result})
+        return result
+
+    def _error_outcome(self, error) -> dict:
+        outcome = {"error": str(error) or error.__class__.__name__}
+        if self.errors.get(error.__class__.__name__) is error.__class__:
+            outcome["error_type"] = error.__class__.__name__
+            outcome["error_detail"] = {
+                "lane": error.lane,
+                "reason": error.reason,
+                "retry_after": error.retry_after
+            }
+        return outcome
+
+    def _shared_error(self, doc, now) -> Exception:
+        """The exception a follower raises for the leader's stored error"""
+        cls = self.errors.get(doc.get("error_type"))
+        if cls is None:
+            return SharedFlightError(doc["error"])
+        detail = dict(doc["error_detail"])
+        finished_at = doc.get("finished_at")
+        if finished_at is not None:
+            elapsed = (now - finished_at.replace(tzinfo=timezone.utc)).total_seconds()
+            detail["retry_after"] = max(0, detail["retry_after"] - elapsed)
+        return cls(**detail)
+
+    def _finish(self, doc_id, outcome):
+        now = datetime.now(timezone.utc)
+        try:
+            self.collection.update_one(
+                {"_id": doc_id, "owner": self.owner},
+                {"$set": {
+                    "status": "done",
+                    "finished_at": now,
+                    "expires_at": now + timedelta(seconds=self.result_ttl),
+                    **outcome
+                }}
+            )
+        except Exception as e:
+            print(f"⚠️ Failed to publish shared flight result: {str(e)}")
+
+    def stats(self) -> dict:
+        return {"leaders": self.leaders, "coalesced": self.coalesced}
@@ -0,0 +1,261 @@
+"""
+Incrementally maintained usage statistics for the admin dashboard.
+
+GET /api/admin/statistics used to run eight count_documents calls (and load
+every feedback document) on each page view. The counters now live in the
+app_stats collection and are bumped on the write paths:
+
+    totals               current count of each counter (+1 per created
+                         document, -n when documents are deleted)
+    hour:2026-10-18T13   hourly rollup - documents created in that hour (UTC),
+                         expiring after STATS_HOURLY_RETENTION_DAYS
+    day:2026-10-18       daily rollup, kept
+
+One record() is a single unordered bulk_write of $inc upserts (totals plus the
+hour and day buckets of its events). Chat turns are counted when the
+write-behind buffer flushes them, so a batch of turns costs one stats write.
+snapshot() reads totals and the buckets the dashboard shows with one find()
+on _id.
+
+The counters are bumped after the document write, outside a transaction: a
+failed stats write is logged and skipped, it never fails the request.
+`python backfill_stats.py` rebuilds everything from the collections (first
+deployment, or to correct drift).
+"""
+
+from datetime import datetime, timezone, timedelta
+from pymongo import UpdateOne, ReplaceOne
+from utils.config import STATS_HOURLY_RETENTION_DAYS, STATS_SERIES_DAYS
+
+TOTALS_ID = "totals"
+RECENT_DAYS = 7
+RECENT_HOURS = RECENT_DAYS * 24   # hourly buckets summed for last_7_days, the current hour included
+WRITE_CHUNK = 1000
+HOUR_FORMAT = "%Y-%m-%dT%H"
+
+# counter -> [(collection, creation time field)] it counts; used by backfill().
+# A field inside an array ("turns.asked_at") counts the array elements that have it:
+# a chat turn is a question at asked_at and an answer at answered_at.
+SOURCES = {
+    "users": [("users", "created_at")],
+    "developers": [("developers", "added_at")],
+    "chat_sessions": [("chat_sessions", "created_at")],
+    "chat_messages": [("chat_history", "timestamp"),
+                      ("chat_turns", "turns.asked_at"), ("chat_turns", "turns.answered_at")],
+    "reports": [("farming_reports", "timestamp")],
+    "feedbacks": [("user_feedback", "timestamp")],
+}
+COUNTERS = tuple(SOURCES)
+
+
+def _utc(at: datetime) -> datetime:
+    """Naive UTC (naive datetimes are taken as UTC, as PyMongo stores them)"""
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    return at
+
+
+def hour_start(at: datetime) -> datetime:
+    return _utc(at).replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(at: datetime) -> datetime:
+    return hour_start(at).replace(hour=0)
+
+
+def hour_id(at: datetime) -> str:
+    return "hour:" + hour_start(at).strftime(HOUR_FORMAT)
+
+
+def day_id(at: datetime) -> str:
+    return "day:" + day_start(at).strftime("%Y-%m-%d")
+
+
+def _empty_counts() -> dict:
+    return {counter: 0 for counter in COUNTERS}
+
+
+class StatsCounters:
+    def __init__(self, collection, hourly_retention_days=STATS_HOURLY_RETENTION_DAYS,
+                 series_days=STATS_SERIES_DAYS):
+        self.collection = collection
+        self.hourly_retention = timedelta(days=hourly_retention_days)
+        self.series_days = series_days
+        self.failures = 0
+        self.last_error = None
+
+    # -------------------- WRITE PATH --------------------
+    def _bucket_fields(self, granularity: str, bucket: datetime) -> dict:
+        fields = {"granularity": granularity, "bucket": bucket}
+        if granularity == "hour":
+            fields["expire_at"] = bucket + self.hourly_retention
+        return fields
+
+    def operations(self, created=(), removed=None) -> list:
+        """
+        $inc upserts for created events [(counter, created_at)] and removed
+        counts {counter: n} (removals only lower the totals)
+        """
+        totals, buckets = {}, {}
+        for counter, at in created:
+            totals[counter] = totals.get(counter, 0) + 1
+            for granularity, start in (("hour", hour_start(at)), ("day", day_start(at))):
+                key = (granularity, start)
+                counts = buckets.setdefault(key, {})
+                counts[counter] = counts.get(counter, 0) + 1
+        for counter, count in (removed or {}).items():
+            if count:
+                totals[counter] = totals.get(counter, 0) - count
+
+        operations = []
+        if totals:
+            operations.append(UpdateOne(
+                {"_id": TOTALS_ID},
+                {"$inc": {f"counts.{counter}": n for counter, n in totals.items()},
+                 "$set": {"updated_at": datetime.now(timezone.utc)}},
+                upsert=True
+            ))
+        for (granularity, start), counts in buckets.items():
+            bucket_id = hour_id(start) if granularity == "hour" else day_id(start)
+            operations.append(UpdateOne(
+                {"_id": bucket_id},
+                {"$inc": {f"counts.{counter}": n for counter, n in counts.items()},
+                 "$setOnInsert": self._bucket_fields(granularity, start)},
+                upsert=True
+            ))
+        return operations
+
+    def record(self, created=(), removed=None) -> bool:
+        """Apply the counter updates in one round trip; False (logged) if the write failed"""
+        operations = self.operations(created, removed)
+        if not operations:
+            return True
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+            return True
+        except Exception as e:
+            self.record_failure(e)
+            return False
+
+    def record_failure(self, error):
+        self.failures += 1
+        self.last_error = str(error)
+        print(f"⚠️ Statistics counters not updated (run backfill_stats.py to correct): {str(error)}")
+
+    # -------------------- DASHBOARD READ --------------------
+    def snapshot_ids(self, now: datetime) -> list:
+        """_ids read by snapshot(): totals, the hours of the last 7 days, the days of the series"""
+        now = hour_start(now)
+        hours = [now - timedelta(hours=h) for h in range(RECENT_HOURS)]
+        days = [now - timedelta(days=d) for d in range(self.series_days)]
+        return [TOTALS_ID] + [hour_id(at) for at in hours] + [day_id(at) for at in days]
+
+    def snapshot(self, now: datetime = None) -> dict:
+        """
+        Totals, last-7-days counts (to the hour), the last 24 hourly and
+        STATS_SERIES_DAYS daily rollups - one find() on _id
+        """
+        now = hour_start(now or datetime.now(timezone.utc))
+        docs = {doc["_id"]: doc for doc in self.collection.find({"_id": {"$in": self.snapshot_ids(now)}})}
+
+        def counts(doc_id):
+            return {**_empty_counts(), **docs.get(doc_id, {}).get("counts", {})}
+
+        recent = _empty_counts()
+        for h in range(RECENT_HOURS):
+            for counter, n in counts(hour_id(now - timedelta(hours=h))).items():
+                recent[counter] = recent.get(counter, 0) + n
+
+        totals_doc = docs.get(TOTALS_ID, {})
+        return {
+            "totals": counts(TOTALS_ID),
+            "last_7_days": recent,
+            "hourly": [
+                {"bucket": (now - timedelta(hours=h)).isoformat() + "Z", **counts(hour_id(now - timedelta(hours=h)))}
+                for h in reversed(range(24))
+            ],
+            "daily": [
+                {"bucket": day_start(now - timedelta(days=d)).date().isoformat(),
+                 **counts(day_id(now - timedelta(days=d)))}
+                for d in reversed(range(self.series_days))
+            ],
+            "updated_at": totals_doc.get("updated_at"),
+            "backfilled_at": totals_doc.get("backfilled_at")
+        }
+
+    # -------------------- BACKFILL --------------------
+    def compute(self, database) -> tuple:
+        """(totals, {(granularity, bucket): counts}) recounted from the source collections"""
+        totals, buckets = _empty_counts(), {}
+        for counter, sources in SOURCES.items():
+            for collection_name, field in sources:
+                collection = database[collection_name]
+                array = field.split(".")[0] if "." in field else None
+                unwind = [{"$unwind": f"${array}"}, {"$match": {field: {"$exists": True}}}] if array else []
+                if array:
+                    counted = next(collection.aggregate(unwind + [{"$count": "count"}]), None)
+                    totals[counter] += counted["count"] if counted else 0
+                else:
+                    totals[counter] += collection.count_documents({})
+                # Grouped on the UTC hour as text ($dateTrunc needs MongoDB 5.0)
+                pipeline = unwind + [
+                    {"$match": {field: {"$type": "date"}}},
+                    {"$group": {"_id": {"$dateToString": {"date": f"${field}", "format": HOUR_FORMAT}},
+                                "count": {"$sum": 1}}}
+                ]
+                for group in collection.aggregate(pipeline):
+                    hour = datetime.strptime(group["_id"], HOUR_FORMAT)
+                    for granularity, start in (("hour", hour), ("day", day_start(hour))):
+                        counts = buckets.setdefault((granularity, start), _empty_counts())
+                        counts[counter] += group["count"]
+        return totals, buckets
+
+    def current_totals(self) -> dict:
+        doc = self.collection.find_one({"_id": TOTALS_ID}) or {}
+        return {**_empty_counts(), **doc.get("counts", {})}
+
+    def backfill(self, database, now: datetime = None) -> dict:
+        """
+        Replace totals and every rollup with counts recomputed from the
+        collections. Hourly rollups past their retention are not written.
+        Idempotent; writes landing while it runs may be miscounted by their
+        own increments, so run it when traffic is low (or run it again).
+        """
+        now = datetime.now(timezone.utc) if now is None else now
+        totals, buckets = self.compute(database)
+        oldest_hour = hour_start(now) - self.hourly_retention
+
+        operations = [ReplaceOne(
+            {"_id": TOTALS_ID},
+            {"counts": totals, "updated_at": now, "backfilled_at": now},
+            upsert=True
+        )]
+        written = set()
+        for (granularity, start), counts in sorted(buckets.items()):
+            if granularity == "hour" and start < oldest_hour:
+                continue
+            bucket_id = hour_id(start) if granularity == "hour" else day_id(start)
+            written.add(bucket_id)
+            operations.append(ReplaceOne(
+                {"_id": bucket_id},
+                {"counts": counts, **self._bucket_fields(granularity, start)},
+                upsert=True
+            ))
+        for i in range(0, len(operations), WRITE_CHUNK):
+            self.collection.bulk_write(operations[i:i + WRITE_CHUNK], ordered=False)
+
+        # Buckets whose documents are all gone
+        stale = [doc["_id"] for doc in self.collection.find({}, {"_id": 1})
+                 if doc["_id"] != TOTALS_ID and doc["_id"] not in written]
+        for i in range(0, len(stale), WRITE_CHUNK):
+            self.collection.delete_many({"_id": {"$in": stale[i:i + WRITE_CHUNK]}})
+
+        return {
+            "totals": totals,
+            "hourly": sum(1 for bucket_id in written if bucket_id.startswith("hour:")),
+            "daily": sum(1 for bucket_id in written if bucket_id.startswith("day:")),
+            "removed": len(stale)
+        }
+
+    def stats(self) -> dict:
+        return {"failures": self.failures, "last_error": self.last_error}
@@ -0,0 +1,46 @@
+import io
+import stat
+import subprocess
+import sys
+
+import pytest
+
+import services.audio_decode as audio_decode
+from services.audio_decode import AudioRejectedError
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    """An "ffmpeg" that writes silence forever; returns the processes started"""
+    script = tmp_path / "ffmpeg"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        "while True:\n"
+        "    sys.stdout.buffer.write(bytes(65536))\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setattr(audio_decode, "VOICE_FFMPEG_PATH", str(script))
+
+    started = []
+    popen = subprocess.Popen
+
+    def tracked(*args, **kwargs):
+        process = popen(*args, **kwargs)
+        started.append(process)
+        return process
+
+    monkeypatch.setattr(audio_decode.subprocess, "Popen", tracked)
+    return started
+
+
+def test_too_long_audio_leaves_no_ffmpeg_process(fake_ffmpeg, monkeypatch):
+    monkeypatch.setattr(audio_decode, "VOICE_MAX_SECONDS", 1)
+    with pytest.raises(AudioRejectedError) as raised:
+        audio_decode.decode_audio(io.BytesIO(b"\x1aE\xdf\xa3" + bytes(1024)), "audio/webm")
+    assert raised.value.status == 413
+
+    (process,) = fake_ffmpeg
+    # Reaped: the exit status was collected, so the child is not a zombie
+    assert process.returncode is not None
+    assert process.stdout.closed and process.stderr.closed
@@ -0,0 +1,155 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from services.chat_turns import (
+    legacy_turns,
+    bucket_doc,
+    bucket_messages,
+    bucket_pairs,
+    turn_messages,
+    item_key,
+    NewestFirst,
+    merge_newest
+)
+
+START = datetime(2025, 3, 1, 6, 30)
+
+
+def legacy_messages(turns, chat_id="c1", user_id="u1"):
+    """chat_history messages of `turns` question/answer pairs, a minute apart, oldest first"""
+    messages = []
+    for i in range(turns):
+        for role, seconds in (("user", 0), ("assistant", 5)):
+            messages.append({"_id": ObjectId(), "chat_id": chat_id, "user_id": user_id, "role": role,
+                             "content": f"{'q' if role == 'user' else 'a'}{i}", "input_type": "text",
+                             "response_type": "ai", "language": "English",
+                             "timestamp": START + timedelta(minutes=i, seconds=seconds)})
+    return messages
+
+
+def stored_order(documents):
+    """Documents as chat_turns returns them for TURN_ORDER: (last_at, _id) descending"""
+    return sorted(documents, key=lambda doc: (doc["last_at"], doc["_id"]), reverse=True)
+
+
+def buckets_of(turns, per_document):
+    return stored_order([bucket_doc(turns[i:i + per_document]) for i in range(0, len(turns), per_document)])
+
+
+def test_legacy_messages_pair_into_turns_and_keep_their_keys():
+    messages = legacy_messages(3)
+    turns = legacy_turns(messages)
+    assert len(turns) == 3
+    assert [msg for turn in turns for msg in turn_messages(turn)] == [
+        {key: msg[key] for key in ("_id", "role", "content", "timestamp", "input_type", "response_type", "language")}
+        for msg in messages
+    ]
+
+
+def test_unpaired_legacy_messages_are_turns_of_their_own():
+    messages = legacy_messages(2)
+    # An answer without its question, and a trailing question without an answer
+    messages = messages[1:3]
+    turns = legacy_turns(messages)
+    assert [(turn.get("question"), turn.get("answer")) for turn in turns] == [(None, "a0"), ("q1", None)]
+    assert [msg["role"] for turn in turns for msg in turn_messages(turn)] == ["assistant", "user"]
+
+    document = bucket_doc(turns)
+    assert document["messages"] == 2
+    assert bucket_pairs(document) == []
+
+
+@pytest.mark.parametrize("per_document", [1, 2, 5, 50])
+def test_newest_first_is_exact_across_bucket_sizes(per_document):
+    messages = legacy_messages(23)
+    expected = sorted(messages, key=item_key, reverse=True)
+    merged = list(NewestFirst(buckets_of(legacy_turns(messages), per_document), bucket_messages))
+    assert [item_key(msg) for msg in merged] == [item_key(msg) for msg in expected]
+
+
+def test_newest_first_with_overlapping_buckets():
+    # Buckets filled out of order (a retried flush): time ranges overlap
+    rng = random.Random(7)
+    turns = legacy_turns(legacy_messages(30))
+    shuffled = turns[:]
+    rng.shuffle(shuffled)
+    documents = stored_order([bucket_doc(sorted(shuffled[i:i + 4], key=lambda t: t["asked_at"]))
+                              for i in range(0, len(shuffled), 4)])
+    merged = [item_key(msg) for msg in NewestFirst(documents, bucket_messages)]
+    assert merged == sorted(merged, reverse=True)
+    assert len(merged) == 60
+
+
+def test_newest_first_reads_only_the_documents_a_page_needs():
+    documents = buckets_of(legacy_turns(legacy_messages(20)), 1)
+    read = []
+
+    def reading():
+        for doc in documents:
+            read.append(doc["_id"])
+            yield doc
+
+    newest = NewestFirst(reading(), bucket_messages)
+    page = [next(newest) for _ in range(4)]
+    assert [msg["content"] for msg in page] == ["a19", "q19", "a18", "q18"]
+    assert len(read) <= 3  # two documents for the page, one looked ahead
+
+
+def test_newest_first_before_and_floor():
+    messages = legacy_messages(10)
+    documents = buckets_of(legacy_turns(messages), 3)
+    before = item_key(messages[10])  # q5
+    older = [msg["content"] for msg in NewestFirst(documents, bucket_messages, before=before)]
+    assert older == ["a4", "q4", "a3", "q3", "a2", "q2", "a1", "q1", "a0", "q0"]
+
+    newer = [msg["content"] for msg in NewestFirst(documents, bucket_messages, floor=messages[15]["timestamp"])]
+    assert newer == ["a9", "q9", "a8", "q8"]
+
+
+def test_merge_newest_returns_a_message_found_in_both_collections_once():
+    messages = legacy_messages(12)
+    # Mid-migration: turns 0-7 are in chat_turns, turns 4-11 still in chat_history (4-7 inserted,
+    # not deleted yet), and the newest answer is also still in the write-behind buffer
+    moved = legacy_turns(messages[:16])
+    legacy = sorted(messages[8:], key=item_key, reverse=True)
+    pending = [msg for msg in legacy if msg["content"] == "a11"]
+    merged = list(merge_newest(pending, legacy, NewestFirst(buckets_of(moved, 3), bucket_messages)))
+    assert [msg["content"] for msg in merged] == [
+        msg["content"] for msg in sorted(messages, key=item_key, reverse=True)
+    ]
+
+
+def test_history_pairs_are_keyed_like_the_answer():
+    messages = legacy_messages(3)
+    pairs = bucket_pairs(bucket_doc(legacy_turns(messages)))
+    assert [pair["question"] for pair in pairs] == ["q0", "q1", "q2"]
+    assert [item_key(pair) for pair in pairs] == [item_key(msg) for msg in messages if msg["role"] == "assistant"]
+
+
+@pytest.mark.parametrize("per_document", [1, 4])
+def test_migration_moves_sessions_and_is_safe_to_rerun(db_service, per_document):
+    from services import chat_migration
+
+    messages = legacy_messages(9, chat_id="c1") + legacy_messages(2, chat_id="c2", user_id="u2")
+    db_service.chat_collection.insert_many(messages)
+    before = {chat_id: [item_key(msg) for msg in db_service.chat_messages(chat_id)] for chat_id in ("c1", "c2")}
+
+    # An interrupted run: c1's turns inserted, its messages not deleted yet
+    partial = legacy_turns([msg for msg in messages if msg["chat_id"] == "c1"])[:3]
+    db_service.chat_turns_collection.insert_one(bucket_doc(partial))
+
+    summary = chat_migration.run(batch=5, pause_ms=0, per_document=per_document)
+    assert summary["finished"]
+    assert summary["sessions"] == 2
+    assert summary["messages"] == len(messages)
+    assert db_service.chat_collection.count_documents({}) == 0
+
+    after = {chat_id: [item_key(msg) for msg in db_service.chat_messages(chat_id)] for chat_id in ("c1", "c2")}
+    assert after == before
+    stored = [turn["_id"] for doc in db_service.chat_turns_collection.find() for turn in doc["turns"]]
+    assert len(stored) == len(set(stored)) == 11
+
+    assert chat_migration.run(pause_ms=0, per_document=per_document)["sessions"] == 0
@@ -0,0 +1,141 @@
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+
+from services.chat_turns import build_turn
+from services.chat_writer import ChatWriteBuffer
+
+FLUSH_INTERVAL_MS = 20
+
+
+def wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return condition()
+
+
+def make_buffer(mongo_db, **kwargs):
+    options = {"enabled": True, "flush_interval_ms": FLUSH_INTERVAL_MS, "batch_max": 500, "max_pending": 1000}
+    options.update(kwargs)
+    buffer = ChatWriteBuffer(mongo_db.chat_turns, mongo_db.chat_sessions, **options)
+    return buffer
+
+
+def new_session(user_id="u1"):
+    now = datetime.now(timezone.utc)
+    return {"user_id": user_id, "title": "Wheat rust", "language": "English", "created_at": now, "updated_at": now}
+
+
+def test_single_turn_is_written_within_a_few_flush_intervals(mongo_db):
+    buffer = make_buffer(mongo_db)
+    try:
+        # First flush, then an idle flusher: a later single turn must still wake it
+        buffer.add_turns([build_turn("u1", "q0", "a0", "ai", "English", chat_id="c1")])
+        assert wait_for(lambda: mongo_db.chat_turns.count_documents({}) == 1, 10 * FLUSH_INTERVAL_MS / 1000)
+        time.sleep(3 * FLUSH_INTERVAL_MS / 1000)
+
+        buffer.add_turns([build_turn("u1", "q1", "a1", "ai", "English", chat_id="c1")])
+        assert wait_for(lambda: mongo_db.chat_turns.count_documents({}) == 2, 10 * FLUSH_INTERVAL_MS / 1000)
+        assert buffer.stats()["pending_turns"] == 0
+    finally:
+        buffer.close(timeout=1)
+
+
+def test_sessions_and_touches_are_flushed_without_turns(mongo_db):
+    buffer = make_buffer(mongo_db)
+    try:
+        chat_id, write_through = buffer.add_session(new_session())
+        assert not write_through
+        assert buffer.pending_session(chat_id)["title"] == "Wheat rust"
+        assert wait_for(lambda: mongo_db.chat_sessions.count_documents({}) == 1, 10 * FLUSH_INTERVAL_MS / 1000)
+        assert buffer.pending_session(chat_id) is None
+
+        later = datetime.now(timezone.utc) + timedelta(minutes=5)
+        buffer.touch_session(chat_id, later)
+        assert wait_for(lambda: mongo_db.chat_sessions.find_one()["updated_at"] >= later.replace(tzinfo=None)
+                        - timedelta(milliseconds=1), 10 * FLUSH_INTERVAL_MS / 1000)
+    finally:
+        buffer.close(timeout=1)
+
+
+def test_pending_turns_are_visible_until_written(mongo_db):
+    buffer = make_buffer(mongo_db, flush_interval_ms=60_000, batch_max=10)
+    buffer._start_thread = lambda: None  # no flusher: everything stays queued
+    buffer.add_turns([build_turn("u1", "q", "a", "ai", "English", chat_id="c1")])
+    assert [turn["question"] for turn in buffer.pending_turns("c1")] == ["q"]
+    assert buffer.pending_turns("c2") == []
+
+    assert buffer.flush(raise_errors=True) == 1
+    assert buffer.pending_turns("c1") == []
+    assert mongo_db.chat_turns.find_one()["turns"][0]["question"] == "q"
+
+
+def test_retried_batch_is_not_written_twice(mongo_db):
+    buffer = make_buffer(mongo_db, turns_per_document=4)
+    buffer._start_thread = lambda: None
+    turn = build_turn("u1", "q", "a", "ai", "English", chat_id="c1")
+    buffer.add_turns([turn])
+    buffer.flush(raise_errors=True)
+
+    # The same turn queued again, as after a write whose acknowledgement was lost
+    buffer.add_turns([dict(turn)])
+    buffer._retried.add(turn["_id"])
+    buffer.flush(raise_errors=True)
+    assert mongo_db.chat_turns.find_one()["count"] == 1
+
+
+def test_write_through_when_disabled_or_over_limit(mongo_db):
+    disabled = make_buffer(mongo_db, enabled=False)
+    assert disabled.add_turns([build_turn("u1", "q", "a", "ai", "English", chat_id="c1")])
+
+    full = make_buffer(mongo_db, max_pending=1)
+    full._start_thread = lambda: None
+    assert not full.add_turns([build_turn("u1", "q", "a", "ai", "English", chat_id="c1")])
+    assert full.add_turns([build_turn("u1", "q", "a", "ai", "English", chat_id="c1")])
+    assert full.stats()["write_through"] == 1
+
+
+def test_flush_hook_gets_written_turns_and_sessions(mongo_db):
+    flushed = []
+    done = threading.Event()
+
+    def on_flush(turns, sessions):
+        flushed.append((len(turns), len(sessions)))
+        done.set()
+
+    buffer = make_buffer(mongo_db, on_flush=on_flush)
+    try:
+        chat_id, _ = buffer.add_session(new_session())
+        buffer.add_turns([build_turn("u1", "q", "a", "ai", "English", chat_id=chat_id)])
+        assert done.wait(10 * FLUSH_INTERVAL_MS / 1000)
+        assert sum(turns for turns, _ in flushed) == 1
+        assert sum(sessions for _, sessions in flushed) == 1
+    finally:
+        buffer.close(timeout=1)
+
+
+def test_flush_hook_skips_documents_written_by_an_earlier_attempt(mongo_db):
+    flushed = []
+    buffer = make_buffer(mongo_db, turns_per_document=1, on_flush=lambda turns, sessions: flushed.append(
+        ([turn["question"] for turn in turns], [session["title"] for session in sessions])
+    ))
+    buffer._start_thread = lambda: None
+    chat_id, _ = buffer.add_session(new_session())
+    turn = build_turn("u1", "q", "a", "ai", "English", chat_id=chat_id)
+    buffer.add_turns([turn])
+    buffer.flush(raise_errors=True)
+
+    # Re-queued after a write whose acknowledgement was lost, next to a new session and turn
+    buffer._sessions[chat_id] = mongo_db.chat_sessions.find_one()
+    buffer.add_turns([dict(turn)])
+    buffer._retried.add(turn["_id"])
+    other_chat_id, _ = buffer.add_session(dict(new_session(), title="Paddy blast"))
+    buffer.add_turns([build_turn("u1", "q2", "a2", "ai", "English", chat_id=other_chat_id)])
+    buffer.flush(raise_errors=True)
+
+    assert flushed == [(["q"], ["Wheat rust"]), (["q2"], ["Paddy blast"])]
+    assert mongo_db.chat_sessions.count_documents({}) == 2
+    assert mongo_db.chat_turns.count_documents({}) == 2
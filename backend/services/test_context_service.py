@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+import time
+
+import pytest
+
+import services.context_service as context_service
+import services.llm_service as llm_service
+from services.context_service import (
+    estimate_tokens,
+    truncate_to_tokens,
+    fit_history,
+    messages_to_summarize,
+    get_chat_context,
+    update_chat_summary
+)
+
+START = datetime(2025, 3, 1, 6, 30)
+
+
+def conversation(turns, answer_chars=40):
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i}", "timestamp": START + timedelta(minutes=i)})
+        messages.append({"role": "assistant", "content": f"answer {i} " + "x" * answer_chars,
+                         "timestamp": START + timedelta(minutes=i, seconds=5)})
+    return messages
+
+
+def test_token_estimates():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a" * 40) == 10
+    assert estimate_tokens("धान" * 10) == 15
+    text = truncate_to_tokens("word " * 100, 20)
+    assert text.endswith(" …")
+    assert estimate_tokens(text) <= 20
+
+
+def test_fit_history_keeps_the_newest_messages_starting_with_a_question():
+    history = [{"role": msg["role"], "message": msg["content"]} for msg in conversation(5, answer_chars=200)]
+    kept = fit_history(history, budget=150)
+    assert kept[0]["role"] == "user"
+    assert kept == history[-len(kept):]
+    assert sum(estimate_tokens(msg["message"]) for msg in kept) <= 150
+    assert fit_history(history, budget=0) == []
+
+
+def test_messages_to_summarize_covers_everything_not_sent(monkeypatch):
+    monkeypatch.setattr(context_service, "LLM_SUMMARY_BATCH_MESSAGES", 6)
+    pending = conversation(8)
+    # Nothing left out: no summary
+    assert messages_to_summarize(pending, pending[0]["timestamp"]) == []
+    # Two messages left out: the batch is filled up with whole turns
+    assert messages_to_summarize(pending, pending[2]["timestamp"]) == pending[:6]
+    # More left out than a batch: all of them
+    assert messages_to_summarize(pending, pending[10]["timestamp"]) == pending[:10]
+    # Nothing sent at all: everything
+    assert messages_to_summarize(pending, None) == pending
+
+
+def test_messages_to_summarize_keeps_the_latest_turn(monkeypatch):
+    monkeypatch.setattr(context_service, "LLM_SUMMARY_BATCH_MESSAGES", 6)
+    pending = conversation(2)
+    assert messages_to_summarize(pending, pending[2]["timestamp"]) == pending[:2]
+
+
+@pytest.fixture
+def summarizer(monkeypatch):
+    """get_ai_response for summary prompts: a short summary naming the turns it was given"""
+    prompts = []
+
+    def summarize(prompt, lane="chat", **kwargs):
+        assert lane == "summary"
+        prompts.append(prompt)
+        return f"summary #{len(prompts)}"
+
+    monkeypatch.setattr(llm_service, "get_ai_response", summarize)
+    return prompts
+
+
+def test_long_session_reaches_the_model_verbatim_or_summarized(db_service, summarizer):
+    # Long AgriGPT answers: ~300 tokens each, so only a few messages fit the 1500-token budget
+    chat_id = str(db_service.chat_sessions_collection.insert_one(
+        db_service.build_chat_session_doc("u1", "Cotton", "English")
+    ).inserted_id)
+    messages = []
+    for i in range(15):
+        # Turns milliseconds apart: an answer is stamped at least 1 ms after its question, and the next
+        # question must not share that millisecond (the summary boundary compares timestamps)
+        time.sleep(0.003)
+        db_service.save_chat("u1", f"question {i}", f"answer {i} " + "y" * 1200, "ai", "English", chat_id=chat_id)
+        db_service.chat_writer.flush()
+        update_chat_summary(chat_id, "English")
+
+        messages = db_service.get_chat_messages_after(chat_id)
+        history, summary = get_chat_context(chat_id)
+        through = db_service.get_chat_summary(chat_id)
+        through = through["summary_through"] if through else None
+
+        summarized = [msg for msg in messages if through is not None and msg["timestamp"] <= through]
+        sent = messages[len(summarized):]
+        # Every message is either in the summary or in the history, and in the history whole
+        assert [msg["message"] for msg in history] == [msg["content"] for msg in sent]
+        assert (summary is None) == (not summarized)
+        # The summary never takes the latest turn
+        assert [msg["message"] for msg in history[-2:]] == [f"question {i}", f"answer {i} " + "y" * 1200]
+
+    assert len(messages) == 30
+    # Batched: far fewer summary calls than turns
+    assert 1 < len(summarizer) < 15
+    # Each summary prompt carries only messages not summarized before
+    assert sum(prompt.count("User: question") for prompt in summarizer) == len(summarized) // 2
@@ -0,0 +1,47 @@
+from services.db_indexes import INDEXES, RETIRED_INDEXES, query_shapes, ensure_indexes, plan_stages
+
+
+def index_names(database, collection):
+    return {idx["name"] for idx in database[collection].list_indexes()}
+
+
+def test_registered_index_names_are_unique_and_not_retired():
+    registered = [(spec["collection"], spec["name"]) for spec in INDEXES]
+    assert len(registered) == len(set(registered))
+    assert not set(registered) & {(spec["collection"], spec["name"]) for spec in RETIRED_INDEXES}
+
+
+def test_every_query_shape_has_an_index_on_its_leading_field():
+    leading = {}
+    for spec in INDEXES:
+        leading.setdefault(spec["collection"], set()).add(spec["keys"][0][0])
+    for shape in query_shapes():
+        fields = set(shape["filter"]) | {field for field, _ in shape.get("sort", [])}
+        assert fields & leading.get(shape["collection"], set()), shape["used_by"]
+
+
+def test_ensure_indexes_creates_the_registry_and_drops_retired_indexes(mongo_db):
+    mongo_db.chat_sessions.create_index([("user_id", 1), ("updated_at", -1)], name="user_id_updated_at")
+    mongo_db.users.create_index([("created_at", -1)], name="created_at")
+
+    summary = ensure_indexes(mongo_db)
+    assert len(summary["created"]) == len(INDEXES) and not summary["conflicts"]
+    assert sorted(summary["dropped"]) == ["chat_sessions.user_id_updated_at", "users.created_at"]
+    assert "user_id_updated_at_id" in index_names(mongo_db, "chat_sessions")
+    assert "created_at" not in index_names(mongo_db, "users")
+    ttl = next(idx for idx in mongo_db.otp_verifications.list_indexes() if idx["name"] == "otp_ttl_index")
+    assert ttl["expireAfterSeconds"] == 86400
+
+    # Idempotent
+    again = ensure_indexes(mongo_db)
+    assert again["created"] == [] and again["dropped"] == [] and len(again["existing"]) == len(INDEXES)
+
+
+def test_plan_stages_ignores_rejected_plans():
+    explained = {
+        "stage": "FETCH",
+        "inputStage": {"stage": "SORT_MERGE", "inputStages": [{"stage": "IXSCAN"}, {"stage": "IXSCAN"}]},
+        "rejectedPlans": [{"stage": "COLLSCAN"}],
+    }
+    assert plan_stages(explained) == ["FETCH", "SORT_MERGE", "IXSCAN", "IXSCAN"]
+    assert plan_stages({}) == []
@@ -0,0 +1,312 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from bson import ObjectId
+
+from services.chat_turns import build_turn, bucket_doc
+
+START = datetime(2025, 3, 1, 6, 30)
+
+
+def seed_chat(db_service, user_id="u1", turns=7, per_document=1):
+    """A chat session with `turns` stored turns, a minute apart; returns chat_id"""
+    chat_id = str(db_service.chat_sessions_collection.insert_one(
+        db_service.build_chat_session_doc(user_id, "Paddy blast", "English")
+    ).inserted_id)
+    stored = []
+    for i in range(turns):
+        turn = build_turn(user_id, f"q{i}", f"a{i}", "ai", "English", chat_id=chat_id)
+        turn.update(_id=ObjectId(), asked_at=START + timedelta(minutes=i),
+                    answered_at=START + timedelta(minutes=i, seconds=5))
+        stored.append(turn)
+    documents = [bucket_doc(stored[i:i + per_document]) for i in range(0, len(stored), per_document)]
+    db_service.chat_turns_collection.insert_many(documents)
+    return chat_id
+
+
+def walk(fetch, items_field, cursor_field="next_cursor"):
+    """Every item of a paginated listing: fetch(cursor) until the cursor runs out"""
+    items, cursor, pages = [], None, 0
+    while True:
+        page = fetch(cursor)
+        items += page[items_field]
+        pages += 1
+        cursor = page[cursor_field]
+        if cursor is None:
+            return items, pages
+
+
+@pytest.mark.parametrize("value", [
+    datetime(2025, 3, 1, 6, 30, 15, 123000),
+    datetime(2025, 3, 1, 12, 0, 15, 123000, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+    datetime(1970, 1, 1),
+])
+def test_cursor_round_trip(db_service, value):
+    doc_id = ObjectId()
+    decoded = db_service.decode_cursor(db_service.encode_cursor(value, doc_id))
+    naive = value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+    assert decoded == (naive, doc_id)
+
+
+def test_cursor_keeps_milliseconds_like_mongodb(db_service):
+    doc_id = ObjectId()
+    value, _ = db_service.decode_cursor(db_service.encode_cursor(datetime(2025, 3, 1, 6, 30, 15, 123456), doc_id))
+    assert value == datetime(2025, 3, 1, 6, 30, 15, 123000)
+
+
+@pytest.mark.parametrize("cursor", ["", "123", "abc_" + str(ObjectId()), "123_not-an-id", "_", None])
+def test_malformed_cursor_is_a_value_error(db_service, cursor):
+    with pytest.raises(ValueError):
+        db_service.decode_cursor(cursor)
+
+
+def test_session_pages_cover_every_session_once_with_ties(db_service):
+    # Five sessions share one updated_at: the _id tie-break keeps pages exact
+    docs = [{"user_id": "u1", "title": f"s{i}", "language": "English", "created_at": START,
+             "updated_at": START + timedelta(minutes=i // 5)} for i in range(12)]
+    db_service.chat_sessions_collection.insert_many(docs)
+    db_service.chat_sessions_collection.insert_one({**docs[0], "_id": ObjectId(), "user_id": "u2"})
+
+    sessions, pages = walk(lambda cursor: db_service.get_chat_sessions_page("u1", 5, cursor), "sessions")
+    assert pages == 3
+    assert sorted(session["title"] for session in sessions) == sorted(doc["title"] for doc in docs)
+    keys = [(session["updated_at"], session["_id"]) for session in sessions]
+    assert keys == sorted(keys, reverse=True)
+    assert set(sessions[0]) == {"_id", "title", "language", "created_at", "updated_at"}
+
+
+def test_report_pages_leave_out_report_data(db_service):
+    docs = [db_service.build_report_doc("u1", f"crop{i}", "Punjab", {"sections": ["..."]}, "English")
+            for i in range(5)]
+    for i, doc in enumerate(docs):
+        doc["timestamp"] = START + timedelta(hours=i)
+    db_service.report_collection.insert_many(docs)
+
+    reports, pages = walk(lambda cursor: db_service.get_user_reports_page("u1", 2, cursor), "reports")
+    assert pages == 3
+    assert [report["crop_name"] for report in reports] == ["crop4", "crop3", "crop2", "crop1", "crop0"]
+    assert all("report_data" not in report for report in reports)
+
+
+@pytest.mark.parametrize("per_document", [1, 3])
+def test_chat_pages_walk_back_to_the_first_message(db_service, per_document):
+    chat_id = seed_chat(db_service, turns=7, per_document=per_document)
+    pages = []
+    cursor = None
+    while True:
+        page = db_service.get_chat_page(chat_id, 4, cursor)
+        pages.append([msg["content"] for msg in page["messages"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # Each page is oldest first; pages go back in time
+    assert pages == [["q5", "a5", "q6", "a6"], ["q3", "a3", "q4", "a4"], ["q1", "a1", "q2", "a2"], ["q0", "a0"]]
+    full = db_service.get_chat_by_id(chat_id)
+    assert [content for page in reversed(pages) for content in page] == [msg["content"] for msg in full["messages"]]
+
+
+def test_chat_page_includes_buffered_turns(db_service, monkeypatch):
+    chat_id = seed_chat(db_service, turns=2)
+    monkeypatch.setattr(db_service.chat_writer, "_start_thread", lambda: None)  # keep the turn queued
+    db_service.save_chat("u1", "q-new", "a-new", "ai", "English", chat_id=chat_id)
+    page = db_service.get_chat_page(chat_id, 3)
+    assert [msg["content"] for msg in page["messages"]] == ["a1", "q-new", "a-new"]
+    older = db_service.get_chat_page(chat_id, 3, page["next_cursor"])
+    assert [msg["content"] for msg in older["messages"]] == ["q0", "a0", "q1"]
+
+
+def test_chat_page_of_unknown_chat_is_none(db_service):
+    assert db_service.get_chat_page(str(ObjectId()), 10) is None
+    assert db_service.get_chat_page("not-an-id", 10) is None
+
+
+@pytest.fixture
+def lookups(db_service, monkeypatch):
+    """
+    chat_sessions aggregations with uncorrelated $lookup sub-pipelines (not
+    supported by mongomock): each one runs on its collection for every
+    document that reaches it. Returns the collections looked up.
+    """
+    collection = db_service.chat_sessions_collection
+    aggregate = type(collection).aggregate
+    looked_up = []
+
+    def with_lookups(pipeline, **kwargs):
+        stages = [stage for stage in pipeline if "$lookup" not in stage]
+        documents = list(aggregate(collection, stages, **kwargs))
+        for document in documents:
+            for stage in pipeline:
+                if "$lookup" in stage:
+                    lookup = stage["$lookup"]
+                    looked_up.append(lookup["from"])
+                    target = db_service.db[lookup["from"]]
+                    document[lookup["as"]] = list(aggregate(target, lookup["pipeline"]))
+        return iter(documents)
+
+    monkeypatch.setattr(collection, "aggregate", with_lookups)
+    return looked_up
+
+
+def all_pages(fetch):
+    pages, cursor = [], None
+    while True:
+        page = fetch(cursor)
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("per_document", [1, 3])
+def test_user_chat_page_matches_the_chat_page(db_service, lookups, monkeypatch, per_document):
+    monkeypatch.setattr(db_service, "CHAT_TURNS_PER_DOCUMENT", per_document)
+    chat_id = seed_chat(db_service, turns=9, per_document=per_document)
+    # Older messages not migrated yet
+    db_service.chat_collection.insert_many([
+        {"_id": ObjectId(), "chat_id": chat_id, "user_id": "u1", "role": role, "content": f"old-{role}",
+         "input_type": "text", "response_type": "ai", "language": "English",
+         "timestamp": START - timedelta(hours=1) + timedelta(seconds=offset)}
+        for offset, role in ((0, "user"), (5, "assistant"))
+    ])
+
+    for limit in (1, 4, 5, 50):
+        owner = all_pages(lambda cursor: db_service.get_user_chat_page(chat_id, "u1", limit, cursor))
+        expected = all_pages(lambda cursor: db_service.get_chat_page(chat_id, limit, cursor))
+        contents = [msg["content"] for page in reversed(owner) for msg in page["messages"]]
+        assert contents == [msg["content"] for page in reversed(expected) for msg in page["messages"]]
+        assert len(contents) == 20
+        assert owner[0]["session"] == expected[0]["session"]
+    assert "chat_history" in lookups
+
+
+def test_user_chat_page_is_only_the_owners(db_service, lookups):
+    chat_id = seed_chat(db_service, turns=3)
+    pipeline = db_service.chat_page_pipeline(chat_id, "u2", 10)
+    assert pipeline[0] == {"$match": {"_id": ObjectId(chat_id), "user_id": "u2"}}
+
+    assert db_service.get_user_chat_page(chat_id, "u2", 10) is None
+    # The session matched nobody: no messages were looked up
+    assert lookups == []
+    # The route tells "someone else's chat" (403) from "no such chat" (404)
+    assert db_service.chat_session_exists(chat_id)
+    assert not db_service.chat_session_exists(str(ObjectId()))
+    assert db_service.get_user_chat_page("not-an-id", "u1", 10) is None
+
+
+def test_user_chat_page_of_a_session_not_flushed_yet(db_service, lookups, monkeypatch):
+    monkeypatch.setattr(db_service.chat_writer, "_start_thread", lambda: None)
+    chat_id = db_service.create_chat_session("u1", "Cotton bollworm", "English")
+    db_service.save_chat("u1", "q", "a", "ai", "English", chat_id=chat_id)
+
+    page = db_service.get_user_chat_page(chat_id, "u1", 10)
+    assert page["session"]["title"] == "Cotton bollworm"
+    assert [msg["content"] for msg in page["messages"]] == ["q", "a"]
+    assert db_service.get_user_chat_page(chat_id, "u2", 10) is None
+    assert db_service.get_chat_by_id(chat_id, "u2") is None
+    assert db_service.get_chat_by_id(chat_id, "u1")["session"]["title"] == "Cotton bollworm"
+
+
+@pytest.fixture
+def windows(db_service, monkeypatch):
+    """
+    chat_history aggregations with $setWindowFields (not supported by
+    mongomock): the stage's $shift outputs are computed in Python, the stages
+    before and after it run on mongomock.
+    """
+    collection = db_service.chat_collection
+    aggregate = type(collection).aggregate
+
+    def with_windows(pipeline, **kwargs):
+        at = next(i for i, stage in enumerate(pipeline) if "$setWindowFields" in stage)
+        window = pipeline[at]["$setWindowFields"]
+        documents = list(aggregate(collection, pipeline[:at]))
+        for field, direction in reversed(list(window["sortBy"].items())):
+            documents.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        shifted = {}
+        for name, spec in window["output"].items():
+            shift = spec["$shift"]
+            for i in range(len(documents)):
+                source = documents[i + shift["by"]] if 0 <= i + shift["by"] < len(documents) else None
+                shifted.setdefault(i, {})[name] = (
+                    {key: source[ref[1:]] for key, ref in shift["output"].items()} if source else None
+                )
+        for i, document in enumerate(documents):
+            document.update(shifted.get(i, {}))
+
+        staged = db_service.db["windowed"]
+        staged.drop()
+        if documents:
+            staged.insert_many(documents)
+        yield from aggregate(staged, pipeline[at + 1:])
+
+    monkeypatch.setattr(collection, "aggregate", with_windows)
+
+
+def legacy_timeline(db_service, user_id="u1"):
+    """chat_history messages with unanswered questions and an answer without one; returns them newest first"""
+    timeline = [
+        (-3600, "user", "old-q1"), (-3595, "assistant", "old-a1"),
+        (-3500, "user", "old-unanswered"),
+        (-3400, "user", "old-q2"), (-3395, "assistant", "old-a2"),
+        (-3300, "assistant", "old-no-question"),
+        (150, "user", "mid-q"), (155, "assistant", "mid-a"),  # between stored turns 2 and 3
+    ]
+    messages = [
+        {"_id": ObjectId(), "chat_id": "legacy-chat", "user_id": user_id, "role": role, "content": content,
+         "input_type": "text", "response_type": "ai", "language": "English",
+         "timestamp": START + timedelta(seconds=offset)}
+        for offset, role, content in timeline
+    ]
+    db_service.chat_collection.insert_many(messages)
+    return sorted(messages, key=lambda msg: (msg["timestamp"], msg["_id"]), reverse=True)
+
+
+def test_pair_history_messages_pairs_each_answer_with_its_question(db_service):
+    messages = [
+        {"role": "assistant", "content": "no question"},
+        {"role": "assistant", "content": "a2", "response_type": "ai", "language": "Hindi", "timestamp": 2},
+        {"role": "user", "content": "q2"},
+        {"role": "user", "content": "unanswered"},
+        {"role": "assistant", "content": "a1", "response_type": "ai", "language": "English", "timestamp": 1},
+        {"role": "user", "content": "q1"},
+    ]
+    pairs = db_service.pair_history_messages(messages)
+    assert [(pair["question"], pair["answer"]) for pair in pairs] == [("q2", "a2"), ("q1", "a1")]
+
+
+def test_history_pipeline_pairs_like_the_reference(db_service, windows):
+    newest_first = legacy_timeline(db_service)
+    db_service.chat_collection.insert_one({"user_id": "u2", "role": "assistant", "content": "other user",
+                                           "timestamp": START})
+    pairs = list(db_service.chat_collection.aggregate(db_service.history_pipeline("u1")))
+    expected = db_service.pair_history_messages(newest_first)
+    assert [(pair["question"], pair["answer"], pair["timestamp"]) for pair in pairs] == \
+        [(pair["question"], pair["answer"], pair["timestamp"]) for pair in expected]
+
+    # A page after the newest pair
+    before = (pairs[0]["timestamp"], pairs[0]["_id"])
+    older = list(db_service.chat_collection.aggregate(db_service.history_pipeline("u1", before, limit=2)))
+    assert [pair["answer"] for pair in older] == [pair["answer"] for pair in expected[1:3]]
+
+
+@pytest.mark.parametrize("per_document", [1, 3])
+def test_history_pages_merge_turns_and_legacy_pairs(db_service, windows, monkeypatch, per_document):
+    monkeypatch.setattr(db_service, "CHAT_LEGACY_READS", True)
+    seed_chat(db_service, turns=7, per_document=per_document)
+    legacy = db_service.pair_history_messages(legacy_timeline(db_service))
+    turns = [(START + timedelta(minutes=i, seconds=5), f"q{i}", f"a{i}") for i in range(7)]
+    expected = sorted([(pair["timestamp"], pair["question"], pair["answer"]) for pair in legacy] + turns, reverse=True)
+
+    history = db_service.get_chat_history("u1")
+    assert [(pair["timestamp"], pair["question"], pair["answer"]) for pair in history] == expected
+    assert set(history[0]) == set(db_service.HISTORY_FIELDS)
+
+    for limit in (1, 3, 50):
+        def fetch(cursor):
+            page = {}
+            pairs = list(db_service.iter_chat_history("u1", limit, cursor, page))
+            return {"history": pairs, "next_cursor": page["next_cursor"]}
+        paged, pages = walk(fetch, "history")
+        assert [(pair["timestamp"], pair["question"], pair["answer"]) for pair in paged] == expected
+        assert pages == -(-len(expected) // limit)
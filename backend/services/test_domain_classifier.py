@@ -0,0 +1,63 @@
+import pytest
+
+from services import domain_classifier
+from services.domain_classifier import (
+    DomainClassifier,
+    normalize_text,
+    extract_features,
+    load_samples,
+    classify_domain,
+    is_agriculture_query
+)
+
+
+def test_normalize_text_drops_punctuation_but_keeps_vowel_signs():
+    assert normalize_text("  How much UREA, for wheat?? ") == "how much urea for wheat"
+    assert normalize_text("धान में खाद डालें।") == "धान में खाद डालें"
+
+
+def test_features_are_word_ngrams_and_words():
+    assert extract_features("Ab!") == ["w:ab", " a", "ab", "b ", " ab", "ab ", " ab "]
+
+
+def test_unknown_features_give_no_confidence():
+    classifier = DomainClassifier().train([
+        {"text": "wheat fertilizer", "label": "agri"}, {"text": "cricket score", "label": "other"}
+    ])
+    assert classifier.predict("") == ("other", 0.5)
+    assert classifier.predict("wheat fertilizer")[0] == "agri"
+    assert classifier.predict("cricket score")[0] == "other"
+
+
+def test_bundled_model_is_accurate_on_the_heldout_split():
+    samples = load_samples("heldout")
+    correct = sum(classify_domain(sample["text"])[0] == sample["label"] for sample in samples)
+    # 94 / 106 when this test was written
+    assert correct / len(samples) >= 0.85
+
+    confident = [sample for sample in samples if classify_domain(sample["text"])[1] >= 0.75]
+    assert sum(classify_domain(sample["text"])[0] == sample["label"] for sample in confident) / len(confident) >= 0.95
+
+
+@pytest.mark.parametrize("text, label", [
+    ("How much urea for wheat per acre?", "agri"),
+    ("धान में कौन सा खाद डालें?", "agri"),
+    ("Who won the cricket match yesterday?", "other"),
+])
+def test_clear_queries_are_decided_locally(text, label, monkeypatch):
+    monkeypatch.setattr(domain_classifier, "_stats", {"local_agri": 0, "local_other": 0, "llm_fallback": 0})
+    assert is_agriculture_query(text, llm_check=lambda text: pytest.fail("LLM called"), min_confidence=0.75) \
+        == (label == "agri")
+    assert domain_classifier.get_domain_classifier_stats()["local_" + label] == 1
+
+
+def test_uncertain_queries_fall_back_to_the_llm(monkeypatch):
+    monkeypatch.setattr(domain_classifier, "_stats", {"local_agri": 0, "local_other": 0, "llm_fallback": 0})
+    asked = []
+    assert is_agriculture_query("zxqv plorb", llm_check=lambda text: asked.append(text) or True)
+    assert asked == ["zxqv plorb"]
+    # Without an LLM check the local label decides
+    assert is_agriculture_query("zxqv plorb") == (classify_domain("zxqv plorb")[0] == "agri")
+
+    stats = domain_classifier.get_domain_classifier_stats()
+    assert stats["llm_fallback"] == 1 and stats["local_rate"] == 0.5
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+
+import pytest
+
+from services import language_service
+from services.language_service import (
+    LANGUAGE_MAP,
+    SCRIPT_LANGUAGES,
+    detect_script,
+    detect_language,
+    resolve_language,
+    get_session_language,
+    remember_session_language
+)
+
+
+@pytest.mark.parametrize("text, script", [
+    ("How much urea for wheat?", "Latin"),
+    ("NPK खाद कितना?", "Devanagari"),  # Indic letters win over Latin ones
+    ("ধানে কোন সার দেব?", "Bengali"),
+    ("گندم کے لیے کھاد", "Arabic"),
+    ("12345 ?!", None),
+    ("", None),
+])
+def test_dominant_script(text, script):
+    assert detect_script(text) == script
+
+
+@pytest.mark.parametrize("text, language", [
+    ("How much urea for wheat?", "English"),
+    ("NPK खाद कितना?", "Hindi"),
+    ("धान में कौन सा खाद डालें?", "Hindi"),
+    ("गहू पिकासाठी कोणते खत वापरावे?", "Marathi"),
+    ("ধানে কোন সার দেব?", "Bengali"),
+    ("ধানত কি সাৰ দিব লাগে?", "Assamese"),
+    ("dhaan me kaun sa khad dale?", "Hindi"),
+    ("ଧାନ ପାଇଁ କେଉଁ ସାର?", "Odia"),
+    ("கோதுமைக்கு என்ன உரம்?", "Tamil"),
+    ("ਕਣਕ ਲਈ ਖਾਦ", "Punjabi"),
+    ("ઘઉં માટે ખાતર", "Gujarati"),
+    ("گندم کے لیے کھاد", "Urdu"),
+])
+def test_detect_language(text, language):
+    assert detect_language(text) == language
+
+
+def test_text_without_letters_gets_the_default():
+    assert detect_language("12345 ?!") == "English"
+    assert detect_language(None, default="Odia") == "Odia"
+
+
+def test_every_detected_language_is_supported():
+    languages = {language for candidates in SCRIPT_LANGUAGES.values() for language in candidates}
+    assert languages == set(LANGUAGE_MAP.values())
+
+
+def test_known_session_language_is_kept_while_the_script_matches():
+    # A Devanagari follow-up in a Marathi session stays Marathi, even if it reads as Hindi
+    assert resolve_language("धन्यवाद", "Marathi") == "Marathi"
+    assert resolve_language("123", "Odia") == "Odia"
+    # A script change is detected from the text
+    assert resolve_language("ধন্যবাদ", "Hindi") == "Bengali"
+    assert resolve_language("ok thanks", "Hindi") == "English"
+    assert resolve_language("How much urea?", "Klingon") == "English"
+
+
+def test_session_memo_evicts_the_least_recently_used(monkeypatch):
+    monkeypatch.setattr(language_service, "LANGUAGE_SESSION_CACHE_SIZE", 2)
+    monkeypatch.setattr(language_service, "_session_languages", OrderedDict())
+    remember_session_language("c1", "Hindi")
+    remember_session_language("c2", "Odia")
+    assert get_session_language("c1") == "Hindi"  # c2 is now the least recently used
+    remember_session_language("c3", "Tamil")
+    remember_session_language(None, "English")
+
+    assert get_session_language("c2") is None
+    assert (get_session_language("c1"), get_session_language("c3")) == ("Hindi", "Tamil")
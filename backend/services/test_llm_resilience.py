@@ -0,0 +1,142 @@
+import pytest
+
+import services.llm_resilience as llm_resilience
+import services.llm_service as llm_service
+from services.llm_errors import LLMCircuitOpenError, LLMUnavailableError
+from services.llm_providers import StubProvider
+from services.llm_resilience import CircuitBreaker, LatencyTracker, backoff_delay, CLOSED, OPEN, HALF_OPEN
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_resilience.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def make_breaker(**kwargs):
+    options = {"failure_rate": 0.5, "min_calls": 4, "window": 4, "open_seconds": 30}
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+def trip(breaker):
+    for _ in range(breaker.min_calls):
+        breaker.allow()
+        breaker.record_failure()
+
+
+def test_breaker_stays_closed_below_min_calls_and_threshold(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.stats()["state"] == CLOSED
+
+    breaker = make_breaker()
+    breaker.record_failure()
+    for _ in range(3):
+        breaker.record_success()
+    assert breaker.stats()["state"] == CLOSED
+    breaker.allow()
+
+
+def test_breaker_opens_at_the_failure_rate_and_fails_fast(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    assert breaker.stats()["state"] == OPEN
+    assert breaker.times_opened == 1
+
+    clock.now += 10
+    with pytest.raises(LLMCircuitOpenError) as raised:
+        breaker.allow("report")
+    assert raised.value.lane == "report"
+    assert raised.value.retry_after == 20
+    assert breaker.open_retry_after() == 20
+    assert breaker.short_circuited == 1
+
+
+def test_breaker_half_opens_after_the_cool_down_and_closes_on_a_good_probe(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += 30
+    assert breaker.stats()["state"] == HALF_OPEN
+    assert breaker.open_retry_after() is None
+
+    breaker.allow()  # the probe
+    with pytest.raises(LLMCircuitOpenError):
+        breaker.allow()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.stats()["state"] == CLOSED
+    assert breaker.stats()["recent_calls"] == 1
+    breaker.allow()
+
+
+def test_failed_probe_opens_the_breaker_again(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += 30
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.stats()["state"] == OPEN
+    assert breaker.times_opened == 2
+    with pytest.raises(LLMCircuitOpenError) as raised:
+        breaker.allow()
+    assert raised.value.retry_after == 30
+
+
+def test_cancelled_probe_frees_the_probe_slot(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.now += 30
+    breaker.allow()
+    breaker.cancel()  # e.g. refused by admission control before reaching the upstream
+    breaker.allow()
+
+
+def test_disabled_breaker_never_opens(clock):
+    breaker = make_breaker(enabled=False)
+    trip(breaker)
+    breaker.allow()
+    assert breaker.open_retry_after() is None
+
+
+def test_latency_percentile_needs_min_samples():
+    tracker = LatencyTracker(window=100, min_samples=5)
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        tracker.record("chat", seconds)
+    assert tracker.percentile("chat", 95) is None
+    tracker.record("chat", 2.0)
+    assert tracker.percentile("chat", 95) == 2.0
+    assert tracker.percentile("chat", 50) == 0.3
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, 0.25, 4.0) <= 4.0
+
+
+def test_failing_upstream_exhausts_retries_then_opens_the_circuit(monkeypatch):
+    breaker = make_breaker(min_calls=3, window=3)
+    monkeypatch.setattr(llm_service, "provider", StubProvider(latency="fixed:1", error_rate=1.0))
+    monkeypatch.setattr(llm_service, "breaker", breaker)
+    monkeypatch.setattr(llm_service, "LLM_RETRY_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(llm_service, "_backoff", lambda attempt, deadline, lane: 0)
+
+    with pytest.raises(LLMUnavailableError) as raised:
+        llm_service.get_ai_response("Why are my tomato leaves curling?", language="English")
+    assert not isinstance(raised.value, LLMCircuitOpenError)
+    assert breaker.stats()["state"] == OPEN
+
+    # Open: fails fast, the provider is not called
+    monkeypatch.setattr(llm_service, "provider", StubProvider(latency="fixed:1"))
+    with pytest.raises(LLMCircuitOpenError):
+        llm_service.get_ai_response("Why are my brinjal leaves curling?", language="English")
+    assert llm_service.get_circuit_retry_after() >= 1
@@ -0,0 +1,193 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import services.llm_service as llm_service
+from services.llm_errors import LLMOverloadedError, LLMUnavailableError
+from services.llm_providers import StubProvider
+from services.llm_scheduler import LLMScheduler, LANE_PRIORITY
+
+
+def make_scheduler(max_concurrency=1, queue_limit=10, max_wait=5.0, initial_latency=0.1):
+    return LLMScheduler(
+        max_concurrency=max_concurrency,
+        queue_limits={lane: queue_limit for lane in LANE_PRIORITY},
+        max_wait_seconds={lane: max_wait for lane in LANE_PRIORITY},
+        initial_latency=initial_latency
+    )
+
+
+def queue(scheduler, lane, order):
+    """Start a thread waiting for a slot on `lane`; it appends the lane to `order` once admitted"""
+    def wait():
+        scheduler.acquire(lane)
+        order.append(lane)
+    thread = threading.Thread(target=wait)
+    thread.start()
+    while scheduler.stats()["lanes"][lane]["queued"] == 0:
+        time.sleep(0.001)
+    return thread
+
+
+def test_calls_are_admitted_up_to_max_concurrency():
+    scheduler = make_scheduler(max_concurrency=2)
+    scheduler.acquire("chat")
+    scheduler.acquire("report")
+    assert scheduler.stats()["in_flight"] == 2
+    assert not scheduler.try_acquire("chat")
+
+    scheduler.release()
+    assert scheduler.try_acquire("chat")
+    assert scheduler.stats()["lanes"]["chat"]["admitted"] == 2
+
+
+def test_freed_slot_goes_to_the_highest_priority_lane():
+    scheduler = make_scheduler()
+    scheduler.acquire("chat")
+    order = []
+    threads = [queue(scheduler, lane, order) for lane in ("summary", "trial", "chat", "report")]
+
+    for _ in threads:
+        scheduler.release()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join(1)
+    assert order == ["chat", "report", "trial", "summary"]
+
+
+def test_same_lane_waiters_are_served_in_arrival_order():
+    scheduler = make_scheduler()
+    scheduler.acquire("chat")
+    order = []
+    first = queue(scheduler, "report", order)
+    second = threading.Thread(target=lambda: (scheduler.acquire("report"), order.append("second")))
+    second.start()
+    while scheduler.stats()["lanes"]["report"]["queued"] < 2:
+        time.sleep(0.001)
+
+    scheduler.release()
+    first.join(1)
+    scheduler.release()
+    second.join(1)
+    assert order == ["report", "second"]
+
+
+def test_full_lane_is_refused_with_retry_after():
+    scheduler = make_scheduler(queue_limit=1)
+    scheduler.acquire("chat")
+    waiter = queue(scheduler, "trial", [])
+
+    with pytest.raises(LLMOverloadedError) as raised:
+        scheduler.acquire("trial")
+    assert raised.value.lane == "trial"
+    assert raised.value.reason == "queue full"
+    assert raised.value.retry_after >= 1
+    assert scheduler.stats()["lanes"]["trial"]["rejected"] == 1
+    assert scheduler.overload_retry_after("trial") == raised.value.retry_after
+    # Other lanes still have room
+    assert scheduler.overload_retry_after("chat") is None
+
+    scheduler.release()
+    waiter.join(1)
+
+
+def test_call_is_refused_when_the_estimated_wait_exceeds_the_lane_deadline():
+    scheduler = make_scheduler(max_wait=1.0, initial_latency=3.0)
+    scheduler.acquire("chat")
+    with pytest.raises(LLMOverloadedError) as raised:
+        scheduler.acquire("summary")
+    assert raised.value.reason == "estimated wait exceeds deadline"
+    assert raised.value.retry_after == 3
+
+
+def test_waiter_is_dropped_when_its_deadline_passes():
+    scheduler = make_scheduler(max_wait=0.05, initial_latency=0.01)
+    scheduler.acquire("chat")
+    with pytest.raises(LLMOverloadedError) as raised:
+        scheduler.acquire("report")
+    assert raised.value.reason == "queue wait deadline exceeded"
+    lanes = scheduler.stats()["lanes"]
+    assert lanes["report"]["dropped"] == 1
+    assert lanes["report"]["queued"] == 0
+
+    # The held slot is released to nobody: in_flight goes back to zero
+    scheduler.release()
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_async_and_thread_waiters_share_one_queue():
+    scheduler = make_scheduler()
+    scheduler.acquire("chat")
+    order = []
+
+    async def main():
+        task = asyncio.create_task(scheduler.acquire_async("chat"))
+        while scheduler.stats()["lanes"]["chat"]["queued"] == 0:
+            await asyncio.sleep(0.001)
+        thread = queue(scheduler, "summary", order)
+        scheduler.release()
+        await asyncio.wait_for(task, 1)
+        order.append("async chat")
+        scheduler.release()
+        await asyncio.get_running_loop().run_in_executor(None, thread.join, 1)
+
+    asyncio.run(main())
+    assert order == ["async chat", "summary"]
+
+
+def test_overloaded_lane_reaches_get_ai_response_as_429_error(monkeypatch):
+    scheduler = make_scheduler(queue_limit=0)
+    scheduler.acquire("chat")
+    monkeypatch.setattr(llm_service, "scheduler", scheduler)
+
+    assert llm_service.get_overload_retry_after("trial") >= 1
+    with pytest.raises(LLMOverloadedError) as raised:
+        llm_service.get_ai_response("Which fertiliser for paddy in Kharif?", language="English", lane="trial")
+    assert raised.value.lane == "trial"
+    assert raised.value.retry_after >= 1
+
+    # A free slot: the stub provider answers
+    scheduler.release()
+    assert llm_service.get_overload_retry_after("trial") is None
+    assert llm_service.get_ai_response("Which fertiliser for wheat in Rabi?", language="English", lane="trial")
+
+
+def test_retry_after_is_rounded_up_to_whole_seconds():
+    assert LLMOverloadedError("chat", "queue full", 0.2).retry_after == 1
+    assert LLMOverloadedError("chat", "queue full", 2.1).retry_after == 3
+
+
+class BlockedProvider(StubProvider):
+    """Stub provider whose calls run until `finish` is set"""
+
+    def __init__(self):
+        super().__init__(latency="fixed:1")
+        self.finish = threading.Event()
+
+    def generate(self, prompt, history=None, timeout=None, response_schema=None):
+        self.finish.wait(5)
+        return super().generate(prompt, history, timeout, response_schema)
+
+
+def test_hedged_call_keeps_its_slot_until_the_primary_request_finishes(monkeypatch):
+    scheduler = make_scheduler(max_concurrency=1)
+    provider = BlockedProvider()
+    monkeypatch.setattr(llm_service, "scheduler", scheduler)
+    monkeypatch.setattr(llm_service, "provider", provider)
+    monkeypatch.setattr(llm_service, "hedge_pool", ThreadPoolExecutor(max_workers=2))
+    monkeypatch.setattr(llm_service, "_hedge_delay", lambda lane, timeout: 0.01)
+    monkeypatch.setattr(llm_service, "LLM_LANE_DEADLINE_SECONDS", {lane: 0.1 for lane in LANE_PRIORITY})
+    monkeypatch.setattr(llm_service, "LLM_RETRY_MAX_ATTEMPTS", 1)
+
+    # No slot for a hedge; the deadline passes while the primary request is still running
+    with pytest.raises(LLMUnavailableError):
+        llm_service._generate("Why are my tomato leaves curling?", lane="chat")
+    assert scheduler.stats()["in_flight"] == 1
+    assert not scheduler.try_acquire("chat")
+
+    provider.finish.set()
+    llm_service.hedge_pool.shutdown(wait=True)
+    assert scheduler.stats()["in_flight"] == 0
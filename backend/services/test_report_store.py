@@ -0,0 +1,58 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import report
+from services import report_store
+from services.report_store import (
+    canonical_report_key,
+    get_stored_report,
+    put_stored_report
+)
+
+
+@pytest.fixture
+def store(db_service):
+    """The report store and farming_reports on the (emptied after the test) mongomock database"""
+    return db_service
+
+
+def report_data(marker="stored"):
+    return {section: [f"{marker} {section} {i}" for i in range(4)] for section in report_store.REPORT_SECTIONS}
+
+
+def test_spellings_of_a_combination_share_one_key():
+    assert canonical_report_key("  Paddy  Rice ", "ODISHA", "Odia") == "paddy rice|odisha|odia"
+    assert canonical_report_key("Paddy Rice", "Odisha", "odia") == canonical_report_key("paddy rice", "odisha ", "Odia")
+    assert canonical_report_key("Paddy", "Odisha", "Odia") != canonical_report_key("Paddy", "Odisha", "Hindi")
+
+
+def test_stored_report_is_served_while_fresh(store):
+    put_stored_report("Wheat", "Punjab", "Hindi", report_data())
+    assert get_stored_report(" wheat ", "PUNJAB", "Hindi") == report_data()
+    assert get_stored_report("Wheat", "Haryana", "Hindi") is None
+
+    # A refresh replaces the sections
+    put_stored_report("Wheat", "Punjab", "Hindi", report_data("refreshed"))
+    assert get_stored_report("Wheat", "Punjab", "Hindi") == report_data("refreshed")
+    assert report_store.report_store_collection.count_documents({}) == 1
+
+
+def test_stale_entry_is_not_served(store):
+    put_stored_report("Wheat", "Punjab", "Hindi", report_data())
+    report_store.report_store_collection.update_one(
+        {}, {"$set": {"generated_at": datetime.now(timezone.utc) - timedelta(hours=30)}}
+    )
+    assert get_stored_report("Wheat", "Punjab", "Hindi", max_age_hours=24) is None
+    assert get_stored_report("Wheat", "Punjab", "Hindi", max_age_hours=48) == report_data()
+
+
+def test_resolve_report_uses_the_store_before_the_llm(store, monkeypatch):
+    monkeypatch.setattr(report, "REPORT_STORE_ENABLED", True)
+    monkeypatch.setattr(report, "generate_report_data", lambda *args, **kwargs: pytest.fail("LLM called"))
+    put_stored_report("Cotton", "Gujarat", "English", report_data())
+
+    data, source = report.resolve_report("cotton", "gujarat", "English")
+    assert source == "store"
+    assert data == {"crop": "cotton", "region": "gujarat", "language": "English", **report_data()}
+
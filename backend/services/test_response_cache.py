@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import services.llm_service as llm_service
+import services.response_cache as response_cache_module
+from services.llm_providers import StubProvider
+from services.response_cache import ResponseCache, normalize_prompt
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_trivially_different_prompts_share_a_key():
+    assert normalize_prompt("  How to grow   WHEAT?? ") == "how to grow wheat"
+    assert normalize_prompt("धान की खेती कैसे करें।") == "धान की खेती कैसे करें"
+    assert normalize_prompt("ｗｈｅａｔ") == "wheat"  # NFKC: full-width letters
+    assert ResponseCache.make_key("Wheat rust?", "English", "m") == ResponseCache.make_key("wheat rust", "english", "m")
+    assert ResponseCache.make_key("Wheat rust", "English", "m") != ResponseCache.make_key("Wheat rust", "Hindi", "m")
+    assert ResponseCache.make_key("Wheat rust", "English", "m") != ResponseCache.make_key("Wheat rust", "English", "n")
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"  # "b" is now the least recently used
+    cache.set("c", "C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache_module, "time", SimpleNamespace(monotonic=clock))
+    cache = ResponseCache(ttl_seconds=60)
+    cache.set("a", "A")
+    cache.set("b", "B", ttl_seconds=5)
+
+    clock.now += 10
+    assert cache.get("a") == "A"
+    assert cache.get("b") is None
+    clock.now += 60
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["entries"]) == (1, 2, 2, 0)
+    assert stats["hit_rate"] == round(1 / 3, 4)
+
+
+class CountingProvider(StubProvider):
+    def __init__(self):
+        super().__init__(latency="fixed:1")
+        self.calls = 0
+
+    def generate(self, prompt, history=None, timeout=None, response_schema=None):
+        self.calls += 1
+        return super().generate(prompt, history, timeout, response_schema)
+
+
+def test_get_ai_response_serves_history_free_prompts_from_the_cache(monkeypatch):
+    provider = CountingProvider()
+    monkeypatch.setattr(llm_service, "provider", provider)
+    monkeypatch.setattr(llm_service, "response_cache", ResponseCache())
+
+    first = llm_service.get_ai_response("How to control aphids in mustard?", language="English")
+    assert llm_service.get_ai_response("how to control  aphids in mustard", language="English") == first
+    assert provider.calls == 1
+
+    # Another language, or a conversation, goes upstream
+    llm_service.get_ai_response("How to control aphids in mustard?", language="Hindi")
+    history = [{"role": "user", "message": "My mustard crop"}, {"role": "assistant", "message": "Tell me more"}]
+    llm_service.get_ai_response("How to control aphids in mustard?", history, language="English")
+    assert provider.calls == 3
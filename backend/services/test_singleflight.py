@@ -0,0 +1,129 @@
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import services.llm_service as llm_service
+from services.llm_errors import LLMOverloadedError, LLMUnavailableError, LLMCircuitOpenError
+from services.singleflight import SingleFlight, MongoSingleFlight, SharedFlightError
+
+LLM_ERRORS = (LLMOverloadedError, LLMUnavailableError, LLMCircuitOpenError)
+
+
+def make_flight(mongo_db, owner):
+    flight = MongoSingleFlight(mongo_db.llm_inflight, poll_interval=0.01, errors=LLM_ERRORS)
+    flight.owner = owner  # one instance per "process"
+    return flight
+
+
+def follow(flight, key, outcome):
+    try:
+        outcome["result"] = flight.do(key, lambda: pytest.fail("the follower must not run the call"))
+    except Exception as e:
+        outcome["error"] = e
+
+
+def test_local_followers_share_the_leader_result():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def call():
+        started.set()
+        release.wait(1)
+        return "answer"
+
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", call)))
+    leader.start()
+    started.wait(1)
+    follower = threading.Thread(target=lambda: results.append(flight.do("k", call)))
+    follower.start()
+    time.sleep(0.02)
+    release.set()
+    leader.join(1)
+    follower.join(1)
+    assert results == ["answer", "answer"]
+    assert flight.stats() == {"leaders": 1, "coalesced": 1, "in_flight": 0}
+
+
+def test_shared_followers_get_the_leader_result(mongo_db):
+    leader, follower = make_flight(mongo_db, "host:1"), make_flight(mongo_db, "host:2")
+    release = threading.Event()
+    outcome = {}
+
+    thread = threading.Thread(target=lambda: outcome.setdefault("leader", leader.do("k", lambda: release.wait(1) and "answer")))
+    thread.start()
+    while mongo_db.llm_inflight.count_documents({}) == 0:
+        time.sleep(0.005)
+    waiter = threading.Thread(target=follow, args=(follower, "k", outcome))
+    waiter.start()
+    release.set()
+    thread.join(1)
+    waiter.join(1)
+    assert outcome["leader"] == outcome["result"] == "answer"
+    assert follower.coalesced == 1
+
+
+@pytest.mark.parametrize("error", [
+    LLMOverloadedError("chat", "queue full", 7),
+    LLMUnavailableError("chat", "retries exhausted", 5),
+    LLMCircuitOpenError("report", "circuit open", 30),
+])
+def test_shared_followers_reraise_the_leader_llm_error(mongo_db, error):
+    leader, follower = make_flight(mongo_db, "host:1"), make_flight(mongo_db, "host:2")
+    with pytest.raises(type(error)):
+        leader.do("k", lambda: (_ for _ in ()).throw(error))
+
+    outcome = {}
+    follow(follower, "k", outcome)
+    shared = outcome["error"]
+    assert type(shared) is type(error)
+    assert (shared.lane, shared.reason) == (error.lane, error.reason)
+    assert 1 <= shared.retry_after <= error.retry_after
+
+
+def test_shared_retry_after_counts_from_the_leader_failure(mongo_db):
+    follower = make_flight(mongo_db, "host:2")
+    now = datetime.now(timezone.utc)
+    mongo_db.llm_inflight.insert_one({
+        "_id": follower._doc_id("k"),
+        "status": "done",
+        "owner": "host:1",
+        "finished_at": now - timedelta(seconds=6),
+        "expires_at": now + timedelta(seconds=4),
+        "error": "LLM overloaded",
+        "error_type": "LLMOverloadedError",
+        "error_detail": {"lane": "chat", "reason": "queue full", "retry_after": 8}
+    })
+    with pytest.raises(LLMOverloadedError) as raised:
+        follower.do("k", lambda: "unused")
+    assert raised.value.retry_after == 2
+
+
+def test_shared_followers_get_other_errors_as_shared_flight_error(mongo_db):
+    leader, follower = make_flight(mongo_db, "host:1"), make_flight(mongo_db, "host:2")
+    with pytest.raises(RuntimeError):
+        leader.do("k", lambda: (_ for _ in ()).throw(RuntimeError("provider bug")))
+
+    with pytest.raises(SharedFlightError, match="provider bug"):
+        follower.do("k", lambda: "unused")
+
+
+def test_get_ai_response_follower_raises_instead_of_falling_back(mongo_db, monkeypatch):
+    leader, follower = make_flight(mongo_db, "host:1"), make_flight(mongo_db, "host:2")
+    prompt, language = "Best time to sow mustard?", "English"
+    request_key = llm_service._request_key(prompt, None, language)
+    with pytest.raises(LLMOverloadedError):
+        leader.do(request_key, lambda: (_ for _ in ()).throw(LLMOverloadedError("chat", "queue full", 3)))
+
+    monkeypatch.setattr(llm_service, "LLM_COALESCE_ENABLED", True)
+    monkeypatch.setattr(llm_service, "shared_flight", follower)
+    with pytest.raises(LLMOverloadedError):
+        llm_service.get_ai_response(prompt, language=language)
+
+    # A non-LLM failure of the leader still ends in the fallback reply
+    other_key = llm_service._request_key("Soil pH for tea?", None, language)
+    with pytest.raises(RuntimeError):
+        leader.do(other_key, lambda: (_ for _ in ()).throw(RuntimeError("provider bug")))
+    assert llm_service.get_ai_response("Soil pH for tea?", language=language) == llm_service.FALLBACK_RESPONSE
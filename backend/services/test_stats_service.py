@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+from services.stats_service import StatsCounters, COUNTERS, TOTALS_ID, RECENT_HOURS, hour_id, day_id
+
+NOW = datetime(2026, 10, 18, 13, 25)
+
+
+def make_counters(mongo_db, **kwargs):
+    return StatsCounters(mongo_db.app_stats, **kwargs)
+
+
+def counts(mongo_db, doc_id):
+    doc = mongo_db.app_stats.find_one({"_id": doc_id})
+    return doc["counts"] if doc else None
+
+
+def test_record_bumps_totals_and_the_hour_and_day_buckets(mongo_db):
+    counters = make_counters(mongo_db, hourly_retention_days=14)
+    earlier = NOW - timedelta(hours=2)
+    assert counters.record(created=[("chat_messages", NOW), ("chat_messages", NOW), ("users", earlier)])
+
+    assert counts(mongo_db, TOTALS_ID) == {"chat_messages": 2, "users": 1}
+    assert counts(mongo_db, hour_id(NOW)) == {"chat_messages": 2}
+    assert counts(mongo_db, hour_id(earlier)) == {"users": 1}
+    assert counts(mongo_db, day_id(NOW)) == {"chat_messages": 2, "users": 1}
+    hour = mongo_db.app_stats.find_one({"_id": hour_id(NOW)})
+    assert hour["expire_at"] == datetime(2026, 11, 1, 13)
+    assert "expire_at" not in mongo_db.app_stats.find_one({"_id": day_id(NOW)})
+
+    # Removals lower the totals only
+    assert counters.record(removed={"chat_messages": 2, "reports": 0})
+    assert counts(mongo_db, TOTALS_ID) == {"chat_messages": 0, "users": 1}
+    assert counts(mongo_db, hour_id(NOW)) == {"chat_messages": 2}
+
+
+def test_operations_are_one_upsert_per_document():
+    operations = StatsCounters(None).operations(
+        created=[("reports", NOW), ("feedbacks", NOW), ("reports", NOW - timedelta(days=1))]
+    )
+    # totals, two hours, two days
+    assert len(operations) == 5
+    assert StatsCounters(None).operations() == []
+
+
+def test_snapshot_sums_exactly_the_last_168_hours(mongo_db):
+    counters = make_counters(mongo_db, series_days=3)
+    oldest_counted = NOW - timedelta(hours=RECENT_HOURS - 1)
+    counters.record(created=[
+        ("reports", NOW), ("reports", oldest_counted), ("reports", oldest_counted - timedelta(hours=1))
+    ])
+
+    snapshot = counters.snapshot(NOW)
+    assert RECENT_HOURS == 168
+    assert snapshot["totals"]["reports"] == 3
+    assert snapshot["last_7_days"]["reports"] == 2
+    assert len(snapshot["hourly"]) == 24
+    assert snapshot["hourly"][-1]["bucket"] == "2026-10-18T13:00:00Z"
+    assert snapshot["hourly"][-1]["reports"] == 1
+    assert [day["bucket"] for day in snapshot["daily"]] == ["2026-10-16", "2026-10-17", "2026-10-18"]
+    assert snapshot["daily"][-1]["reports"] == 1 and snapshot["daily"][-1]["users"] == 0
+
+
+def test_backfill_matches_the_counts_of_the_write_path(mongo_db):
+    asked = NOW - timedelta(hours=30)
+    old = NOW - timedelta(days=40)
+    mongo_db.users.insert_many([{"created_at": NOW}, {"created_at": old}])
+    mongo_db.chat_history.insert_one({"role": "user", "timestamp": old})
+    mongo_db.chat_turns.insert_one({"turns": [
+        {"asked_at": asked, "answered_at": asked + timedelta(minutes=1)},
+        {"asked_at": NOW},   # answer not stored
+    ]})
+    mongo_db.app_stats.insert_one({"_id": hour_id(NOW - timedelta(hours=5)), "counts": {"users": 9}})
+
+    live = make_counters(mongo_db.client.get_database("agrigpt_live"), hourly_retention_days=14)
+    live.record(created=[("users", NOW), ("users", old), ("chat_messages", old),
+                         ("chat_messages", asked), ("chat_messages", asked + timedelta(minutes=1)),
+                         ("chat_messages", NOW)])
+
+    counters = make_counters(mongo_db, hourly_retention_days=14)
+    for _ in range(2):  # idempotent
+        result = counters.backfill(mongo_db, NOW)
+        assert result["totals"]["users"] == 2 and result["totals"]["chat_messages"] == 4
+        # The stale bucket is removed; hourly rollups past their retention are not written
+        assert mongo_db.app_stats.find_one({"_id": hour_id(NOW - timedelta(hours=5))}) is None
+        assert mongo_db.app_stats.find_one({"_id": hour_id(old)}) is None
+        assert counts(mongo_db, day_id(old)) == {**dict.fromkeys(COUNTERS, 0), "users": 1, "chat_messages": 1}
+
+    backfilled, recorded = counters.snapshot(NOW), live.snapshot(NOW)
+    assert backfilled["backfilled_at"] == NOW
+    for key in ("totals", "last_7_days", "hourly", "daily"):
+        assert backfilled[key] == recorded[key]
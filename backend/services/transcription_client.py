@@ -0,0 +1,114 @@
+"""
+Client for the Whisper transcription server (transcription_server.py).
+
+Web workers call transcribe() with 16 kHz mono float32 PCM. The samples are
+copied once into a named shared memory block; only the block's name, the
+sample count and the decode options are sent to the server. The block is
+unlinked as soon as the result is back. No model is loaded in this process.
+"""
+
+import threading
+from multiprocessing.connection import Client
+from utils.config import (
+    TRANSCRIBE_SERVER_HOST,
+    TRANSCRIBE_SERVER_PORT,
+    TRANSCRIBE_AUTHKEY,
+    TRANSCRIBE_CLIENT_TIMEOUT_SECONDS
+)
+
+SAMPLE_RATE = 16000
+
+
+class TranscriptionError(Exception):
+    """Base class for transcription service errors"""
+
+    def __init__(self, message, retry_after=5):
+        super().__init__(message)
+        self.retry_after = int(retry_after)
+
+
+class TranscriptionOverloadedError(TranscriptionError):
+    """The transcription queue is full (HTTP 429)"""
+
+
+class TranscriptionUnavailableError(TranscriptionError):
+    """The transcription server is down, timed out or failed (HTTP 503)"""
+
+
+_counters = {"requests": 0, "overloaded": 0, "unavailable": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def _request(payload: dict, timeout: float) -> dict:
+    if not TRANSCRIBE_AUTHKEY:
+        raise TranscriptionUnavailableError("TRANSCRIBE_AUTHKEY is not set")
+    try:
+        conn = Client((TRANSCRIBE_SERVER_HOST, TRANSCRIBE_SERVER_PORT), authkey=TRANSCRIBE_AUTHKEY)
+    except OSError as e:
+        raise TranscriptionUnavailableError(f"Transcription server unreachable: {e}")
+    try:
+        conn.send(payload)
+        if not conn.poll(timeout):
+            raise TranscriptionUnavailableError("Transcription server timed out")
+        return conn.recv()
+    except (OSError, EOFError) as e:
+        raise TranscriptionUnavailableError(f"Transcription server connection lost: {e}")
+    finally:
+        conn.close()
+
+
+def transcribe(audio, **options) -> dict:
+    """
+    Transcribe 16 kHz mono float32 PCM (NumPy array) on the transcription pool.
+    options are passed to WhisperModel.transcribe (e.g. language, beam_size).
+
+    Returns {"text", "language", "language_probability", "audio_seconds", "decode_seconds", ...}
+
+    Raises:
+        TranscriptionOverloadedError: the pool's queue is full
+        TranscriptionUnavailableError: server unreachable, timed out or failed
+    """
+    import numpy as np
+    from multiprocessing import shared_memory
+
+    audio = np.ascontiguousarray(audio, dtype=np.float32)
+    _count("requests")
+    shm = shared_memory.SharedMemory(create=True, size=max(1, audio.nbytes))
+    try:
+        np.ndarray(audio.shape, dtype=np.float32, buffer=shm.buf)[:] = audio
+        response = _request(
+            {"op": "transcribe", "shm": shm.name, "samples": len(audio), "options": options},
+            TRANSCRIBE_CLIENT_TIMEOUT_SECONDS
+        )
+    except TranscriptionUnavailableError:
+        _count("unavailable")
+        raise
+    finally:
+        shm.close()
+        shm.unlink()
+
+    if response.get("ok"):
+        return response["result"]
+    if response.get("error") == "overloaded":
+        _count("overloaded")
+        raise TranscriptionOverloadedError("Transcription queue full", response.get("retry_after", 5))
+    _count("unavailable")
+    raise TranscriptionUnavailableError(
+        f"Transcription {response.get('error')}: {response.get('detail', '')}", response.get("retry_after", 5)
+    )
+
+
+def get_transcription_stats() -> dict:
+    """Pool metrics from the server (queue depth, RTF, ...) plus this worker's client counters"""
+    with _counters_lock:
+        client = dict(_counters)
+    try:
+        response = _request({"op": "stats"}, timeout=2)
+        return {"client": client, "pool": response.get("stats")}
+    except TranscriptionUnavailableError as e:
+        return {"client": client, "pool": None, "error": str(e)}
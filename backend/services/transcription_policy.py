@@ -0,0 +1,98 @@
+"""
+Load-adaptive transcription quality tiers (server side, used by TranscriptionPool).
+
+Every job gets a tier from the current load and the clip length after
+silence trimming:
+
+    quality   small / int8 / beam 5   pool idle, short clip
+    balanced  base  / int8 / beam 2   a few jobs waiting, or a longer clip
+    fast      tiny  / int8 / beam 1   anything else - guaranteed throughput
+
+A tier applies when the queue depth is at most its TRANSCRIBE_POLICY_MAX_QUEUE
+and the (trimmed) clip at most its TRANSCRIBE_POLICY_MAX_SECONDS; the last
+tier has no limits. Options the caller sets explicitly are never overridden.
+
+Each decision is appended to TRANSCRIBE_POLICY_LOG_PATH (JSONL) together with
+its outcome (decode time, real-time factor), so the thresholds can be tuned
+from real traffic.
+"""
+
+import json
+import os
+import threading
+import time
+from utils.config import (
+    TRANSCRIBE_POLICY_TIERS,
+    TRANSCRIBE_POLICY_MAX_QUEUE,
+    TRANSCRIBE_POLICY_MAX_SECONDS,
+    TRANSCRIBE_POLICY_LOG_PATH
+)
+
+
+def parse_tier(spec: str) -> dict:
+    """ "small/int8/5" -> {"model_size": "small", "compute_type": "int8", "beam_size": 5} """
+    model_size, compute_type, beam_size = spec.split("/")
+    return {"model_size": model_size, "compute_type": compute_type, "beam_size": int(beam_size)}
+
+
+class TranscriptionPolicy:
+    def __init__(self, tiers=None, max_queue=None, max_seconds=None, log_path=TRANSCRIBE_POLICY_LOG_PATH):
+        tiers = TRANSCRIBE_POLICY_TIERS if tiers is None else tiers
+        self.tiers = {name: parse_tier(spec) for name, spec in tiers.items()}
+        self.max_queue = TRANSCRIBE_POLICY_MAX_QUEUE if max_queue is None else max_queue
+        self.max_seconds = TRANSCRIBE_POLICY_MAX_SECONDS if max_seconds is None else max_seconds
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self.counts = {name: 0 for name in self.tiers}
+        self.counts["skipped"] = 0
+
+    def choose(self, queue_depth: int, busy: int, processes: int, clip_seconds: float, options: dict) -> dict:
+        """Pick the first tier whose limits hold; returns the decision record"""
+        names = list(self.tiers)
+        tier = names[-1]
+        for name in names[:-1]:
+            if queue_depth <= self.max_queue.get(name, 0) and clip_seconds <= self.max_seconds.get(name, 0):
+                tier = name
+                break
+
+        # Explicit options from the caller win over the tier
+        applied = {key: value for key, value in self.tiers[tier].items() if key not in options}
+        with self._lock:
+            self.counts[tier] += 1
+        return {
+            "tier": tier,
+            "queue_depth": queue_depth,
+            "busy": busy,
+            "processes": processes,
+            "clip_seconds": round(clip_seconds, 2),
+            "options": applied
+        }
+
+    def skipped(self, audio_seconds: float) -> dict:
+        """Decision record for a clip with no speech (not decoded at all)"""
+        with self._lock:
+            self.counts["skipped"] += 1
+        return {"tier": "skipped", "clip_seconds": 0.0, "audio_seconds": round(audio_seconds, 2), "options": {}}
+
+    def record(self, decision: dict, **outcome):
+        """Append the decision and its outcome to the JSONL log"""
+        if not self.log_path:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), **decision, **outcome}, ensure_ascii=False)
+        try:
+            with self._lock:
+                directory = os.path.dirname(self.log_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not write transcription decision log: {str(e)}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tiers": {name: {**tier, "max_queue": self.max_queue.get(name), "max_seconds": self.max_seconds.get(name)}
+                          for name, tier in self.tiers.items()},
+                "decisions": dict(self.counts)
+            }
@@ -0,0 +1,346 @@
+"""
+Whisper transcription worker pool (server side, run by transcription_server.py).
+
+A fixed number of worker processes own the faster-whisper models - web
+workers never load them. Requests arrive over a multiprocessing connection
+(services/transcription_client.py); the audio itself is not sent over the
+socket: the client writes 16 kHz mono float32 PCM into a named shared memory
+block and only its name and length travel with the request. The worker
+process maps the block and hands a zero-copy NumPy view to
+WhisperModel.transcribe.
+
+    client --(shm name, samples, options)--> server thread --job queue--> worker process
+    client <-------------- result dict ---- server thread <-result queue-- worker process
+
+Each worker runs its CTranslate2 models with TRANSCRIBE_CPU_THREADS intra-op
+threads and TRANSCRIBE_NUM_WORKERS inter-op workers, so concurrent requests
+queue in front of the pool instead of contending for one model instance.
+Metrics: queue depth, busy workers, and real-time factor (decode time /
+audio duration) over a rolling window.
+
+Before a job is queued, the server thread trims leading and trailing silence
+(services/vad.py) - the worker only decodes the speech slice of the block -
+and the policy (services/transcription_policy.py) picks model size, beam size
+and compute type from the queue depth and the trimmed length. Workers load
+every tier's model at start-up.
+"""
+
+import itertools
+import multiprocessing
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Listener
+
+SAMPLE_RATE = 16000
+
+
+class TranscriptionQueueFull(Exception):
+    """The pool's queue is at TRANSCRIBE_MAX_QUEUE"""
+
+
+def attach_shared_memory(name: str):
+    """Map an existing shared memory block without letting this process' tracker unlink it"""
+    from multiprocessing import resource_tracker, shared_memory
+
+    shm = shared_memory.SharedMemory(name=name)
+    # Python < 3.13 registers attached blocks too - the creating client owns and unlinks it
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+# ==================== WORKER PROCESS ====================
+
+def _load_model(config: dict, model_size: str, compute_type: str):
+    from faster_whisper import WhisperModel
+    return WhisperModel(
+        model_size_or_path=model_size,
+        device="cpu",
+        compute_type=compute_type,
+        cpu_threads=config["cpu_threads"],
+        num_workers=config["num_workers"]
+    )
+
+
+def _transcribe_job(models: dict, config: dict, shm_name: str, samples: int, start: int, end: int,
+                    options: dict) -> dict:
+    import numpy as np
+
+    options = dict(options)
+    model_size = options.pop("model_size", config["model_size"])
+    compute_type = options.pop("compute_type", config["compute_type"])
+    key = (model_size, compute_type)
+    if key not in models:
+        models[key] = _load_model(config, model_size, compute_type)
+
+    shm = attach_shared_memory(shm_name)
+    audio = segments = None
+    try:
+        audio = np.ndarray((samples,), dtype=np.float32, buffer=shm.buf)[start:end]
+        started = time.perf_counter()
+        segments, info = models[key].transcribe(audio, **options)
+        segments = list(segments)
+        text = " ".join(s.text for s in segments).strip()
+        decode_seconds = time.perf_counter() - started
+        avg_logprob = sum(s.avg_logprob for s in segments) / len(segments) if segments else None
+    finally:
+        # Drop every view of the block before unmapping it
+        audio = segments = None
+        shm.close()
+
+    return {
+        "text": text,
+        "language": info.language,
+        "language_probability": info.language_probability,
+        "avg_logprob": avg_logprob,
+        "audio_seconds": (end - start) / SAMPLE_RATE,
+        "trimmed_seconds": (samples - (end - start)) / SAMPLE_RATE,
+        "decode_seconds": decode_seconds,
+        "model_size": model_size,
+        "compute_type": compute_type
+    }
+
+
+def _worker_main(index: int, config: dict, jobs, results):
+    """Worker process: load the default and tier models, then transcribe jobs until a None sentinel"""
+    models = {key: _load_model(config, *key) for key in config["preload"]}
+    print(f"✓ Transcription worker {index} ready ({', '.join('/'.join(key) for key in models)})")
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        job_id, shm_name, samples, start, end, options = job
+        results.put(("started", job_id, index))
+        try:
+            results.put(("done", job_id, _transcribe_job(models, config, shm_name, samples, start, end, options)))
+        except Exception as e:
+            results.put(("failed", job_id, str(e)))
+
+
+# ==================== POOL ====================
+
+def _speech_slice(shm_name: str, samples: int, pad_ms: int) -> tuple:
+    import numpy as np
+    from services.vad import speech_bounds
+
+    shm = attach_shared_memory(shm_name)
+    audio = None
+    try:
+        audio = np.ndarray((samples,), dtype=np.float32, buffer=shm.buf)
+        return speech_bounds(audio, pad_ms=pad_ms)
+    finally:
+        audio = None
+        shm.close()
+
+
+class TranscriptionPool:
+    def __init__(self, processes=2, model_size="tiny", compute_type="int8", cpu_threads=2, num_workers=1,
+                 max_queue=32, rtf_window=200, policy=None, trim_silence=True, trim_pad_ms=200):
+        self.processes = processes
+        self.max_queue = max_queue
+        self.policy = policy
+        self.trim_silence = trim_silence
+        self.trim_pad_ms = trim_pad_ms
+        self.config = {
+            "model_size": model_size,
+            "compute_type": compute_type,
+            "cpu_threads": cpu_threads,
+            "num_workers": num_workers,
+            # Every tier's model is loaded up front, so an idle pool never waits on a model load
+            "preload": list(dict.fromkeys([(model_size, compute_type)] + [
+                (tier["model_size"], tier["compute_type"]) for tier in (policy.tiers.values() if policy else [])
+            ]))
+        }
+        context = multiprocessing.get_context("spawn")
+        self._jobs = context.Queue()
+        self._results = context.Queue()
+        self._workers = [
+            context.Process(target=_worker_main, args=(i, self.config, self._jobs, self._results), daemon=True)
+            for i in range(processes)
+        ]
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending = {}   # job_id -> [threading.Event, outcome, payload]
+        self._started = set()
+        self._rtf = deque(maxlen=rtf_window)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.audio_seconds = 0.0
+        self.trimmed_seconds = 0.0
+
+    def start(self):
+        for worker in self._workers:
+            worker.start()
+        threading.Thread(target=self._collect, daemon=True).start()
+
+    def stop(self):
+        for _ in self._workers:
+            self._jobs.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5)
+
+    def _collect(self):
+        """Route worker results back to the waiting request threads"""
+        while True:
+            kind, job_id, payload = self._results.get()
+            with self._lock:
+                if kind == "started":
+                    if job_id in self._pending:
+                        self._started.add(job_id)
+                    continue
+                self._started.discard(job_id)
+                entry = self._pending.pop(job_id, None)
+                if kind == "done":
+                    self.completed += 1
+                    self.audio_seconds += payload["audio_seconds"]
+                    self.trimmed_seconds += payload["trimmed_seconds"]
+                    if payload["audio_seconds"]:
+                        self._rtf.append(payload["decode_seconds"] / payload["audio_seconds"])
+                else:
+                    self.failed += 1
+            if entry is not None:
+                entry[1], entry[2] = kind, payload
+                entry[0].set()
+
+    def queue_depth(self) -> int:
+        """Jobs waiting for a worker (not yet started)"""
+        with self._lock:
+            return len(self._pending) - len(self._started)
+
+    def transcribe(self, shm_name: str, samples: int, options: dict, timeout: float) -> dict:
+        """
+        Run one job on the pool and wait for its result.
+
+        Raises:
+            TranscriptionQueueFull: max_queue jobs are already waiting
+            TimeoutError: no result within timeout
+            RuntimeError: the worker failed to transcribe
+        """
+        start, end = _speech_slice(shm_name, samples, self.trim_pad_ms) if self.trim_silence else (0, samples)
+        if end <= start:
+            # No speech: nothing to decode (Whisper tends to hallucinate text on silence)
+            if self.policy:
+                self.policy.record(self.policy.skipped(samples / SAMPLE_RATE))
+            with self._lock:
+                self.trimmed_seconds += samples / SAMPLE_RATE
+            return {
+                "text": "", "language": None, "language_probability": 0.0, "avg_logprob": None,
+                "audio_seconds": 0.0, "trimmed_seconds": samples / SAMPLE_RATE, "decode_seconds": 0.0,
+                "model_size": None, "compute_type": None, "tier": "skipped"
+            }
+
+        entry = [threading.Event(), None, None]
+        with self._lock:
+            queue_depth = len(self._pending) - len(self._started)
+            if queue_depth >= self.max_queue:
+                self.rejected += 1
+                raise TranscriptionQueueFull()
+            job_id = next(self._ids)
+            self._pending[job_id] = entry
+            busy = len(self._started)
+
+        decision = None
+        if self.policy:
+            decision = self.policy.choose(queue_depth, busy, self.processes, (end - start) / SAMPLE_RATE, options)
+            options = {**options, **decision["options"]}
+        self._jobs.put((job_id, shm_name, samples, start, end, options))
+
+        if not entry[0].wait(timeout):
+            with self._lock:
+                # The worker may still pick it up; its result is then dropped
+                self._pending.pop(job_id, None)
+                self._started.discard(job_id)
+            if decision:
+                self.policy.record(decision, outcome="timeout")
+            raise TimeoutError("Transcription timed out")
+        if entry[1] != "done":
+            if decision:
+                self.policy.record(decision, outcome="failed")
+            raise RuntimeError(entry[2])
+
+        result = entry[2]
+        if decision:
+            self.policy.record(
+                decision,
+                outcome="done",
+                audio_seconds=round(result["audio_seconds"], 2),
+                trimmed_seconds=round(result["trimmed_seconds"], 2),
+                decode_seconds=round(result["decode_seconds"], 3),
+                rtf=round(result["decode_seconds"] / result["audio_seconds"], 3) if result["audio_seconds"] else None
+            )
+        return {**result, "tier": decision["tier"] if decision else None}
+
+    def stats(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._rtf)
+            pending = len(self._pending)
+            busy = len(self._started)
+            return {
+                "processes": self.processes,
+                **self.config,
+                "queue_depth": pending - busy,
+                "busy": busy,
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "audio_seconds": round(self.audio_seconds, 1),
+                "trimmed_seconds": round(self.trimmed_seconds, 1),
+                "rtf_p50": round(ordered[len(ordered) // 2], 3) if ordered else None,
+                "rtf_p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3) if ordered else None,
+                "policy": self.policy.stats() if self.policy else None
+            }
+
+
+# ==================== SERVER ====================
+
+def serve(pool: TranscriptionPool, address: tuple, authkey: bytes, job_timeout: float, retry_after: int):
+    """Accept client connections forever; one thread per connection"""
+    listener = Listener(address, authkey=authkey)
+    print(f"✓ Transcription server listening on {address[0]}:{address[1]} ({pool.processes} processes)")
+
+    def handle(conn):
+        try:
+            while True:
+                try:
+                    request = conn.recv()
+                except EOFError:
+                    return
+                conn.send(_handle_request(pool, request, job_timeout, retry_after))
+        except Exception as e:
+            print(f"✗ Transcription connection error: {str(e)}")
+        finally:
+            conn.close()
+
+    while True:
+        try:
+            conn = listener.accept()
+        except Exception as e:
+            # Failed handshake (wrong authkey) or aborted connection
+            print(f"⚠️ Transcription server rejected a connection: {str(e)}")
+            continue
+        threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+
+def _handle_request(pool: TranscriptionPool, request: dict, job_timeout: float, retry_after: int) -> dict:
+    op = request.get("op")
+    if op == "stats":
+        return {"ok": True, "stats": pool.stats()}
+    if op != "transcribe":
+        return {"ok": False, "error": "bad_request", "detail": f"Unknown op: {op}"}
+
+    try:
+        result = pool.transcribe(request["shm"], request["samples"], request.get("options") or {}, job_timeout)
+        return {"ok": True, "result": result}
+    except TranscriptionQueueFull:
+        return {"ok": False, "error": "overloaded", "retry_after": retry_after}
+    except TimeoutError:
+        return {"ok": False, "error": "timeout", "retry_after": retry_after}
+    except Exception as e:
+        print(f"✗ Transcription failed: {str(e)}")
+        return {"ok": False, "error": "failed", "detail": str(e)}
@@ -0,0 +1,156 @@
+"""
+Energy-based voice activity detection for 16 kHz mono float32 PCM.
+
+Audio is cut into 30 ms frames; a frame is speech when its level is
+VOICE_VAD_THRESHOLD_DB above a running noise-floor estimate (and above an
+absolute -50 dBFS floor, so digital silence never counts). The noise floor
+follows non-speech frames and creeps up only very slowly during speech, so
+it settles on steady field noise (wind, pump engines) within a second or two
+without drifting up to the level of a long sentence.
+
+SpeechSegmenter is fed frames as they arrive over /ws/voice and returns a
+segment each time VOICE_VAD_SEGMENT_SILENCE_MS of silence follows speech, so
+each segment can be transcribed while the farmer keeps talking.
+
+speech_bounds looks at a whole clip at once (the noise floor is its quietest
+frames) and is used by the transcription pool to trim leading and trailing
+silence before decoding.
+"""
+
+from utils.config import (
+    VOICE_VAD_THRESHOLD_DB,
+    VOICE_VAD_SEGMENT_SILENCE_MS,
+    VOICE_VAD_END_SILENCE_MS,
+    VOICE_VAD_MAX_SEGMENT_SECONDS
+)
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 480          # 30 ms
+ABSOLUTE_FLOOR_DB = -50.0
+INITIAL_NOISE_CEILING_DB = -45.0   # a stream that starts mid-word must not set the floor at speech level
+NOISE_ADAPT_RATE = 0.05            # per non-speech frame
+NOISE_SPEECH_RISE_RATE = 0.002     # per speech frame
+PRE_ROLL_FRAMES = 7          # ~200 ms kept before the first speech frame (soft onsets)
+MIN_SPEECH_FRAMES = 7        # shorter bursts are clicks / bumps, not words
+
+
+ONSET_FRAMES = 3             # consecutive speech frames that mark the first / last word
+
+
+def frame_levels(pcm):
+    """dBFS level of each complete 30 ms frame"""
+    import numpy as np
+
+    frames = len(pcm) // FRAME_SAMPLES
+    if not frames:
+        return np.zeros(0, dtype=np.float32)
+    blocks = pcm[:frames * FRAME_SAMPLES].reshape(frames, FRAME_SAMPLES)
+    rms = np.sqrt(np.mean(np.square(blocks, dtype=np.float32), axis=1))
+    return 20.0 * np.log10(np.maximum(rms, 1e-6))
+
+
+def speech_bounds(pcm, threshold_db=VOICE_VAD_THRESHOLD_DB, pad_ms=200) -> tuple:
+    """
+    (start, end) sample indices of the speech in a clip, padded by pad_ms on
+    both sides; (0, 0) when there is no speech at all.
+    """
+    import numpy as np
+
+    levels = frame_levels(pcm)
+    if len(levels) < ONSET_FRAMES:
+        return (0, len(pcm)) if len(levels) and levels.max() > ABSOLUTE_FLOOR_DB else (0, 0)
+
+    noise_db = min(float(np.percentile(levels, 10)), INITIAL_NOISE_CEILING_DB)
+    speech = levels > max(noise_db + threshold_db, ABSOLUTE_FLOOR_DB)
+    # Runs of ONSET_FRAMES speech frames - a single click does not count as speech
+    runs = np.flatnonzero(np.convolve(speech, np.ones(ONSET_FRAMES, dtype=int), mode="valid") == ONSET_FRAMES)
+    if not len(runs):
+        return 0, 0
+
+    pad = pad_ms * SAMPLE_RATE // 1000
+    start = max(0, int(runs[0]) * FRAME_SAMPLES - pad)
+    end = min(len(pcm), (int(runs[-1]) + ONSET_FRAMES) * FRAME_SAMPLES + pad)
+    return start, end
+
+
+class SpeechSegmenter:
+    def __init__(self, threshold_db=VOICE_VAD_THRESHOLD_DB, segment_silence_ms=VOICE_VAD_SEGMENT_SILENCE_MS,
+                 end_silence_ms=VOICE_VAD_END_SILENCE_MS, max_segment_seconds=VOICE_VAD_MAX_SEGMENT_SECONDS):
+        self.threshold_db = threshold_db
+        self.segment_silence_frames = max(1, segment_silence_ms // 30)
+        self.end_silence_frames = max(1, end_silence_ms // 30) if end_silence_ms else None
+        self.max_segment_frames = int(max_segment_seconds * 1000) // 30
+        self.noise_db = None
+        self._remainder = None
+        self._pre_roll = []
+        self._segment = []        # frames of the open segment
+        self._speech_frames = 0   # speech frames in the open segment
+        self._silence_run = 0
+        self.heard_speech = False
+        self.utterance_ended = False
+
+    def _is_speech(self, level: float) -> bool:
+        if self.noise_db is None:
+            self.noise_db = min(level, INITIAL_NOISE_CEILING_DB)
+        speech = level > max(self.noise_db + self.threshold_db, ABSOLUTE_FLOOR_DB)
+        self.noise_db += (NOISE_SPEECH_RISE_RATE if speech else NOISE_ADAPT_RATE) * (level - self.noise_db)
+        return speech
+
+    def _close(self):
+        """The open segment as one array, or None if it was too short to be speech"""
+        import numpy as np
+
+        segment, speech_frames = self._segment, self._speech_frames
+        self._segment, self._speech_frames, self._silence_run = [], 0, 0
+        if speech_frames < MIN_SPEECH_FRAMES:
+            return None
+        self.heard_speech = True
+        return np.concatenate(segment)
+
+    def feed(self, pcm) -> list:
+        """Add PCM; returns the speech segments closed by it (possibly none)"""
+        import numpy as np
+
+        if self._remainder is not None and len(self._remainder):
+            pcm = np.concatenate([self._remainder, pcm])
+        frames = len(pcm) // FRAME_SAMPLES
+        self._remainder = pcm[frames * FRAME_SAMPLES:]
+
+        closed = []
+        for index, level in enumerate(frame_levels(pcm)):
+            frame = pcm[index * FRAME_SAMPLES:(index + 1) * FRAME_SAMPLES]
+            speech = self._is_speech(float(level))
+
+            if not self._segment:
+                if not speech:
+                    self._pre_roll = (self._pre_roll + [frame])[-PRE_ROLL_FRAMES:]
+                    self._silence_run += 1
+                    if self.heard_speech and self.end_silence_frames and self._silence_run >= self.end_silence_frames:
+                        self.utterance_ended = True
+                    continue
+                self._segment, self._pre_roll = self._pre_roll, []
+
+            self._segment.append(frame)
+            if speech:
+                self._speech_frames += 1
+                self._silence_run = 0
+            else:
+                self._silence_run += 1
+
+            if self._silence_run >= self.segment_silence_frames or len(self._segment) >= self.max_segment_frames:
+                silence_run = self._silence_run
+                segment = self._close()
+                # Keep counting the silence towards the end of the utterance
+                self._silence_run = silence_run
+                if segment is not None:
+                    closed.append(segment)
+        return closed
+
+    def flush(self):
+        """Close the open segment at the end of the stream (None if there is no speech in it)"""
+        if self._remainder is not None and len(self._remainder) and self._segment:
+            self._segment.append(self._remainder)
+        self._remainder = None
+        if not self._segment:
+            return None
+        return self._close()
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+import report
+from report import REPORT_SECTIONS, REPORT_SECTION_SPECS, parse_report_json, _valid_points, _sections_to_repair
+
+
+def points(section, marker=""):
+    return [f"{emoji} {section} point {i}{marker}" for i, emoji in enumerate(REPORT_SECTION_SPECS[section][2])]
+
+
+def full_report():
+    return {section: points(section) for section in REPORT_SECTIONS}
+
+
+def test_plain_json_report_is_parsed():
+    assert parse_report_json(json.dumps(full_report(), ensure_ascii=False)) == full_report()
+
+
+def test_fenced_json_report_is_parsed():
+    response = "```json\n" + json.dumps(full_report(), ensure_ascii=False) + "\n```"
+    assert parse_report_json(response) == full_report()
+
+
+def test_output_truncated_mid_section_keeps_the_complete_sections():
+    text = json.dumps(full_report(), ensure_ascii=False)
+    cut = text.index('"calendar"') + 40
+    parsed = parse_report_json(text[:cut])
+    assert set(parsed) == set(REPORT_SECTIONS) - {"calendar"}
+    assert parsed["sowingAdvice"] == points("sowingAdvice")
+
+
+def test_bracket_inside_a_point_does_not_end_the_salvaged_section():
+    document = full_report()
+    document["sowingAdvice"] = points("sowingAdvice", " [see seed packet]")
+    text = json.dumps(document, ensure_ascii=False)
+    # Cut off in the last section: the earlier ones are salvaged from the broken document
+    parsed = parse_report_json(text[:text.index('"calendar"') + 20])
+    assert parsed["sowingAdvice"] == points("sowingAdvice", " [see seed packet]")
+
+
+def test_valid_points_adds_missing_emojis_and_drops_extra_points():
+    value = ["Sow in June", "🌱 ignored emoji order", "  ", "Rows 30 cm apart", "Water lightly", "Extra point"]
+    assert _valid_points(value, "sowingAdvice") == [
+        "🌱 Sow in June", "📏 🌱 ignored emoji order", "🌾 Rows 30 cm apart", "💧 Water lightly"
+    ]
+
+
+@pytest.mark.parametrize("value", [None, "🌱 one string", ["🌱 a", "📏 b", ""], ["🌱 a", 2, "🌾 c", "💧 d"]])
+def test_valid_points_rejects_short_or_malformed_sections(value):
+    assert _valid_points(value, "sowingAdvice") is None
+
+
+def test_missing_sections_are_repaired_up_to_the_threshold(monkeypatch):
+    monkeypatch.setattr(report, "REPORT_REPAIR_MAX_SECTIONS", 2)
+    sections = full_report()
+    assert _sections_to_repair(sections) == []
+
+    del sections["calendar"], sections["weatherTips"]
+    assert _sections_to_repair(sections) == ["weatherTips", "calendar"]
+
+    # Mostly unusable: no re-asks (fallback data instead)
+    del sections["fertilizerPlan"]
+    assert _sections_to_repair(sections) == []
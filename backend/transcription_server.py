@@ -0,0 +1,96 @@
+"""
+Whisper Transcription Server
+
+Runs the faster-whisper models in a dedicated pool of worker processes, so
+web workers (gunicorn / uvicorn) never load a model themselves. /api/voice
+sends decoded PCM through shared memory (services/transcription_client.py).
+
+Start it next to the web server, on the same host:
+
+Usage:
+    python transcription_server.py                      - Settings from .env (TRANSCRIBE_*)
+    python transcription_server.py --processes 4        - Four worker processes
+    python transcription_server.py --cpu-threads 2 --num-workers 1
+    python transcription_server.py --model base --fixed - Always base (no quality tiers)
+    python transcription_server.py --no-trim            - Decode leading/trailing silence too
+
+Size the pool to the CPU: processes x cpu_threads should not exceed the cores
+left over after the web workers.
+"""
+
+import argparse
+import signal
+import sys
+from services.transcription_pool import TranscriptionPool, serve
+from services.transcription_policy import TranscriptionPolicy
+from utils.config import (
+    TRANSCRIBE_SERVER_HOST,
+    TRANSCRIBE_SERVER_PORT,
+    TRANSCRIBE_AUTHKEY,
+    TRANSCRIBE_PROCESSES,
+    TRANSCRIBE_MODEL_SIZE,
+    TRANSCRIBE_COMPUTE_TYPE,
+    TRANSCRIBE_CPU_THREADS,
+    TRANSCRIBE_NUM_WORKERS,
+    TRANSCRIBE_MAX_QUEUE,
+    TRANSCRIBE_TIMEOUT_SECONDS,
+    TRANSCRIBE_TRIM_SILENCE,
+    TRANSCRIBE_TRIM_PAD_MS,
+    TRANSCRIBE_POLICY_ENABLED,
+    JWT_SECRET_KEY
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whisper transcription worker pool")
+    parser.add_argument("--processes", type=int, default=TRANSCRIBE_PROCESSES, help="worker processes")
+    parser.add_argument("--model", default=TRANSCRIBE_MODEL_SIZE, help="default model size (tiny, base, small)")
+    parser.add_argument("--compute-type", default=TRANSCRIBE_COMPUTE_TYPE, help="CTranslate2 compute type")
+    parser.add_argument("--cpu-threads", type=int, default=TRANSCRIBE_CPU_THREADS, help="threads per model")
+    parser.add_argument("--num-workers", type=int, default=TRANSCRIBE_NUM_WORKERS, help="parallel decodes per model")
+    parser.add_argument("--max-queue", type=int, default=TRANSCRIBE_MAX_QUEUE, help="waiting jobs before 429")
+    parser.add_argument("--fixed", action="store_true", help="always use --model (no load-adaptive tiers)")
+    parser.add_argument("--no-trim", action="store_true", help="decode clips untrimmed (keep leading/trailing silence)")
+    args = parser.parse_args()
+
+    # Connections are unpickled once authenticated - a guessable key would mean code execution
+    if not TRANSCRIBE_AUTHKEY:
+        sys.exit("❌ TRANSCRIBE_AUTHKEY missing - set a dedicated secret (the web workers use the same one)")
+    if TRANSCRIBE_AUTHKEY == JWT_SECRET_KEY.encode():
+        sys.exit("❌ TRANSCRIBE_AUTHKEY must not be JWT_SECRET_KEY - set a dedicated secret")
+
+    policy = TranscriptionPolicy() if TRANSCRIBE_POLICY_ENABLED and not args.fixed else None
+
+    pool = TranscriptionPool(
+        processes=args.processes,
+        model_size=args.model,
+        compute_type=args.compute_type,
+        cpu_threads=args.cpu_threads,
+        num_workers=args.num_workers,
+        max_queue=args.max_queue,
+        policy=policy,
+        trim_silence=TRANSCRIBE_TRIM_SILENCE and not args.no_trim,
+        trim_pad_ms=TRANSCRIBE_TRIM_PAD_MS
+    )
+    pool.start()
+
+    def shutdown(signum, frame):
+        print("\n🛑 Stopping transcription workers...")
+        pool.stop()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    # A job may wait in the queue before it runs - allow for both
+    serve(
+        pool,
+        (TRANSCRIBE_SERVER_HOST, TRANSCRIBE_SERVER_PORT),
+        TRANSCRIBE_AUTHKEY,
+        job_timeout=TRANSCRIBE_TIMEOUT_SECONDS,
+        retry_after=5
+    )
+
+
+if __name__ == "__main__":
+    main()
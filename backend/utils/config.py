@@ -6,6 +6,24 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB = os.getenv("MONGO_DB")
+# Create missing registered indexes (services/db_indexes.py) when the app starts
+DB_ENSURE_INDEXES_ON_STARTUP = os.getenv("DB_ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true"
+
+# Write-behind buffer for chat turns (services/chat_writer.py)
+CHAT_WRITE_BEHIND_ENABLED = os.getenv("CHAT_WRITE_BEHIND_ENABLED", "true").lower() == "true"
+CHAT_WRITE_FLUSH_INTERVAL_MS = int(os.getenv("CHAT_WRITE_FLUSH_INTERVAL_MS", "50"))
+CHAT_WRITE_BATCH_MAX = int(os.getenv("CHAT_WRITE_BATCH_MAX", "500"))            # turns per bulk write
+CHAT_WRITE_MAX_PENDING = int(os.getenv("CHAT_WRITE_MAX_PENDING", "20000"))      # beyond this, callers write through
+CHAT_WRITE_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("CHAT_WRITE_SHUTDOWN_TIMEOUT_SECONDS", "10"))
+
+# Turn-oriented chat storage (services/chat_turns.py, chat_turns collection)
+# 1 = one document per turn; N > 1 = turns of a session bucketed N to a document
+CHAT_TURNS_PER_DOCUMENT = max(1, int(os.getenv("CHAT_TURNS_PER_DOCUMENT", "1")))
+# Also read the pre-migration chat_history collection; turn off once migrate_chat_turns.py has finished
+CHAT_LEGACY_READS = os.getenv("CHAT_LEGACY_READS", "true").lower() == "true"
+# Legacy messages sampled per migration batch, and the pause between batches (keeps the migration online)
+CHAT_MIGRATION_BATCH = int(os.getenv("CHAT_MIGRATION_BATCH", "500"))
+CHAT_MIGRATION_PAUSE_MS = int(os.getenv("CHAT_MIGRATION_PAUSE_MS", "100"))
 
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "change-this-secret")
 JWT_EXPIRY_HOURS = int(os.getenv("JWT_EXPIRY_HOURS", "24"))
@@ -18,7 +36,168 @@ EMAIL_ID = os.getenv("EMAIL_ID")
 EMAIL_APP_PASSWORD = os.getenv("EMAIL_APP_PASSWORD")
 OTP_EXPIRY_MINUTES = int(os.getenv("OTP_EXPIRY_MINUTES", "10"))
 
-if not GEMINI_API_KEY:
+# LLM Provider: "gemini" (Google Gemini) or "stub" (offline load testing, no API key)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+LLM_STUB_LATENCY_MS = os.getenv("LLM_STUB_LATENCY_MS", "lognormal:1200,0.5")
+LLM_STUB_ERROR_RATE = float(os.getenv("LLM_STUB_ERROR_RATE", "0"))
+LLM_STUB_STREAM_CHUNK_MS = int(os.getenv("LLM_STUB_STREAM_CHUNK_MS", "40"))
+LLM_STUB_SEED = int(os.getenv("LLM_STUB_SEED")) if os.getenv("LLM_STUB_SEED") else None
+
+# LLM Response Cache (history-free prompts only)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "21600"))  # 6 hours
+
+# Single-flight coalescing of identical concurrent LLM prompts
+# "local" = threads within a worker, "shared" = across workers via MongoDB
+LLM_COALESCE_ENABLED = os.getenv("LLM_COALESCE_ENABLED", "true").lower() == "true"
+LLM_COALESCE_MODE = os.getenv("LLM_COALESCE_MODE", "local").lower()
+LLM_COALESCE_LEASE_SECONDS = int(os.getenv("LLM_COALESCE_LEASE_SECONDS", "60"))
+LLM_COALESCE_POLL_MS = int(os.getenv("LLM_COALESCE_POLL_MS", "100"))
+LLM_COALESCE_RESULT_TTL_SECONDS = int(os.getenv("LLM_COALESCE_RESULT_TTL_SECONDS", "10"))
+
+# LLM Admission Control (priority lanes: chat > report > trial)
+def _lane_map(value, cast, default=""):
+    """Parse "chat:200,report:100,trial:50" into a dict; lanes missing from value keep their default"""
+    def parse(text):
+        return {lane.strip(): cast(limit) for lane, limit in (item.split(":") for item in text.split(",") if item.strip())}
+    return {**parse(default), **parse(value)}
+
+_DEFAULT_LANE_QUEUE_LIMITS = "chat:200,report:100,trial:50,summary:20"
+_DEFAULT_LANE_MAX_WAIT_SECONDS = "chat:15,report:30,trial:8,summary:60"
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_LANE_QUEUE_LIMITS = _lane_map(
+    os.getenv("LLM_LANE_QUEUE_LIMITS", _DEFAULT_LANE_QUEUE_LIMITS), int, _DEFAULT_LANE_QUEUE_LIMITS
+)
+LLM_LANE_MAX_WAIT_SECONDS = _lane_map(
+    os.getenv("LLM_LANE_MAX_WAIT_SECONDS", _DEFAULT_LANE_MAX_WAIT_SECONDS), float, _DEFAULT_LANE_MAX_WAIT_SECONDS
+)
+
+# LLM call resilience: per-lane deadlines, retries, hedging, circuit breaker
+_DEFAULT_LANE_DEADLINE_SECONDS = "chat:30,report:60,trial:20,summary:90"
+LLM_LANE_DEADLINE_SECONDS = _lane_map(
+    os.getenv("LLM_LANE_DEADLINE_SECONDS", _DEFAULT_LANE_DEADLINE_SECONDS), float, _DEFAULT_LANE_DEADLINE_SECONDS
+)
+LLM_RETRY_MAX_ATTEMPTS = int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "3"))
+LLM_RETRY_BASE_DELAY_MS = int(os.getenv("LLM_RETRY_BASE_DELAY_MS", "250"))
+LLM_RETRY_MAX_DELAY_MS = int(os.getenv("LLM_RETRY_MAX_DELAY_MS", "4000"))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_MIN_DELAY_MS = int(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "500"))
+LLM_BREAKER_ENABLED = os.getenv("LLM_BREAKER_ENABLED", "true").lower() == "true"
+LLM_BREAKER_FAILURE_RATE = float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_OPEN_SECONDS = int(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+
+# Conversation context sent to the LLM (token estimates, see services/context_service.py)
+LLM_CONTEXT_TOKEN_BUDGET = int(os.getenv("LLM_CONTEXT_TOKEN_BUDGET", "1500"))
+LLM_CONTEXT_MAX_MESSAGES = int(os.getenv("LLM_CONTEXT_MAX_MESSAGES", "10"))
+LLM_CONTEXT_MESSAGE_MAX_TOKENS = int(os.getenv("LLM_CONTEXT_MESSAGE_MAX_TOKENS", "400"))
+
+# Rolling summary of turns older than the context window (stored on chat_sessions)
+LLM_SUMMARY_ENABLED = os.getenv("LLM_SUMMARY_ENABLED", "true").lower() == "true"
+LLM_SUMMARY_BATCH_MESSAGES = int(os.getenv("LLM_SUMMARY_BATCH_MESSAGES", "6"))
+LLM_SUMMARY_MAX_WORDS = int(os.getenv("LLM_SUMMARY_MAX_WORDS", "150"))
+
+# Language detection (services/language_service.py): chat sessions whose language is memoized per process
+LANGUAGE_SESSION_CACHE_SIZE = int(os.getenv("LANGUAGE_SESSION_CACHE_SIZE", "10000"))
+
+# Per-user language profile (services/language_profile.py): Whisper language hint for voice
+LANGUAGE_PROFILE_ENABLED = os.getenv("LANGUAGE_PROFILE_ENABLED", "true").lower() == "true"
+LANGUAGE_PROFILE_TTL_SECONDS = int(os.getenv("LANGUAGE_PROFILE_TTL_SECONDS", "3600"))
+LANGUAGE_PROFILE_HISTORY = int(os.getenv("LANGUAGE_PROFILE_HISTORY", "50"))          # latest messages / sessions
+LANGUAGE_PROFILE_MIN_SAMPLES = int(os.getenv("LANGUAGE_PROFILE_MIN_SAMPLES", "3"))
+LANGUAGE_PROFILE_MIN_SHARE = float(os.getenv("LANGUAGE_PROFILE_MIN_SHARE", "0.8"))
+# A hinted transcript below this average log-probability is redone with auto-detection
+LANGUAGE_HINT_MIN_LOGPROB = float(os.getenv("LANGUAGE_HINT_MIN_LOGPROB", "-1.0"))
+
+# Whisper transcription server (transcription_server.py) - web workers never load a model
+TRANSCRIBE_SERVER_HOST = os.getenv("TRANSCRIBE_SERVER_HOST", "127.0.0.1")
+TRANSCRIBE_SERVER_PORT = int(os.getenv("TRANSCRIBE_SERVER_PORT", "5055"))
+# The server unpickles what authenticated clients send: a dedicated secret, never the JWT key (required by
+# transcription_server.py)
+TRANSCRIBE_AUTHKEY = os.getenv("TRANSCRIBE_AUTHKEY", "").encode()
+TRANSCRIBE_PROCESSES = int(os.getenv("TRANSCRIBE_PROCESSES", "2"))
+TRANSCRIBE_MODEL_SIZE = os.getenv("TRANSCRIBE_MODEL_SIZE", "tiny")
+TRANSCRIBE_COMPUTE_TYPE = os.getenv("TRANSCRIBE_COMPUTE_TYPE", "int8")
+TRANSCRIBE_CPU_THREADS = int(os.getenv("TRANSCRIBE_CPU_THREADS", "2"))
+TRANSCRIBE_NUM_WORKERS = int(os.getenv("TRANSCRIBE_NUM_WORKERS", "1"))
+TRANSCRIBE_MAX_QUEUE = int(os.getenv("TRANSCRIBE_MAX_QUEUE", "32"))
+TRANSCRIBE_TIMEOUT_SECONDS = int(os.getenv("TRANSCRIBE_TIMEOUT_SECONDS", "60"))
+# The web worker waits this much longer than the server's job timeout, so the server's own "timeout" answer
+# arrives before the client gives up on the connection
+TRANSCRIBE_CLIENT_TIMEOUT_SECONDS = TRANSCRIBE_TIMEOUT_SECONDS + max(1, int(os.getenv("TRANSCRIBE_TIMEOUT_MARGIN_SECONDS", "5")))
+# Skip leading / trailing silence (and clips with no speech at all) before decoding
+TRANSCRIBE_TRIM_SILENCE = os.getenv("TRANSCRIBE_TRIM_SILENCE", "true").lower() == "true"
+TRANSCRIBE_TRIM_PAD_MS = int(os.getenv("TRANSCRIBE_TRIM_PAD_MS", "200"))
+
+# Load-adaptive quality tiers (services/transcription_policy.py): "name:model/compute_type/beam_size",
+# tried in order; a tier applies while queue depth and clip length are within its limits (last = no limits)
+_DEFAULT_TRANSCRIBE_POLICY_TIERS = "quality:small/int8/5,balanced:base/int8/2,fast:tiny/int8/1"
+_DEFAULT_TRANSCRIBE_POLICY_MAX_QUEUE = "quality:0,balanced:2"
+_DEFAULT_TRANSCRIBE_POLICY_MAX_SECONDS = "quality:15,balanced:30"
+TRANSCRIBE_POLICY_ENABLED = os.getenv("TRANSCRIBE_POLICY_ENABLED", "true").lower() == "true"
+TRANSCRIBE_POLICY_TIERS = _lane_map(
+    os.getenv("TRANSCRIBE_POLICY_TIERS", _DEFAULT_TRANSCRIBE_POLICY_TIERS), str
+)
+TRANSCRIBE_POLICY_MAX_QUEUE = _lane_map(
+    os.getenv("TRANSCRIBE_POLICY_MAX_QUEUE", _DEFAULT_TRANSCRIBE_POLICY_MAX_QUEUE), int, _DEFAULT_TRANSCRIBE_POLICY_MAX_QUEUE
+)
+TRANSCRIBE_POLICY_MAX_SECONDS = _lane_map(
+    os.getenv("TRANSCRIBE_POLICY_MAX_SECONDS", _DEFAULT_TRANSCRIBE_POLICY_MAX_SECONDS), float, _DEFAULT_TRANSCRIBE_POLICY_MAX_SECONDS
+)
+TRANSCRIBE_POLICY_LOG_PATH = os.getenv("TRANSCRIBE_POLICY_LOG_PATH", "logs/transcription_decisions.jsonl")
+
+# /api/voice uploads (services/audio_decode.py): rejected before decoding when larger / longer
+VOICE_MAX_UPLOAD_BYTES = int(os.getenv("VOICE_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+VOICE_MAX_SECONDS = float(os.getenv("VOICE_MAX_SECONDS", "60"))
+VOICE_FFMPEG_PATH = os.getenv("VOICE_FFMPEG_PATH", "ffmpeg")
+
+# Voice activity detection (services/vad.py) for streaming voice over /ws/voice
+VOICE_VAD_THRESHOLD_DB = float(os.getenv("VOICE_VAD_THRESHOLD_DB", "10"))
+VOICE_VAD_SEGMENT_SILENCE_MS = int(os.getenv("VOICE_VAD_SEGMENT_SILENCE_MS", "450"))
+# Silence after speech that ends the utterance without an explicit "end" message (0 = wait for "end")
+VOICE_VAD_END_SILENCE_MS = int(os.getenv("VOICE_VAD_END_SILENCE_MS", "1500"))
+VOICE_VAD_MAX_SEGMENT_SECONDS = float(os.getenv("VOICE_VAD_MAX_SEGMENT_SECONDS", "15"))
+
+# Local agriculture-domain classifier (services/domain_classifier.py)
+DOMAIN_CLASSIFIER_ENABLED = os.getenv("DOMAIN_CLASSIFIER_ENABLED", "true").lower() == "true"
+DOMAIN_CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("DOMAIN_CLASSIFIER_MIN_CONFIDENCE", "0.75"))
+# Answer clearly off-topic first messages in chat with the fallback, without calling the LLM
+DOMAIN_FILTER_CHAT = os.getenv("DOMAIN_FILTER_CHAT", "false").lower() == "true"
+DOMAIN_FILTER_CHAT_MIN_CONFIDENCE = float(os.getenv("DOMAIN_FILTER_CHAT_MIN_CONFIDENCE", "0.85"))
+
+# Precomputed Farming Report Store
+REPORT_STORE_ENABLED = os.getenv("REPORT_STORE_ENABLED", "true").lower() == "true"
+REPORT_STORE_FRESHNESS_HOURS = int(os.getenv("REPORT_STORE_FRESHNESS_HOURS", "168"))  # 7 days
+REPORT_PREWARM_TOP_N = int(os.getenv("REPORT_PREWARM_TOP_N", "50"))
+REPORT_PREWARM_LOOKBACK_DAYS = int(os.getenv("REPORT_PREWARM_LOOKBACK_DAYS", "30"))
+
+# Batch report generation (POST /api/reports/batch)
+REPORT_BATCH_MAX_ITEMS = int(os.getenv("REPORT_BATCH_MAX_ITEMS", "30"))
+REPORT_BATCH_CONCURRENCY = int(os.getenv("REPORT_BATCH_CONCURRENCY", "6"))
+
+# JSON-mode report generation: missing sections are re-asked individually,
+# unless more than this many are missing (then fallback data is used)
+REPORT_REPAIR_MAX_SECTIONS = int(os.getenv("REPORT_REPAIR_MAX_SECTIONS", "2"))
+
+# Paginated list APIs (/api/chats, /api/chats/<chat_id>, /api/reports, /api/history): default page sizes and the cap
+_DEFAULT_LIST_PAGE_SIZES = "sessions:50,messages:100,reports:20,history:50"
+LIST_PAGE_SIZES = _lane_map(os.getenv("LIST_PAGE_SIZES", _DEFAULT_LIST_PAGE_SIZES), int, _DEFAULT_LIST_PAGE_SIZES)
+LIST_PAGE_MAX = int(os.getenv("LIST_PAGE_MAX", "200"))
+# Serve the old unpaginated shapes (full arrays / documents); per request with ?compat=1
+LIST_API_COMPAT = os.getenv("LIST_API_COMPAT", "false").lower() == "true"
+
+# Admin statistics counters (services/stats_service.py, app_stats collection)
+# Hourly rollups expire after this many days (at least 8, the dashboard sums the last 7 days from them)
+STATS_HOURLY_RETENTION_DAYS = max(8, int(os.getenv("STATS_HOURLY_RETENTION_DAYS", "14")))
+# Days of daily rollups returned by /api/admin/statistics
+STATS_SERIES_DAYS = int(os.getenv("STATS_SERIES_DAYS", "30"))
+
+if LLM_PROVIDER == "gemini" and not GEMINI_API_KEY:
     raise ValueError("❌ GEMINI_API_KEY missing")
 
 if not MONGO_URI:
@@ -1,19 +1,24 @@
-from faster_whisper import WhisperModel
-from pydub import AudioSegment
-import tempfile
-import os
+import asyncio
 
 from services.llm_service import get_ai_response
+from services.llm_errors import LLMError
+from services.transcription_client import transcribe, TranscriptionError
+from services.audio_decode import decode_audio, decode_pcm16, AudioRejectedError, SAMPLE_RATE
+from services.vad import SpeechSegmenter
 from services.db_service import save_chat
-
-# -----------------------------
-# Whisper Model (FREE, OFFLINE)
-# -----------------------------
-whisper_model = WhisperModel(
-    model_size_or_path="tiny",
-    device="cpu",
-    compute_type="int8"
+from services.domain_classifier import is_agriculture_query
+from services.language_service import LANGUAGE_MAP, LANGUAGE_CODES, resolve_language
+from services.language_profile import (
+    transcription_language_hint,
+    hinted_transcript_ok,
+    forget_user_language_profile
 )
+from utils.config import DOMAIN_CLASSIFIER_ENABLED, VOICE_MAX_SECONDS
+
+# Streaming: Whisper prompt carried from earlier segments, and the language
+# probability at which the first segment's language is kept for the rest
+STREAM_PROMPT_CHARS = 200
+STREAM_LANGUAGE_LOCK_PROBABILITY = 0.8
 
 # -----------------------------
 # Language-wise fallback messages
@@ -48,69 +53,184 @@ Query:
     result = get_ai_response(prompt).strip().upper()
     return result.startswith("YES")
 
+
+def is_agriculture_query_voice(text: str) -> bool:
+    """Local classifier first; the LLM check only for low-confidence queries"""
+    if not DOMAIN_CLASSIFIER_ENABLED:
+        return is_agriculture_query_ai(text)
+    return is_agriculture_query(text, llm_check=is_agriculture_query_ai)
+
+# -----------------------------
+# Transcription with the user's language hint
+# -----------------------------
+def transcribe_for_user(pcm, user_id: str, **options) -> dict:
+    """
+    Whisper with the user's usual language forced (no detection pass); redone
+    with auto-detection when the hinted transcript looks wrong.
+    """
+    hint = transcription_language_hint(user_id)
+    if hint:
+        transcript = transcribe(pcm, language=hint, **options)
+        if hinted_transcript_ok(transcript, hint):
+            return transcript
+        # The farmer switched language: rebuild the profile from this turn on
+        forget_user_language_profile(user_id)
+    return transcribe(pcm, **options)
+
 # -----------------------------
 # Voice Handler
 # -----------------------------
-def handle_voice(audio_file, user_id):
+def answer_voice_text(user_text: str, whisper_language: str, user_id: str) -> dict:
     """
-    Voice → Native text → AI domain check → AI response / fallback
+    Transcript → domain check (local, AI if unsure) → AI response / fallback → saved voice turn
+    Shared by /api/voice and the streaming /ws/voice endpoint.
     """
+    # Whisper's language unless the transcript is in another script
+    # (e.g. Odia speech detected as Hindi)
+    language_code = whisper_language or "en"
+    if user_text:
+        language_code = LANGUAGE_CODES[resolve_language(user_text, LANGUAGE_MAP.get(language_code))]
+
+    # Empty input
+    if not user_text:
+        response = FALLBACK_MESSAGES["en"]
+        response_type = "fallback"
+
+    # Domain validation
+    elif not is_agriculture_query_voice(user_text):
+        response = FALLBACK_MESSAGES.get(language_code, FALLBACK_MESSAGES["en"])
+        response_type = "fallback"
+
+    else:
+        # Agriculture query → AI response
+        ai_prompt = f"Respond ONLY in the same language.\n\n{user_text}"
+        response = get_ai_response(ai_prompt)
+        response_type = "ai"
+
+    # Save to MongoDB (voice input)
+    save_chat(
+        user_id=user_id,
+        question=user_text,
+        answer=response,
+        response_type=response_type,
+        language=language_code,
+        input_type="voice"
+    )
+
+    return {
+        "user_text": user_text,
+        "ai_reply": response,
+        "response_type": response_type,
+        "language": language_code
+    }
 
-    try:
-        # Save uploaded audio temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp:
-            audio_path = temp.name
-            audio_file.save(audio_path)
-
-        # Ensure WAV format
-        audio = AudioSegment.from_file(audio_path)
-        audio.export(audio_path, format="wav")
-
-        # Whisper transcription
-        segments, info = whisper_model.transcribe(audio_path)
-        user_text = " ".join(s.text for s in segments).strip()
-
-        language_code = info.language or "en"
-
-        # Empty input
-        if not user_text:
-            response = FALLBACK_MESSAGES["en"]
-            response_type = "fallback"
-
-        # AI-based domain validation
-        elif not is_agriculture_query_ai(user_text):
-            response = FALLBACK_MESSAGES.get(language_code, FALLBACK_MESSAGES["en"])
-            response_type = "fallback"
-
-        else:
-            # Agriculture query → AI response
-            ai_prompt = f"Respond ONLY in the same language.\n\n{user_text}"
-            response = get_ai_response(ai_prompt)
-            response_type = "ai"
-
-        # Save to MongoDB (voice input)
-        save_chat(
-            user_id=user_id,
-            question=user_text,
-            answer=response,
-            response_type=response_type,
-            language=language_code,
-            input_type="voice"
-        )
 
-        return {
-            "user_text": user_text,
-            "ai_reply": response,
-            "response_type": response_type,
-            "language": language_code
-        }
+def handle_voice(audio_file, user_id):
+    """
+    Voice → Native text → domain check (local, AI if unsure) → AI response / fallback
 
+    audio_file: werkzeug FileStorage (multipart part or raw audio body)
+    """
+
+    try:
+        # Decode in memory to 16 kHz mono PCM, then Whisper on the transcription pool
+        pcm = decode_audio(audio_file.stream, audio_file.mimetype, audio_file.mimetype_params)
+        transcript = transcribe_for_user(pcm, user_id)
+        return answer_voice_text(transcript["text"], transcript["language"], user_id)
+
+    except (LLMError, TranscriptionError, AudioRejectedError):
+        # Let the route answer 413 / 429 / 503 instead of a fallback reply
+        raise
     except Exception as e:
         return {
             "error": "Voice processing failed",
             "details": str(e)
         }
 
-    finally:
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
+
+# -----------------------------
+# Streaming Voice (/ws/voice)
+# -----------------------------
+class VoiceStream:
+    """
+    One streamed utterance: PCM frames in while the farmer speaks, a partial
+    transcript out per speech segment (VAD), and the AI reply as soon as the
+    last segment is transcribed.
+
+    Segments are transcribed in order by one background task while frames keep
+    arriving; each is decoded with the text so far as Whisper's prompt and the
+    language of the first confident segment (itself hinted by the user's
+    language profile), so the pieces read as one query.
+    """
+
+    def __init__(self, user_id: str, send_event, sample_rate: int = SAMPLE_RATE):
+        self.user_id = user_id
+        self.send_event = send_event
+        self.sample_rate = sample_rate
+        self.segmenter = SpeechSegmenter()
+        self.samples = 0
+        self.texts = []
+        self.language = None
+        self.languages = {}   # language -> seconds of speech
+        self._segments = asyncio.Queue()
+        self._worker = asyncio.create_task(self._transcribe_segments())
+
+    async def feed(self, data: bytes) -> bool:
+        """Add a binary frame; True once VAD has heard the end of the utterance"""
+        if self._worker.done():
+            # Surface a transcription failure while the client is still talking
+            self._worker.result()
+        pcm = decode_pcm16(data, self.sample_rate)
+        self.samples += len(pcm)
+        if self.samples > VOICE_MAX_SECONDS * SAMPLE_RATE:
+            raise AudioRejectedError(f"Audio is longer than {VOICE_MAX_SECONDS:g} seconds", 413)
+        for segment in self.segmenter.feed(pcm):
+            self._segments.put_nowait(segment)
+        return self.segmenter.utterance_ended
+
+    async def finish(self) -> dict:
+        """Close the last segment, wait for its transcript and answer the full utterance"""
+        segment = self.segmenter.flush()
+        if segment is not None:
+            self._segments.put_nowait(segment)
+        self._segments.put_nowait(None)
+        await self._worker
+
+        user_text = " ".join(self.texts).strip()
+        language = max(self.languages, key=self.languages.get) if self.languages else None
+        await self.send_event({"type": "final", "text": user_text, "language": language})
+        return await asyncio.to_thread(answer_voice_text, user_text, language, self.user_id)
+
+    def cancel(self):
+        self._worker.cancel()
+
+    async def _transcribe_segments(self):
+        index = 0
+        while True:
+            segment = await self._segments.get()
+            if segment is None:
+                return
+            options = {}
+            if self.texts:
+                options["initial_prompt"] = " ".join(self.texts)[-STREAM_PROMPT_CHARS:]
+            if self.language:
+                transcript = await asyncio.to_thread(transcribe, segment, language=self.language, **options)
+            else:
+                transcript = await asyncio.to_thread(transcribe_for_user, segment, self.user_id, **options)
+
+            text = transcript["text"]
+            if not text:
+                continue
+            if not self.language and transcript["language_probability"] >= STREAM_LANGUAGE_LOCK_PROBABILITY:
+                self.language = transcript["language"]
+            self.languages[transcript["language"]] = (
+                self.languages.get(transcript["language"], 0.0) + transcript["audio_seconds"]
+            )
+            self.texts.append(text)
+            index += 1
+            await self.send_event({
+                "type": "partial",
+                "segment": index,
+                "text": text,
+                "text_so_far": " ".join(self.texts)
+            })
@@ -47,6 +47,12 @@ const ChatPage = () => {
   const [showSidebar, setShowSidebar] = useState(true);
   const [isMobileSidebarOpen, setIsMobileSidebarOpen] = useState(false);
   const [chatToDelete, setChatToDelete] = useState<string | null>(null);
+  // next_cursor of the last loaded session page - /api/chats returns the most recent sessions first
+  const [sessionsCursor, setSessionsCursor] = useState<string | null>(null);
+  const [isLoadingMoreSessions, setIsLoadingMoreSessions] = useState(false);
+  // next_cursor of the oldest loaded page - /api/chats/<id> returns the newest messages first
+  const [olderCursor, setOlderCursor] = useState<string | null>(null);
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false);
 
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
@@ -57,6 +63,8 @@ const ChatPage = () => {
   const streamRef = useRef<MediaStream | null>(null);
   const currentChatIdRef = useRef<string | null>(null);
   const promptProcessedRef = useRef(false);
+  const keepScrollRef = useRef(false);
+  const loadedMoreSessionsRef = useRef(false);
 
   // Scroll to top when navigating away from this page
   useEffect(() => {
@@ -107,9 +115,11 @@ const ChatPage = () => {
         });
 
         if (sessionsResponse.ok) {
-          const sessions = await sessionsResponse.json();
+          const { sessions, next_cursor } = await sessionsResponse.json();
           console.log('Chat sessions loaded:', sessions);
+          loadedMoreSessionsRef.current = false;
           setChatSessions(sessions);
+          setSessionsCursor(next_cursor || null);
 
           // Show welcome message without loading any session
           setMessages([
@@ -167,6 +177,15 @@ const ChatPage = () => {
     checkInitialPrompt();
   }, [location.state, navigate, location.pathname]);
 
+  // Convert API messages to display format
+  const toDisplayMessages = (apiMessages: any[]): Message[] =>
+    apiMessages.map((msg: any) => ({
+      id: `${msg.timestamp}-${msg.role}`,
+      text: msg.content,
+      sender: msg.role === 'user' ? 'user' : 'bot',
+      timestamp: new Date(msg.timestamp)
+    }));
+
   // Load a specific chat session
   const loadChatSession = async (chatId: string, token?: string) => {
     const authToken = token || localStorage.getItem('token');
@@ -178,6 +197,7 @@ const ChatPage = () => {
     // Update state
     setCurrentChatId(chatId);
     setMessages([]); // Clear messages immediately
+    setOlderCursor(null);
 
     try {
       const response = await fetch(getApiUrl(`${API_ENDPOINTS.CHATS}/${chatId}`), {
@@ -197,15 +217,10 @@ const ChatPage = () => {
 
         console.log('✅ Chat data loaded for:', chatId);
 
-        // Convert messages to display format
-        const displayMessages: Message[] = chatData.messages.map((msg: any) => ({
-          id: msg.timestamp,
-          text: msg.content,
-          sender: msg.role === 'user' ? 'user' : 'bot',
-          timestamp: new Date(msg.timestamp)
-        }));
+        const displayMessages = toDisplayMessages(chatData.messages);
 
         setMessages(displayMessages);
+        setOlderCursor(chatData.next_cursor || null);
         console.log(`✅ Loaded ${displayMessages.length} messages`);
       }
     } catch (error) {
@@ -213,6 +228,43 @@ const ChatPage = () => {
     }
   };
 
+  // Load the page of messages before the oldest one shown
+  const loadOlderMessages = async () => {
+    const chatId = currentChatIdRef.current;
+    const authToken = localStorage.getItem('token');
+    if (!chatId || !authToken || !olderCursor || isLoadingOlder) return;
+
+    setIsLoadingOlder(true);
+    try {
+      const response = await fetch(
+        getApiUrl(`${API_ENDPOINTS.CHATS}/${chatId}?before=${encodeURIComponent(olderCursor)}`),
+        {
+          headers: {
+            'Authorization': `Bearer ${authToken}`
+          }
+        }
+      );
+
+      if (response.ok) {
+        const chatData = await response.json();
+
+        if (currentChatIdRef.current !== chatId) {
+          console.warn('⚠️ User switched chats, discarding older messages');
+          return;
+        }
+
+        // Older messages go on top - keep the scroll position where it is
+        keepScrollRef.current = true;
+        setMessages(prev => [...toDisplayMessages(chatData.messages), ...prev]);
+        setOlderCursor(chatData.next_cursor || null);
+      }
+    } catch (error) {
+      console.error('❌ Failed to load older messages:', error);
+    } finally {
+      setIsLoadingOlder(false);
+    }
+  };
+
   // Create a new chat session
   const createNewChat = () => {
     // Force immediate state reset using ref (synchronous)
@@ -221,6 +273,7 @@ const ChatPage = () => {
     // Clear state
     setCurrentChatId(null);
     setMessages([]); // Clear messages first
+    setOlderCursor(null);
 
     // Use setTimeout to ensure messages are cleared before adding welcome message
     // This prevents race conditions with React's state batching
@@ -283,6 +336,7 @@ const ChatPage = () => {
           currentChatIdRef.current = null;
           setCurrentChatId(null);
           setMessages([]); // Clear first
+          setOlderCursor(null);
 
           // Then add welcome message
           setTimeout(() => {
@@ -331,14 +385,54 @@ const ChatPage = () => {
       });
 
       if (response.ok) {
-        const sessions = await response.json();
-        setChatSessions(sessions);
+        const { sessions, next_cursor } = await response.json();
+        if (!loadedMoreSessionsRef.current) {
+          setChatSessions(sessions);
+          setSessionsCursor(next_cursor || null);
+          return;
+        }
+        // Older pages were loaded: refresh the first page, keep the rest (and the cursor after them)
+        const refreshed = new Set(sessions.map((s: ChatSession) => s._id));
+        setChatSessions(prev => [...sessions, ...prev.filter(s => !refreshed.has(s._id))]
+          .sort((a, b) => new Date(b.updated_at).getTime() - new Date(a.updated_at).getTime()));
       }
     } catch (error) {
       console.error('Failed to refresh chat sessions:', error);
     }
   }, []);
 
+  // Load the page of sessions after the last one shown
+  const loadMoreSessions = async () => {
+    const token = localStorage.getItem('token');
+    if (!token || !sessionsCursor || isLoadingMoreSessions) return;
+
+    setIsLoadingMoreSessions(true);
+    try {
+      const response = await fetch(
+        getApiUrl(`${API_ENDPOINTS.CHATS}?cursor=${encodeURIComponent(sessionsCursor)}`),
+        {
+          headers: {
+            'Authorization': `Bearer ${token}`
+          }
+        }
+      );
+
+      if (response.ok) {
+        const { sessions, next_cursor } = await response.json();
+        loadedMoreSessionsRef.current = true;
+        setChatSessions(prev => {
+          const shown = new Set(prev.map(s => s._id));
+          return [...prev, ...sessions.filter((s: ChatSession) => !shown.has(s._id))];
+        });
+        setSessionsCursor(next_cursor || null);
+      }
+    } catch (error) {
+      console.error('Failed to load more chat sessions:', error);
+    } finally {
+      setIsLoadingMoreSessions(false);
+    }
+  };
+
   const scrollToBottom = useCallback(() => {
     // Use instant scroll on mobile for better performance
     const behavior = isMobile ? 'instant' : 'smooth';
@@ -352,6 +446,10 @@ const ChatPage = () => {
   );
 
   useEffect(() => {
+    if (keepScrollRef.current) {
+      keepScrollRef.current = false;
+      return;
+    }
     debouncedScroll();
   }, [messages, debouncedScroll]);
 
@@ -1070,6 +1168,7 @@ const ChatPage = () => {
     currentChatIdRef.current = null;
     setCurrentChatId(null);
     setMessages([]);
+    setOlderCursor(null);
 
     setTimeout(() => {
       setMessages([
@@ -1113,6 +1212,17 @@ const ChatPage = () => {
     </div>
   );
 
+  // "Load more" at the end of the session list (desktop and mobile sidebar)
+  const sessionsLoadMore = sessionsCursor && (
+    <button
+      onClick={loadMoreSessions}
+      disabled={isLoadingMoreSessions}
+      className="w-full py-2 rounded-2xl text-xs sm:text-sm font-medium text-green-700 bg-green-50 hover:bg-green-100 border border-green-200 dark:text-green-300 dark:bg-green-900/30 dark:hover:bg-green-900/50 dark:border-green-800 disabled:opacity-60 transition-colors"
+    >
+      {isLoadingMoreSessions ? 'Loading…' : 'Load more chats'}
+    </button>
+  );
+
   return (
     <div className="min-h-screen bg-gradient-to-br from-green-50 via-emerald-50 to-teal-50 dark:from-gray-900 dark:via-emerald-950 dark:to-gray-900 transition-all duration-500">
       <div className="h-screen pt-14 sm:pt-16 flex relative">
@@ -1137,7 +1247,7 @@ const ChatPage = () => {
                   </div>
                   <div>
                     <h3 className="font-bold text-gray-800 dark:text-gray-100 text-base">Chat History</h3>
-                    <p className="text-xs text-gray-500 dark:text-gray-400">{chatSessions.length} conversation{chatSessions.length !== 1 ? 's' : ''}</p>
+                    <p className="text-xs text-gray-500 dark:text-gray-400">{chatSessions.length}{sessionsCursor ? '+' : ''} conversation{chatSessions.length !== 1 ? 's' : ''}</p>
                   </div>
                 </div>
                 <motion.button
@@ -1178,7 +1288,7 @@ const ChatPage = () => {
                       key={session._id}
                       initial={{ opacity: 0, x: -20 }}
                       animate={{ opacity: 1, x: 0 }}
-                      transition={{ delay: index * 0.05 }}
+                      transition={{ delay: (index % 50) * 0.05 }}
                       whileHover={{ scale: 1.02, x: 4 }}
                       onClick={() => loadChatSession(session._id)}
                       className={`group relative p-4 rounded-2xl cursor-pointer transition-all duration-200 ${currentChatId === session._id
@@ -1219,6 +1329,7 @@ const ChatPage = () => {
                     </motion.div>
                   ))
                 )}
+                {sessionsLoadMore}
               </div>
             </motion.div>
 
@@ -1255,7 +1366,7 @@ const ChatPage = () => {
                           </div>
                           <div>
                             <h3 className="font-bold text-gray-800 dark:text-gray-100 text-base">Chat History</h3>
-                            <p className="text-xs text-gray-500 dark:text-gray-400">{chatSessions.length} conversation{chatSessions.length !== 1 ? 's' : ''}</p>
+                            <p className="text-xs text-gray-500 dark:text-gray-400">{chatSessions.length}{sessionsCursor ? '+' : ''} conversation{chatSessions.length !== 1 ? 's' : ''}</p>
                           </div>
                         </div>
                         <motion.button
@@ -1349,6 +1460,7 @@ const ChatPage = () => {
                           </motion.div>
                         ))
                       )}
+                      {sessionsLoadMore}
                     </div>
                   </motion.div>
                 </>
@@ -1435,6 +1547,17 @@ const ChatPage = () => {
 
           {/* Messages */}
           <div className="flex-1 overflow-y-auto p-3 sm:p-4 md:p-5 lg:p-6 xl:p-8 space-y-3 md:space-y-4 lg:space-y-5 scrollbar-hide" style={{ scrollbarWidth: 'none', msOverflowStyle: 'none' }}>
+            {olderCursor && (
+              <div className="flex justify-center">
+                <button
+                  onClick={loadOlderMessages}
+                  disabled={isLoadingOlder}
+                  className="px-4 py-1.5 rounded-full text-xs sm:text-sm font-medium text-green-700 bg-green-50 hover:bg-green-100 border border-green-200 dark:text-green-300 dark:bg-green-900/30 dark:hover:bg-green-900/50 dark:border-green-800 disabled:opacity-60 transition-colors"
+                >
+                  {isLoadingOlder ? 'Loading…' : 'Load older messages'}
+                </button>
+              </div>
+            )}
             {messages.map((message, index) => (
               <motion.div
                 key={message.id}
@@ -16,11 +16,10 @@ interface CropReport {
 }
 
 interface ReportHistory {
-  user_id: string;
+  _id: string;
   crop_name: string;
   region: string;
   language: string;
-  report_data: CropReport;
   timestamp: string;
 }
 
@@ -33,6 +32,9 @@ const ReportPage = () => {
   const [isDownloading, setIsDownloading] = useState(false);
   const [reportHistory, setReportHistory] = useState<ReportHistory[]>([]);
   const [isLoadingHistory, setIsLoadingHistory] = useState(false);
+  // next_cursor of the last loaded page - /api/reports returns the newest reports first
+  const [reportsCursor, setReportsCursor] = useState<string | null>(null);
+  const [isLoadingMoreReports, setIsLoadingMoreReports] = useState(false);
   const [showHistory, setShowHistory] = useState(true);
   const [isAuthenticated, setIsAuthenticated] = useState(false);
   const reportRef = useRef<HTMLDivElement>(null);
@@ -59,8 +61,9 @@ const ReportPage = () => {
       });
 
       if (response.ok) {
-        const data = await response.json();
-        setReportHistory(data);
+        const { reports, next_cursor } = await response.json();
+        setReportHistory(reports);
+        setReportsCursor(next_cursor || null);
       }
     } catch (error) {
       console.error('Error fetching report history:', error);
@@ -69,11 +72,55 @@ const ReportPage = () => {
     }
   };
 
-  const loadHistoryReport = (historyItem: ReportHistory) => {
+  // Load the page of reports after the last one shown
+  const loadMoreReports = async () => {
+    if (!reportsCursor || isLoadingMoreReports) return;
+
+    setIsLoadingMoreReports(true);
+    try {
+      const token = localStorage.getItem('token');
+      const response = await fetch(
+        getApiUrl(`${API_ENDPOINTS.REPORTS}?cursor=${encodeURIComponent(reportsCursor)}`),
+        {
+          headers: {
+            'Authorization': `Bearer ${token}`
+          }
+        }
+      );
+
+      if (response.ok) {
+        const { reports, next_cursor } = await response.json();
+        setReportHistory(prev => [...prev, ...reports]);
+        setReportsCursor(next_cursor || null);
+      }
+    } catch (error) {
+      console.error('Error loading more reports:', error);
+    } finally {
+      setIsLoadingMoreReports(false);
+    }
+  };
+
+  const loadHistoryReport = async (historyItem: ReportHistory) => {
+    // The history list has no report_data - fetch the full report on demand
+    let reportData: CropReport;
+    try {
+      const token = localStorage.getItem('token');
+      const response = await fetch(getApiUrl(`${API_ENDPOINTS.REPORTS}/${historyItem._id}`), {
+        headers: {
+          'Authorization': `Bearer ${token}`
+        }
+      });
+      if (!response.ok) return;
+      reportData = (await response.json()).report_data;
+    } catch (error) {
+      console.error('Error loading report:', error);
+      return;
+    }
+
     setCropName(historyItem.crop_name);
     setRegion(historyItem.region);
     setLanguage(historyItem.language);
-    setReport(historyItem.report_data);
+    setReport(reportData);
     setShowHistory(false);
     // Scroll to report
     setTimeout(() => {
@@ -455,10 +502,10 @@ const ReportPage = () => {
                   >
                     {reportHistory.map((item, index) => (
                       <motion.div
-                        key={index}
+                        key={item._id}
                         initial={{ opacity: 0, y: 10 }}
                         animate={{ opacity: 1, y: 0 }}
-                        transition={{ delay: index * 0.05 }}
+                        transition={{ delay: (index % 20) * 0.05 }}
                         whileHover={{ scale: 1.02, x: 4 }}
                         onClick={() => loadHistoryReport(item)}
                         className="relative overflow-hidden bg-gradient-to-br from-emerald-50 to-teal-50 dark:from-emerald-900/20 dark:to-teal-900/20 p-4 rounded-xl cursor-pointer shadow-md hover:shadow-lg transition-all border-2 border-emerald-200 dark:border-emerald-800 hover:border-emerald-400 dark:hover:border-emerald-600 group"
@@ -488,6 +535,15 @@ const ReportPage = () => {
                         </div>
                       </motion.div>
                     ))}
+                    {reportsCursor && (
+                      <button
+                        onClick={loadMoreReports}
+                        disabled={isLoadingMoreReports}
+                        className="w-full py-2 rounded-xl text-sm font-medium text-emerald-700 bg-emerald-50 hover:bg-emerald-100 border border-emerald-200 dark:text-emerald-300 dark:bg-emerald-900/30 dark:hover:bg-emerald-900/50 dark:border-emerald-800 disabled:opacity-60 transition-colors"
+                      >
+                        {isLoadingMoreReports ? 'Loading…' : 'Load more reports'}
+                      </button>
+                    )}
                   </motion.div>
                 ) : null}
               </AnimatePresence>